@@ -0,0 +1,143 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for the CSR adjacency of workflow plans
+"""
+
+import pickle
+import unittest
+
+import networkx as nx
+import numpy as np
+
+from topsim.core.adjacency import Adjacency, Structure
+from topsim.core.planner import WorkflowPlan, WorkflowStatus
+from topsim.core.task import Task
+from topsim.user.plan.batch_planning import BatchPlanning, _workflow_to_nx
+
+WORKFLOW = "test/data/config/standard/workflow_config_minutes.json"
+
+
+class _Observation:
+    name = 'emu'
+    workflow = WORKFLOW
+
+
+def _tasks(size):
+    return [Task(f"t{i}", 0, 0, None, []) for i in range(size)]
+
+
+class TestStructure(unittest.TestCase):
+
+    def setUp(self):
+        self.structure = Structure.from_edges(
+            4, [0, 0, 1, 2], [1, 2, 3, 3], transfer_data=[5, 6, 1, 2])
+
+    def test_csr(self):
+        structure = self.structure
+        self.assertEqual(4, len(structure))
+        self.assertEqual(4, structure.edges)
+        self.assertEqual(np.int32, structure.succ_indices.dtype)
+        self.assertEqual([1, 2], list(structure.successors(0)))
+        self.assertEqual([1, 2], list(structure.predecessors(3)))
+        self.assertEqual([], list(structure.predecessors(0)))
+        self.assertEqual([0, 1, 1, 2], list(structure.in_degree()))
+        self.assertEqual([2, 1, 1, 0], list(structure.out_degree()))
+        with self.assertRaises(ValueError):
+            structure.succ_indices[0] = 3
+        with self.assertRaises(ValueError):
+            Structure.from_edges(2, [0], [1], transfer_data=[1, 2])
+
+    def test_adjacency(self):
+        tasks = _tasks(4)
+        adjacency = Adjacency(tasks, self.structure)
+        self.assertEqual([tasks[1], tasks[2]], adjacency.successors(tasks[0]))
+        self.assertEqual([tasks[1], tasks[2]],
+                         adjacency.predecessors(tasks[3]))
+        self.assertFalse(adjacency.has_predecessors(tasks[0]))
+        self.assertTrue(adjacency.has_predecessors(tasks[3]))
+        self.assertEqual(6, adjacency.transfer_data(tasks[0], tasks[2]))
+        with self.assertRaises(KeyError):
+            adjacency.transfer_data(tasks[0], tasks[3])
+        with self.assertRaises(ValueError):
+            Adjacency(tasks[:3], self.structure)
+
+    def test_networkx(self):
+        graph = _workflow_to_nx(WORKFLOW)
+        mapping = {node: Task(f"t{node}", 0, 0, None, []) for node in graph}
+        adjacency = Adjacency.from_networkx(graph, mapping)
+        for node in graph:
+            task = mapping[node]
+            self.assertEqual([mapping[p] for p in graph.predecessors(node)],
+                             adjacency.predecessors(task))
+            self.assertEqual({mapping[s] for s in graph.successors(node)},
+                             set(adjacency.successors(task)))
+        relabelled = nx.relabel_nodes(graph, mapping)
+        rebuilt = adjacency.to_networkx()
+        self.assertEqual(set(relabelled.edges), set(rebuilt.edges))
+        for u, v, data in relabelled.edges(data=True):
+            self.assertEqual(data['transfer_data'],
+                             rebuilt.edges[u, v]['transfer_data'])
+
+
+class TestWorkflowPlanAdjacency(unittest.TestCase):
+
+    def test_batch_plan(self):
+        """
+        Plans share the structure of their workflow, which is read once,
+        and only build a graph when it is asked for.
+        """
+        planning = BatchPlanning('batch')
+        first = planning.generate_plan(0, None, None, _Observation(), 5)
+        second = planning.generate_plan(10, None, None, _Observation(), 5)
+        self.assertIs(first.adjacency.structure, second.adjacency.structure)
+        self.assertIsNot(first.adjacency.tasks[0],
+                         second.adjacency.tasks[0])
+
+        graph = _workflow_to_nx(WORKFLOW)
+        for task in first.tasks:
+            self.assertEqual(
+                task.pred,
+                [p.id for p in first.get_task_predecessors(task)])
+            self.assertEqual(
+                len(list(graph.successors(task.graph_id))),
+                len(first.get_task_successors(task)))
+
+        self.assertIsNone(first._graph)
+        self.assertEqual(graph.number_of_edges(),
+                         first.graph.number_of_edges())
+        restored = pickle.loads(pickle.dumps(first))
+        self.assertIsNone(restored._graph)
+        self.assertEqual(len(first.tasks), len(restored.adjacency))
+
+    def test_graph(self):
+        """
+        Plans made with a graph of tasks have the same adjacency.
+        """
+        tasks = _tasks(3)
+        graph = nx.DiGraph()
+        graph.add_edge(tasks[0], tasks[1], transfer_data=3)
+        graph.add_edge(tasks[0], tasks[2], transfer_data=4)
+        plan = WorkflowPlan('emu', 0, 10, tasks, [0, 1, 2],
+                            WorkflowStatus.SCHEDULED, 5, graph)
+        self.assertIs(graph, plan.graph)
+        self.assertEqual([tasks[1], tasks[2]],
+                         plan.get_task_successors(tasks[0]))
+        self.assertEqual(4, plan.adjacency.transfer_data(tasks[0], tasks[2]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for post-run analytics
+"""
+
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from topsim.core.eventbus import Event, EVENT_FIELDS
+from topsim.core.output import PARTITION_FIELDS
+from topsim.core.table import Table
+from topsim.utils import analytics
+
+from test.util import batch_simulation
+
+
+TASKS = pd.DataFrame({
+    'est': [0, 0, 10, 20],
+    'eft': [0, 10, 20, 40],
+    'ast': [0, 5, 15, 30],
+    'aft': [10, 15, 35, 50],
+    'observation_id': ['emu', 'emu', 'emu', 'dingo'],
+}, index=['emu_ingest_t0', 'emu_t0', 'emu_t1', 'dingo_t0'])
+
+EVENTS = [
+    Event(0, 'buffer', 'emu', 'added', 'buffer'),
+    Event(4, 'buffer', 'dingo', 'added', 'buffer'),
+    Event(5, 'scheduler', 'emu', 'started', 'allocation'),
+    Event(6, 'scheduler', 'emu', 'started', 'allocation'),
+    Event(30, 'scheduler', 'dingo', 'started', 'allocation'),
+    Event(8, 'buffer', 'askap', 'added', 'buffer'),
+]
+
+
+class TestAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        self.events = pd.DataFrame(EVENTS, columns=EVENT_FIELDS)
+
+    def test_makespan(self):
+        self.assertEqual(50, analytics.makespan(TASKS))
+        self.assertEqual(0, analytics.makespan(TASKS.iloc[:0]))
+
+    def test_queue_wait(self):
+        wait = analytics.queue_wait(self.events)
+        self.assertEqual(5, wait.loc['emu', 'wait'])
+        self.assertEqual(26, wait.loc['dingo', 'wait'])
+        self.assertTrue(np.isnan(wait.loc['askap', 'wait']))
+        table = Table({c: [e[i] for e in EVENTS]
+                       for i, c in enumerate(EVENT_FIELDS)})
+        pd.testing.assert_frame_equal(wait, analytics.queue_wait(table))
+
+    def test_workflow_runtime(self):
+        runtime = analytics.workflow_runtime(TASKS)
+        # Ingest tasks are not part of the workflow
+        self.assertEqual(30, runtime.loc['emu', 'actual'])
+        self.assertEqual(20, runtime.loc['emu', 'planned'])
+        self.assertEqual(1.5, runtime.loc['emu', 'ratio'])
+        self.assertEqual(1, runtime.loc['dingo', 'ratio'])
+
+    def test_task_slowdown(self):
+        slowdown = analytics.task_slowdown(TASKS)
+        self.assertEqual([1, 2, 1], list(slowdown))
+        table = Table({'task_id': list(TASKS.index),
+                       **{c: list(TASKS[c]) for c in TASKS.columns}})
+        pd.testing.assert_series_equal(
+            slowdown, analytics.task_slowdown(table))
+
+    def test_utilisation(self):
+        occupancy = pd.DataFrame({
+            'machine': ['m0', 'm1'], 'start': [0, 5], 'end': [10, None],
+            'kind': ['ingest', 'task']})
+        self.assertEqual(0.75, analytics.utilisation(occupancy, 2, 0, 10))
+        self.assertEqual(
+            0.5, analytics.utilisation(occupancy, 2, 0, 10, kind='ingest'))
+        self.assertEqual(0, analytics.utilisation(occupancy, 2, 10, 10))
+
+    def test_buffer_high_water(self):
+        sim = pd.DataFrame({'hot_buffer': [100., 60., 80., 60.],
+                            'cold_buffer': [50., 50., 20., 50.]})
+        high_water = analytics.buffer_high_water(sim)
+        self.assertEqual(40, high_water.loc['hot_buffer', 'used'])
+        self.assertEqual(1, high_water.loc['hot_buffer', 'time'])
+        self.assertEqual(30, high_water.loc['cold_buffer', 'used'])
+        # Change-only time series are timed by their 'time' column
+        changes = sim.assign(time=[0, 7, 9, 12])
+        high_water = analytics.buffer_high_water(
+            changes, capacity={'hot_buffer': 200})
+        self.assertEqual(140, high_water.loc['hot_buffer', 'used'])
+        self.assertEqual(9, high_water.loc['cold_buffer', 'time'])
+
+
+class TestSimulationAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_summary(self):
+        simulation = batch_simulation()
+        _, tasks = simulation.start()
+        summary = simulation.summary()
+        self.assertEqual(tasks['aft'].max(), summary['makespan'])
+        self.assertEqual(2, summary['observations'])
+        self.assertEqual(
+            len(tasks[~tasks.index.str.contains('ingest')]), summary['tasks'])
+        self.assertGreater(summary['mean_queue_wait'], 0)
+        self.assertGreater(summary['hot_buffer_high_water'], 0)
+        self.assertTrue(0 < summary['utilisation'] <= 1)
+        self.assertEqual(
+            simulation.cluster.occupancy.utilisation(0, summary['makespan']),
+            summary['utilisation'])
+
+    def test_summarise_runs(self):
+        """
+        Each simulation in a results file is summarised in the same way as
+        the simulation itself.
+        """
+        path = f"{self.output}/results.h5"
+        expected = []
+        for delimiters in ('a', 'b/c'):
+            simulation = batch_simulation(to_file=True, hdf5_path=path,
+                                          delimiters=delimiters)
+            simulation.start()
+            expected.append(simulation.summary())
+        summaries = analytics.summarise_runs(path)
+        self.assertEqual(list(PARTITION_FIELDS), summaries.index.names)
+        summaries = summaries.droplevel(['timestamp', 'configuration'])
+        self.assertEqual(['a', 'b/c'], sorted(summaries.index))
+        for delimiters, summary in zip(('a', 'b/c'), expected):
+            pd.testing.assert_series_equal(
+                pd.Series(summary, dtype=float), summaries.loc[delimiters],
+                check_names=False)
+
+        path = f"{self.output}/results.npz"
+        simulation = batch_simulation(to_file=True, hdf5_path=path,
+                                      engine='array')
+        simulation.start()
+        summaries = analytics.summarise_runs(path)
+        self.assertEqual(1, len(summaries))
+        self.assertEqual(expected[0]['makespan'],
+                         summaries['makespan'].iloc[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for the benchmark scenarios and results
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+
+from topsim.core.config import Config
+from topsim.user.telescope import Telescope
+from topsim.utils.benchmark import (
+    build_scenario, compare_results, format_results, measure_import,
+    measure_scheduling_window, measure_workflow_formats, _run_scenario,
+    SCALES, IMPORT_MODULES, IMPORT_BUDGET
+)
+
+
+class TestBenchmarkScenarios(unittest.TestCase):
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_scale_machines(self):
+        config = Config(build_scenario("machines", "medium", self.output))
+        machines, _ = config.parse_cluster_config()
+        self.assertEqual(10 * SCALES["medium"], len(machines))
+
+    def test_scale_observations(self):
+        config = Config(build_scenario("observations", "medium", self.output))
+        _, _, observations, _ = config.parse_instrument_config(Telescope.name)
+        self.assertEqual(2 * SCALES["medium"], len(observations))
+        starts = [o.est for o in observations]
+        self.assertEqual(sorted(starts), starts)
+
+    def test_scale_tasks(self):
+        config = Config(build_scenario("tasks", "medium", self.output))
+        _, pipelines, _, _ = config.parse_instrument_config(Telescope.name)
+        with open(pipelines["emu"]["workflow"]) as fp:
+            graph = json.load(fp)["graph"]
+        self.assertEqual(10 * SCALES["medium"], len(graph["nodes"]))
+
+    def test_unknown_scenario(self):
+        self.assertRaises(ValueError, build_scenario, "cpus", "small",
+                          self.output)
+        self.assertRaises(ValueError, build_scenario, "tasks", "huge",
+                          self.output)
+
+    def test_run_scenario(self):
+        result = _run_scenario("machines", "small", self.output)
+        for key in ("wall_time", "simulated_per_wall", "events_per_second",
+                    "peak_rss", "output_size"):
+            self.assertGreater(result[key], 0)
+        results = {"runs": [result]}
+        (comparison,) = compare_results(results, results)
+        self.assertEqual(1.0, comparison["wall_time"])
+        self.assertIn("machines_small", format_results(results, [comparison]))
+
+    def test_workflow_formats(self):
+        result = measure_workflow_formats("medium", self.output, repeat=1)
+        self.assertEqual(10 * SCALES["medium"], result["tasks"])
+        for key in ("json_size", "compiled_size", "json_load_time",
+                    "compiled_load_time"):
+            self.assertGreater(result[key], 0)
+        self.assertIn("workflow_medium",
+                      format_results({"runs": [], "workflows": [result]}))
+
+    def test_scheduling_window(self):
+        results = measure_scheduling_window(self.output, windows=(None, 1),
+                                            size=100, width=25)
+        self.assertEqual(["batch_window_all", "batch_window_1",
+                          "heft_window_all", "heft_window_1"],
+                         [r["name"] for r in results])
+        for result in results:
+            self.assertGreater(result["makespan"], 0)
+        self.assertEqual(0, results[0]["window_decisions"])
+        self.assertGreater(results[1]["window_truncated"], 0)
+        self.assertIn("heft_window_1",
+                      format_results({"runs": [], "windows": results}))
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_import_budget(self):
+        """
+        Importing the simulation, the command-line interface or the
+        replications run by each worker process does not import pandas,
+        networkx, shadow or tqdm, and stays within budget.
+        """
+        for module in IMPORT_MODULES:
+            result = measure_import(module)
+            self.assertEqual([], result["heavy_modules"], module)
+            self.assertLess(result["import_time"], IMPORT_BUDGET, module)
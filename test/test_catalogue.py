@@ -0,0 +1,111 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for the results catalogue
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+import simpy
+
+from pandas.testing import assert_frame_equal
+
+from topsim.core.simulation import Simulation
+from topsim.user.telescope import Telescope
+from topsim.user.plan.batch_planning import BatchPlanning
+from topsim.user.schedule.batch_allocation import BatchProcessing
+from topsim.utils.catalogue import Catalogue
+
+CONFIG = "test/data/config/standard_simulation.json"
+
+
+def _run(path, delimiters, **kwargs):
+    simulation = Simulation(
+        simpy.Environment(), CONFIG, Telescope, BatchPlanning("batch"),
+        BatchProcessing(), progress='none', timestamp=0, to_file=True,
+        hdf5_path=path, delimiters=delimiters, **kwargs)
+    simulation.start()
+    return simulation
+
+
+class TestCatalogue(unittest.TestCase):
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        os.mkdir(f"{self.output}/sweep")
+        self.first = f"{self.output}/sweep/results_a.h5"
+        self.second = f"{self.output}/sweep/results_b.h5"
+        self.simulation = _run(self.first, 'batch/batch/run_a')
+        _run(self.second, 'batch/batch/run_b', use_task_data=True)
+        _run(self.second, 'other/run_c', timeseries='changes')
+        self.catalogue = Catalogue(f"{self.output}/catalogue.sqlite")
+        self.assertEqual(3, self.catalogue.index(f"{self.output}/sweep"))
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_find(self):
+        runs = self.catalogue.find()
+        self.assertEqual(3, len(runs))
+        self.assertEqual({'batch'}, set(runs['planning']))
+        self.assertEqual({'BatchProcessing'}, set(runs['scheduling']))
+        self.assertEqual(
+            2, len(self.catalogue.find(delimiters='batch/batch/*')))
+        self.assertEqual(
+            ['batch/batch/run_b'],
+            list(self.catalogue.find(use_task_data=True)['delimiters']))
+        runs = self.catalogue.find(
+            delimiters=['batch/batch/run_a', 'other/run_c'],
+            configuration='standard_simulation')
+        self.assertEqual(2, len(runs))
+        self.assertEqual(0, len(self.catalogue.find(planning='heft')))
+
+    def test_metrics(self):
+        runs = self.catalogue.find(delimiters='batch/batch/run_a')
+        summary = self.simulation.summary()
+        self.assertEqual(summary['makespan'], runs['makespan'].iloc[0])
+        self.assertEqual(summary['utilisation'],
+                         runs['utilisation'].iloc[0])
+        self.assertEqual(
+            3, len(self.catalogue.find(makespan=summary['makespan'])))
+
+    def test_reindex(self):
+        """
+        Only files that have changed are indexed again.
+        """
+        self.assertEqual(0, self.catalogue.index(f"{self.output}/sweep"))
+        _run(self.first, 'batch/batch/run_d')
+        self.assertEqual(2, self.catalogue.index(self.first))
+        self.assertEqual(4, len(self.catalogue))
+        self.assertEqual(2, self.catalogue.index(self.second, force=True))
+        self.assertEqual(4, len(self.catalogue))
+
+    def test_load(self):
+        runs = self.catalogue.find(delimiters='batch/batch/*')
+        expected = pd.read_hdf(self.first,
+                               key=f"{runs['key'].iloc[0]}/sim")
+        for jobs in (1, 2):
+            loaded = dict(self.catalogue.load(runs, 'sim', jobs=jobs))
+            self.assertEqual(list(runs.index), list(loaded))
+            assert_frame_equal(expected, loaded[runs.index[0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for checkpointing and restoring a simulation
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+import pandas as pd
+
+from pandas.testing import assert_frame_equal
+
+from topsim.core.delay import DelayModel
+from topsim.core.simulation import Simulation
+from topsim.user.schedule.batch_allocation import BatchProcessing
+
+from test.util import batch_simulation
+
+
+RESUME_SCRIPT = """
+import pickle, sys
+from topsim.core.delay import DelayModel
+from topsim.core.simulation import Simulation
+simulation = Simulation.restore(sys.argv[1])
+simulation.checkpoint_path = None
+sim, tasks = simulation.resume()
+with open(sys.argv[2], 'wb') as fp:
+    pickle.dump((sim, tasks, simulation.monitor.events), fp)
+"""
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        self.checkpoint = f"{self.output}/checkpoint.pkl"
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_checkpoint_requires_interval(self):
+        with self.assertRaises(ValueError):
+            batch_simulation(checkpoint=self.checkpoint)
+
+    def test_checkpoint_before_start(self):
+        with self.assertRaises(RuntimeError):
+            batch_simulation().checkpoint(self.checkpoint)
+
+    def test_restored_simulation_matches_original(self):
+        """
+        A simulation restored part-way through produces the same results as
+        one that runs uninterrupted.
+        """
+        original = batch_simulation(checkpoint=self.checkpoint,
+                                    checkpoint_interval=150)
+        sim, tasks = original.start()
+
+        restored = Simulation.restore(self.checkpoint)
+        self.assertEqual(150, restored.env.now)
+        restored.checkpoint_path = None
+        restored_sim, restored_tasks = restored.resume()
+
+        self.assertEqual(original.env.now, restored.env.now)
+        assert_frame_equal(sim, restored_sim)
+        assert_frame_equal(tasks, restored_tasks)
+        assert_frame_equal(original.monitor.events.reset_index(drop=True),
+                           restored.monitor.events.reset_index(drop=True))
+
+    def test_periodic_checkpoint_in_new_process(self):
+        """
+        The last periodic checkpoint is restored in a fresh interpreter
+        (with its own hashing of objects) and gives the same results.
+        """
+        simulation = batch_simulation(checkpoint=self.checkpoint,
+                                      checkpoint_interval=50)
+        sim, tasks = simulation.start()
+        self.assertTrue(os.path.exists(self.checkpoint))
+
+        results = f"{self.output}/results.pkl"
+        env = dict(os.environ, PYTHONPATH=os.getcwd())
+        subprocess.run(
+            [sys.executable, "-c", RESUME_SCRIPT, self.checkpoint, results],
+            check=True, env=env)
+        restored_sim, restored_tasks, events = pd.read_pickle(results)
+        assert_frame_equal(sim, restored_sim)
+        assert_frame_equal(tasks, restored_tasks)
+        assert_frame_equal(simulation.monitor.events.reset_index(drop=True),
+                           events.reset_index(drop=True))
+
+    def test_restore_streamed_output(self):
+        """
+        Rows streamed to file after the checkpoint are replaced, rather than
+        duplicated, when the restored simulation finishes.
+        """
+        original = batch_simulation(to_file=True, chunk_size=25,
+                                    hdf5_path=f"{self.output}/original.h5")
+        original.start()
+
+        path = f"{self.output}/restored.h5"
+        interrupted = batch_simulation(to_file=True, chunk_size=25,
+                                       hdf5_path=path)
+        interrupted.start(runtime=60)
+        interrupted.checkpoint(self.checkpoint)
+        # Results written after the checkpoint, before being interrupted
+        interrupted.resume(until=120)
+        interrupted.monitor.flush()
+        Simulation.restore(self.checkpoint).resume()
+
+        key = f"{original._hdf5_key()}/sim"
+        expected = pd.read_hdf(f"{self.output}/original.h5", key=key)
+        actual = pd.read_hdf(path, key=key)
+        assert_frame_equal(expected, actual)
+
+
+class TestFork(unittest.TestCase):
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_fork_before_start(self):
+        with self.assertRaises(RuntimeError):
+            batch_simulation().fork({'baseline': {}})
+
+    def test_fork_unknown_setting(self):
+        simulation = batch_simulation()
+        simulation.start(runtime=10)
+        with self.assertRaises(ValueError):
+            simulation.fork({'baseline': {'buffer': None}})
+
+    def test_fork_branches(self):
+        """
+        An unchanged branch reproduces the uninterrupted simulation, and
+        changed settings take effect from the fork.
+        """
+        sim, tasks = batch_simulation().start()
+
+        simulation = batch_simulation()
+        simulation.start(runtime=50)
+        delay = DelayModel(0.9, "normal", DelayModel.DelayDegree.HIGH)
+        results = simulation.fork(
+            {'baseline': {}, 'delayed': {'delay': delay}}, jobs=2)
+        self.assertEqual(['baseline', 'delayed'], list(results))
+        baseline_sim, baseline_tasks = results['baseline']
+        assert_frame_equal(sim, baseline_sim)
+        assert_frame_equal(tasks, baseline_tasks)
+        delayed_sim, _ = results['delayed']
+        self.assertGreater(len(delayed_sim), len(sim))
+        # The original simulation is unchanged by its branches
+        self.assertEqual(50, simulation.env.now)
+        self.assertEqual(None, simulation.planner.model.delay_model)
+
+    def test_fork_to_file(self):
+        path = f"{self.output}/fork.h5"
+        simulation = batch_simulation(to_file=True, hdf5_path=path)
+        simulation.start(runtime=50)
+        results = simulation.fork(
+            {'baseline': {}, 'split': {'scheduling': BatchProcessing(
+                min_resources_per_workflow=1)}}, jobs=1)
+        self.assertEqual(f"{self.output}/fork-split.h5", results['split'])
+        key = f"{simulation._hdf5_key()}/sim"
+        for output in results.values():
+            sim = pd.read_hdf(output, key=key)
+            self.assertGreater(len(sim), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
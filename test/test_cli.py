@@ -0,0 +1,256 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for the topsim command-line interface
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from pathlib import Path
+from unittest import mock
+from click.testing import CliRunner
+
+from topsim.cli import cli
+from topsim.core.table import read_tables
+from topsim.core.eventlog import EventLogReader
+from topsim.utils.experiment import load_manifest, MANIFEST
+
+CONFIG = "test/data/config/standard_simulation.json"
+
+
+class TestRunCommand(unittest.TestCase):
+
+    def setUp(self):
+        self.runner = CliRunner()
+        self.output = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_run_summary(self):
+        result = self.runner.invoke(
+            cli, ["run", CONFIG, "--planner", "batch", "--scheduler", "batch",
+                  "--progress", "none"])
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertIn("tasks run", result.output)
+
+    def test_run_streamed_output(self):
+        """
+        Streamed output is read back in the same way as a complete
+        simulation, and has the same number of rows.
+        """
+        streamed = f"{self.output}/streamed.h5"
+        result = self.runner.invoke(
+            cli, ["run", CONFIG, "--planner", "batch", "--scheduler", "batch",
+                  "--progress", "none", "--output", streamed,
+                  "--stream", "--chunk-size", "25"])
+        self.assertEqual(0, result.exit_code, result.output)
+        with pd.HDFStore(streamed, mode='r') as store:
+            (key,) = [k for k in store.keys() if k.endswith('/sim')]
+            sim = store[key]
+        self.assertGreater(len(sim), 25)
+        self.assertEqual(list(range(len(sim))), list(sim.index))
+
+    def test_run_array_engine(self):
+        output = f"{self.output}/results.npz"
+        result = self.runner.invoke(
+            cli, ["run", CONFIG, "--planner", "batch", "--scheduler", "batch",
+                  "--progress", "none", "--engine", "array",
+                  "--output", output])
+        self.assertEqual(0, result.exit_code, result.output)
+        tables = read_tables(output)
+        self.assertGreater(len(tables["tasks"]), 0)
+
+    def test_run_changes_timeseries(self):
+        output = f"{self.output}/results.npz"
+        result = self.runner.invoke(
+            cli, ["run", CONFIG, "--planner", "batch", "--scheduler", "batch",
+                  "--progress", "none", "--engine", "array",
+                  "--timeseries", "changes", "--output", output])
+        self.assertEqual(0, result.exit_code, result.output)
+        tables = read_tables(output)
+        self.assertIn("time", tables["sim"])
+        self.assertIn("planning", tables["params"])
+        self.assertLess(len(tables["sim"]), tables["params"]["timesteps"][0])
+
+    def test_run_scheduling_window(self):
+        output = f"{self.output}/results.npz"
+        result = self.runner.invoke(
+            cli, ["run", CONFIG, "--planner", "batch", "--scheduler", "batch",
+                  "--progress", "none", "--engine", "array",
+                  "--scheduling-window", "1", "--output", output])
+        self.assertEqual(0, result.exit_code, result.output)
+        params = read_tables(output)["params"]
+        self.assertEqual(1, params["window"][0])
+        self.assertGreater(params["window_decisions"][0], 0)
+
+    def test_run_event_log(self):
+        event_log = f"{self.output}/sim.trace"
+        result = self.runner.invoke(
+            cli, ["run", CONFIG, "--planner", "batch", "--scheduler", "batch",
+                  "--progress", "none", "--event-log", event_log])
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertGreater(len(EventLogReader(event_log)), 0)
+
+    def test_run_budget(self):
+        result = self.runner.invoke(
+            cli, ["run", CONFIG, "--planner", "batch", "--scheduler", "batch",
+                  "--progress", "none", "--budget", "0"])
+        self.assertEqual(2, result.exit_code, result.output)
+
+    def test_run_checkpoint_and_resume(self):
+        checkpoint = f"{self.output}/checkpoint.pkl"
+        result = self.runner.invoke(
+            cli, ["run", CONFIG, "--planner", "batch", "--scheduler", "batch",
+                  "--progress", "none", "--checkpoint", checkpoint,
+                  "--checkpoint-interval", "100"])
+        self.assertEqual(0, result.exit_code, result.output)
+        finished = result.output
+        result = self.runner.invoke(cli, ["resume", checkpoint])
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertEqual(finished, result.output)
+
+        branches = f"{self.output}/branches.json"
+        with open(branches, 'w') as fp:
+            json.dump({"baseline": {},
+                       "delayed": {"delay": {"prob": 0.5, "dist": "normal",
+                                             "degree": 0.5, "seed": 1}}},
+                      fp)
+        result = self.runner.invoke(cli, ["fork", checkpoint, branches,
+                                          "--jobs", "1"])
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertIn("baseline:", result.output)
+        self.assertIn("delayed:", result.output)
+
+    def test_replicate(self):
+        summary = f"{self.output}/summary.csv"
+        result = self.runner.invoke(
+            cli, ["replicate", CONFIG, "--planner", "batch", "--scheduler",
+                  "batch", "--min-replications", "2", "--max-replications",
+                  "2", "--seed", "1", "--output", summary])
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertIn("makespan", result.output)
+        table = pd.read_csv(summary, index_col="metric")
+        self.assertEqual(2, table.loc["makespan", "replications"])
+
+    def test_compile_workflow(self):
+        workflow = "test/data/config/standard/workflow_config_minutes.json"
+        output = f"{self.output}/workflow.npz"
+        result = self.runner.invoke(
+            cli, ["compile-workflow", workflow, "--output", output])
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertTrue(Path(output).exists())
+        result = self.runner.invoke(
+            cli, ["compile-workflow", workflow, "--output",
+                  f"{self.output}/workflow.bin"])
+        self.assertNotEqual(0, result.exit_code)
+
+
+class TestBenchCommand(unittest.TestCase):
+
+    def test_base_config(self):
+        """
+        Benchmarks are derived from --base-config, or the test configuration
+        of a source checkout, which an installed package does not have.
+        """
+        runner = CliRunner()
+        with mock.patch('topsim.utils.benchmark.run_benchmarks',
+                        return_value={'runs': []}) as run:
+            result = runner.invoke(cli, ["bench", "--base-config", CONFIG])
+            self.assertEqual(0, result.exit_code, result.output)
+            self.assertEqual(CONFIG, run.call_args.args[3])
+            with mock.patch('topsim.utils.benchmark.BASE_CONFIG',
+                            Path("missing.json")):
+                result = runner.invoke(cli, ["bench"])
+            self.assertEqual(2, result.exit_code, result.output)
+            self.assertIn("--base-config", result.output)
+
+
+class TestSweepCommand(unittest.TestCase):
+
+    def setUp(self):
+        self.runner = CliRunner()
+        self.output = tempfile.mkdtemp()
+        self.spec = Path(self.output) / "spec.json"
+        with open(self.spec, 'w') as fp:
+            json.dump({
+                "configuration": [CONFIG],
+                "alloc_combinations": [["batch", "batch"]],
+                "data_combinations": [[False, True], [True, True]],
+                "output": self.output
+            }, fp)
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_parallel_sweep(self):
+        result = self.runner.invoke(
+            cli, ["sweep", str(self.spec), "--jobs", "2",
+                  "--progress", "none"])
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertIn("2 simulations completed", result.output)
+        manifest = load_manifest(Path(self.output) / MANIFEST)
+        self.assertEqual(2, len(manifest["runs"]))
+        # Nothing left to run
+        result = self.runner.invoke(
+            cli, ["sweep", str(self.spec), "--progress", "none"])
+        self.assertIn("0 simulations completed", result.output)
+
+    def test_catalogue(self):
+        result = self.runner.invoke(
+            cli, ["sweep", str(self.spec), "--progress", "none"])
+        self.assertEqual(0, result.exit_code, result.output)
+        catalogue = str(Path(self.output) / "catalogue.sqlite")
+        result = self.runner.invoke(
+            cli, ["catalogue", "index", catalogue, self.output])
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertIn("Indexed 2 runs", result.output)
+        csv = str(Path(self.output) / "runs.csv")
+        result = self.runner.invoke(
+            cli, ["catalogue", "query", catalogue, "--output", csv,
+                  "--where", "delimiters=batch/batch/*",
+                  "--where", "use_task_data=true"])
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertEqual(1, len(pd.read_csv(csv)))
+        result = self.runner.invoke(
+            cli, ["catalogue", "query", catalogue, "--where", "planning"])
+        self.assertNotEqual(0, result.exit_code)
+
+    def test_slurm_array_sweep(self):
+        """
+        In a SLURM array job, sweep runs the shard of its array task.
+        """
+        environ = {'SLURM_ARRAY_TASK_ID': '2', 'SLURM_ARRAY_TASK_MIN': '1',
+                   'SLURM_ARRAY_TASK_COUNT': '2'}
+        with mock.patch.dict('os.environ', environ):
+            result = self.runner.invoke(
+                cli, ["sweep", str(self.spec), "--progress", "none"])
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertIn("1 simulations completed", result.output)
+        self.assertTrue(
+            (Path(self.output) / "results_shard1of2.h5").exists())
+
+    def test_sweep_manifest(self):
+        result = self.runner.invoke(
+            cli, ["sweep", str(self.spec), "--manifest"])
+        self.assertEqual(0, result.exit_code, result.output)
+        with open(Path(self.output) / "sweep.json") as fp:
+            self.assertEqual(2, len(json.load(fp)["combinations"]))
@@ -68,6 +68,28 @@ class TestDelayCreation(unittest.TestCase):
         delay = dm.generate_delay(rt)
         self.assertEqual(1, delay-rt)
 
+    def test_common_random_numbers(self):
+        """
+        Each task has its own delay, which does not depend on the order in
+        which delays are drawn.
+        """
+        dm = DelayModel(0.5, "normal", DelayModel.DelayDegree.HIGH,
+                        common_random_numbers=True)
+        keys = [f"emu/{i}" for i in range(20)]
+        forward = {k: dm.generate_delay(100, key=k) for k in keys}
+        backward = {k: dm.generate_delay(100, key=k) for k in reversed(keys)}
+        self.assertEqual(forward, backward)
+        delayed = [k for k, v in forward.items() if v > 100]
+        self.assertTrue(0 < len(delayed) < len(keys))
+        # The streams depend on the seed
+        other = DelayModel(0.5, "normal", DelayModel.DelayDegree.HIGH,
+                           seed=21, common_random_numbers=True)
+        self.assertNotEqual(
+            forward, {k: other.generate_delay(100, key=k) for k in keys})
+        # Without common random numbers, the key is not used
+        dm = DelayModel(0.3, "normal")
+        self.assertEqual(11, dm.generate_delay(10, key="emu/0"))
+
 @unittest.skip("Skipping until delay reporting has been fixed")
 class TestDelaysInActors(unittest.TestCase):
 
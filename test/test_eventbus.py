@@ -0,0 +1,102 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for the event bus
+"""
+
+import unittest
+
+from topsim.core.eventbus import (
+    Event, EventBus, EventRecorder, EventCounter, EVENT_FIELDS)
+
+from test.util import batch_simulation
+
+
+class TestEventBus(unittest.TestCase):
+
+    def test_publish(self):
+        """
+        Subscribers receive every event, in the order they subscribed
+        """
+        bus = EventBus()
+        received = []
+        bus.subscribe(lambda e: received.append(('first', e.time)))
+        recorder = bus.subscribe(EventRecorder())
+        bus.subscribe(lambda e: received.append(('second', e.time)))
+        bus.publish(Event(0, 'instrument', 'emu1', 'started', 'telescope'))
+        bus.publish(Event(1, 'instrument', 'emu1', 'finished', 'telescope'))
+        self.assertEqual(2, bus.count)
+        self.assertEqual([('first', 0), ('second', 0),
+                          ('first', 1), ('second', 1)], received)
+        self.assertEqual(2, len(recorder))
+        self.assertEqual(EVENT_FIELDS, tuple(recorder.records()[0]))
+
+        bus.unsubscribe(recorder)
+        bus.publish(Event(2, 'scheduler', 'emu1', 'added', 'queue'))
+        self.assertEqual(2, len(recorder))
+
+    def test_counter(self):
+        counter = EventCounter()
+        counter(Event(0, 'scheduler', 'emu1', 'added', 'queue'))
+        counter(Event(4, 'scheduler', 'askap2', 'added', 'queue'))
+        self.assertEqual(2, counter['scheduler', 'queue', 'added'])
+        self.assertEqual(0, counter['scheduler', 'queue', 'removed'])
+
+
+class TestSimulationEvents(unittest.TestCase):
+
+    def test_events_recorded(self):
+        """
+        The events of the simulation are those published to its bus, in the
+        order they were published, and the actors share the one bus.
+        """
+        simulation = batch_simulation()
+        simulation.start()
+        for actor in (simulation.cluster, simulation.buffer,
+                      simulation.scheduler, simulation.instrument):
+            self.assertIs(simulation.bus, actor.bus)
+        events = simulation.monitor.events
+        self.assertEqual(list(EVENT_FIELDS), list(events.columns))
+        self.assertEqual(simulation.bus.count, len(events))
+        self.assertTrue(events['time'].is_monotonic_increasing)
+        # Each observation is started and finished on the telescope, and
+        # added to and removed from the scheduler's queue
+        observations = len(simulation.instrument.observations)
+        counts = simulation.event_counts
+        self.assertEqual(observations,
+                         counts['instrument', 'telescope', 'started'])
+        self.assertEqual(observations,
+                         counts['instrument', 'telescope', 'finished'])
+        self.assertEqual(counts['scheduler', 'queue', 'added'],
+                         counts['scheduler', 'queue', 'removed'])
+        # Cluster events are recorded too
+        self.assertEqual(counts['cluster', 'provision', 'started'],
+                         counts['cluster', 'provision', 'stopped'])
+        self.assertLess(0, counts['cluster', 'provision', 'started'])
+
+    def test_array_engine_events(self):
+        pandas = batch_simulation()
+        pandas.start()
+        array = batch_simulation(engine='array')
+        array.start()
+        events = array.monitor.events
+        self.assertEqual(list(EVENT_FIELDS), events.columns)
+        self.assertEqual(pandas.monitor.events.to_dict('list'),
+                         {k: list(v) for k, v in events.to_dict().items()})
+
+
+if __name__ == '__main__':
+    unittest.main()
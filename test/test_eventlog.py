@@ -0,0 +1,130 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for the binary event log
+"""
+
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from pandas.testing import assert_frame_equal
+
+from topsim.core.eventbus import Event
+from topsim.core.eventlog import (
+    EventLogWriter, EventLogReader, EVENT_DTYPE, ACTORS)
+from topsim.core.simulation import Simulation
+
+from test.util import batch_simulation
+
+
+EVENTS = [
+    Event(0, "instrument", "emu1", "started", "telescope"),
+    Event(3, "scheduler", "emu1", "added", "queue"),
+    Event(5, "scheduler", "askap2", "started", "allocation"),
+]
+
+
+class TestEventLog(unittest.TestCase):
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        self.path = f"{self.output}/sim.trace"
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_write_and_read(self):
+        writer = EventLogWriter(self.path)
+        writer.append(EVENTS)
+        writer.flush()
+        log = EventLogReader(self.path)
+        self.assertEqual(3, len(log))
+        self.assertIsInstance(log.records, np.memmap)
+        self.assertEqual(EVENT_DTYPE, log.records.dtype)
+        # Actors have fixed codes; observations are interned once
+        self.assertEqual(ACTORS.index("scheduler"), log.records["actor"][1])
+        self.assertEqual(log.records["observation"][0],
+                         log.records["observation"][1])
+        self.assertEqual(EVENTS[2].observation,
+                         log.to_numpy()["observation"][2])
+
+    def test_select(self):
+        writer = EventLogWriter(self.path)
+        writer.append(EVENTS)
+        writer.flush()
+        log = EventLogReader(self.path)
+        selected = log.select(actor="scheduler", start=4)
+        self.assertEqual([5], list(selected["time"]))
+        self.assertEqual(0, len(log.select(observation="unknown")))
+        df = log.to_df(log.select(observation="emu1"))
+        self.assertEqual(["started", "added"], list(df["event"]))
+        with self.assertRaises(ValueError):
+            log.select(priority=1)
+
+    def test_not_an_event_log(self):
+        with open(self.path, 'wb') as fp:
+            fp.write(b"0" * 64)
+        with self.assertRaises(ValueError):
+            EventLogReader(self.path)
+
+    def test_truncate_after_pickle(self):
+        """
+        Records written after a writer is pickled are removed when the
+        pickled writer is truncated, as a restored simulation does.
+        """
+        writer = EventLogWriter(self.path)
+        writer.append(EVENTS[:1])
+        state = pickle.dumps(writer)
+        writer.append(EVENTS[1:])
+        writer.flush()
+        self.assertEqual(3, len(EventLogReader(self.path)))
+        pickle.loads(state).truncate()
+        self.assertEqual(1, len(EventLogReader(self.path)))
+
+    def test_simulation_event_log(self):
+        """
+        The event log holds the same events as are otherwise collected by
+        the Monitor, and they are not kept in memory.
+        """
+        simulation = batch_simulation()
+        simulation.start()
+        logged = batch_simulation(event_log=self.path)
+        logged.start()
+        self.assertEqual(0, len(logged.monitor.events))
+        events = EventLogReader(self.path).to_df()
+        assert_frame_equal(
+            simulation.monitor.events.reset_index(drop=True),
+            events.astype(str).astype({"time": int}))
+
+    def test_restore_event_log(self):
+        batch_simulation(event_log=self.path).start()
+        expected = EventLogReader(self.path).to_df()
+        path = f"{self.output}/restored.trace"
+        checkpoint = f"{self.output}/checkpoint.pkl"
+        batch_simulation(event_log=path, checkpoint=checkpoint,
+                         checkpoint_interval=100).start()
+        restored = Simulation.restore(checkpoint)
+        restored.checkpoint_path = None
+        restored.resume()
+        assert_frame_equal(expected, EventLogReader(path).to_df())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Unit tests for the Experiment wrapper and its results manifest
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import subprocess
+import sys
+
+import pandas as pd
+
+from pathlib import Path
+from unittest import mock
+
+from topsim.core.delay import DelayModel
+from topsim.utils.experiment import (
+    Experiment, simulation_digest, load_manifest, merge_shards, parse_shard,
+    MANIFEST
+)
+
+CONFIG = Path("test/data/config/standard_simulation.json")
+
+
+class TestSimulationDigest(unittest.TestCase):
+
+    def test_digest_is_stable_across_interpreters(self):
+        """
+        hash() is randomised per interpreter; the digest must not be.
+        """
+        digest = simulation_digest(CONFIG, "batch", "batch")
+        code = ("from topsim.utils.experiment import simulation_digest;"
+                f"print(simulation_digest('{CONFIG}', 'batch', 'batch'))")
+        out = subprocess.run([sys.executable, "-c", code],
+                             capture_output=True, text=True, check=True)
+        self.assertEqual(digest, out.stdout.strip())
+
+    def test_digest_changes_with_parameters(self):
+        base = simulation_digest(CONFIG, "batch", "batch")
+        self.assertNotEqual(
+            base, simulation_digest(CONFIG, "batch", "dynamic_plan"))
+        self.assertNotEqual(
+            base, simulation_digest(CONFIG, "batch", "batch",
+                                    use_task_data=True))
+        self.assertNotEqual(
+            base, simulation_digest(CONFIG, "batch", "batch",
+                                    sched_args={"max_resource_partitions": 2}))
+        self.assertNotEqual(
+            base, simulation_digest(
+                CONFIG, "batch", "batch",
+                delay=DelayModel(0.1, "normal", DelayModel.DelayDegree.LOW)))
+
+    def test_digest_changes_with_workflow_contents(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            shutil.copytree(CONFIG.parent / "standard", Path(tmp) / "standard")
+            config = Path(tmp) / CONFIG.name
+            shutil.copy(CONFIG, config)
+            before = simulation_digest(config, "batch", "batch")
+            with open(Path(tmp) / "standard/workflow_config_minutes.json",
+                      'a') as fp:
+                fp.write("\n")
+            self.assertNotEqual(
+                before, simulation_digest(config, "batch", "batch"))
+
+
+class TestExperimentManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def _experiment(self, data_combinations):
+        return Experiment(
+            configuration=[CONFIG],
+            alloc_combinations=[("batch", "batch")],
+            data_combinations=data_combinations,
+            output=self.output,
+            sched_args={}
+        )
+
+    def test_completed_runs_are_skipped(self):
+        experiment = self._experiment([(False, True)])
+        experiment.run()
+        manifest = load_manifest(Path(self.output) / MANIFEST)
+        self.assertEqual(1, len(manifest["runs"]))
+        outputs = os.listdir(self.output)
+        self.assertEqual(2, len(outputs))
+
+        # Extending the sweep only runs the new combination
+        experiment = self._experiment([(False, True), (True, True)])
+        built = [d for d, _, _ in experiment._build_simulations()]
+        self.assertEqual(1, len(built))
+        self.assertNotIn(built[0], manifest["runs"])
+
+    def test_missing_output_is_recomputed(self):
+        experiment = self._experiment([(False, True)])
+        experiment.run()
+        manifest = load_manifest(Path(self.output) / MANIFEST)
+        (run,) = manifest["runs"].values()
+        os.remove(Path(self.output) / run["output"])
+        experiment = self._experiment([(False, True)])
+        self.assertEqual(1, len(list(experiment._build_simulations())))
+
+
+class TestExperimentShards(unittest.TestCase):
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        self.experiment = Experiment(
+            configuration=[CONFIG],
+            alloc_combinations=[("batch", "batch")],
+            data_combinations=[(False, True), (True, True), (False, False)],
+            output=self.output,
+            sched_args={}
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_parse_shard(self):
+        self.assertEqual((1, 4), parse_shard("1/4"))
+        self.assertRaises(ValueError, parse_shard, "4/4")
+        self.assertRaises(ValueError, parse_shard, "one/4")
+
+    def test_slurm_array(self):
+        """
+        The shard of an array job is its task id from the first, so that
+        `--array=1-N` runs shards 0 to N - 1.
+        """
+        path = self.experiment.write_sweep_manifest()
+        environ = {'SLURM_ARRAY_TASK_MIN': '1', 'SLURM_ARRAY_TASK_COUNT': '2'}
+        for task, shard in (('1', (0, 2)), ('2', (1, 2))):
+            with mock.patch.dict(os.environ, SLURM_ARRAY_TASK_ID=task,
+                                 **environ):
+                experiment = Experiment.from_sweep_manifest(path)
+                self.assertEqual(shard, experiment._select_shard(None))
+        with mock.patch.dict(os.environ, SLURM_ARRAY_TASK_ID='3', **environ):
+            with self.assertRaises(ValueError):
+                Experiment.from_sweep_manifest(path)._select_shard(None)
+
+    def test_combinations_are_deterministic(self):
+        combinations = self.experiment.combinations()
+        self.assertEqual([0, 1, 2], [c['index'] for c in combinations])
+        self.assertEqual(combinations, self.experiment.combinations())
+        path = self.experiment.write_sweep_manifest()
+        experiment = Experiment.from_sweep_manifest(path)
+        self.assertEqual(combinations, experiment.combinations())
+
+    def test_shards_partition_the_sweep(self):
+        shards = [
+            [d for d, _, _ in self.experiment._build_simulations((i, 2))]
+            for i in range(2)
+        ]
+        self.assertEqual(2, len(shards[0]))
+        self.assertEqual(1, len(shards[1]))
+        every = [c['digest'] for c in self.experiment.combinations()]
+        self.assertCountEqual(every, shards[0] + shards[1])
+
+    def test_shards_merge(self):
+        path = self.experiment.write_sweep_manifest()
+        for i in range(2):
+            Experiment.from_sweep_manifest(path).run(shard=(i, 2))
+        self.assertTrue((Path(self.output) / "results_shard0of2.h5").exists())
+        self.assertTrue((Path(self.output) / "results_shard1of2.h5").exists())
+        merged = merge_shards(self.output)
+        with pd.HDFStore(merged, mode='r') as store:
+            sims = [k for k in store.keys() if k.endswith('/sim')]
+        self.assertEqual(3, len(sims))
+        # The merged manifest means nothing is left to run
+        experiment = Experiment.from_sweep_manifest(path)
+        self.assertEqual([], list(experiment._build_simulations()))
@@ -0,0 +1,179 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for the synthetic configuration and workflow generator
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+
+import simpy
+import networkx as nx
+
+from pathlib import Path
+
+from topsim.core.config import Config
+from topsim.core.simulation import Simulation
+from topsim.user.telescope import Telescope
+from topsim.user.plan.batch_planning import BatchPlanning
+from topsim.user.schedule.batch_allocation import BatchProcessing
+from topsim.utils.generate import generate_config, generate_workflow, SHAPES
+
+
+def _read_graph(path):
+    with open(path) as fp:
+        return nx.node_link_graph(json.load(fp)["graph"], edges="links")
+
+
+class TestGenerateWorkflow(unittest.TestCase):
+
+    def setUp(self):
+        self.output = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_shapes(self):
+        for shape in SHAPES:
+            path = generate_workflow(self.output / f"{shape}.json",
+                                     shape=shape, size=103, width=10,
+                                     degree=3, task_data=100, seed=20)
+            graph = _read_graph(path)
+            self.assertEqual(103, graph.number_of_nodes())
+            self.assertTrue(nx.is_directed_acyclic_graph(graph))
+            for node, data in graph.nodes(data=True):
+                self.assertIn("comp", data)
+                self.assertIn("task_data", data)
+            for _, _, data in graph.edges(data=True):
+                self.assertIn("transfer_data", data)
+
+    def test_fork_join_single_exit(self):
+        graph = _read_graph(generate_workflow(
+            self.output / "wf.json", shape="fork-join", size=25, width=4))
+        exits = [n for n in graph if graph.out_degree(n) == 0]
+        self.assertEqual([24], exits)
+
+    def test_layered_degree(self):
+        graph = _read_graph(generate_workflow(
+            self.output / "wf.json", shape="layered", size=100, width=10,
+            degree=3, seed=1))
+        for node in range(10, 100):
+            preds = list(graph.predecessors(node))
+            self.assertEqual(3, len(preds))
+            self.assertTrue(all(node // 10 - 1 == p // 10 for p in preds))
+
+    def test_heterogeneity(self):
+        graph = _read_graph(generate_workflow(
+            self.output / "wf.json", size=50, comp=100, heterogeneity=0))
+        self.assertEqual({100}, {d["comp"] for _, d in graph.nodes(data=True)})
+        graph = _read_graph(generate_workflow(
+            self.output / "wf.json", size=50, comp=100, heterogeneity=0.5))
+        comps = [d["comp"] for _, d in graph.nodes(data=True)]
+        self.assertTrue(all(50 <= c <= 150 for c in comps))
+        self.assertGreater(len(set(comps)), 1)
+
+    def test_seed(self):
+        first = generate_workflow(self.output / "a.json", shape="random",
+                                  size=200, seed=3)
+        second = generate_workflow(self.output / "b.json", shape="random",
+                                   size=200, seed=3)
+        self.assertEqual(first.read_text(), second.read_text())
+
+    def test_random_seed(self):
+        """
+        Without a seed the workflow is random, and the seed chosen is
+        recorded so that it can be reproduced.
+        """
+        first = generate_workflow(self.output / "a.json", shape="random",
+                                  size=200)
+        second = generate_workflow(self.output / "b.json", shape="random",
+                                   size=200)
+        zero = generate_workflow(self.output / "c.json", shape="random",
+                                 size=200, seed=0)
+        self.assertNotEqual(first.read_text(), second.read_text())
+        self.assertNotEqual(first.read_text(), zero.read_text())
+        with open(first) as fp:
+            seed = json.load(fp)["header"]["gen_specs"]["seed"]
+        again = generate_workflow(self.output / "d.json", shape="random",
+                                  size=200, seed=seed)
+        self.assertEqual(first.read_text(), again.read_text())
+
+    def test_invalid_parameters(self):
+        self.assertRaises(ValueError, generate_workflow,
+                          self.output / "wf.json", shape="star")
+        self.assertRaises(ValueError, generate_workflow,
+                          self.output / "wf.json", size=0)
+        self.assertRaises(ValueError, generate_workflow,
+                          self.output / "wf.json", heterogeneity=1)
+
+
+class TestGenerateConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.output = Path(tempfile.mkdtemp())
+        self.workflow = generate_workflow(
+            self.output / "workflow.json", shape="fork-join", size=20,
+            seed=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_config(self):
+        path = generate_config(
+            self.output / "config.json",
+            {"emu": self.workflow, "dingo": self.workflow}, machines=103,
+            heterogeneity=0.2, observations=6, duration=600, gap=60, seed=1)
+        config = Config(path)
+        machines, _ = config.parse_cluster_config()
+        self.assertEqual(103, len(machines))
+        self.assertEqual(4, len(config.cluster["system"]["resources"]))
+        _, pipelines, observations, _ = config.parse_instrument_config(
+            Telescope.name)
+        self.assertEqual(6, len(observations))
+        self.assertEqual("workflow.json", pipelines["emu"]["workflow"])
+        for previous, current in zip(observations, observations[1:]):
+            self.assertEqual(previous.est + previous.duration + 60,
+                             current.est)
+
+    def test_random_seed(self):
+        """
+        The seed chosen for a configuration without one is recorded.
+        """
+        first = generate_config(self.output / "a.json",
+                                {"emu": self.workflow}, heterogeneity=0.2)
+        with open(first) as fp:
+            seed = json.load(fp)["cluster"]["header"]["gen_specs"]["seed"]
+        again = generate_config(self.output / "b.json",
+                                {"emu": self.workflow}, heterogeneity=0.2,
+                                seed=seed)
+        self.assertEqual(first.read_text(), again.read_text())
+
+    def test_simulation(self):
+        """
+        A generated configuration runs to completion.
+        """
+        path = generate_config(
+            self.output / "config.json", {"emu": self.workflow},
+            machines=12, observations=2, duration=600, timestep="minutes",
+            data_rate=6e7, seed=1)
+        env = simpy.Environment()
+        simulation = Simulation(env, path, Telescope, BatchPlanning("batch"),
+                                BatchProcessing(), progress="none")
+        simulation.start()
+        self.assertTrue(simulation.is_finished())
+        self.assertEqual(2, simulation.instrument.observations_finished())
@@ -0,0 +1,178 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for the native HEFT planning model.
+
+The expected ranks and allocations are those of SHADOW's HEFT for the same
+workflows, as recorded in test_planner and test_scheduler.
+"""
+
+import unittest
+
+import numpy as np
+import simpy
+
+from topsim.core.config import Config
+from topsim.core.planner import Planner
+from topsim.core.cluster import Cluster
+from topsim.core.buffer import Buffer
+from topsim.core.scheduler import Scheduler
+from topsim.core.instrument import Observation
+from topsim.core.adjacency import Structure
+from topsim.core.workflow import load_workflow
+from topsim.user.telescope import Telescope
+from topsim.user.schedule.dynamic_plan import DynamicSchedulingFromPlan
+from topsim.user.plan.heft_planning import (
+    HEFTPlanning, MachineClasses, heft, upward_rank)
+from topsim.utils.experiment import _build_planning
+
+CONFIG = "test/data/config/standard_simulation_longtask.json"
+HEFT_CONFIG = "test/data/config/heft_single_observation_simulation.json"
+OBS_WORKFLOW = "test/data/config/longtask/workflow_config_minutes_longtask.json"
+
+
+class TestHEFT(unittest.TestCase):
+
+    def test_upward_rank(self):
+        """
+        SHADOW's ranks of the longtask workflow on 10 identical machines
+        """
+        env = simpy.Environment()
+        cluster = Cluster(env, config=Config(CONFIG))
+        workflow = load_workflow(OBS_WORKFLOW)
+        machines = MachineClasses(cluster.machines)
+        self.assertEqual([1], list(machines.flops / cluster.machines[0].cpu))
+        runtimes = machines.runtimes(workflow.attribute('comp'))
+        cost = workflow.structure.succ_data / cluster.system_bandwidth
+        rank = upward_rank(workflow.structure,
+                           machines.mean_runtime(runtimes), cost)
+        expected = {0: 6421, 5: 4990, 3: 4288, 4: 4240, 2: 3683, 1: 4077,
+                    6: 2529, 8: 2953, 7: 2963, 9: 1202}
+        self.assertEqual(expected,
+                         dict(zip(workflow.ids, rank.astype(int).tolist())))
+
+    def test_insertion(self):
+        """
+        A task is inserted in an idle period of a machine, before tasks that
+        were allocated earlier, when it finishes earliest there.
+        """
+        # 0 -> 1 and 0 -> 2, with 1 ranked first but delayed by its data
+        structure = Structure.from_edges(3, [0, 0], [1, 2], [10, 0])
+        runtimes = np.array([[2.0], [5.0], [3.0]])
+        order, start, finish, machine = heft(
+            structure, runtimes, structure.succ_data, np.array([0]),
+            rank=np.array([10.0, 5.0, 4.0]))
+        self.assertEqual([0, 1, 2], list(order))
+        # With one machine, no data is transferred
+        self.assertEqual([0, 2, 7], list(start))
+        runtimes = np.array([[2.0, 2.0], [20.0, 1.0], [30.0, 3.0]])
+        order, start, finish, machine = heft(
+            structure, runtimes, np.array([10.0, 0.0]), np.array([0, 1]),
+            rank=np.array([10.0, 5.0, 4.0]))
+        # 1 waits on machine 1 for 10 of data, and 2 fits in the idle
+        # period before it
+        self.assertEqual([0, 1, 1], list(machine))
+        self.assertEqual([0, 12, 2], list(start))
+
+
+class TestHEFTPlanning(unittest.TestCase):
+
+    def setUp(self):
+        self.env = simpy.Environment()
+        config = Config(CONFIG)
+        self.cluster = Cluster(self.env, config=config)
+        self.planner = Planner(self.env, self.cluster, HEFTPlanning('heft'),
+                               use_task_data=False, use_edge_data=True)
+        self.buffer = Buffer(self.env, self.cluster, self.planner, config)
+        self.observation = Observation(
+            'planner_observation', 0, 10, 5, OBS_WORKFLOW, data_rate=2)
+
+    def test_plan(self):
+        """
+        The plan has the same order of tasks as SHADOW's
+        """
+        with self.assertRaises(RuntimeError):
+            self.planner.run(self.observation, self.buffer, 1)
+        self.observation.ast = self.env.now
+        with self.assertRaises(RuntimeError):
+            self.planner.run(self.observation, self.buffer, 1)
+        self.cluster.provision_batch_resources(10, self.observation.name)
+        plan = self.planner.run(self.observation, self.buffer, 1)
+        expected = [0, 5, 3, 4, 2, 1, 6, 8, 7, 9]
+        self.assertEqual([f'planner_observation_0_{x}' for x in expected],
+                         [t.id for t in plan.tasks])
+        self.assertEqual(5520000, plan.tasks[5].flops)
+        self.assertEqual(max(t.eft for t in plan.tasks), plan.eft)
+        self.assertEqual(plan.tasks[0].id, plan.exec_order[0])
+        for task in plan.tasks:
+            for predecessor in plan.get_task_predecessors(task):
+                self.assertLessEqual(predecessor.eft, task.est)
+                self.assertIn(predecessor.id, task.pred)
+
+    def test_unsupported(self):
+        self.planner.model = HEFTPlanning('pheft')
+        self.observation.ast = self.env.now
+        with self.assertRaises(RuntimeError):
+            self.planner.run(self.observation, self.buffer, 1)
+
+    def test_experiment(self):
+        self.assertIsInstance(_build_planning('native_heft'), HEFTPlanning)
+
+
+class TestHEFTScheduling(unittest.TestCase):
+
+    def setUp(self):
+        self.env = simpy.Environment()
+        config = Config(HEFT_CONFIG)
+        self.cluster = Cluster(self.env, config)
+        self.planner = Planner(self.env, self.cluster, HEFTPlanning('heft'),
+                               use_task_data=False, use_edge_data=True)
+        self.buffer = Buffer(self.env, self.cluster, self.planner, config)
+        self.scheduler = Scheduler(self.env, self.buffer, self.cluster,
+                                   self.planner, DynamicSchedulingFromPlan())
+        self.telescope = Telescope(self.env, config, self.planner,
+                                   self.scheduler)
+
+    def test_heterogeneous(self):
+        """
+        The allocations of SHADOW's HEFT on three classes of machine, and
+        the runtime of the plan.
+        """
+        observation = self.telescope.observations[0]
+        self.scheduler.observation_queue.append(observation)
+        observation.ast = self.env.now
+        self.env.process(self.scheduler.allocate_tasks(observation))
+        self.env.run(1)
+        expected = [(0, 'cat2', 0, 11), (3, 'cat2', 11, 21),
+                    (2, 'cat2', 21, 30), (4, 'cat1', 22, 40),
+                    (1, 'cat0', 29, 42), (5, 'cat2', 30, 45),
+                    (6, 'cat2', 45, 55), (8, 'cat2', 58, 71),
+                    (7, 'cat0', 60, 81), (9, 'cat0', 84, 98)]
+        self.assertEqual(
+            [(f'{observation.name}_0_{tid}', f'{category}_0', est, eft)
+             for tid, category, est, eft in expected],
+            [(t.id, t.allocated_machine_id, t.est, t.eft)
+             for t in observation.plan.tasks])
+        self.assertEqual(98, observation.plan.eft)
+
+        self.buffer.hot[0].observations['scheduled'].append(observation)
+        self.env.run(until=99)
+        self.assertEqual(97, observation.plan.finished_tasks[-1].aft)
+        self.assertEqual(10, len(self.cluster._tasks['finished']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for the machine occupancy log
+"""
+
+import unittest
+
+import numpy as np
+import simpy
+
+from topsim.core.occupancy import IntervalTree, OccupancyLog
+from topsim.core.simulation import Simulation
+from topsim.user.telescope import Telescope
+from topsim.user.plan.batch_planning import BatchPlanning
+from topsim.user.schedule.batch_allocation import BatchProcessing
+
+CONFIG = "test/data/config/standard_simulation.json"
+
+
+class TestIntervalTree(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(1)
+        starts = rng.integers(0, 1000, 500)
+        ends = starts + rng.integers(0, 100, 500)
+        tree = IntervalTree(starts, ends)
+        for start in rng.integers(0, 1100, 50):
+            end = start + rng.integers(1, 50)
+            expected = np.flatnonzero(
+                (starts < end) & (ends > start) & (ends > starts))
+            np.testing.assert_array_equal(
+                expected, tree.overlapping(start, end))
+            np.testing.assert_array_equal(
+                np.flatnonzero((starts <= start) & (ends > start)),
+                tree.at(start))
+
+    def test_empty(self):
+        tree = IntervalTree([], [])
+        self.assertEqual(0, len(tree.overlapping(0, 10)))
+        # Empty intervals contain no time
+        self.assertEqual(0, len(IntervalTree([5], [5]).at(5)))
+
+
+class TestOccupancyLog(unittest.TestCase):
+
+    def setUp(self):
+        self.log = OccupancyLog(['m0', 'm1'])
+        self.log.start('m0', 't0', 'emu1', 'ingest', 0)
+        self.log.start('m1', 't1', 'emu1', 'task', 5)
+        self.log.stop('m0', 't0', 10)
+
+    def test_busy(self):
+        self.assertEqual(['m0'], self.log.busy(0))
+        self.assertEqual(['m0', 'm1'], self.log.busy(9))
+        # m1 is still occupied
+        self.assertEqual(['m1'], self.log.busy(100))
+        self.assertEqual([], self.log.busy(100, kind='ingest'))
+
+    def test_utilisation(self):
+        self.assertEqual(0.5, self.log.utilisation(0, 10, kind='ingest'))
+        self.assertEqual(0.75, self.log.utilisation(0, 10))
+        self.assertEqual(0.25, self.log.utilisation(10, 30, now=20))
+        with self.assertRaises(ValueError):
+            self.log.utilisation(10, 10)
+
+    def test_table(self):
+        table = self.log.to_table()
+        self.assertEqual(2, len(table))
+        self.assertEqual([10, None], list(table['end']))
+        with self.assertRaises(ValueError):
+            self.log.start('m0', 't2', 'emu1', 'transfer', 10)
+
+
+class TestClusterOccupancy(unittest.TestCase):
+
+    def test_simulation(self):
+        """
+        Every task that is run occupies a machine for an interval, and no
+        machine runs two tasks at once.
+        """
+        simulation = Simulation(
+            simpy.Environment(), CONFIG, Telescope, BatchPlanning("batch"),
+            BatchProcessing(), progress='none', timestamp=0)
+        _, tasks = simulation.start()
+        df = simulation.cluster.occupancy.to_df()
+        self.assertEqual(len(tasks), len(df))
+        self.assertFalse(df['end'].isna().any())
+        self.assertEqual({'ingest', 'task'}, set(df['kind']))
+        for _, intervals in df.sort_values('start').groupby('machine'):
+            self.assertTrue(
+                (intervals['start'].values[1:]
+                 >= intervals['end'].values[:-1]).all())
+        busy = simulation.cluster.occupancy.busy(int(df['start'].iloc[0]))
+        self.assertIn(df['machine'].iloc[0], busy)
+
+
+if __name__ == '__main__':
+    unittest.main()
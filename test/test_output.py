@@ -0,0 +1,177 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for output backends
+"""
+
+import shutil
+import tempfile
+import unittest
+import importlib.util
+
+from unittest import mock
+
+import pandas as pd
+
+from pathlib import Path
+from pandas.testing import assert_frame_equal
+
+from topsim.core.output import (
+    HDF5Output, TableOutput, DatasetOutput, create_output, read_dataset,
+    NULL_PARTITION)
+from topsim.core.table import Table, read_tables
+
+from test.util import batch_simulation
+
+PARTITION = {'timestamp': 'Thu700101000000', 'delimiters': 'batch/heft',
+             'configuration': 'standard_simulation'}
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+
+class TestOutputBackends(unittest.TestCase):
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        self.df = pd.DataFrame({'time': range(6), 'value': [1., 2.] * 3})
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_hdf5(self):
+        path = f"{self.output}/results.h5"
+        backend = create_output('hdf5', path)
+        self.assertIsInstance(backend, HDF5Output)
+        backend.write(PARTITION, {'params': self.df})
+        backend.append(PARTITION, 'sim', self.df.iloc[:3], 0)
+        backend.append(PARTITION, 'sim', self.df.iloc[3:], 3)
+        key = 'Thu700101000000/batch/heft/standard_simulation'
+        assert_frame_equal(self.df, pd.read_hdf(path, key=f"{key}/params"))
+        assert_frame_equal(self.df, pd.read_hdf(path, key=f"{key}/sim"))
+        backend.truncate(PARTITION, 'sim', 4)
+        self.assertEqual(4, len(pd.read_hdf(path, key=f"{key}/sim")))
+        self.assertEqual((PARTITION, 'sim'),
+                         HDF5Output.parse_key(f"/{key}/sim"))
+
+    def test_branch(self):
+        path = f"{self.output}/results.h5"
+        backend = HDF5Output(path)
+        backend.write(PARTITION, {'params': self.df})
+        branch = backend.branch('split')
+        self.assertIsInstance(branch, HDF5Output)
+        self.assertEqual(f"{self.output}/results-split.h5", branch.path)
+        self.assertTrue(Path(branch.path).exists())
+        self.assertEqual(path, backend.path)
+
+    def test_tables(self):
+        path = f"{self.output}/results.npz"
+        backend = create_output('tables', path)
+        backend.write(PARTITION, {'sim': Table({'time': [0, 1]})})
+        self.assertEqual([0, 1], list(read_tables(path)['sim']['time']))
+        with self.assertRaises(NotImplementedError):
+            backend.append(PARTITION, 'sim', self.df, 0)
+        with self.assertRaises(ValueError):
+            TableOutput(f"{self.output}/results.h5")
+        with self.assertRaises(ValueError):
+            create_output('feather', path)
+
+    # Partitioning does not use pyarrow, so is tested without it
+    @mock.patch('topsim.core.output.find_spec', return_value=object())
+    def test_dataset_partitions(self, _):
+        """
+        Tables are partitioned by the fields of each simulation, with values
+        that are safe to use as directory names.
+        """
+        backend = DatasetOutput(self.output)
+        directory = backend.directory(dict(PARTITION, delimiters=''), 'sim')
+        self.assertEqual(
+            Path(self.output, 'sim', 'timestamp=Thu700101000000',
+                 f'delimiters={NULL_PARTITION}',
+                 'configuration=standard_simulation'), directory)
+        self.assertEqual(
+            'delimiters=batch%2Fheft',
+            backend.directory(PARTITION, 'sim').parent.name)
+        directory.mkdir(parents=True)
+        for start in (0, 100, 200):
+            (directory / f"part-{start:012d}.parquet").touch()
+        backend.truncate(dict(PARTITION, delimiters=''), 'sim', 100)
+        self.assertEqual(['part-000000000000.parquet'],
+                         [p.name for p in directory.iterdir()])
+        with self.assertRaises(ValueError):
+            DatasetOutput(self.output, format='orc')
+
+    @unittest.skipUnless(HAS_PYARROW, "requires pyarrow")
+    def test_dataset(self):
+        for format in ('parquet', 'arrow'):
+            path = f"{self.output}/results.{format}"
+            backend = DatasetOutput(path, format)
+            backend.append(PARTITION, 'sim', self.df.iloc[:3], 0)
+            backend.append(PARTITION, 'sim', self.df.iloc[3:], 3)
+            other = dict(PARTITION, configuration='other')
+            backend.write(other, {'sim': self.df})
+            table = read_dataset(path, 'sim', columns=['time', 'value'],
+                                 filters={'configuration': 'other'},
+                                 format=format)
+            self.assertEqual(['time', 'value'], table.column_names)
+            self.assertEqual(6, table.num_rows)
+            table = read_dataset(path, 'sim', filters={'time': [1, 4]},
+                                 format=format)
+            self.assertEqual(4, table.num_rows)
+
+
+class TestSimulationOutputBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            batch_simulation(output_backend='feather')
+        with self.assertRaises(ValueError):
+            batch_simulation(engine='array', output_backend='hdf5')
+        with self.assertRaises(ValueError):
+            batch_simulation(output_backend='tables')
+
+    def test_missing_pyarrow(self):
+        """
+        Backends that need pyarrow fail when the simulation is created, not
+        after it has run.
+        """
+        path = f"{self.output}/results.parquet"
+        with mock.patch('topsim.core.output.find_spec', return_value=None):
+            with self.assertRaises(ImportError):
+                batch_simulation(to_file=True, hdf5_path=path,
+                                 output_backend='parquet')
+            with self.assertRaises(ImportError):
+                TableOutput(f"{self.output}/results.arrow")
+            TableOutput(f"{self.output}/results.npz")
+
+    @unittest.skipUnless(HAS_PYARROW, "requires pyarrow")
+    def test_parquet_dataset(self):
+        path = f"{self.output}/results.parquet"
+        simulation = batch_simulation(to_file=True, hdf5_path=path,
+                                      output_backend='parquet', chunk_size=50)
+        simulation.start()
+        sim = read_dataset(path, 'sim').to_pandas()
+        self.assertEqual(len(sim), simulation.monitor.offset)
+        self.assertGreater(
+            len(read_dataset(path, 'summary').to_pandas()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,6 +26,7 @@ from topsim.user.telescope import Telescope
 from topsim.user.schedule.dynamic_plan import DynamicSchedulingFromPlan
 from topsim.user.plan.static_planning import SHADOWPlanning
 from topsim.user.plan.batch_planning import BatchPlanning
+from topsim.user.plan.heft_planning import HEFTPlanning
 
 current_dir = os.path.abspath('')
 
@@ -237,3 +238,127 @@ class TestBatchProcessingPlan(unittest.TestCase):
 
     def tearDown(self) -> None:
         pass
+
+
+class TestPlannerLookahead(unittest.TestCase):
+
+    def setUp(self):
+        self.env = simpy.Environment()
+        self.cluster = Cluster(self.env, config=Config(CONFIG))
+        self.planner = Planner(
+            self.env, self.cluster, HEFTPlanning('heft'),
+            use_task_data=False, use_edge_data=True, lookahead=1, workers=1
+        )
+        self.observations = [
+            Observation(name, OBS_START_TME, OBS_DURATION, OBS_DEMAND,
+                        OBS_WORKFLOW, data_rate=OBS_DATA_RATE)
+            for name in ('first', 'second')
+        ]
+        self.planner.observations = self.observations
+        self.addCleanup(self.planner.close)
+
+    def _plan(self, observation, machines):
+        observation.ast = self.env.now
+        self.cluster.provision_batch_resources(machines, observation.name)
+        observation.plan = self.planner.run(observation, None, None)
+        return observation.plan
+
+    def _expected(self, observation):
+        return HEFTPlanning('heft').generate_plan(
+            self.env.now, self.cluster, None, observation, None)
+
+    def test_plan_ahead(self):
+        """
+        The second observation is planned while the first runs, and the
+        plan is moved to the machines provisioned for it.
+        """
+        first, second = self.observations
+        self._plan(first, 5)
+        self.assertIn(second.name, self.planner._pending)
+        self.env.run(until=10)
+        plan = self._plan(second, 5)
+        self.assertEqual((1, 0), (self.planner.prefetch_hits,
+                                  self.planner.prefetch_misses))
+        expected = self._expected(second)
+        self.assertEqual(
+            [(t.id, t.est, t.eft, t.allocated_machine_id, t.pred)
+             for t in expected.tasks],
+            [(t.id, t.est, t.eft, t.allocated_machine_id, t.pred)
+             for t in plan.tasks])
+        self.assertEqual(expected.exec_order, plan.exec_order)
+        self.assertEqual((expected.est, expected.eft), (plan.est, plan.eft))
+        self.assertEqual({'cat0_5', 'cat0_6', 'cat0_7', 'cat0_8', 'cat0_9'},
+                         {t.allocated_machine_id for t in plan.tasks})
+        for task in plan.tasks:
+            self.assertEqual(
+                task.pred, [p.id for p in plan.get_task_predecessors(task)])
+
+    def test_different_provision(self):
+        """
+        A plan made for different machines is not used.
+        """
+        first, second = self.observations
+        self._plan(first, 5)
+        plan = self._plan(second, 4)
+        self.assertEqual((0, 1), (self.planner.prefetch_hits,
+                                  self.planner.prefetch_misses))
+        self.assertEqual(4, len({t.allocated_machine_id for t in plan.tasks}))
+        self.assertEqual(self._expected(second).eft, plan.eft)
+
+    def test_simulation(self):
+        """
+        Simulations that plan ahead of time have the same results.
+        """
+        from topsim.core.simulation import Simulation
+
+        def run(lookahead):
+            simulation = Simulation(
+                simpy.Environment(), "test/data/config/standard_simulation.json",
+                Telescope, HEFTPlanning('heft'), DynamicSchedulingFromPlan(),
+                progress='none', timestamp=0, lookahead_plans=lookahead,
+                planning_workers=1)
+            return simulation, simulation.start()
+
+        _, (sim, tasks) = run(0)
+        simulation, (ahead_sim, ahead_tasks) = run(1)
+        self.assertEqual(1, simulation.planner.prefetch_hits)
+        self.assertIsNone(simulation.planner._pool)
+        self.assertTrue(tasks.equals(ahead_tasks))
+        self.assertTrue(sim.equals(ahead_sim))
+
+    def test_failed_simulation(self):
+        """
+        The planning workers are shut down when a simulation fails.
+        """
+        from topsim.core.simulation import Simulation
+
+        simulation = Simulation(
+            simpy.Environment(), "test/data/config/standard_simulation.json",
+            Telescope, HEFTPlanning('heft'), DynamicSchedulingFromPlan(),
+            progress='none', timestamp=0, lookahead_plans=1,
+            planning_workers=1)
+        step = simulation.env.step
+        pools = []
+
+        def fail():
+            pools.append(simulation.planner._pool)
+            if simulation.env.now > 10:
+                raise KeyboardInterrupt
+            step()
+
+        simulation.env.step = fail
+        with self.assertRaises(KeyboardInterrupt):
+            simulation.start()
+        self.assertIsNotNone(pools[-1])
+        self.assertIsNone(simulation.planner._pool)
+
+    def test_checkpoint(self):
+        """
+        Plans being made ahead of time are not saved in checkpoints.
+        """
+        self._plan(self.observations[0], 5)
+        self.assertIsNotNone(self.planner._pool)
+        state = self.planner.__getstate__()
+        self.assertEqual({}, state['_pending'])
+        self.assertIsNone(state['_pool'])
+
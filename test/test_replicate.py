@@ -0,0 +1,116 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for Monte Carlo replications
+"""
+
+import math
+import logging
+import unittest
+
+import numpy as np
+
+from pandas.testing import assert_frame_equal
+
+from topsim.core.delay import DelayModel
+from topsim.user.plan.batch_planning import BatchPlanning
+from topsim.user.schedule.batch_allocation import BatchProcessing
+from topsim.utils.replicate import (
+    RunningStatistics, run_replications, replication_seeds, _t_quantile,
+    METRICS)
+
+CONFIG = "test/data/config/standard_simulation.json"
+
+
+class TestRunningStatistics(unittest.TestCase):
+
+    def test_matches_numpy(self):
+        values = np.random.default_rng(4).normal(10, 3, 50)
+        statistics = RunningStatistics()
+        for v in values:
+            statistics.update(v)
+        self.assertEqual(50, statistics.count)
+        self.assertAlmostEqual(values.mean(), statistics.mean)
+        self.assertAlmostEqual(values.var(ddof=1), statistics.variance)
+
+    def test_half_width(self):
+        statistics = RunningStatistics()
+        statistics.update(1)
+        self.assertEqual(math.inf, statistics.half_width())
+        for v in (2, 3, 4, 5):
+            statistics.update(v)
+        # t(0.975, 4) = 2.776
+        self.assertAlmostEqual(2.776 * math.sqrt(2.5) / math.sqrt(5),
+                               statistics.half_width(), places=2)
+
+    def test_t_quantile(self):
+        self.assertAlmostEqual(12.706, _t_quantile(0.975, 1), places=3)
+        self.assertAlmostEqual(4.303, _t_quantile(0.975, 2), places=3)
+        self.assertAlmostEqual(2.776, _t_quantile(0.975, 4), places=3)
+        self.assertAlmostEqual(2.228, _t_quantile(0.975, 10), places=3)
+        self.assertAlmostEqual(1.660, _t_quantile(0.95, 100), places=3)
+
+
+class TestReplications(unittest.TestCase):
+
+    def setUp(self):
+        self.delay = DelayModel(0.5, "normal", DelayModel.DelayDegree.HIGH)
+
+    def test_seeds(self):
+        self.assertEqual(replication_seeds(1, 5), replication_seeds(1, 8)[:5])
+        self.assertEqual(5, len(set(replication_seeds(1, 5))))
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            run_replications(CONFIG, BatchPlanning("batch"),
+                             BatchProcessing(), metric="throughput")
+        with self.assertRaises(ValueError):
+            run_replications(CONFIG, BatchPlanning("batch"),
+                             BatchProcessing(), min_replications=1)
+
+    def test_fixed_count(self):
+        level = logging.getLogger("topsim").level
+        replications, summary = run_replications(
+            CONFIG, BatchPlanning("batch"), BatchProcessing(), self.delay,
+            min_replications=3, max_replications=3, seed=1)
+        # Replications run in this process leave its logging alone
+        self.assertEqual(level, logging.getLogger("topsim").level)
+        self.assertEqual(3, len(replications))
+        self.assertEqual(list(METRICS), list(summary.index))
+        self.assertEqual(3, summary.loc["makespan", "replications"])
+        self.assertAlmostEqual(replications["makespan"].mean(),
+                               summary.loc["makespan", "mean"])
+        self.assertLessEqual(summary.loc["makespan", "ci_low"],
+                             summary.loc["makespan", "ci_high"])
+
+    def test_early_stopping_in_parallel(self):
+        """
+        Replications stop as soon as the interval is narrow enough, and the
+        result does not depend on the number of workers.
+        """
+        kwargs = dict(delay=self.delay, target_width=1000,
+                      min_replications=2, max_replications=6, seed=2)
+        serial, _ = run_replications(
+            CONFIG, BatchPlanning("batch"), BatchProcessing(), **kwargs)
+        self.assertEqual(2, len(serial))
+        parallel, _ = run_replications(
+            CONFIG, BatchPlanning("batch"), BatchProcessing(), jobs=2,
+            **kwargs)
+        assert_frame_equal(serial, parallel)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,11 +19,16 @@ Test the scheduling algorithm as 'designed' by the user.
 import simpy
 import unittest
 
+from pandas.testing import assert_frame_equal
+
 from topsim.core.config import Config
-from topsim.core.planner import Planner
+from topsim.core.planner import Planner, WorkflowPlan, WorkflowStatus
 from topsim.core.cluster import Cluster
 from topsim.core.scheduler import Scheduler
 from topsim.core.buffer import Buffer
+from topsim.core.task import Task
+from topsim.core.adjacency import Adjacency, Structure
+from topsim.core.simulation import Simulation
 from topsim.user.telescope import Telescope
 
 from topsim.user.plan.batch_planning import BatchPlanning
@@ -34,6 +39,18 @@ from topsim.user.schedule.dynamic_plan import DynamicSchedulingFromPlan
 CONFIG = "test/data/config/standard_simulation.json"
 
 
+class _FinishedTasks:
+    """
+    Stands in for the cluster, with the ids of finished tasks
+    """
+
+    def __init__(self):
+        self.finished = set()
+
+    def is_task_finished(self, task):
+        return task.id in self.finished
+
+
 class TestFifoAlgorithm(unittest.TestCase):
 
     def setUp(self):
@@ -132,3 +149,79 @@ class TestBatchSchedulerAllocation(unittest.TestCase):
         -------
 
         """
+
+
+class TestSchedulingWindow(unittest.TestCase):
+
+    def setUp(self):
+        self.tasks = [Task(f"t{i}", est, 0, None, [])
+                      for i, est in enumerate([5, 1, 3, 2, 4])]
+        # t3 waits on t1
+        structure = Structure.from_edges(5, [1], [3], [0])
+        self.plan = WorkflowPlan('emu', 0, 10, self.tasks, [],
+                                 WorkflowStatus.SCHEDULED, 5,
+                                 adjacency=Adjacency(self.tasks, structure))
+        self.cluster = _FinishedTasks()
+
+    def _considered(self, algorithm, free):
+        return [t.id for t in algorithm._considered(
+            self.cluster, self.plan, set(self.tasks), free)]
+
+    def test_considered(self):
+        """
+        Without a window, every ready task of the task pool is considered.
+        """
+        self.assertEqual(["t1", "t2", "t4", "t0"],
+                         self._considered(BatchProcessing(), 1))
+        self.cluster.finished.add("t1")
+        self.assertEqual(["t1", "t3", "t2", "t4", "t0"],
+                         self._considered(BatchProcessing(), 1))
+        with self.assertRaises(ValueError):
+            BatchProcessing(window=0)
+
+    def test_window(self):
+        """
+        The window holds the ready tasks with the earliest estimated start,
+        for each free machine; a task becomes ready when its predecessors
+        have finished.
+        """
+        algorithm = DynamicSchedulingFromPlan(window=1)
+        self.assertEqual(["t1", "t2"], self._considered(algorithm, 2))
+        # t2 is not allocated, so is considered again
+        algorithm._record_window(self.plan, {self.tasks[1]}, 1)
+        self.assertEqual([], self._considered(algorithm, 0))
+        self.cluster.finished.add("t1")
+        self.assertEqual(["t3", "t2", "t4"], self._considered(algorithm, 3))
+        algorithm._record_window(self.plan, set(self.tasks[2:5]), 0)
+        self.assertEqual({'window': 1, 'window_decisions': 2,
+                          'window_truncated': 2, 'window_idle': 1},
+                         algorithm.window_stats())
+        self.assertEqual(["t0"], self._considered(algorithm, 1))
+        algorithm._record_window(self.plan, {self.tasks[0]}, 0)
+        self.cluster.finished.update(t.id for t in self.tasks)
+        self.assertEqual([], self._considered(algorithm, 1))
+        algorithm._record_window(self.plan, set(), 1)
+        self.assertEqual({}, algorithm._ready)
+
+    def test_simulation(self):
+        """
+        Without a window, results are unchanged; with one, the simulation
+        finishes and records how often the window was truncated.
+        """
+        def run(**kwargs):
+            algorithm = BatchProcessing(**kwargs)
+            simulation = Simulation(
+                simpy.Environment(), CONFIG, Telescope,
+                BatchPlanning("batch"), algorithm, progress='none',
+                timestamp=0)
+            return simulation, simulation.start()
+
+        _, (sim, tasks) = run()
+        _, (unbounded_sim, unbounded_tasks) = run(window=None)
+        assert_frame_equal(tasks, unbounded_tasks)
+        simulation, (window_sim, window_tasks) = run(window=1)
+        self.assertEqual(len(tasks), len(window_tasks))
+        stats = simulation.scheduler.algorithm.window_stats()
+        self.assertGreater(stats['window_decisions'], 0)
+        self.assertEqual([stats['window_truncated']],
+                         simulation.params['window_truncated'])
@@ -2,11 +2,18 @@ import unittest
 import simpy
 import logging
 import os
+import sys
+import shutil
 import datetime
+import tempfile
+import subprocess
 import pandas as pd
 from pathlib import Path
+from pandas.testing import assert_frame_equal
 
 from topsim.core.simulation import Simulation
+from topsim.core.table import read_tables
+from topsim.core.monitor import expand_timeseries, METADATA_COLUMNS
 from topsim.user.schedule.dynamic_plan import DynamicSchedulingFromPlan
 from topsim.user.schedule.batch_allocation import BatchProcessing
 from topsim.user.plan.static_planning import SHADOWPlanning
@@ -96,3 +103,102 @@ class TestSimulationBatchProcessing(unittest.TestCase):
         )
         sim, task = simulation.start()
         self.assertGreater(len(sim), 0)
+
+
+class TestSimulationArrayEngine(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.output = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def _simulation(self, engine, **kwargs):
+        return Simulation(
+            simpy.Environment(), CONFIG, Telescope,
+            planning_model=BatchPlanning('batch'),
+            scheduling=BatchProcessing(), timestamp=0, progress='none',
+            engine=engine, **kwargs
+        )
+
+    def test_matches_pandas_engine(self):
+        sim, tasks = self._simulation('pandas').start()
+        array_sim, array_tasks = self._simulation('array').start()
+        assert_frame_equal(sim, array_sim.to_df())
+        assert_frame_equal(tasks, array_tasks.to_df(index='task_id'))
+
+    def test_without_pandas(self):
+        """
+        A simulation run with the array engine never imports pandas.
+        """
+        script = (
+            "import sys, simpy\n"
+            "from topsim.core.simulation import Simulation\n"
+            "from topsim.user.telescope import Telescope\n"
+            "from topsim.user.plan.batch_planning import BatchPlanning\n"
+            "from topsim.user.schedule.batch_allocation import "
+            "BatchProcessing\n"
+            "Simulation(simpy.Environment(), sys.argv[1], Telescope, "
+            "BatchPlanning('batch'), BatchProcessing(), progress='none', "
+            "engine='array', to_file=True, hdf5_path=sys.argv[2]).start()\n"
+            "assert 'pandas' not in sys.modules\n"
+        )
+        output = f'{self.output}/results.npz'
+        env = dict(os.environ, PYTHONPATH=cwd)
+        subprocess.run([sys.executable, '-c', script, str(CONFIG), output],
+                       check=True, env=env)
+        tables = read_tables(output)
+        self.assertEqual(['sim', 'tasks', 'events', 'params', 'occupancy'],
+                         list(tables))
+        self.assertGreater(len(tables['sim']), 0)
+
+    def test_invalid_output(self):
+        with self.assertRaises(ValueError):
+            self._simulation('array', to_file=True,
+                             hdf5_path=f'{self.output}/results.h5')
+        with self.assertRaises(ValueError):
+            self._simulation('array', to_file=True, chunk_size=10,
+                             hdf5_path=f'{self.output}/results.npz')
+        with self.assertRaises(ValueError):
+            self._simulation('polars')
+
+
+class TestSimulationChangesTimeseries(unittest.TestCase):
+
+    def _simulation(self, **kwargs):
+        return Simulation(
+            simpy.Environment(), CONFIG, Telescope,
+            planning_model=BatchPlanning('batch'),
+            scheduling=BatchProcessing(), timestamp=0, progress='none',
+            **kwargs
+        )
+
+    def test_expands_to_dense(self):
+        """
+        Only changes are recorded, and expanding them with the parameters
+        gives the same data as the 'dense' time-series.
+        """
+        dense, _ = self._simulation().start()
+        simulation = self._simulation(timeseries='changes')
+        changes, _ = simulation.start()
+        self.assertLess(len(changes), len(dense))
+        self.assertIn('time', changes.columns)
+        for column in METADATA_COLUMNS:
+            self.assertNotIn(column, changes.columns)
+            self.assertIn(column, simulation.params)
+        self.assertEqual([len(dense)], simulation.params['timesteps'])
+        assert_frame_equal(
+            dense, expand_timeseries(changes, simulation.params))
+
+    def test_array_engine(self):
+        dense, _ = self._simulation(engine='array').start()
+        simulation = self._simulation(engine='array', timeseries='changes')
+        changes, _ = simulation.start()
+        expanded = expand_timeseries(changes, simulation.params)
+        self.assertEqual(dense.columns, expanded.columns)
+        assert_frame_equal(dense.to_df(), expanded.to_df())
+
+    def test_invalid_timeseries(self):
+        with self.assertRaises(ValueError):
+            self._simulation(timeseries='sparse')
+
@@ -0,0 +1,93 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for the column tables of the 'array' simulation engine
+"""
+
+import csv
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from topsim.core.table import Table, write_tables, read_tables
+
+
+class TestTable(unittest.TestCase):
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        self.table = Table.from_records([
+            {'time': 0, 'actor': 'scheduler', 'value': 1.5},
+            {'time': 1, 'actor': 'buffer', 'value': 2.5},
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_columns(self):
+        self.assertEqual(2, len(self.table))
+        self.assertEqual(['time', 'actor', 'value'], self.table.columns)
+        np.testing.assert_array_equal([0, 1], self.table['time'])
+        array = self.table.to_numpy()
+        self.assertEqual('buffer', array.actor[1])
+
+    def test_missing_columns(self):
+        self.table.append({'time': 2, 'resource': 'hot'})
+        self.assertEqual([None, None, 'hot'], list(self.table['resource']))
+        self.assertEqual(None, self.table['actor'][2])
+        with self.assertRaises(ValueError):
+            Table({'a': [1, 2], 'b': [1]})
+
+    def test_to_df(self):
+        df = self.table.to_df(index='actor')
+        self.assertEqual(['scheduler', 'buffer'], list(df.index))
+        self.assertEqual(['time', 'value'], list(df.columns))
+
+    def test_write_and_read(self):
+        path = f"{self.output}/table.npz"
+        self.table.write(path)
+        table = Table.read(path)
+        self.assertEqual(self.table.columns, table.columns)
+        np.testing.assert_array_equal(self.table['value'], table['value'])
+
+        path = f"{self.output}/table.csv"
+        self.table.write(path)
+        with open(path) as fp:
+            rows = list(csv.reader(fp))
+        self.assertEqual(['time', 'actor', 'value'], rows[0])
+        self.assertEqual(['1', 'buffer', '2.5'], rows[2])
+        self.assertRaises(ValueError, Table.read, path)
+        self.assertRaises(ValueError, self.table.write,
+                          f"{self.output}/table.h5")
+
+    def test_write_tables(self):
+        events = Table({'event': ['started']})
+        (path,) = write_tables(f"{self.output}/results.npz",
+                               {'sim': self.table, 'events': events})
+        tables = read_tables(path)
+        self.assertEqual(['sim', 'events'], list(tables))
+        self.assertEqual(['started'], list(tables['events']['event']))
+
+        paths = write_tables(f"{self.output}/results.csv",
+                             {'sim': self.table, 'events': events})
+        self.assertEqual(['results-sim.csv', 'results-events.csv'],
+                         [p.name for p in paths])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -42,6 +42,17 @@ class TaskInit(unittest.TestCase):
             flops=0, task_data=0, edge_data=0,
             delay=self.dm)
 
+    def test_workflow_key(self):
+        """
+        The key of a task does not depend on when its workflow was planned
+        """
+        early = Task('apricot_jam_0_10', 0, 11, None, [], gid=10)
+        late = Task('apricot_jam_120_10', 0, 11, None, [], gid=10)
+        self.assertEqual('apricot_jam/10', early.workflow_key())
+        self.assertEqual(early.workflow_key(), late.workflow_key())
+        self.assertEqual('apricot_jam_0_10',
+                         Task('apricot_jam_0_10', 0, 11, None, []).workflow_key())
+
 
 class TestTaskRuntime(unittest.TestCase):
     def setUp(self):
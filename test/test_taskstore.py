@@ -0,0 +1,125 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for the finished-task store
+"""
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import simpy
+
+from pandas.testing import assert_frame_equal
+
+from topsim.core.simulation import Simulation
+from topsim.core.task import Task
+from topsim.core.taskstore import TaskStore, TASK_COLUMNS
+from topsim.user.telescope import Telescope
+from topsim.user.plan.batch_planning import BatchPlanning
+from topsim.user.schedule.batch_allocation import BatchProcessing
+
+CONFIG = "test/data/config/standard_simulation.json"
+
+
+def _task(i):
+    task = Task(f"emu{i % 2}_t{i}", est=i, eft=i + 10, machine_id=None,
+                predecessors=[])
+    task.ast, task.aft = i + 1, i + 12
+    task.delay_flag = bool(i % 3)
+    return task
+
+
+class TestTaskStore(unittest.TestCase):
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_columns(self):
+        store = TaskStore()
+        for i in range(3):
+            store.append(_task(i), f"m{i}")
+        self.assertEqual(3, len(store))
+        columns = store.to_dict()
+        self.assertEqual(list(TASK_COLUMNS), list(columns))
+        self.assertEqual(['emu0', 'emu1', 'emu0'],
+                         list(columns['observation_id']))
+        self.assertEqual([12, 13, 14], list(columns['aft']))
+        df = store.to_df()
+        self.assertEqual(['emu0_t0', 'emu1_t1', 'emu0_t2'], list(df.index))
+        self.assertEqual('m1', df.loc['emu1_t1', 'machine'])
+
+    def test_empty(self):
+        self.assertEqual(0, len(TaskStore().to_df()))
+
+    def test_spill(self):
+        """
+        Records beyond the memory budget are spilled to disk, and read back
+        in order.
+        """
+        store = TaskStore(memory_budget=500, spill_dir=self.output)
+        unbounded = TaskStore()
+        for i in range(50):
+            store.append(_task(i), f"m{i}")
+            unbounded.append(_task(i), f"m{i}")
+        self.assertGreater(len(os.listdir(self.output)), 1)
+        self.assertLessEqual(store.nbytes, 500)
+        assert_frame_equal(unbounded.to_df(), store.to_df())
+
+        # A checkpoint includes the spilled records
+        restored = pickle.loads(pickle.dumps(store))
+        shutil.rmtree(self.output)
+        os.mkdir(self.output)
+        restored.append(_task(50), "m50")
+        unbounded.append(_task(50), "m50")
+        for name, values in unbounded.to_dict().items():
+            np.testing.assert_array_equal(values, restored.to_dict()[name])
+
+    def test_temporary_spill_directory(self):
+        store = TaskStore(memory_budget=1)
+        store.append(_task(0), "m0")
+        directory = store._temporary[0]
+        self.assertTrue(os.path.isdir(directory))
+        del store
+        self.assertFalse(os.path.exists(directory))
+
+
+class TestSimulationTaskStore(unittest.TestCase):
+
+    def test_memory_budget(self):
+        """
+        Spilling finished task records does not change the task table.
+        """
+        def run(**kwargs):
+            return Simulation(
+                simpy.Environment(), CONFIG, Telescope,
+                BatchPlanning("batch"), BatchProcessing(), progress='none',
+                timestamp=0, **kwargs).start()
+
+        _, tasks = run()
+        _, spilled = run(task_memory_budget=1024)
+        assert_frame_equal(tasks, spilled)
+        self.assertEqual(list(TASK_COLUMNS[1:]), list(tasks.columns[:8]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for structured tracing
+"""
+
+import os
+import sys
+import unittest
+import subprocess
+
+import simpy
+
+from topsim.core.simulation import Simulation
+from topsim.core.trace import Tracer, TracePoint, TRACE
+from topsim.user.telescope import Telescope
+from topsim.user.plan.batch_planning import BatchPlanning
+from topsim.user.schedule.batch_allocation import BatchProcessing
+
+CONFIG = "test/data/config/standard_simulation.json"
+
+
+class TestTracer(unittest.TestCase):
+
+    def setUp(self):
+        self.tracer = Tracer(capacity=3)
+
+    def test_disabled(self):
+        self.assertFalse(self.tracer.scheduler)
+        self.assertEqual(0, len(self.tracer.records()))
+        self.tracer.enable('scheduler')
+        self.assertTrue(self.tracer.scheduler)
+        self.assertFalse(self.tracer.cluster)
+        with self.assertRaises(ValueError):
+            self.tracer.enable('monitor')
+
+    def test_ring_buffer(self):
+        """
+        Once the buffer is full, the oldest records are overwritten, and
+        strings are only interned once.
+        """
+        self.tracer.enable()
+        for time in range(5):
+            self.tracer.record(TracePoint.PROVISION, time, 'emu', time * 2)
+        self.assertEqual(3, len(self.tracer))
+        self.assertEqual(2, self.tracer.dropped)
+        self.assertEqual(['emu'], self.tracer.strings)
+        records = self.tracer.records()
+        self.assertEqual([2, 3, 4], list(records['time']))
+        self.assertEqual(
+            {'time': 4, 'point': 'PROVISION', 'observation': 'emu',
+             'machines': 8},
+            self.tracer.decode()[-1])
+
+    def test_format(self):
+        self.tracer.enable()
+        self.tracer.record(TracePoint.ALLOCATION, 7, 'emu_0_1', 'cat0_m0')
+        self.assertEqual(["7: Allocation emu_0_1-cat0_m0 made to cluster"],
+                         self.tracer.format())
+        self.tracer.clear()
+        self.assertEqual([], self.tracer.format())
+
+
+class TestSimulationTrace(unittest.TestCase):
+
+    def tearDown(self):
+        TRACE.disable()
+        TRACE.clear()
+
+    def test_trace_simulation(self):
+        TRACE.enable('scheduler', 'cluster')
+        simulation = Simulation(
+            simpy.Environment(), CONFIG, Telescope, BatchPlanning("batch"),
+            BatchProcessing(), progress='none', timestamp=0)
+        _, tasks = simulation.start()
+        records = TRACE.decode()
+        points = [r['point'] for r in records]
+        # Every workflow task (but not ingest) is allocated by the scheduler
+        allocated = {r['task'] for r in records if r['point'] == 'ALLOCATION'}
+        self.assertTrue(allocated)
+        self.assertTrue(allocated < set(tasks.index))
+        self.assertEqual(len(simulation.instrument.observations),
+                         points.count('PROVISION'))
+        # The instrument was not traced
+        self.assertNotIn('TELESCOPE_USE', points)
+
+    def test_enable_from_environment(self):
+        script = ("from topsim.core.trace import TRACE; "
+                  "print(TRACE.scheduler, TRACE.buffer, TRACE.capacity)")
+        env = dict(os.environ, PYTHONPATH=os.getcwd(),
+                   TOPSIM_TRACE="scheduler", TOPSIM_TRACE_CAPACITY="10")
+        output = subprocess.run([sys.executable, "-c", script], env=env,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual("True False 10", output.stdout.strip())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for compiled workflows
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+
+import networkx as nx
+import numpy as np
+import simpy
+
+from pathlib import Path
+from pandas.testing import assert_frame_equal
+
+from topsim.core.simulation import Simulation
+from topsim.core.workflow import (
+    CompiledWorkflow, compile_workflow, load_workflow, read_graph,
+    node_link_file)
+from topsim.user.telescope import Telescope
+from topsim.user.plan.batch_planning import BatchPlanning
+from topsim.user.schedule.batch_allocation import BatchProcessing
+
+CONFIG = Path("test/data/config/standard_simulation.json")
+WORKFLOW = CONFIG.parent / "standard/workflow_config_minutes.json"
+
+
+def _read_json(path):
+    with open(path) as fp:
+        return nx.node_link_graph(json.load(fp)["graph"], edges="links")
+
+
+def _assert_graphs_equal(test, expected, graph):
+    test.assertEqual(dict(expected.nodes(data=True)),
+                     dict(graph.nodes(data=True)))
+    test.assertEqual({(u, v): d for u, v, d in expected.edges(data=True)},
+                     {(u, v): d for u, v, d in graph.edges(data=True)})
+
+
+class TestCompiledWorkflow(unittest.TestCase):
+
+    def setUp(self):
+        self.output = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_compile(self):
+        path = compile_workflow(WORKFLOW, self.output / "workflow.npz")
+        compiled, parsed = load_workflow(path), load_workflow(WORKFLOW)
+        self.assertEqual(parsed.ids, compiled.ids)
+        self.assertEqual(parsed.header, compiled.header)
+        np.testing.assert_array_equal(parsed.attributes['comp'],
+                                      compiled.attributes['comp'])
+        for name in ('succ_indptr', 'succ_indices', 'pred_indices',
+                     'pred_data'):
+            np.testing.assert_array_equal(
+                getattr(parsed.structure, name),
+                getattr(compiled.structure, name))
+        graph = _read_json(WORKFLOW)
+        self.assertEqual(list(nx.topological_sort(graph)), compiled.ids)
+        _assert_graphs_equal(self, graph, read_graph(path))
+        self.assertEqual(max(d for _, d in graph.out_degree()),
+                         compiled.max_out_degree())
+        with self.assertRaises(ValueError):
+            compile_workflow(WORKFLOW, self.output / "workflow.json")
+
+    def test_string_ids(self):
+        """
+        Node ids may be strings, and nodes may leave out attributes.
+        """
+        source = self.output / "workflow.json"
+        with open(source, 'w') as fp:
+            json.dump({"header": {"time": False}, "graph": {
+                "directed": True, "multigraph": False, "graph": {},
+                "nodes": [{"id": "a", "comp": 10, "task_data": 5},
+                          {"id": "b", "comp": 20.5}],
+                "links": [{"source": "a", "target": "b",
+                           "transfer_data": 3}]}}, fp)
+        workflow = load_workflow(compile_workflow(source))
+        self.assertEqual(['a', 'b'], workflow.ids)
+        self.assertEqual([5, 0], workflow.attribute('task_data'))
+        self.assertEqual([0, 0], workflow.attribute('missing'))
+        _assert_graphs_equal(self, _read_json(source),
+                             workflow.to_networkx())
+
+        # Libraries that only read JSON are given the decompiled workflow
+        decompiled = node_link_file(self.output / "workflow.npz",
+                                    self.output)
+        _assert_graphs_equal(self, _read_json(source), _read_json(decompiled))
+        self.assertEqual(str(source), node_link_file(str(source)))
+
+    def test_version(self):
+        path = compile_workflow(WORKFLOW, self.output / "workflow.npz")
+        with np.load(path) as data:
+            arrays = dict(data)
+        arrays['meta'] = np.asarray(json.dumps({'version': 0}))
+        np.savez(path, **arrays)
+        with self.assertRaises(ValueError):
+            CompiledWorkflow.from_npz(path)
+
+    def test_simulation(self):
+        """
+        A configuration may use compiled workflows in place of JSON, with
+        the same results.
+        """
+        workflow = compile_workflow(WORKFLOW, self.output / "workflow.npz")
+        with open(CONFIG) as fp:
+            config = json.load(fp)
+        for pipeline in config['instrument']['telescope']['pipelines'].values():
+            pipeline['workflow'] = str(workflow.absolute())
+        compiled_config = self.output / "config.json"
+        with open(compiled_config, 'w') as fp:
+            json.dump(config, fp)
+
+        def run(path):
+            return Simulation(
+                simpy.Environment(), path, Telescope, BatchPlanning("batch"),
+                BatchProcessing(), progress='none', timestamp=0).start()
+
+        sim, tasks = run(CONFIG)
+        compiled_sim, compiled_tasks = run(compiled_config)
+        assert_frame_equal(tasks.drop(columns='config'),
+                           compiled_tasks.drop(columns='config'))
+        self.assertEqual(list(sim['finished_tasks']),
+                         list(compiled_sim['finished_tasks']))
+
+
+if __name__ == '__main__':
+    unittest.main()
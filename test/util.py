@@ -0,0 +1,37 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Helpers shared by the tests
+"""
+
+import simpy
+
+from topsim.core.simulation import Simulation
+from topsim.user.telescope import Telescope
+from topsim.user.plan.batch_planning import BatchPlanning
+from topsim.user.schedule.batch_allocation import BatchProcessing
+
+CONFIG = "test/data/config/standard_simulation.json"
+
+
+def batch_simulation(**kwargs):
+    """
+    A simulation of :py:data:`CONFIG` with batch planning and processing,
+    without progress bars and with a fixed timestamp
+    """
+    return Simulation(
+        simpy.Environment(), CONFIG, Telescope, BatchPlanning("batch"),
+        BatchProcessing(), progress='none', timestamp=0, **kwargs)
@@ -2,10 +2,13 @@
 Algorithm presents the abstract base class for any Scheduling algorithm.
 """
 
+import heapq
+
 from abc import ABC, abstractmethod
 
 from topsim.core.cluster import Cluster
 from topsim.core.planner import Planner, WorkflowPlan
+from topsim.core.task import TaskStatus
 
 
 class Scheduling(ABC):
@@ -18,6 +21,12 @@ class Scheduling(ABC):
 
     Attributes
     ----------
+    window : int or None
+        If set, each timestep considers at most `window` ready tasks for
+        each free machine, in order of their estimated start time, taken
+        from a heap of the ready tasks of each workflow plan (see
+        :py:meth:`_considered`). By default, every task of the task pool is
+        considered.
 
     Notes
     -----
@@ -42,9 +51,21 @@ class Scheduling(ABC):
     LOW_MAX_RESOURCES = 896
     MID_MAX_RESOURCES = 786
 
-    def __init__(self):
+    def __init__(self, window=None):
         self.name = "AbstractAlgorithm"
         self.ingest_requirements = 0
+        if window is not None and window < 1:
+            raise ValueError(f"window must be at least 1, not {window}")
+        self.window = window
+        #: Timesteps with free machines; of those, the timesteps in which
+        #: the window left tasks out; and of those, the timesteps that
+        #: ended with machines still free
+        self.window_decisions = 0
+        self.window_truncated = 0
+        self.window_idle = 0
+        self._truncated = False
+        #: The _ReadyTasks of each workflow plan scheduled with the window
+        self._ready = {}
 
     @abstractmethod
     def to_string(self):
@@ -93,3 +114,147 @@ class Scheduling(ABC):
         df : pandas.DataFrame
             DataFrame with current state
         """
+
+    def _is_ready(self, cluster, workflow_plan, task):
+        """
+        Whether `task` is unscheduled and its predecessors have finished
+        """
+        return (task.task_status is TaskStatus.UNSCHEDULED
+                and all(cluster.is_task_finished(p) for p in
+                        workflow_plan.adjacency.predecessors(task)))
+
+    def _considered(self, cluster, workflow_plan, task_pool, free):
+        """
+        The ready tasks to consider this timestep, when `free` machines are
+        available, in order of estimated start time.
+
+        Without a window, these are the ready tasks of `task_pool`.
+        Otherwise, they are the first `window` tasks for each free machine
+        from the heap of ready tasks of `workflow_plan`, which is kept up to
+        date as tasks finish, so the work done each timestep does not grow
+        with the task pool. Tasks taken from the heap must be passed back
+        with :py:meth:`_record_window`.
+        """
+        self._truncated = False
+        if self.window is None:
+            return (t for t in sorted(task_pool, key=lambda t: (t.est, t.id))
+                    if self._is_ready(cluster, workflow_plan, t))
+        ready = self._ready.get(workflow_plan.id)
+        if ready is None or ready.plan is not workflow_plan:
+            ready = self._ready[workflow_plan.id] = _ReadyTasks(
+                cluster, workflow_plan)
+        ready.update(cluster)
+        if not free:
+            return []
+        self.window_decisions += 1
+        limit = self.window * free
+        if len(ready) > limit:
+            self._truncated = True
+            self.window_truncated += 1
+        return ready.take(limit)
+
+    def _record_window(self, workflow_plan, allocated, free):
+        """
+        Return the tasks taken by :py:meth:`_considered` that were not
+        `allocated` to the heap of ready tasks, and record that `free`
+        machines were left.
+        """
+        if self.window is None:
+            return
+        if self._truncated and free:
+            self.window_idle += 1
+        ready = self._ready.get(workflow_plan.id)
+        if ready is not None:
+            ready.release(allocated)
+            if ready.exhausted():
+                del self._ready[workflow_plan.id]
+
+    def window_stats(self):
+        """
+        How often the window truncated the tasks considered, as a dict of
+        :py:attr:`window` and the counts of timesteps.
+        """
+        return {'window': self.window,
+                'window_decisions': self.window_decisions,
+                'window_truncated': self.window_truncated,
+                'window_idle': self.window_idle}
+
+
+class _ReadyTasks:
+    """
+    The tasks of a workflow plan that are ready to be allocated, in a heap
+    keyed by their estimated start time, and the allocated tasks that have
+    not yet finished.
+
+    A task is pushed onto the heap when the last of its predecessors
+    finishes, which is found by checking only the allocated tasks.
+    """
+
+    def __init__(self, cluster, plan):
+        self.plan = plan
+        self.heap = []
+        self.taken = []
+        self.running = []
+        #: Number of unfinished predecessors of each waiting task
+        self.waiting = {}
+        for task in plan.tasks:
+            if task.task_status is TaskStatus.UNSCHEDULED:
+                remaining = sum(
+                    not cluster.is_task_finished(p)
+                    for p in plan.adjacency.predecessors(task))
+                if remaining:
+                    self.waiting[task] = remaining
+                else:
+                    self._push(task)
+            elif task.task_status is not TaskStatus.FINISHED:
+                self.running.append(task)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _push(self, task):
+        heapq.heappush(self.heap, (task.est, task.id, task))
+
+    def update(self, cluster):
+        """
+        Push the successors of allocated tasks that have since finished,
+        once all of their predecessors have.
+        """
+        running = []
+        for task in self.running:
+            if not cluster.is_task_finished(task):
+                running.append(task)
+                continue
+            for successor in self.plan.adjacency.successors(task):
+                remaining = self.waiting.get(successor)
+                if remaining is None:
+                    continue
+                if remaining == 1:
+                    del self.waiting[successor]
+                    self._push(successor)
+                else:
+                    self.waiting[successor] = remaining - 1
+        self.running = running
+
+    def take(self, limit):
+        """
+        Pop the (at most) `limit` tasks with the earliest estimated start
+        """
+        self.taken = [heapq.heappop(self.heap)[2]
+                      for _ in range(min(limit, len(self.heap)))]
+        return self.taken
+
+    def release(self, allocated):
+        """
+        Mark the taken tasks that were `allocated` as running, and push the
+        others back onto the heap.
+        """
+        for task in self.taken:
+            if task in allocated:
+                self.running.append(task)
+            else:
+                self._push(task)
+        self.taken = []
+
+    def exhausted(self):
+        return not (self.heap or self.running or self.waiting)
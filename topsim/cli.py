@@ -17,10 +17,34 @@
 Command-line interface for the TopSim project
 """
 import click
+import os
 import sys
 
 from importlib.metadata import version as vs
 
+#: Progress reporting modes; see topsim.core.simulation.PROGRESS_MODES
+PROGRESS = click.Choice(['bar', 'log', 'none'])
+
+
+def _output_options(f):
+    """
+    Options shared by commands that run simulations.
+    """
+    f = click.option("--budget", type=float, default=None,
+                     help="Wall-clock budget in seconds; stop early once it "
+                          "has been spent.")(f)
+    f = click.option("--progress", type=PROGRESS, default='bar',
+                     show_default=True,
+                     help="How to report progress.")(f)
+    f = click.option("--chunk-size", type=click.IntRange(min=1),
+                     default=1000, show_default=True,
+                     help="Timesteps per chunk when streaming.")(f)
+    f = click.option("--stream/--no-stream", default=False,
+                     show_default=True,
+                     help="Stream per-timestep results to file in chunks, "
+                          "rather than holding them in memory.")(f)
+    return f
+
 
 @click.group()
 def cli():
@@ -40,5 +64,500 @@ def version(module=''):
     click.echo(f"TOpSim: {vs('topsim')}") # using the {module} module.")
 
 
+@cli.command()
+@click.argument("config", type=click.Path(exists=True, dir_okay=False))
+@click.option("--planner", default="heft", show_default=True,
+              type=click.Choice(["batch", "heft", "pheft", "fcfs",
+                                 "native_heft"]),
+              help="Planning model used to generate workflow plans.")
+@click.option("--scheduler", default="dynamic_plan", show_default=True,
+              type=click.Choice(["dynamic_plan", "batch"]),
+              help="Scheduling model used to allocate tasks at runtime.")
+@click.option("--output", type=click.Path(), default=None,
+              help="File to store results in: HDF5, or with the array "
+                   "engine .npz, .csv or .arrow; or a dataset directory "
+                   "(see --output-backend). If not provided, a summary is "
+                   "printed instead.")
+@click.option("--engine", type=click.Choice(["pandas", "array"]),
+              default="pandas", show_default=True,
+              help="Record results in pandas DataFrames, or in plain arrays "
+                   "without importing pandas.")
+@click.option("--output-backend",
+              type=click.Choice(["hdf5", "tables", "parquet", "arrow"]),
+              default=None,
+              help="How to write --output: HDF5 (the default for the pandas "
+                   "engine), a table file (the default for the array "
+                   "engine), or a Parquet or Arrow dataset directory.")
+@click.option("--timeseries", type=click.Choice(["dense", "changes"]),
+              default="dense", show_default=True,
+              help="Record the simulation data every timestep, or only "
+                   "when a value changes.")
+@click.option("--use-task-data/--no-task-data", default=False,
+              show_default=True)
+@click.option("--use-edge-data/--no-edge-data", default=True,
+              show_default=True)
+@click.option("--event-log", type=click.Path(dir_okay=False), default=None,
+              help="Write events to this binary event log, rather than "
+                   "keeping them in memory.")
+@click.option("--checkpoint", type=click.Path(dir_okay=False), default=None,
+              help="File to periodically checkpoint the simulation to; "
+                   "continue it with 'topsim resume'.")
+@click.option("--checkpoint-interval", type=click.IntRange(min=1),
+              default=None,
+              help="Simulation time between checkpoints.")
+@click.option("--lookahead-plans", type=click.IntRange(min=0), default=0,
+              show_default=True,
+              help="Number of upcoming observations to plan ahead of time, "
+                   "in worker processes.")
+@click.option("--scheduling-window", type=click.IntRange(min=1),
+              default=None,
+              help="Consider at most this many ready tasks for each free "
+                   "machine every timestep, in order of their estimated "
+                   "start time; by default, every task is considered.")
+@_output_options
+def run(config, planner, scheduler, output, engine, output_backend,
+        timeseries, use_task_data, use_edge_data, event_log, checkpoint,
+        checkpoint_interval, lookahead_plans, scheduling_window, stream,
+        chunk_size, progress, budget):
+    """
+    Run a single simulation of CONFIG.
+    """
+    import simpy
+    from topsim.core.simulation import Simulation
+    from topsim.user.telescope import Telescope
+    from topsim.utils.experiment import _build_planning, _build_scheduling
+
+    if stream and not output:
+        raise click.UsageError("--stream requires --output")
+    if stream and engine == "array":
+        raise click.UsageError("--stream requires the pandas engine")
+    if checkpoint and not checkpoint_interval:
+        raise click.UsageError("--checkpoint requires --checkpoint-interval")
+    try:
+        simulation = Simulation(
+            env=simpy.Environment(), config=config, instrument=Telescope,
+            planning_model=_build_planning(planner),
+            scheduling=_build_scheduling(
+                scheduler, {"window": scheduling_window}),
+            to_file=bool(output), hdf5_path=output,
+            use_task_data=use_task_data, use_edge_data=use_edge_data,
+            progress=progress, chunk_size=chunk_size if stream else None,
+            checkpoint=checkpoint, checkpoint_interval=checkpoint_interval,
+            engine=engine, event_log=event_log, timeseries=timeseries,
+            output_backend=output_backend, lookahead_plans=lookahead_plans)
+    except ImportError as e:
+        # An output backend whose optional dependency is missing
+        raise click.UsageError(str(e))
+    result = simulation.start(budget=budget)
+    _report(simulation, result, output, budget)
+
+
+@cli.command()
+@click.argument("checkpoint", type=click.Path(exists=True, dir_okay=False))
+@click.option("--budget", type=float, default=None,
+              help="Wall-clock budget in seconds; stop early once it "
+                   "has been spent.")
+def resume(checkpoint, budget):
+    """
+    Continue the simulation saved in CHECKPOINT (see run --checkpoint).
+
+    The simulation keeps checkpointing to the same file, and writes its
+    results to the output given to the original run.
+    """
+    from topsim.core.simulation import Simulation
+    simulation = Simulation.restore(checkpoint)
+    result = simulation.resume(budget=budget)
+    output = (simulation._output.path if simulation._output is not None
+              else None)
+    _report(simulation, result, output, budget)
+
+
+@cli.command()
+@click.argument("checkpoint", type=click.Path(exists=True, dir_okay=False))
+@click.argument("branches", type=click.Path(exists=True, dir_okay=False))
+@click.option("--jobs", "-j", type=click.IntRange(min=1), default=None,
+              help="Number of branches to run in parallel [default: one per "
+                   "branch, up to the number of CPUs].")
+@click.option("--budget", type=float, default=None,
+              help="Wall-clock budget of each branch in seconds.")
+def fork(checkpoint, branches, jobs, budget):
+    """
+    Continue the simulation saved in CHECKPOINT along each of BRANCHES.
+
+    BRANCHES is a JSON file that maps the name of each branch to the
+    settings it changes: any of "scheduling" and "planning" (as for
+    'topsim run'), and "delay" (as in a sweep specification).
+    """
+    import json
+    from topsim.core.simulation import Simulation
+    from topsim.utils.experiment import (
+        _build_planning, _build_scheduling, _build_delay)
+
+    with open(branches) as fp:
+        spec = json.load(fp)
+    builders = {
+        "scheduling": lambda s: _build_scheduling(s, {}),
+        "planning": _build_planning,
+        "delay": _build_delay,
+    }
+    try:
+        settings = {
+            name: {k: builders[k](v) for k, v in branch.items()}
+            for name, branch in spec.items()
+        }
+    except KeyError as e:
+        raise click.UsageError(f"Unknown branch setting {e}")
+    simulation = Simulation.restore(checkpoint)
+    results = simulation.fork(settings, jobs=jobs, budget=budget)
+    for name, result in results.items():
+        if isinstance(result, str):
+            click.echo(f"{name}: {result}")
+        else:
+            click.echo(f"{name}: {len(result[0])} timesteps, "
+                       f"{len(result[1])} tasks run")
+
+
+def _report(simulation, result, output, budget):
+    """
+    Report the outcome of a simulation run with 'run' or 'resume', and exit.
+    """
+    if simulation.timed_out:
+        click.echo(f"Budget of {budget}s spent; simulation stopped @ "
+                   f"{simulation.env.now}", err=True)
+    if output:
+        click.echo(output)
+    else:
+        _, tasks = result
+        click.echo(f"Simulation finished @ {simulation.env.now}: "
+                   f"{len(tasks)} tasks run")
+    sys.exit(2 if simulation.timed_out else 0)
+
+
+@cli.command()
+@click.argument("spec", type=click.Path(exists=True, dir_okay=False))
+@click.option("--jobs", "-j", type=click.IntRange(min=1), default=1,
+              show_default=True,
+              help="Number of simulations to run in parallel.")
+@click.option("--output", type=click.Path(file_okay=False), default=None,
+              help="Output directory; defaults to the one in SPEC.")
+@click.option("--shard", default=None,
+              help="Only run shard i of N (zero-indexed) of the sweep; in a "
+                   "SLURM array job, defaults to the shard of the array "
+                   "task.")
+@click.option("--manifest", "manifest_only", is_flag=True,
+              help="Write the sweep manifest to the output directory "
+                   "without running any simulations.")
+@click.option("--force", is_flag=True,
+              help="Re-run simulations that already have results.")
+@_output_options
+def sweep(spec, jobs, output, shard, manifest_only, force, stream,
+          chunk_size, progress, budget):
+    """
+    Run every combination in the sweep described by SPEC.
+
+    SPEC is a JSON sweep specification, or a manifest written with
+    --manifest (see topsim.utils.experiment.Experiment.from_sweep_manifest).
+    """
+    from topsim.utils.experiment import Experiment, parse_shard
+    try:
+        experiment = Experiment.from_sweep_manifest(spec, output, force)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    if manifest_only:
+        click.echo(experiment.write_sweep_manifest())
+        return
+    if shard is not None:
+        try:
+            shard = parse_shard(shard)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--shard")
+    completed = experiment.run(
+        shard=shard, jobs=jobs, budget=budget, progress=progress,
+        chunk_size=chunk_size if stream else None)
+    click.echo(f"{completed} simulations completed")
+
+
+@cli.command()
+@click.argument("output", type=click.Path(exists=True, file_okay=False))
+@click.option("--results", default="results.h5", show_default=True,
+              help="Name of the merged results file.")
+def merge(output, results):
+    """
+    Merge the results of each shard of a sweep in the OUTPUT directory.
+    """
+    from topsim.utils.experiment import merge_shards
+    click.echo(merge_shards(output, results))
+
+
+@cli.command()
+@click.option("--scenario", "scenarios", multiple=True,
+              type=click.Choice(["machines", "tasks", "observations",
+                                 "duration"]),
+              help="Scenario to run (repeatable); defaults to all of them.")
+@click.option("--scale", "scales", multiple=True,
+              type=click.Choice(["small", "medium", "large"]),
+              help="Scale to run each scenario at (repeatable); defaults to "
+                   "small.")
+@click.option("--repeat", type=click.IntRange(min=1), default=1,
+              show_default=True,
+              help="Run each scenario this many times and keep the fastest.")
+@click.option("--output", type=click.Path(dir_okay=False), default=None,
+              help="JSON file to save the results in.")
+@click.option("--compare", type=click.Path(exists=True, dir_okay=False),
+              default=None,
+              help="JSON results of a previous benchmark to compare with.")
+@click.option("--base-config", type=click.Path(exists=True, dir_okay=False),
+              default=None,
+              help="Configuration from which each scenario is derived; "
+                   "defaults to the standard test configuration of a source "
+                   "checkout.")
+def bench(scenarios, scales, repeat, output, compare, base_config):
+    """
+    Run the benchmark suite and report its performance.
+    """
+    from topsim.utils import benchmark
+
+    base = base_config or benchmark.BASE_CONFIG
+    if not os.path.exists(base):
+        raise click.UsageError(
+            f"{base} does not exist (it is only part of a source checkout); "
+            f"provide a configuration with --base-config")
+    results = benchmark.run_benchmarks(
+        scenarios or benchmark.SCENARIOS, scales or ("small",), repeat, base)
+    comparison = None
+    if compare:
+        comparison = benchmark.compare_results(
+            benchmark.load_results(compare), results)
+    click.echo(benchmark.format_results(results, comparison))
+    if output:
+        benchmark.write_results(results, output)
+        click.echo(output)
+
+
+@cli.command()
+@click.argument("config", type=click.Path(exists=True, dir_okay=False))
+@click.option("--planner", default="heft", show_default=True,
+              type=click.Choice(["batch", "heft", "pheft", "fcfs",
+                                 "native_heft"]))
+@click.option("--scheduler", default="dynamic_plan", show_default=True,
+              type=click.Choice(["dynamic_plan", "batch"]))
+@click.option("--delay-prob", type=click.FloatRange(0, 1), default=0.1,
+              show_default=True, help="Probability that a task is delayed.")
+@click.option("--delay-dist", default="normal", show_default=True,
+              type=click.Choice(["normal", "poisson", "uniform"]))
+@click.option("--delay-degree", default="MID", show_default=True,
+              type=click.Choice(["LOW", "MID", "HIGH"], case_sensitive=False))
+@click.option("--common-random-numbers", is_flag=True,
+              help="Draw each task's delay from its own stream, so runs with "
+                   "the same --seed but different policies see the same "
+                   "per-task delays.")
+@click.option("--metric", default="makespan", show_default=True,
+              type=click.Choice(["makespan", "observation_delay",
+                                 "task_delay_offset"]),
+              help="Metric whose confidence interval decides when to stop.")
+@click.option("--target-width", type=float, default=None,
+              help="Stop once the confidence interval of the metric is no "
+                   "wider than this.")
+@click.option("--relative", is_flag=True,
+              help="--target-width is relative to the mean of the metric.")
+@click.option("--confidence", type=click.FloatRange(0, 1, min_open=True,
+                                                    max_open=True),
+              default=0.95, show_default=True)
+@click.option("--min-replications", type=click.IntRange(min=2), default=5,
+              show_default=True)
+@click.option("--max-replications", type=click.IntRange(min=2), default=100,
+              show_default=True)
+@click.option("--jobs", "-j", type=click.IntRange(min=1), default=1,
+              show_default=True,
+              help="Number of replications to run in parallel.")
+@click.option("--seed", type=int, default=None)
+@click.option("--output", type=click.Path(dir_okay=False), default=None,
+              help="CSV file to save the summary table in.")
+@click.option("--replications", "replications_output",
+              type=click.Path(dir_okay=False), default=None,
+              help="CSV file to save the metrics of each replication in.")
+def replicate(config, planner, scheduler, delay_prob, delay_dist,
+              delay_degree, common_random_numbers, metric, target_width, relative, confidence,
+              min_replications, max_replications, jobs, seed, output,
+              replications_output):
+    """
+    Run Monte Carlo replications of CONFIG with a seeded delay model.
+    """
+    from topsim.core.delay import DelayModel
+    from topsim.utils.replicate import run_replications
+    from topsim.utils.experiment import _build_planning, _build_scheduling
+
+    if max_replications < min_replications:
+        raise click.BadParameter("less than --min-replications",
+                                 param_hint="--max-replications")
+    delay = DelayModel(delay_prob, delay_dist,
+                       DelayModel.DelayDegree[delay_degree.upper()],
+                       common_random_numbers=common_random_numbers)
+    replications, summary = run_replications(
+        config, _build_planning(planner), _build_scheduling(scheduler, {}),
+        delay, metric=metric, target_width=target_width, relative=relative,
+        confidence=confidence, min_replications=min_replications,
+        max_replications=max_replications, jobs=jobs, seed=seed)
+    click.echo(summary.to_string(float_format="{:.2f}".format))
+    if output:
+        summary.to_csv(output)
+        click.echo(output)
+    if replications_output:
+        replications.to_csv(replications_output, index=False)
+        click.echo(replications_output)
+
+
+@cli.group()
+def generate():
+    """
+    Generate synthetic configurations and workflows.
+    """
+
+
+@generate.command("workflow")
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option("--shape", default="layered", show_default=True,
+              type=click.Choice(["fork-join", "layered", "random"]))
+@click.option("--size", type=click.IntRange(min=1), default=1000,
+              show_default=True, help="Number of tasks.")
+@click.option("--width", type=click.IntRange(min=1), default=None,
+              help="Parallelism of the workflow [default: sqrt(size)].")
+@click.option("--degree", type=click.IntRange(min=1), default=2,
+              show_default=True, help="Maximum predecessors of each task.")
+@click.option("--comp", type=float, default=60000, show_default=True,
+              help="Mean computation cost of each task.")
+@click.option("--heterogeneity", type=click.FloatRange(0, 1, max_open=True),
+              default=0.5, show_default=True)
+@click.option("--ccr", type=float, default=0.01, show_default=True,
+              help="Communication-to-computation ratio.")
+@click.option("--task-data", type=float, default=0, show_default=True,
+              help="Mean data read by each task.")
+@click.option("--seed", type=int, default=None)
+def generate_workflow(output, shape, size, width, degree, comp,
+                      heterogeneity, ccr, task_data, seed):
+    """
+    Write a synthetic workflow to OUTPUT.
+    """
+    from topsim.utils.generate import generate_workflow
+    click.echo(generate_workflow(
+        output, shape=shape, size=size, width=width, degree=degree,
+        comp=comp, heterogeneity=heterogeneity, ccr=ccr,
+        task_data=task_data, seed=seed))
+
+
+@generate.command("config")
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option("--pipeline", "pipelines", multiple=True, required=True,
+              metavar="NAME=WORKFLOW",
+              help="Observation name and its workflow file (repeatable).")
+@click.option("--machines", type=click.IntRange(min=1), default=100,
+              show_default=True)
+@click.option("--machine-classes", type=click.IntRange(min=1), default=None,
+              help="Number of machine types [default: 1 if homogeneous, "
+                   "else 4].")
+@click.option("--heterogeneity", type=click.FloatRange(0, 1, max_open=True),
+              default=0.0, show_default=True)
+@click.option("--observations", type=click.IntRange(min=1), default=10,
+              show_default=True)
+@click.option("--duration", type=click.IntRange(min=1), default=3600,
+              show_default=True, help="Mean observation length (seconds).")
+@click.option("--gap", type=click.IntRange(min=0), default=0,
+              show_default=True, help="Time between observations (seconds).")
+@click.option("--timestep", default="seconds", show_default=True,
+              type=click.Choice(["seconds", "minutes", "hours"]))
+@click.option("--seed", type=int, default=None)
+def generate_config(output, pipelines, machines, machine_classes,
+                    heterogeneity, observations, duration, gap, timestep,
+                    seed):
+    """
+    Write a synthetic simulation configuration to OUTPUT.
+    """
+    from topsim.utils.generate import generate_config
+    try:
+        pipelines = dict(p.split("=", 1) for p in pipelines)
+    except ValueError:
+        raise click.BadParameter("expected NAME=WORKFLOW",
+                                 param_hint="--pipeline")
+    click.echo(generate_config(
+        output, pipelines, machines=machines,
+        machine_classes=machine_classes, heterogeneity=heterogeneity,
+        observations=observations, duration=duration, gap=gap,
+        timestep=timestep, seed=seed))
+
+
+@cli.command("compile-workflow")
+@click.argument("source", type=click.Path(exists=True, dir_okay=False))
+@click.option("--output", type=click.Path(dir_okay=False), default=None,
+              help="Compiled workflow file [default: SOURCE with the suffix "
+                   ".npz].")
+def compile_workflow(source, output):
+    """
+    Compile the node-link JSON workflow SOURCE to a binary .npz workflow,
+    which may be used in a configuration in place of SOURCE.
+    """
+    from topsim.core.workflow import compile_workflow
+    try:
+        click.echo(compile_workflow(source, output))
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--output")
+
+
+@cli.group()
+def catalogue():
+    """
+    Index and query the runs in many results files.
+    """
+
+
+@catalogue.command("index")
+@click.argument("catalogue_path", metavar="CATALOGUE",
+                type=click.Path(dir_okay=False))
+@click.argument("paths", nargs=-1, required=True,
+                type=click.Path(exists=True))
+@click.option("--metrics/--no-metrics", default=True, show_default=True,
+              help="Compute summary metrics of runs with a task table.")
+@click.option("--force", is_flag=True,
+              help="Re-index results files that have not changed.")
+def catalogue_index(catalogue_path, paths, metrics, force):
+    """
+    Index the runs in the results files (or directories of them) PATHS.
+    """
+    from topsim.utils.catalogue import Catalogue
+    count = Catalogue(catalogue_path).index(*paths, metrics=metrics,
+                                            force=force)
+    click.echo(f"Indexed {count} runs")
+
+
+@catalogue.command("query")
+@click.argument("catalogue_path", metavar="CATALOGUE",
+                type=click.Path(exists=True, dir_okay=False))
+@click.option("--where", "criteria", multiple=True, metavar="NAME=VALUE",
+              help="Column, parameter or metric value (repeatable); VALUE "
+                   "may be a glob pattern or a JSON list.")
+@click.option("--output", type=click.Path(dir_okay=False), default=None,
+              help="Write the matching runs to this CSV file.")
+def catalogue_query(catalogue_path, criteria, output):
+    """
+    List the runs in CATALOGUE that match every --where criterion.
+    """
+    import json
+    from topsim.utils.catalogue import Catalogue
+    try:
+        criteria = dict(c.split("=", 1) for c in criteria)
+    except ValueError:
+        raise click.BadParameter("expected NAME=VALUE", param_hint="--where")
+    for name, value in criteria.items():
+        try:
+            criteria[name] = json.loads(value)
+        except ValueError:
+            pass
+    runs = Catalogue(catalogue_path).find(**criteria)
+    if output:
+        runs.to_csv(output)
+        click.echo(output)
+    else:
+        click.echo(runs.to_csv())
+
+
 if __name__ == '__main__':
     cli()
\ No newline at end of file
@@ -0,0 +1,235 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Compressed sparse row (CSR) adjacency of a workflow.
+
+A workflow's edges are stored as two CSR structures, one for successors and
+one for predecessors: the neighbours of node `i` are
+`indices[indptr[i]:indptr[i + 1]]`, with the 'transfer_data' of each edge in
+`data` at the same positions. The index arrays depend only on the shape of
+the workflow, so a planning model can build them once per workflow file with
+:py:class:`Structure` and share them between every plan of that workflow;
+an :py:class:`Adjacency` pairs them with the Task objects of a single plan:
+
+>>> structure = Structure.from_edges(4, [0, 0, 1, 2], [1, 2, 3, 3],
+...                                  transfer_data=[5, 5, 1, 1])
+>>> adjacency = Adjacency(tasks, structure)
+>>> adjacency.predecessors(tasks[3])
+[t1, t2]
+
+A :py:obj:`networkx.DiGraph` of the Task objects can still be built, when it
+is first asked for, with :py:meth:`Adjacency.to_networkx`.
+"""
+
+import logging
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _csr(size, sources, targets, data):
+    """
+    CSR arrays of the edges `sources -> targets`, grouped by source.
+    """
+    order = np.argsort(sources, kind='stable')
+    counts = np.bincount(sources, minlength=size)
+    indptr = np.zeros(size + 1, dtype=np.int32)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, targets[order].astype(np.int32), data[order]
+
+
+class Structure:
+    """
+    CSR index arrays of the successors and predecessors of each node of a
+    workflow, and the 'transfer_data' of each edge.
+
+    Parameters
+    ----------
+    succ_indptr, succ_indices, succ_data : numpy.ndarray
+        The successors of each node
+    pred_indptr, pred_indices, pred_data : numpy.ndarray
+        The predecessors of each node
+    """
+
+    def __init__(self, succ_indptr, succ_indices, succ_data,
+                 pred_indptr, pred_indices, pred_data):
+        self.succ_indptr = succ_indptr
+        self.succ_indices = succ_indices
+        self.succ_data = succ_data
+        self.pred_indptr = pred_indptr
+        self.pred_indices = pred_indices
+        self.pred_data = pred_data
+        for array in self.__dict__.values():
+            # Shared between plans, so must not change
+            array.flags.writeable = False
+
+    @classmethod
+    def from_edges(cls, size, sources, targets, transfer_data=None):
+        """
+        Build the structure of a workflow with `size` nodes, numbered from
+        0, and the edges `sources[i] -> targets[i]`.
+        """
+        sources = np.asarray(sources, dtype=np.int64).reshape(-1)
+        targets = np.asarray(targets, dtype=np.int64).reshape(-1)
+        if transfer_data is None:
+            data = np.zeros(len(sources), dtype=float)
+        else:
+            data = np.asarray(transfer_data, dtype=float).reshape(-1)
+        if not len(sources) == len(targets) == len(data):
+            raise ValueError("Each edge must have a source, target and "
+                             "transfer_data")
+        return cls(*_csr(size, sources, targets, data),
+                   *_csr(size, targets, sources, data))
+
+    @classmethod
+    def from_networkx(cls, graph, nodes):
+        """
+        Build the structure of `graph`, with its nodes numbered in the
+        order of `nodes`.
+        """
+        index = {node: i for i, node in enumerate(nodes)}
+        # Grouped by target, so that the predecessors of each node are in
+        # the same order as in the graph
+        edges = [(index[u], index[v], data.get('transfer_data', 0))
+                 for v in nodes for u, data in graph.pred[v].items()]
+        sources, targets, transfer_data = (
+            zip(*edges) if edges else ((), (), ()))
+        return cls.from_edges(len(index), sources, targets, transfer_data)
+
+    def __len__(self):
+        return len(self.succ_indptr) - 1
+
+    @property
+    def edges(self):
+        """
+        The number of edges in the workflow
+        """
+        return len(self.succ_indices)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.__dict__.values())
+
+    def successors(self, i):
+        """
+        Indices of the successors of node `i`
+        """
+        return self.succ_indices[self.succ_indptr[i]:self.succ_indptr[i + 1]]
+
+    def predecessors(self, i):
+        """
+        Indices of the predecessors of node `i`
+        """
+        return self.pred_indices[self.pred_indptr[i]:self.pred_indptr[i + 1]]
+
+    def in_degree(self):
+        return np.diff(self.pred_indptr)
+
+    def out_degree(self):
+        return np.diff(self.succ_indptr)
+
+
+class Adjacency:
+    """
+    Successors and predecessors of each task in a workflow plan.
+
+    Parameters
+    ----------
+    tasks : list of :py:obj:`~topsim.core.task.Task`
+        The task at each node of `structure`
+    structure : :py:class:`Structure`
+    """
+
+    def __init__(self, tasks, structure):
+        if len(tasks) != len(structure):
+            raise ValueError(
+                f"{len(tasks)} tasks given for a workflow of "
+                f"{len(structure)} nodes")
+        self.tasks = list(tasks)
+        self.structure = structure
+        self._index = {task: i for i, task in enumerate(self.tasks)}
+
+    @classmethod
+    def from_networkx(cls, graph, mapping):
+        """
+        The adjacency of `graph`, with each node replaced by the task it
+        maps to in `mapping` (in the same way as
+        :py:func:`networkx.relabel_nodes`, without copying the graph).
+        """
+        nodes = list(graph.nodes)
+        return cls([mapping[n] for n in nodes],
+                   Structure.from_networkx(graph, nodes))
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def index(self, task):
+        """
+        The node of `task` in the workflow
+        """
+        return self._index[task]
+
+    def successors(self, task):
+        """
+        The tasks that depend on `task`
+        """
+        tasks = self.tasks
+        return [tasks[i] for i in
+                self.structure.successors(self._index[task]).tolist()]
+
+    def predecessors(self, task):
+        """
+        The tasks that `task` depends on
+        """
+        tasks = self.tasks
+        return [tasks[i] for i in
+                self.structure.predecessors(self._index[task]).tolist()]
+
+    def has_predecessors(self, task):
+        i = self._index[task]
+        indptr = self.structure.pred_indptr
+        return bool(indptr[i + 1] > indptr[i])
+
+    def transfer_data(self, u, v):
+        """
+        The data transferred from task `u` to task `v`
+        """
+        i, j = self._index[u], self._index[v]
+        structure = self.structure
+        start, stop = structure.succ_indptr[i], structure.succ_indptr[i + 1]
+        found = np.flatnonzero(structure.succ_indices[start:stop] == j)
+        if len(found) == 0:
+            raise KeyError(f"No edge from {u} to {v}")
+        return float(structure.succ_data[start + found[0]])
+
+    def to_networkx(self):
+        """
+        The workflow as a :py:obj:`networkx.DiGraph` of its tasks, with the
+        'transfer_data' of each edge.
+        """
+        import networkx as nx
+
+        graph = nx.DiGraph()
+        graph.add_nodes_from(self.tasks)
+        structure = self.structure
+        sources = np.repeat(np.arange(len(self.tasks)),
+                            structure.out_degree())
+        graph.add_edges_from(
+            (self.tasks[u], self.tasks[v], {'transfer_data': float(d)})
+            for u, v, d in zip(sources, structure.succ_indices,
+                               structure.succ_data))
+        return graph
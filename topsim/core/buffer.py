@@ -32,12 +32,10 @@ import logging
 import json
 from time import sleep
 
-import pandas as pd
-
-from tqdm import tqdm
-
 from topsim.common.globals import TIMESTEP
 from topsim.core.instrument import RunStatus
+from topsim.core.trace import TRACE, TracePoint
+from topsim.core.eventbus import Event, EventBus
 
 LOGGER = logging.getLogger(__name__)
 
@@ -80,7 +78,9 @@ class Buffer:
         self.cold_count = len(self.cold)
         self._data_left_to_transfer = 0
         self.waiting_observation_list = []
-        self.events = []
+        #: :py:obj:`~topsim.core.eventbus.EventBus` to which events are
+        #: published; replaced by that of the Simulation.
+        self.bus = EventBus()
         self.threshold = 0.6
         self.stored_times = []
 
@@ -98,7 +98,6 @@ class Buffer:
         A simpy.env.timeout() of duration topsim.common.globals.TIMESTEP
         """
         while True:
-            self.events = []
             if self.env.now % 1000 == 0:
                 LOGGER.debug(
                     "\nHotBuffer: %s \nColdBuffer: %s @ %d",
@@ -257,7 +256,8 @@ class Buffer:
         self._add_event(observation, "buffer", "removed")
         return self.hot[b].remove(observation)
 
-    def move_hot_to_cold(self, b):
+    def move_hot_to_cold(self, b, current_obs=None,
+                         data_left_to_transfer=None):
         """
 
         Called when the scheduler is requesting data for workflow processing.
@@ -270,43 +270,51 @@ class Buffer:
 
             The observation that is stored in the HotBuffer, to be moved
 
+        current_obs, data_left_to_transfer : optional
+            The observation being transferred, and the data left to transfer,
+            when resuming a transfer that is already in progress (see
+            :py:mod:`topsim.core.checkpoint`).
+
         Returns
         -------
 
         """
 
-        # TODO Support multiple observation transfers 
+        pbar = None
+        if current_obs is None:
+            # TODO Support multiple observation transfers 
 
-        if not self.hot[b].observations["stored"]:
-            raise RuntimeError(
-                "No observations in Hot Buffer"
-            )
+            if not self.hot[b].observations["stored"]:
+                raise RuntimeError(
+                    "No observations in Hot Buffer"
+                )
 
-        # Iterate through current observations for transfer
-        # Each of them will have a data size
-        # The total data rate is just total divided by the number of
-        # observations in the 'transfer' dictionary.
-        # Each timestep we check the length - if something has been removed
-        # from transfer, we update the data rate
-
-        current_obs = self.hot[b].observation_for_transfer()
-        # current_obs = self.hot.observations['transfer']
-        self._data_left_to_transfer = current_obs.total_data_size
-        data_left_to_transfer = current_obs.total_data_size
-        _total_data = current_obs.total_data_size
-        _tqdm = False
-        pbar = None
-        if _tqdm:
-            pbar = tqdm(total=_total_data, desc=f'Buffer: {current_obs.name}')
-        if not self.cold[b].has_capacity_for(data_left_to_transfer):
-            # We cannot actually transfer the observation due to size
-            # constraints
-            # TODO create an object method to update the hot buffer
-            self.hot[b].observations['stored'].append(current_obs)
-            self.hot[b].observations['transfer'].remove(current_obs)
-            return False
-        # TODO UPDATE EVENT INFORMATION ON WHICH TRANSFER DIRECTION
-        self._add_event(current_obs, "transfer", "started")
+            # Iterate through current observations for transfer
+            # Each of them will have a data size
+            # The total data rate is just total divided by the number of
+            # observations in the 'transfer' dictionary.
+            # Each timestep we check the length - if something has been removed
+            # from transfer, we update the data rate
+
+            current_obs = self.hot[b].observation_for_transfer()
+            # current_obs = self.hot.observations['transfer']
+            self._data_left_to_transfer = current_obs.total_data_size
+            data_left_to_transfer = current_obs.total_data_size
+            _total_data = current_obs.total_data_size
+            _tqdm = False
+            pbar = None
+            if _tqdm:
+                from tqdm import tqdm
+                pbar = tqdm(total=_total_data, desc=f'Buffer: {current_obs.name}')
+            if not self.cold[b].has_capacity_for(data_left_to_transfer):
+                # We cannot actually transfer the observation due to size
+                # constraints
+                # TODO create an object method to update the hot buffer
+                self.hot[b].observations['stored'].append(current_obs)
+                self.hot[b].observations['transfer'].remove(current_obs)
+                return False
+            # TODO UPDATE EVENT INFORMATION ON WHICH TRANSFER DIRECTION
+            self._add_event(current_obs, "transfer", "started")
         while True:
             # data_transfer_time = observation_size / self.cold.max_data_rate
             #
@@ -339,7 +347,8 @@ class Buffer:
             pbar.close()
         return True
 
-    def move_cold_to_hot(self, b):
+    def move_cold_to_hot(self, b, current_obs=None,
+                         data_left_to_transfer=None):
         """
 
         Called from within the buffer, when we hae capacity in the HotBuffer to
@@ -353,41 +362,49 @@ class Buffer:
 
             The observation that is stored in the HotBuffer, to be moved
 
+        current_obs, data_left_to_transfer : optional
+            The observation being transferred, and the data left to transfer,
+            when resuming a transfer that is already in progress (see
+            :py:mod:`topsim.core.checkpoint`).
+
         Returns
         -------
 
         """
 
-        # TODO Support multiple observation transfers
+        pbar = None
+        if current_obs is None:
+            # TODO Support multiple observation transfers
 
-        if not self.cold[b].observations["stored"]:
-            raise RuntimeError(
-                "No observations in Hot Buffer"
-            )
+            if not self.cold[b].observations["stored"]:
+                raise RuntimeError(
+                    "No observations in Hot Buffer"
+                )
 
-        # Iterate through current observations for transfer
-        # Each of them will have a data size
-        # The total data rate is just total divided by the number of
-        # observations in the 'transfer' dictionary.
-        # Each timestep we check the length - if something has been removed
-        # from transfer, we update the data rate
-
-        current_obs = self.cold[b].observation_for_transfer()
-        # current_obs = self.hot.observations['transfer']
-        data_left_to_transfer = current_obs.total_data_size
-        _total_data = current_obs.total_data_size
-        _tqdm = False
-        pbar = None
-        if _tqdm:
-            pbar = tqdm(total=_total_data, desc=f'Buffer: {current_obs.name}')
-        if not self.hot[b].has_capacity_for(data_left_to_transfer):
-            # We cannot actually transfer the observation due to size
-            # constraints
-            # TODO create an object method to update the hot buffer
-            self.cold[b].observations['stored'].append(current_obs)
-            self.cold[b].observations['transfer'] = None
-            return False
-        self._add_event(current_obs, "transfer-to-hot", "started")
+            # Iterate through current observations for transfer
+            # Each of them will have a data size
+            # The total data rate is just total divided by the number of
+            # observations in the 'transfer' dictionary.
+            # Each timestep we check the length - if something has been removed
+            # from transfer, we update the data rate
+
+            current_obs = self.cold[b].observation_for_transfer()
+            # current_obs = self.hot.observations['transfer']
+            data_left_to_transfer = current_obs.total_data_size
+            _total_data = current_obs.total_data_size
+            _tqdm = False
+            pbar = None
+            if _tqdm:
+                from tqdm import tqdm
+                pbar = tqdm(total=_total_data, desc=f'Buffer: {current_obs.name}')
+            if not self.hot[b].has_capacity_for(data_left_to_transfer):
+                # We cannot actually transfer the observation due to size
+                # constraints
+                # TODO create an object method to update the hot buffer
+                self.cold[b].observations['stored'].append(current_obs)
+                self.cold[b].observations['transfer'] = None
+                return False
+            self._add_event(current_obs, "transfer-to-hot", "started")
         while True:
             if data_left_to_transfer <= 0:
                 LOGGER.info(
@@ -402,6 +419,9 @@ class Buffer:
                 # Pick the slowest rate to transfer
                 min(self.hot[b].max_ingest_data_rate, self.cold[b].max_data_rate)
             )
+            if TRACE.buffer and check == 0:
+                TRACE.record(TracePoint.HOT_BUFFER_STORED, self.env.now,
+                             current_obs.name)
 
             data_left_to_transfer = self.cold[b].transfer_observation(
                 current_obs, min(self.hot[b].max_ingest_data_rate, self.cold[b].max_data_rate),
@@ -418,7 +438,7 @@ class Buffer:
             pbar.close()
         return True
 
-    def ingest_data_stream(self, observation):
+    def ingest_data_stream(self, observation, time_left=None):
         """
         Buffer ingests the data stream from the Ingest pipelines. the data
         is what is added to the 'hot' buffer every timestep
@@ -429,15 +449,19 @@ class Buffer:
         ----------
         observation : core.Telescope.Observation object
             The observation we are attempting to ingest
+        time_left : int, optional
+            Timesteps left of an ingest that is already running; used when
+            restoring a simulation from a checkpoint.
 
         """
         b = observation.buffer_id
-        time_left = observation.duration - 1
         if observation.status is RunStatus.WAITING:
             raise RuntimeError(
                 "Observation must be marked RUNNING before ingest begins!"
             )
-        self._add_event(observation, "buffer", "added")
+        if time_left is None:
+            time_left = observation.duration - 1
+            self._add_event(observation, "buffer", "added")
         while observation.status == RunStatus.RUNNING:
 
             self.hot[b].process_incoming_data_stream(
@@ -515,24 +539,25 @@ class Buffer:
         current_state : pandas.DataFrame()
             A DataFrame (1xn) table of the current state of the Buffers.
         """
-        current_state = pd.DataFrame()
-        current_state['hot_buffer'] = [self.hot[0].current_capacity]
-        current_state['cold_buffer'] = [self.cold[0].current_capacity]
-        current_state['stored'] = [
-            len(self.cold[0].observations['stored'])
-            + len(self.hot[0].observations['stored'])
-        ]
+        import pandas as pd
+        return pd.DataFrame({k: [v] for k, v in self.to_record().items()})
 
-        return current_state
+    def to_record(self):
+        """
+        The state of the Buffer at the current timestep, as a dict of column
+        names and values (see :py:meth:`to_df`).
+        """
+        return {
+            'hot_buffer': self.hot[0].current_capacity,
+            'cold_buffer': self.cold[0].current_capacity,
+            'stored': (len(self.cold[0].observations['stored'])
+                       + len(self.hot[0].observations['stored'])),
+        }
 
     def _add_event(self, observation, resource, event):
-        self.events.append(
-            {
-                "time": int(self.env.now), "actor": "buffer",
-                "observation": str(observation.name), "event": str(event),
-                "resource": str(resource)
-            }
-        )
+        self.bus.publish(Event(int(self.env.now), "buffer",
+                               str(observation.name), str(event),
+                               str(resource)))
 
 
 class HotBuffer:
@@ -692,7 +717,6 @@ class HotBuffer:
 
         if residual_data == 0:
             self.observations['transfer'] = None
-            print('Added to hotbuffer')
             self.observations['stored'].append(observation)
 
         return residual_data
@@ -0,0 +1,387 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Checkpoint and restore a running simulation.
+
+SimPy processes are Python generators, which cannot be pickled. Instead, a
+checkpoint is taken between timesteps (when no process is part-way through a
+step), and records:
+
+* The state of every actor (Telescope, Buffer, Cluster, Scheduler, Planner,
+  Monitor), the tasks and workflow plans they share, and the delay models,
+  pickled together so that shared references are preserved.
+* For each pending SimPy process, the time at which it next wakes up, and
+  the method (and arguments) that continues it from that point. The
+  per-process state (e.g. the data left to transfer between buffers, or the
+  timesteps left of an ingest) is read from the suspended generator.
+
+On restore, the actors are unpickled into a new
+:py:class:`simpy.Environment` that starts at the checkpoint time, and the
+processes are re-created in the order in which they were due to wake up, so
+that the restored simulation processes events in the same order as the
+original.
+
+Only the processes started by the core actors are supported; a process
+started by user code (other than the run() loop of an actor) raises a
+RuntimeError when the checkpoint is taken.
+"""
+
+import io
+import os
+import sys
+import pickle
+import inspect
+import logging
+
+import simpy
+
+from pathlib import Path
+from simpy.events import Process
+
+from topsim.core.task import Task
+from topsim.core.buffer import Buffer
+from topsim.core.cluster import Cluster
+from topsim.core.scheduler import Scheduler
+
+LOGGER = logging.getLogger(__name__)
+
+#: Version of the checkpoint format
+CHECKPOINT_VERSION = 1
+
+
+def save_checkpoint(simulation, path):
+    """
+    Write a checkpoint of `simulation` to `path`.
+
+    Parameters
+    ----------
+    simulation : :py:obj:`~topsim.core.simulation.Simulation`
+        A simulation that has been started, and is between timesteps.
+    path : str or Path
+        The checkpoint file. It is written atomically, so an existing
+        checkpoint is only replaced once the new one is complete.
+
+    Returns
+    -------
+    path : Path
+    """
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as fp:
+        _dump(simulation, fp)
+    os.replace(tmp, path)
+    LOGGER.debug("Checkpoint written @ %s: %s", simulation.env.now, path)
+    return path
+
+
+def load_checkpoint(path):
+    """
+    Restore the simulation saved in the checkpoint at `path`.
+
+    Returns
+    -------
+    simulation : :py:obj:`~topsim.core.simulation.Simulation`
+        The simulation, with its process stack rebuilt, ready to be continued
+        with :py:meth:`~topsim.core.simulation.Simulation.resume`.
+    """
+    with open(path, "rb") as fp:
+        simulation = _load(fp, path)
+    LOGGER.info("Simulation restored @ %s from %s", simulation.env.now, path)
+    return simulation
+
+
+def dumps(simulation):
+    """
+    Checkpoint `simulation` in memory; see :py:func:`save_checkpoint`.
+
+    Returns
+    -------
+    state : bytes
+    """
+    fp = io.BytesIO()
+    _dump(simulation, fp)
+    return fp.getvalue()
+
+
+def loads(state):
+    """
+    Restore a simulation checkpointed with :py:func:`dumps`.
+    """
+    return _load(io.BytesIO(state), "checkpoint")
+
+
+def _dump(simulation, fp):
+    env = simulation.env
+    checkpoint = {
+        "version": CHECKPOINT_VERSION,
+        "now": env.now,
+        "simulation": simulation,
+        "processes": _capture_processes(env),
+    }
+    _Pickler(fp, env).dump(checkpoint)
+
+
+def _load(fp, name):
+    checkpoint = _Unpickler(fp).load()
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(
+            f"{name} is not a version {CHECKPOINT_VERSION} checkpoint")
+    simulation = checkpoint["simulation"]
+    _restart_processes(simulation.env, checkpoint["processes"])
+    return simulation
+
+
+class _ProcessRef:
+    """
+    Placeholder for a :py:class:`simpy.events.Process` referenced by the
+    state of another process; replaced once the processes are re-created.
+    """
+
+    def __init__(self, index=None, value=None):
+        self.index = index
+        self.value = value
+
+
+def _capture_processes(env):
+    """
+    Describe each pending process by the time it is due to wake up, and how
+    to continue it from there.
+
+    Returns
+    -------
+    processes : list of tuple
+        (delay, continuation), in the order the processes are due to wake
+        up. `continuation` is None for a process that finishes when it wakes
+        up, or (object, method name, keyword arguments).
+    """
+    scheduled = {}
+    for when, priority, eid, event in env._queue:
+        scheduled[id(event)] = (when, priority, eid)
+    processes = []
+    for when, priority, eid, event in sorted(env._queue,
+                                             key=lambda e: e[:3]):
+        for callback in event.callbacks or []:
+            process = getattr(callback, "__self__", None)
+            if isinstance(process, Process) and process.is_alive:
+                processes.append(process)
+    index = {id(p): i for i, p in enumerate(processes)}
+    captured = []
+    for process in processes:
+        when, _, _ = scheduled[id(process.target)]
+        continuation = _continuation(process._generator)
+        if continuation is not None:
+            obj, name, kwargs = continuation
+            kwargs = {k: _reference(v, index) for k, v in kwargs.items()}
+            continuation = (obj, name, kwargs)
+        captured.append((when - env.now, continuation))
+    return captured
+
+
+def _reference(value, index):
+    if isinstance(value, Process):
+        if value.is_alive:
+            return _ProcessRef(index=index[id(value)])
+        return _ProcessRef(value=value.value if value.ok else None)
+    return value
+
+
+def _continuation(generator):
+    """
+    Work out how to continue the (suspended) generator of a process.
+    """
+    # Follow 'yield from' to the generator that is actually suspended
+    while inspect.isgenerator(getattr(generator, "gi_yieldfrom", None)):
+        generator = generator.gi_yieldfrom
+    code = generator.gi_code
+    local = generator.gi_frame.f_locals
+    if code is _resume.__code__:
+        # A restored process that has not yet reached its continuation
+        return local["continuation"]
+    if inspect.getgeneratorstate(generator) == inspect.GEN_CREATED:
+        return _continuation_of_created(generator)
+    if code in _CONTINUATIONS:
+        return _CONTINUATIONS[code](local)
+    if code.co_name == "run" and code.co_argcount == 1 and "self" in local:
+        # The per-timestep loop of an actor, which keeps its state on the
+        # actor; restart it.
+        return local["self"], "run", {}
+    raise RuntimeError(
+        f"Unable to checkpoint process {code.co_name}: it is not one of the "
+        f"processes supported by topsim.core.checkpoint")
+
+
+def _continuation_of_created(generator):
+    """
+    A generator that has not started yet is re-created with its original
+    arguments.
+    """
+    local = dict(generator.gi_frame.f_locals)
+    obj = local.pop("self")
+    return obj, generator.gi_code.co_name, local
+
+
+def _allocate_tasks(local):
+    if local["finished"]:
+        return None
+    return local["self"], "allocate_tasks", {
+        "observation": local["observation"],
+        "current_plan": local["current_plan"],
+        "schedule": local["schedule"],
+        "allocation_pairs": local["allocation_pairs"],
+        "task_pool": local["task_pool"],
+    }
+
+
+def _allocate_ingest(local):
+    return local["self"], "allocate_ingest", {
+        "observation": local["observation"],
+        "pipelines": local["pipelines"],
+        "planner": local["planner"],
+        "max_ingest": local["max_ingest"],
+        "c": local["c"],
+        "time_left": local["time_left"],
+    }
+
+
+def _allocate_task_to_cluster(local):
+    return local["self"], "allocate_task_to_cluster", {
+        "task": local["task"],
+        "machine": local["machine"],
+        "predecessor_allocations": local["predecessor_allocations"],
+        "observation": local["observation"],
+        "ingest": local["ingest"],
+        "c": local["c"],
+        "ret": local["ret"],
+    }
+
+
+def _do_work(local):
+    # Suspended either waiting for data from its predecessors (in which case
+    # the task starts when it wakes up), or running.
+    return local["self"], "do_work", {
+        "env": local["env"],
+        "machine": local["machine"],
+        "total_duration": local["total_duration"],
+    }
+
+
+def _buffer_transfer(name):
+    def continuation(local):
+        return local["self"], name, {
+            "b": local["b"],
+            "current_obs": local["current_obs"],
+            "data_left_to_transfer": local["data_left_to_transfer"],
+        }
+    return continuation
+
+
+def _ingest_data_stream(local):
+    return local["self"], "ingest_data_stream", {
+        "observation": local["observation"],
+        "time_left": local["time_left"],
+    }
+
+
+#: How to continue each of the core processes, from the local variables of
+#: its suspended generator.
+_CONTINUATIONS = {
+    Scheduler.allocate_tasks.__code__: _allocate_tasks,
+    Scheduler.allocate_ingest.__code__: _allocate_ingest,
+    Cluster.allocate_task_to_cluster.__code__: _allocate_task_to_cluster,
+    # Provisioning finishes once its only timestep has passed
+    Cluster.provision_ingest_resources.__code__: lambda local: None,
+    Task.do_work.__code__: _do_work,
+    Buffer.move_hot_to_cold.__code__: _buffer_transfer("move_hot_to_cold"),
+    Buffer.move_cold_to_hot.__code__: _buffer_transfer("move_cold_to_hot"),
+    Buffer.ingest_data_stream.__code__: _ingest_data_stream,
+}
+
+
+def _resume(env, delay, continuation):
+    """
+    Wait until a restored process is due to wake up, then continue it.
+    """
+    yield env.timeout(delay)
+    if continuation is not None:
+        obj, name, kwargs = continuation
+        return (yield from getattr(obj, name)(**kwargs))
+
+
+def _restart_processes(env, processes):
+    restored = [env.process(_resume(env, delay, continuation))
+                for delay, continuation in processes]
+    # Processes may refer to processes that are restored after them
+    for _, continuation in processes:
+        if continuation is None:
+            continue
+        kwargs = continuation[2]
+        for key, value in kwargs.items():
+            if isinstance(value, _ProcessRef):
+                kwargs[key] = _resolve(env, value, restored)
+
+
+def _resolve(env, ref, restored):
+    if ref.index is not None:
+        return restored[ref.index]
+    # The process had already finished
+    event = env.event()
+    event.succeed(ref.value)
+    return event
+
+
+class _Pickler(pickle.Pickler):
+    """
+    Pickle a simulation, leaving out the SimPy environment and open output
+    files, which are re-created when the checkpoint is loaded.
+    """
+
+    def __init__(self, fp, env):
+        super().__init__(fp, protocol=pickle.HIGHEST_PROTOCOL)
+        self.env = env
+
+    def persistent_id(self, obj):
+        if obj is self.env:
+            return ("env", obj.now)
+        pd = sys.modules.get("pandas")
+        if pd is not None and isinstance(obj, pd.HDFStore):
+            return ("hdfstore", obj.filename)
+        if isinstance(obj, Process):
+            # Processes that are not part of a continuation (e.g. kept by
+            # user code) cannot be restored.
+            return ("process", None)
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+
+    def __init__(self, fp):
+        super().__init__(fp)
+        self.env = None
+
+    def persistent_load(self, pid):
+        kind, value = pid
+        if kind == "env":
+            if self.env is None:
+                self.env = simpy.Environment(initial_time=value)
+            return self.env
+        if kind == "hdfstore":
+            import pandas as pd
+            store = pd.HDFStore(value)
+            store.close()
+            return store
+        if kind == "process":
+            return None
+        raise pickle.UnpicklingError(f"Unknown persistent id {pid}")
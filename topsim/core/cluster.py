@@ -1,8 +1,11 @@
-import pandas as pd
 import logging
 
 from topsim.core.task import Task, TaskStatus
 from topsim.common.globals import TIMESTEP
+from topsim.core.trace import TRACE, TracePoint
+from topsim.core.eventbus import Event, EventBus
+from topsim.core.occupancy import OccupancyLog
+from topsim.core.taskstore import TaskStore
 
 logger = logging.getLogger(__name__)
 
@@ -54,11 +57,14 @@ class Cluster:
 
     """
 
-    def __init__(self, env, config):
+    def __init__(self, env, config, task_memory_budget=None):
         """
         Initialising a Cluster object requires only the Simpy environment and a
         Config object.
 
+        `task_memory_budget` is the approximate number of bytes of finished
+        task records kept in memory before they are spilled to disk (see
+        :py:class:`~topsim.core.taskstore.TaskStore`).
         """
         self.env = env  #: Simulation Environment object
         machines, system_bandwidth = config.parse_cluster_config()
@@ -74,7 +80,8 @@ class Cluster:
                            'available': [machine for machine in self.machines],
                            'total': len(self.machines)}
 
-        self._tasks = {'running': [], 'finished': {},
+        # Finished tasks are kept as ids; their records are in task_store
+        self._tasks = {'running': [], 'finished': set(),
                        'waiting': [], }  # Dictionary of tasks on system
 
         self._ingest = {'status': False, 'pipeline': None, 'observation': None,
@@ -88,7 +95,15 @@ class Cluster:
                             'finished_tasks': 0}
 
         self.num_provisioned_obs = 0
-        self.events = []
+        #: :py:obj:`~topsim.core.occupancy.OccupancyLog` of the intervals
+        #: during which each machine is occupied
+        self.occupancy = OccupancyLog(self.machine_ids)
+        #: :py:obj:`~topsim.core.taskstore.TaskStore` of the records of
+        #: finished tasks
+        self.task_store = TaskStore(task_memory_budget)
+        #: :py:obj:`~topsim.core.eventbus.EventBus` to which events are
+        #: published; replaced by that of the Simulation.
+        self.bus = EventBus()
         self._clusters = {
             'default': {'resources': self._resources, 'tasks': self._tasks,
                         'ingest': self._ingest, 'usage_data': self._usage_data,
@@ -106,7 +121,6 @@ class Cluster:
         Standard TIMESTEP timeout for the simulation.
         """
         while True:
-            self.events = []
             # Manage each cluster
             for c in self.cl:
                 if not self._clusters[c]['ingest']['status']:
@@ -197,6 +211,7 @@ class Cluster:
         self._clusters[c]['ingest']['status'] = True
         self._clusters[c]['ingest']['demand'] = demand
         id = observation.name
+        self._add_event(id, 'ingest', 'started')
         while True:
             for pair in pairs:
                 (machine, task) = pair
@@ -237,7 +252,7 @@ class Cluster:
 
     def allocate_task_to_cluster(self, task, machine,
                                  predecessor_allocations=None, observation=None,
-                                 ingest=False, c='default'):
+                                 ingest=False, c='default', ret=None):
         """
         Receive task from scheduler for allocation to specified machine
 
@@ -252,13 +267,15 @@ class Cluster:
         pred : list of predecessors machine allocations, for use if the task
         is allocated to a different machine.
 
+        ret : :py:obj:`simpy.events.Process`, optional
+            The process of a task that is already running on the cluster;
+            used when restoring a simulation from a checkpoint.
+
         Returns
         -------
         True if task successfully completed
         """
 
-        ret = None
-
         while True:
             if task not in self._clusters[c]['tasks']['running']:
                 # THIS CHECK DOESN"T WORK FIX IT SOMEHOW
@@ -272,11 +289,12 @@ class Cluster:
                 if ingest:
                     # Ingest resources allocated separately from scheduler
                     self._clusters[c]['tasks']['running'].append(task)
-                    self._clusters[c]['tasks']['finished'][task] = False
                     self._clusters[c]['usage_data']['available'] -= 1
                     self._clusters[c]['usage_data']['running_tasks'] += 1
                     self._clusters[c]['usage_data']['ingest'] += 1
                     task.task_status = TaskStatus.SCHEDULED
+                    self.occupancy.start(machine.id, task.id, observation,
+                                         'ingest', self.env.now)
                     ret = machine.run(task, self.env, predecessor_allocations)
                 else:
                     self._set_machine_occupied(machine, observation)
@@ -285,6 +303,8 @@ class Cluster:
                     self._clusters[c]['usage_data']['running_tasks'] += 1
 
                     task.task_status = TaskStatus.SCHEDULED
+                    self.occupancy.start(machine.id, task.id, observation,
+                                         'task', self.env.now)
                     ret = self.env.process(task.do_work(self.env, machine,
                                                         predecessor_allocations))
                     yield self.env.timeout(1)
@@ -292,8 +312,9 @@ class Cluster:
                 # machine.stop_task(task)
                 self._clusters[c]['tasks']['running'].remove(task)
                 self._clusters[c]['usage_data']['running_tasks'] -= 1
-                self._clusters[c]['tasks']['finished'][task] = True
+                self._clusters[c]['tasks']['finished'].add(task.id)
                 self._clusters[c]['usage_data']['finished_tasks'] += 1
+                self.occupancy.stop(machine.id, task.id, self.env.now)
                 if ingest:
                     self._clusters[c]['resources']['ingest'].remove(machine)
                     self._clusters[c]['resources']['available'].append(machine)
@@ -303,6 +324,7 @@ class Cluster:
                 self._clusters[c]['usage_data']['available'] += 1
                 task.task_status = TaskStatus.FINISHED
                 task.delay_flag = task.delay_flag
+                self.task_store.append(task, machine.id)
                 return task.task_status
             else:
                 yield self.env.timeout(TIMESTEP)
@@ -385,7 +407,9 @@ class Cluster:
         for m in range(0, size):
             self._add_idle_resource(name, available_resources[m])
 
-        logger.info(f"{size} machines provisioned for {name}")
+        if TRACE.cluster:
+            TRACE.record(TracePoint.PROVISION, self.env.now, name, size)
+        self._add_event(name, 'provision', 'started')
         self.num_provisioned_obs += 1
         return True
 
@@ -404,6 +428,7 @@ class Cluster:
         if observation in self._clusters[c]['resources']['idle']:
             self._update_available_resources(observation)
             self._reset_idle_resources(observation)
+            self._add_event(observation, 'provision', 'stopped')
 
     def get_machine_from_id(self, id, c='default'):
         """
@@ -471,7 +496,7 @@ class Cluster:
 
         Returns
         -------
-        `list` of finished :py:obj:`topsim.core.task.Task` objects
+        `list` of the ids of finished :py:obj:`topsim.core.task.Task` objects
         """
         return [x for x in self._clusters[c]['tasks']['finished']]
 
@@ -487,14 +512,11 @@ class Cluster:
         -------
         True if task is finished (in cluster finished dictionary)
         """
-        if task not in self._clusters[c]['tasks']['finished']:
-            return False
-        else:
-            return self._clusters[c]['tasks']['finished'][task]
+        return task.id in self._clusters[c]['tasks']['finished']
 
     def get_finished_tasks(self, c='default'):
         """
-        Return a list of the tasks that are finished
+        Return a list of the ids of the tasks that are finished
         Parameters
         ----------
         c
@@ -630,14 +652,9 @@ class Cluster:
         """
         self._clusters[c]['resources']['available'].remove(machine)
 
-    def _add_event(self, observation, resource, event):
-        self.events.append(
-            {
-                "time": self.env.now, "actor": "cluster",
-                "observation": observation.name, "event": event,
-                "resource": resource
-            }
-        )
+    def _add_event(self, name, resource, event):
+        self.bus.publish(Event(int(self.env.now), "cluster", name, event,
+                               resource))
 
     def _set_machine_task_occupied(self):
         """
@@ -704,21 +721,24 @@ class Cluster:
         -------
 
         """
-        df = pd.DataFrame()
-        df['available_resources'] = [
-            self._clusters['default']['usage_data']['available']]
-        df['ingest_resources'] = [
-            self._clusters['default']['usage_data']['ingest']]
-        df['running_tasks'] = [
-            self._clusters['default']['usage_data']['running_tasks']]
-        df['finished_tasks'] = [
-            self._clusters['default']['usage_data']['finished_tasks']]
-
-        df['provisioned_observations'] = [
-            len(self._clusters['default']['resources']['idle'])]
-        # df['waiting_tasks'] = [len(self.tasks['waiting'])]
+        import pandas as pd
+        return pd.DataFrame({k: [v] for k, v in self.to_record().items()})
 
-        return df
+    def to_record(self):
+        """
+        The state of the cluster at the current timestep, as a dict of
+        column names and values (see :py:meth:`to_df`).
+        """
+        usage = self._clusters['default']['usage_data']
+        return {
+            'available_resources': usage['available'],
+            'ingest_resources': usage['ingest'],
+            'running_tasks': usage['running_tasks'],
+            'finished_tasks': usage['finished_tasks'],
+            'provisioned_observations': len(
+                self._clusters['default']['resources']['idle']),
+            # 'waiting_tasks': len(self.tasks['waiting'])
+        }
 
     def _update_usage_data(self, resource: str, value):
         """
@@ -737,27 +757,16 @@ class Cluster:
 
     def finished_task_time_data(self):
         """
-        Each task in the 'finished' component of 'self.clusters' has the
-        estimated start times, end times, and the actual start and finish
-        times. We can use this to track the expected finish time across the
-        two
+        Each finished task has the estimated start times, end times, and the
+        actual start and finish times. We can use this to track the expected
+        finish time across the two
+
         Returns
         -------
+        df : :py:obj:`pandas.DataFrame`
+            A row for each finished task, indexed by task id
         """
-
-        finished_tasks = self._clusters['default']['tasks']['finished']
-        task_data = {}
-        for task in finished_tasks:
-            task_data[task.id] = {}
-            task_data[task.id]['est'] = task.est + task.workflow_offset
-            task_data[task.id]['eft'] = task.eft + task.workflow_offset
-            task_data[task.id]['ast'] = task.ast
-            task_data[task.id]['aft'] = task.aft
-            task_data[task.id]['workflow_offset'] = task.workflow_offset
-            task_data[task.id]['observation_id'] = task.id.split('_')[
-                0]  # task_data['pred'] = [pred for pred in task.pred]
-
-        return pd.DataFrame(task_data).infer_objects()
+        return self.task_store.to_df()
 
     def __len__(self):
         return len(self.machines)
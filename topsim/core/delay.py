@@ -14,9 +14,10 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from enum import Enum
+import hashlib
 import logging
 
-from numpy.random import default_rng, seed
+from numpy.random import default_rng, seed, SeedSequence
 
 LOGGER = logging.getLogger(__name__)
 
@@ -56,7 +57,8 @@ class DelayModel:
         NONE = 0
 
 
-    def __init__(self, prob, dist, degree=DelayDegree.LOW, seed=20):
+    def __init__(self, prob, dist, degree=DelayDegree.LOW, seed=20,
+                 common_random_numbers=False):
         """
 
         Parameters
@@ -74,6 +76,14 @@ class DelayModel:
 
         seed : int
             The input seed to ensure repeatable randomness
+
+        common_random_numbers : bool
+            If True, the delay of each task is drawn from its own random
+            stream, keyed by the seed and the identity of the task in its
+            workflow (see :py:meth:`~topsim.core.task.Task.workflow_key`).
+            A task then has the same delay whatever order tasks are run in,
+            so simulations that differ only in their scheduling see the same
+            per-task delays, and can be compared pairwise.
         """
 
         _allowed_dist = ['normal', 'poisson', 'uniform']
@@ -87,16 +97,28 @@ class DelayModel:
         self.dist = dist
         self.degree = degree
         self.seed = seed
+        self.common_random_numbers = common_random_numbers
 
     def __str__(self):
         return str(self.degree)
 
-    def generate_delay(self, task_runtime, n=100):
+    def generate_delay(self, task_runtime, n=100, key=None):
         """
         Produce a delay based on current DelayModel attributes.
         A delay is a unit of time to be passed to the timeout.
 
         Given a probability, return the new delay by a factor of 'degree'
+
+        Parameters
+        ----------
+        task_runtime : int
+            The (undelayed) runtime of the task
+        n : int
+            Number of values drawn from the distribution
+        key : str, optional
+            Identity of the task the delay is for; used to select its random
+            stream when `common_random_numbers` is set.
+
         Returns
         -------
         delay : int
@@ -106,12 +128,26 @@ class DelayModel:
         if self.degree.value == 0:
             return delay
         else:
-            if default_rng(self.seed).random() < self.prob:
-                rand_var = self._create_random_value_from_runtime(task_runtime, n)
+            rng = self._keyed_rng(key)
+            draw = rng.random() if rng else default_rng(self.seed).random()
+            if draw < self.prob:
+                rand_var = self._create_random_value_from_runtime(
+                    task_runtime, n, rng)
                 delay = int(rand_var)
             return delay
 
-    def _create_random_value_from_runtime(self, runtime, n=100):
+    def _keyed_rng(self, key):
+        """
+        The random stream for `key` in common-random-numbers mode, or None.
+        """
+        if not self.common_random_numbers or key is None:
+            return None
+        # Python's hash() is salted per-process, so use a stable digest
+        digest = hashlib.blake2b(str(key).encode(), digest_size=8).digest()
+        stream = int.from_bytes(digest, 'little')
+        return default_rng(SeedSequence(self.seed, spawn_key=(stream,)))
+
+    def _create_random_value_from_runtime(self, runtime, n=100, rng=None):
         """
         Take a runtime value and generate a distribution from that value
         using the self.dist distrubution, based on the numpy distribution
@@ -119,6 +155,11 @@ class DelayModel:
 
         This distribution uses the runtime value as the mean (mu) value
 
+        Parameters
+        ----------
+        rng : numpy.random.Generator, optional
+            Random stream to draw from (see :py:meth:`_keyed_rng`)
+
         Returns
         -------
         rand_var : int
@@ -130,11 +171,11 @@ class DelayModel:
         sigma = self.degree.value * mu
 
         if self.dist == "normal":
-            s = default_rng(self.seed).normal(mu, sigma, n)
+            s = (rng or default_rng(self.seed)).normal(mu, sigma, n)
         elif self.dist == "poisson":
-            s = default_rng().poisson(mu, int(runtime / self.degree))
+            s = (rng or default_rng()).poisson(mu, int(runtime / self.degree))
         else:
-            s = default_rng().uniform()
+            s = (rng or default_rng()).uniform()
 
         var = s[s > mu]
         rand_var = var[int(len(var)/2)]
@@ -0,0 +1,129 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+The event bus, through which actors report the major events of a
+simulation.
+
+Actors publish an :py:class:`Event` to the bus as soon as it happens, and
+the bus passes it on to each of its subscribers in turn; nothing is
+buffered per timestep, so no event depends on when the Monitor runs. The
+Simulation subscribes an :py:class:`EventRecorder` (or an event log) and an
+:py:class:`EventCounter`; other subscribers can be added for live metrics:
+
+>>> simulation.bus.subscribe(
+...     lambda e: print(e) if e.event == 'finished' else None)
+"""
+
+import logging
+
+from collections import Counter
+from typing import NamedTuple
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Event(NamedTuple):
+    """
+    A major event of an actor (for example, an observation starting on the
+    telescope, or being added to the scheduler's queue).
+    """
+    time: int
+    actor: str
+    observation: str
+    event: str
+    resource: str
+
+
+#: The fields of each event, which are the columns of the event output
+EVENT_FIELDS = Event._fields
+
+
+class EventBus:
+    """
+    Passes the events published by actors on to subscribers.
+
+    Subscribers are called with each :py:class:`Event`, in the order in
+    which they subscribed. They must be picklable (for example, a bound
+    method of a picklable object) so that the simulation can be
+    checkpointed.
+    """
+
+    def __init__(self):
+        self.subscribers = []
+        #: Number of events published so far
+        self.count = 0
+
+    def subscribe(self, subscriber):
+        """
+        Add `subscriber`, a callable that takes an :py:class:`Event`.
+
+        Returns
+        -------
+        subscriber
+            So that this may be used as a decorator
+        """
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.remove(subscriber)
+
+    def publish(self, event):
+        """
+        Pass `event` on to each subscriber.
+        """
+        self.count += 1
+        for subscriber in self.subscribers:
+            subscriber(event)
+
+
+class EventRecorder:
+    """
+    Append-only record of every event published to a bus.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def __len__(self):
+        return len(self.events)
+
+    def records(self):
+        """
+        The recorded events, as dicts.
+        """
+        return [e._asdict() for e in self.events]
+
+
+class EventCounter:
+    """
+    Live count of the events published to a bus, by actor, resource and
+    event.
+
+    >>> simulation.event_counts['scheduler', 'queue', 'removed']
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def __call__(self, event):
+        self.counts[event.actor, event.resource, event.event] += 1
+
+    def __getitem__(self, key):
+        return self.counts[key]
@@ -0,0 +1,296 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Compact binary log of the events of a simulation.
+
+Each event (time, actor, observation, event, resource) is appended to the
+log as a fixed-width record of :py:data:`EVENT_DTYPE`. The string fields are
+stored as indices into a string table, which starts with the actors, events
+and resources used by TopSim (so that their codes are the same in every
+log) and interns observation names, and any other values, as they are
+seen. The string table is kept next to the log, in `<log>.strings`.
+
+The log is read by memory-mapping it, so that event histories much larger
+than memory can be filtered before anything is loaded:
+
+>>> log = EventLogReader('sim.trace')
+>>> started = log.select(actor='scheduler', event='started')
+>>> log.to_df(started)
+"""
+
+import os
+import json
+import struct
+import logging
+
+import numpy as np
+
+from pathlib import Path
+
+LOGGER = logging.getLogger(__name__)
+
+#: Identifies a TopSim event log
+MAGIC = b'TOPSIMEV'
+#: Format version of the event log
+EVENT_LOG_VERSION = 1
+#: Layout of each event record
+EVENT_DTYPE = np.dtype([
+    ('time', '<i8'), ('actor', '<u4'), ('observation', '<u4'),
+    ('event', '<u4'), ('resource', '<u4')
+])
+#: Fields of an event that are stored in the string table
+STRING_FIELDS = ('actor', 'observation', 'event', 'resource')
+
+#: Actors, events and resources, which always have the same codes
+ACTORS = ('instrument', 'scheduler', 'buffer', 'cluster')
+EVENTS = ('started', 'stopped', 'finished', 'added', 'removed')
+RESOURCES = ('telescope', 'queue', 'buffer', 'allocation', 'transfer',
+             'transfer-to-hot', 'ingest', 'provision')
+
+_HEADER = struct.Struct('<8sII')
+_RECORD = struct.Struct('<q4I')
+#: Number of records buffered in memory before they are written
+BUFFER_RECORDS = 4096
+
+
+def _strings_path(path):
+    path = Path(path)
+    return path.with_name(f"{path.name}.strings")
+
+
+class EventLogWriter:
+    """
+    Append simulation events to a binary event log.
+
+    The writer can be pickled (as part of a simulation checkpoint): records
+    that are still buffered are written first, and the number of records
+    in the log is kept, so that a restored simulation can
+    :py:meth:`truncate` any written after the checkpoint.
+
+    Parameters
+    ----------
+    path : str or Path
+        The event log; it is replaced if it already exists.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.count = 0
+        self._strings = list(dict.fromkeys(ACTORS + EVENTS + RESOURCES))
+        self._string_ids = {s: i for i, s in enumerate(self._strings)}
+        self._pending = bytearray()
+        self._written_strings = 0
+        with open(self.path, 'wb') as fp:
+            fp.write(_HEADER.pack(MAGIC, EVENT_LOG_VERSION, _RECORD.size))
+        self._write_strings()
+
+    def _intern(self, value):
+        value = str(value)
+        index = self._string_ids.get(value)
+        if index is None:
+            index = self._string_ids[value] = len(self._strings)
+            self._strings.append(value)
+        return index
+
+    def record(self, event):
+        """
+        Append a single :py:class:`~topsim.core.eventbus.Event` to the log;
+        this is subscribed to the simulation's event bus.
+        """
+        self._pending += _RECORD.pack(
+            int(event.time), self._intern(event.actor),
+            self._intern(event.observation), self._intern(event.event),
+            self._intern(event.resource))
+        if len(self._pending) >= BUFFER_RECORDS * _RECORD.size:
+            self.flush()
+
+    def append(self, events):
+        """
+        Append events to the log.
+
+        Parameters
+        ----------
+        events : iterable of :py:class:`~topsim.core.eventbus.Event`
+        """
+        for event in events:
+            self.record(event)
+
+    def flush(self):
+        """
+        Write buffered records, and any new strings, to file.
+        """
+        if self._pending:
+            with open(self.path, 'ab') as fp:
+                fp.write(self._pending)
+            self.count += len(self._pending) // _RECORD.size
+            self._pending = bytearray()
+        if self._written_strings != len(self._strings):
+            self._write_strings()
+
+    def _write_strings(self):
+        path = _strings_path(self.path)
+        tmp = path.with_name(f"{path.name}.tmp")
+        with open(tmp, 'w') as fp:
+            json.dump(self._strings, fp)
+        os.replace(tmp, path)
+        self._written_strings = len(self._strings)
+
+    def truncate(self):
+        """
+        Remove records beyond those written when this writer was pickled
+        (see :py:meth:`~topsim.core.simulation.Simulation.restore`).
+        """
+        with open(self.path, 'r+b') as fp:
+            fp.truncate(_HEADER.size + self.count * _RECORD.size)
+        self._write_strings()
+
+    def branch(self, name):
+        """
+        Continue this log in a copy, `<stem>-<name><suffix>`, for a branch
+        of a forked simulation.
+        """
+        self.flush()
+        path = Path(self.path)
+        output = path.with_name(f"{path.stem}-{name}{path.suffix}")
+        with open(self.path, 'rb') as src, open(output, 'wb') as dst:
+            dst.write(src.read(_HEADER.size + self.count * _RECORD.size))
+        branch = object.__new__(EventLogWriter)
+        branch.__dict__.update(self.__dict__)
+        branch.path = str(output)
+        branch._strings = list(self._strings)
+        branch._string_ids = dict(self._string_ids)
+        branch._pending = bytearray()
+        branch._write_strings()
+        return branch
+
+    def __len__(self):
+        return self.count + len(self._pending) // _RECORD.size
+
+    def __getstate__(self):
+        self.flush()
+        return self.__dict__.copy()
+
+
+class EventLogReader:
+    """
+    Read an event log written by :py:class:`EventLogWriter`.
+
+    The records are memory-mapped, rather than read into memory.
+
+    Parameters
+    ----------
+    path : str or Path
+        The event log
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, 'rb') as fp:
+            header = fp.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"{path} is not a TopSim event log")
+        magic, version, size = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a TopSim event log")
+        if version != EVENT_LOG_VERSION or size != EVENT_DTYPE.itemsize:
+            raise ValueError(
+                f"{path} is a version {version} event log; expected version "
+                f"{EVENT_LOG_VERSION}")
+        with open(_strings_path(self.path)) as fp:
+            self.strings = json.load(fp)
+        self._codes = {s: i for i, s in enumerate(self.strings)}
+        count = (os.path.getsize(self.path) - _HEADER.size) // size
+        if count:
+            self.records = np.memmap(self.path, dtype=EVENT_DTYPE, mode='r',
+                                     offset=_HEADER.size, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=EVENT_DTYPE)
+
+    def __len__(self):
+        return len(self.records)
+
+    def code(self, value):
+        """
+        The code of `value` in the string table, or -1 if it is not there.
+        """
+        return self._codes.get(value, -1)
+
+    def select(self, start=None, end=None, **fields):
+        """
+        Select the records within a time range that match the given values.
+
+        Examples
+        --------
+
+        >>> log.select(start=100, end=200, observation='emu1',
+        ...            event='started')
+
+        Parameters
+        ----------
+        start, end : int, optional
+            Select records with `start <= time < end`
+        fields
+            Values of any of :py:data:`STRING_FIELDS` to match
+
+        Returns
+        -------
+        records : numpy.ndarray
+            The matching records (a copy), of :py:data:`EVENT_DTYPE`
+        """
+        unknown = set(fields) - set(STRING_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot select events by {sorted(unknown)}")
+        mask = np.ones(len(self.records), dtype=bool)
+        if start is not None:
+            mask &= self.records['time'] >= start
+        if end is not None:
+            mask &= self.records['time'] < end
+        for name, value in fields.items():
+            mask &= self.records[name] == self.code(value)
+        return np.asarray(self.records[mask])
+
+    def to_numpy(self, records=None):
+        """
+        Decode records (by default, all of them) into a structured array
+        with string fields.
+        """
+        records = self.records if records is None else records
+        strings = np.asarray(self.strings)
+        dtype = [('time', '<i8')] + [(f, strings.dtype)
+                                     for f in STRING_FIELDS]
+        decoded = np.empty(len(records), dtype=dtype)
+        decoded['time'] = records['time']
+        for name in STRING_FIELDS:
+            decoded[name] = strings[records[name]]
+        return decoded
+
+    def to_df(self, records=None):
+        """
+        Decode records (by default, all of them) into a
+        :py:obj:`pandas.DataFrame`, with the same columns as the events of
+        the :py:obj:`~topsim.core.monitor.Monitor`. String fields are
+        categorical.
+        """
+        import pandas as pd
+
+        records = self.records if records is None else records
+        columns = {'time': np.asarray(records['time'])}
+        for name in STRING_FIELDS:
+            columns[name] = pd.Categorical.from_codes(
+                np.asarray(records[name]), categories=self.strings)
+        return pd.DataFrame(
+            columns, columns=['time', 'actor', 'observation', 'event',
+                              'resource'])
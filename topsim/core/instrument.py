@@ -117,6 +117,17 @@ class Instrument(ABC):
         """
         pass
 
+    def to_record(self):
+        """
+        Produce the output of :py:meth:`to_df` as a dict of column names and
+        values, for simulations that are run without pandas (the 'array'
+        engine).
+
+        Instruments that should be usable without pandas must override this;
+        by default, it is derived from :py:meth:`to_df`.
+        """
+        return self.to_df().iloc[0].to_dict()
+
 
 class Observation(object):
     """
@@ -1,4 +1,3 @@
-import pandas as pd
 
 from enum import Enum
 
@@ -51,6 +50,7 @@ class Machine(object):
         self.current_task = None
 
     def to_df(self):
+        import pandas as pd
         d = {
             'id': [self.id],
             'cpu': [self.cpu],
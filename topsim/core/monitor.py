@@ -2,10 +2,21 @@ import json
 import logging
 import time
 import os
-import pandas as pd
+
+import numpy as np
+
+from topsim.core.table import Table
+from topsim.core.eventbus import EventRecorder, EVENT_FIELDS
 
 logger = logging.getLogger(__name__)
 
+#: Ways in which the per-timestep data of a simulation are recorded
+TIMESERIES_MODES = ('dense', 'changes')
+
+#: Columns that are constant for a run; with the 'changes' time-series they
+#: are stored with the simulation parameters instead of in each row
+METADATA_COLUMNS = ('planning', 'scheduling', 'config', 'delay')
+
 
 class Monitor(object):
     """
@@ -18,27 +29,99 @@ class Monitor(object):
 
     Attributes
     ----------
+    chunk_size : int
+        If set, the per-timestep data is passed to the Simulation to be
+        written to file each time `chunk_size` rows have been collected,
+        after which they are dropped from :py:attr:`df`.
+    offset : int
+        The number of rows that have already been written to file.
+    engine : str
+        'pandas' to collect data in DataFrames; 'array' to record it in
+        :py:class:`~topsim.core.table.Table` objects, without importing
+        pandas.
+    event_log : :py:obj:`~topsim.core.eventlog.EventLogWriter`
+        If set, events are appended to this binary log, rather than
+        collected in :py:attr:`events`.
+    recorder : :py:obj:`~topsim.core.eventbus.EventRecorder`
+        Every event published to the simulation's event bus (unless
+        :py:attr:`event_log` is set), in the order in which it was
+        published.
+    timeseries : str
+        'dense' to record a row every timestep; 'changes' to record a row,
+        with its 'time', only when a value differs from the previous row,
+        leaving out :py:data:`METADATA_COLUMNS` (see
+        :py:func:`expand_timeseries`).
+    timesteps : int
+        The number of timesteps monitored so far.
     """
-    def __init__(self, simulation, start_time):
+    def __init__(self, simulation, start_time, engine='pandas',
+                 timeseries='dense'):
         self.simulation = simulation
         self.env = simulation.env
         self.sim_timestamp = start_time
-        self.df = pd.DataFrame()
-        self.events = pd.DataFrame()
+        self.engine = engine
+        self.timeseries = timeseries
+        self.timesteps = 0
+        self._last_record = None
+        if engine == 'array':
+            self.df = Table()
+        else:
+            import pandas as pd
+            self.df = pd.DataFrame()
+        self.chunk_size = None
+        self.offset = 0
+        self.event_log = None
+        self.recorder = EventRecorder()
 
     def run(self):
         while True:
             if self.env.now % 1000 == 0:
                 logger.debug('SimTime=%s', self.env.now)
             # time.sleep(0.5)
+            if self.timeseries == 'changes':
+                self._record_changes()
+            elif self.engine == 'array':
+                self.df.append(self.collate_actor_records())
+            else:
+                import pandas as pd
+                self.df = pd.concat(
+                    [self.df, self.collate_actor_dataframes()],
+                    ignore_index=True
+                )
+            if self.chunk_size and len(self.df) >= self.chunk_size:
+                self.flush()
+            self.timesteps += 1
+            yield self.env.timeout(1)
+
+    def _record_changes(self):
+        """
+        Add a row for the current timestep if any value has changed since
+        the last row that was added.
+        """
+        record = self.collate_actor_records(metadata=False)
+        if record == self._last_record:
+            return
+        self._last_record = record
+        row = {'time': int(self.env.now), **record}
+        if self.engine == 'array':
+            self.df.append(row)
+        else:
+            import pandas as pd
             self.df = pd.concat(
-                [self.df, self.collate_actor_dataframes()],
+                [self.df, pd.DataFrame({k: [v] for k, v in row.items()})],
                 ignore_index=True
             )
-            self.collate_events()
-            yield self.env.timeout(1)
 
-    import h5py
+    def flush(self):
+        """
+        Write the per-timestep data collected so far to the simulation
+        output, and release it from memory.
+        """
+        import pandas as pd
+        self.df.index = pd.RangeIndex(self.offset, self.offset + len(self.df))
+        self.simulation._append_output(self.df, self.offset)
+        self.offset += len(self.df)
+        self.df = pd.DataFrame()
 
     def collate_actor_dataframes(self):
         """
@@ -51,6 +134,7 @@ class Monitor(object):
         -------
 
         """
+        import pandas as pd
         df = pd.DataFrame()
         cluster = self.simulation.cluster.to_df()
         buffer = self.simulation.buffer.to_df()
@@ -72,23 +156,125 @@ class Monitor(object):
         )
         return df
 
-    def collate_events(self):
+    def collate_actor_records(self, metadata=True):
         """
-        Update events attribute with this timestep's events
+        Collate the per-timestep data of each Actor into a single row, with
+        the same columns as :py:meth:`collate_actor_dataframes`.
+
+        Parameters
+        ----------
+        metadata : bool
+            Include :py:data:`METADATA_COLUMNS` (see :py:meth:`metadata`)
 
         Returns
         -------
+        record : dict
+        """
+        record = {}
+        record.update(self.simulation.cluster.to_record())
+        record.update(self.simulation.buffer.to_record())
+        record.update(self.simulation.instrument.to_record())
+        record.update(self.simulation.scheduler.to_record())
+        if metadata:
+            record.update(self.metadata())
+        return record
 
+    def metadata(self):
+        """
+        The values of :py:data:`METADATA_COLUMNS`, which are the same for
+        every timestep of a run.
+
+        Returns
+        -------
+        metadata : dict
         """
-        if self.simulation.instrument.events:
-            self.events = pd.concat([self.events,
-                                    pd.DataFrame(self.simulation.instrument.events)])
-
-        if self.simulation.scheduler.events:
-            self.events = pd.concat([self.events,
-                                    pd.DataFrame(self.simulation.scheduler.events)])
-        if self.simulation.buffer.events:
-            self.events = pd.concat([self.events,
-                                    pd.DataFrame(self.simulation.buffer.events)])
-
-        self.events = self.events.infer_objects()
+        record = {}
+        record['planning'] = str(self.simulation.planner.model.algorithm)
+        record['scheduling'] = str(self.simulation.scheduler.algorithm)
+        record['config'] = str(self.simulation._cfg_path.name)
+        record['delay'] = self.simulation.planner.delay_model.degree.value
+        return record
+
+    def record_event(self, event):
+        """
+        Record an event published to the simulation's event bus, in the
+        event log if there is one.
+        """
+        if self.event_log is not None:
+            self.event_log.record(event)
+        else:
+            self.recorder(event)
+
+    @property
+    def events(self):
+        """
+        The events recorded so far, with a column for each of
+        :py:data:`~topsim.core.eventbus.EVENT_FIELDS`: a
+        :py:obj:`~topsim.core.table.Table` for the 'array' engine, or a
+        :py:obj:`pandas.DataFrame` otherwise.
+        """
+        if self.engine == 'array':
+            events = self.recorder.events
+            return Table({field: [getattr(e, field) for e in events]
+                          for field in EVENT_FIELDS})
+        import pandas as pd
+        return pd.DataFrame(
+            self.recorder.events, columns=EVENT_FIELDS).infer_objects()
+
+
+def expand_timeseries(sim, params=None, timesteps=None):
+    """
+    Expand the per-timestep data recorded with the 'changes' time-series into
+    one row per timestep, as it would have been recorded by the 'dense'
+    time-series.
+
+    Examples
+    --------
+
+    >>> sim = pd.read_hdf('results.h5', key=f'{key}/sim')
+    >>> params = pd.read_hdf('results.h5', key=f'{key}/params')
+    >>> sim = expand_timeseries(sim, params)
+
+    Parameters
+    ----------
+    sim : pandas.DataFrame or Table
+        Rows recorded when a value changed, with the 'time' at which each
+        was recorded
+    params : dict, pandas.DataFrame or Table, optional
+        The simulation parameters; if given, their :py:data:`METADATA_COLUMNS`
+        are added to every row, and 'timesteps' gives the number of rows.
+    timesteps : int, optional
+        The number of rows; by default, taken from `params`, or else one
+        more than the last 'time'.
+
+    Returns
+    -------
+    sim : pandas.DataFrame or Table
+        The same type as `sim`, indexed by timestep, without a 'time' column
+    """
+    time = np.asarray(sim['time'], dtype=int)
+    if timesteps is None and params is not None and 'timesteps' in params:
+        timesteps = _first(params['timesteps'])
+    if timesteps is None:
+        timesteps = int(time[-1]) + 1 if len(time) else 0
+    # Each timestep takes the last row recorded at or before it
+    rows = np.searchsorted(time, np.arange(timesteps), side='right') - 1
+    metadata = {}
+    if params is not None:
+        metadata = {c: _first(params[c]) for c in METADATA_COLUMNS
+                    if c in params}
+    if isinstance(sim, Table):
+        columns = {name: values[rows] for name, values in
+                   sim.to_dict().items() if name != 'time'}
+        columns.update(
+            {c: [v] * timesteps for c, v in metadata.items()})
+        return Table(columns)
+    df = sim.drop(columns='time').iloc[rows].reset_index(drop=True)
+    for column, value in metadata.items():
+        df[column] = value
+    return df
+
+
+def _first(values):
+    value = list(values)[0]
+    return value.item() if hasattr(value, 'item') else value
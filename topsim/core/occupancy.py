@@ -0,0 +1,243 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Log of the intervals during which each machine of the cluster is occupied.
+
+The Cluster opens an interval when it allocates a task (or an ingest task)
+to a machine, and closes it when the machine is freed, so that exact
+per-machine timelines are available without sampling anything per
+timestep. Intervals are half-open, `[start, end)`: a machine is busy at
+time `t` if `start <= t < end`.
+
+Queries use an :py:class:`IntervalTree`, built from the log when it is
+first queried after a change:
+
+>>> occupancy = simulation.cluster.occupancy
+>>> occupancy.busy(3600)
+['cat0_m0', 'cat0_m3']
+>>> occupancy.utilisation(0, 3600, kind='ingest')
+0.125
+"""
+
+import logging
+
+import numpy as np
+
+from topsim.core.table import Table
+
+LOGGER = logging.getLogger(__name__)
+
+#: Kinds of work that occupy a machine
+OCCUPANCY_KINDS = ('ingest', 'task')
+
+#: Columns of the occupancy log
+OCCUPANCY_COLUMNS = ('machine', 'start', 'end', 'task', 'observation', 'kind')
+
+
+class IntervalTree:
+    """
+    Static, centred interval tree over half-open intervals `[start, end)`.
+
+    Parameters
+    ----------
+    starts, ends : array-like
+        The bounds of each interval; queries return indices into these.
+    """
+
+    def __init__(self, starts, ends):
+        self.starts = np.asarray(starts, dtype=float)
+        self.ends = np.asarray(ends, dtype=float)
+        # Empty intervals contain no time, so are never found
+        self._root = self._build(np.flatnonzero(self.ends > self.starts))
+
+    def _build(self, indices):
+        if len(indices) == 0:
+            return None
+        starts, ends = self.starts[indices], self.ends[indices]
+        center = np.median(np.concatenate([starts, ends]))
+        left = ends <= center
+        right = starts > center
+        here = indices[~(left | right)]
+        if len(here) == 0:
+            # Every interval lies to one side of the median; split on the
+            # interval that ends first instead, so that the tree is finite
+            first = indices[np.argmin(ends)]
+            center = self.starts[first]
+            left = ends <= center
+            right = starts > center
+            here = indices[~(left | right)]
+        return (
+            center,
+            here[np.argsort(self.starts[here], kind='stable')],
+            here[np.argsort(-self.ends[here], kind='stable')],
+            self._build(indices[left]),
+            self._build(indices[right]),
+        )
+
+    def __len__(self):
+        return len(self.starts)
+
+    def at(self, time):
+        """
+        Indices of the intervals that contain `time`.
+        """
+        return self.overlapping(time, np.nextafter(time, np.inf))
+
+    def overlapping(self, start, end):
+        """
+        Indices (sorted) of the intervals that overlap `[start, end)`.
+        """
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None or start >= end:
+                continue
+            center, by_start, by_end, left, right = node
+            if end <= center:
+                # The intervals here all contain center, so end after `end`
+                count = np.searchsorted(self.starts[by_start], end,
+                                        side='left')
+                found.append(by_start[:count])
+                stack.append(left)
+            elif start > center:
+                # ... and all start at or before `start`
+                count = np.searchsorted(-self.ends[by_end], -start,
+                                        side='left')
+                found.append(by_end[:count])
+                stack.append(right)
+            else:
+                found.append(by_start)
+                stack.append(left)
+                stack.append(right)
+        if not found:
+            return np.zeros(0, dtype=int)
+        return np.sort(np.concatenate(found))
+
+
+class OccupancyLog:
+    """
+    Intervals during which each machine was occupied, and by what.
+
+    Parameters
+    ----------
+    machines : list of str
+        The ids of every machine in the cluster
+    """
+
+    def __init__(self, machines):
+        self.machines = list(machines)
+        self._columns = {name: [] for name in OCCUPANCY_COLUMNS}
+        self._open = {}
+        self._tree = None
+        self._tree_now = None
+
+    def __len__(self):
+        return len(self._columns['machine'])
+
+    def start(self, machine, task, observation, kind, time):
+        """
+        Open an interval for `task`, which is now occupying `machine`.
+        """
+        if kind not in OCCUPANCY_KINDS:
+            raise ValueError(
+                f"kind must be one of {OCCUPANCY_KINDS}, not '{kind}'")
+        self._open[machine, task] = len(self)
+        for name, value in zip(
+                OCCUPANCY_COLUMNS,
+                (machine, time, None, task, observation, kind)):
+            self._columns[name].append(value)
+        self._tree = None
+
+    def stop(self, machine, task, time):
+        """
+        Close the interval of `task` on `machine`.
+        """
+        index = self._open.pop((machine, task))
+        self._columns['end'][index] = time
+        self._tree = None
+
+    def to_table(self):
+        """
+        The intervals, as a :py:class:`~topsim.core.table.Table` with
+        :py:data:`OCCUPANCY_COLUMNS`; 'end' is None for a machine that is
+        still occupied.
+        """
+        return Table(self._columns)
+
+    def to_df(self):
+        return self.to_table().to_df()
+
+    def tree(self, now=None):
+        """
+        The :py:class:`IntervalTree` of the log, in which intervals that
+        are still open end at `now` (or never, by default).
+        """
+        if self._tree is None or self._tree_now != now:
+            ends = [(np.inf if now is None else now) if end is None else end
+                    for end in self._columns['end']]
+            self._tree = IntervalTree(self._columns['start'], ends)
+            self._tree_now = now
+        return self._tree
+
+    def busy(self, time, kind=None):
+        """
+        The machines that were occupied at `time`.
+
+        Parameters
+        ----------
+        time : int
+        kind : str, optional
+            Only count work of this kind (one of :py:data:`OCCUPANCY_KINDS`)
+
+        Returns
+        -------
+        machines : list of str
+            Sorted machine ids
+        """
+        indices = self._select(self.tree().at(time), kind)
+        return sorted({self._columns['machine'][i] for i in indices})
+
+    def utilisation(self, start, end, kind=None, now=None):
+        """
+        The fraction of the capacity of the cluster (machine-seconds) that
+        was occupied during `[start, end)`.
+
+        Parameters
+        ----------
+        start, end : int
+        kind : str, optional
+            Only count work of this kind (one of :py:data:`OCCUPANCY_KINDS`)
+        now : int, optional
+            The current time, at which open intervals are taken to end
+
+        Returns
+        -------
+        utilisation : float
+        """
+        if end <= start:
+            raise ValueError("end must be after start")
+        tree = self.tree(now)
+        indices = self._select(tree.overlapping(start, end), kind)
+        occupied = (np.minimum(tree.ends[indices], end)
+                    - np.maximum(tree.starts[indices], start)).sum()
+        return float(occupied / (len(self.machines) * (end - start)))
+
+    def _select(self, indices, kind):
+        if kind is None:
+            return indices
+        kinds = self._columns['kind']
+        return [i for i in indices if kinds[i] == kind]
@@ -0,0 +1,397 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Output backends, which write the results of a simulation to file.
+
+The results of a simulation are a set of named tables (for example 'sim',
+'summary' and 'params'), which are stored under the partition of the
+simulation: the timestamp of the experiment, its delimiters and the name of
+its configuration (see :py:data:`PARTITION_FIELDS`). Each backend is a
+subclass of :py:class:`OutputBackend`:
+
+* :py:class:`HDF5Output` stores each table in an HDF5 file, under the key
+  `<timestamp>/<delimiters>/<config>/<table>`;
+* :py:class:`TableOutput` writes the tables of a single simulation run with
+  the 'array' engine to a `.npz`, CSV or Arrow file
+  (see :py:func:`~topsim.core.table.write_tables`);
+* :py:class:`DatasetOutput` writes a Parquet or Arrow IPC dataset, in which
+  each table is a directory partitioned by the fields of the simulation
+  (`<path>/<table>/timestamp=.../delimiters=.../configuration=.../`).
+
+Datasets (which require pyarrow) are read with :py:func:`read_dataset`, which
+only reads the columns, and the partitions, that are asked for:
+
+>>> sim = read_dataset('results.parquet', 'sim',
+...                    columns=['time', 'available_resources'],
+...                    filters={'configuration': 'mos_sw10'})
+>>> sim.to_pandas()
+"""
+
+import copy
+import shutil
+import logging
+
+from pathlib import Path
+from importlib.util import find_spec
+from urllib.parse import quote
+
+from topsim.core.table import Table, write_tables, _format
+
+LOGGER = logging.getLogger(__name__)
+
+#: Output backends that can be created with :py:func:`create_output`
+OUTPUT_BACKENDS = ('hdf5', 'tables', 'parquet', 'arrow')
+
+#: Fields by which the results of each simulation are partitioned
+PARTITION_FIELDS = ('timestamp', 'delimiters', 'configuration')
+
+#: File suffix of each dataset format
+DATASET_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+#: Directory name given to an empty partition value, which pyarrow reads as
+#: null
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+
+class OutputBackend:
+    """
+    Writes the results of simulations to `path`.
+
+    Subclasses implement :py:meth:`write`, and :py:meth:`append` and
+    :py:meth:`truncate` if they support streamed output. Backends only hold
+    the path to their output, so that a simulation writing to one can be
+    checkpointed.
+
+    Parameters
+    ----------
+    path : str or Path
+        The output file or directory
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def write(self, partition, tables):
+        """
+        Write the results of a simulation.
+
+        Parameters
+        ----------
+        partition : dict
+            Maps each of :py:data:`PARTITION_FIELDS` to its value for the
+            simulation
+        tables : dict
+            Maps the name of each table to a :py:obj:`pandas.DataFrame` or
+            :py:class:`~topsim.core.table.Table`
+        """
+        raise NotImplementedError
+
+    def append(self, partition, name, data, start):
+        """
+        Append rows to table `name` of a simulation, for streamed output.
+
+        Parameters
+        ----------
+        partition : dict
+            As for :py:meth:`write`
+        name : str
+            The table
+        data : pandas.DataFrame
+            The rows to append
+        start : int
+            The number of rows already appended
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support streamed output")
+
+    def truncate(self, partition, name, rows):
+        """
+        Remove streamed rows of table `name` beyond the first `rows`.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support streamed output")
+
+    def branch(self, name):
+        """
+        Continue the output in a copy, `<stem>-<name><suffix>`, of what has
+        been written so far (see
+        :py:meth:`~topsim.core.simulation.Simulation.fork`).
+
+        Returns
+        -------
+        backend : OutputBackend
+            A backend of the same type, writing to the copy
+        """
+        path = Path(self.path)
+        output = path.with_name(f"{path.stem}-{name}{path.suffix}")
+        if path.is_dir():
+            shutil.copytree(path, output, dirs_exist_ok=True)
+        elif path.exists():
+            shutil.copyfile(path, output)
+        backend = copy.copy(self)
+        backend.path = str(output)
+        return backend
+
+
+class HDF5Output(OutputBackend):
+    """
+    Store results in an HDF5 file, with a key for each table of each
+    simulation.
+
+    Streamed tables are stored in the PyTables 'table' format, which supports
+    appending; reading them back is the same as for any other table.
+    """
+
+    def __init__(self, path):
+        import pandas as pd
+
+        super().__init__(path)
+        if Path(path).exists():
+            LOGGER.warning(
+                'Output HDF5 path already exists, '
+                'simulation appended to existing file'
+            )
+        pd.HDFStore(self.path).close()
+
+    @staticmethod
+    def key(partition):
+        """
+        The key under which the tables of a simulation are stored
+        """
+        return '/'.join(str(partition[f]) for f in PARTITION_FIELDS)
+
+    @staticmethod
+    def parse_key(key):
+        """
+        The partition and table name of the key of a stored table; the
+        inverse of :py:meth:`key`.
+        """
+        *fields, name = key.strip('/').split('/')
+        # The delimiters may themselves contain '/'
+        partition = dict(zip(PARTITION_FIELDS, (
+            fields[0], '/'.join(fields[1:-1]), fields[-1])))
+        return partition, name
+
+    def write(self, partition, tables):
+        import pandas as pd
+
+        key = self.key(partition)
+        with pd.HDFStore(self.path) as store:
+            for name, data in tables.items():
+                if isinstance(data, Table):
+                    data = data.to_df()
+                store.put(key=f"{key}/{name}", value=data)
+
+    def append(self, partition, name, data, start):
+        import pandas as pd
+
+        with pd.HDFStore(self.path) as store:
+            store.append(
+                key=f"{self.key(partition)}/{name}", value=data,
+                format='table', index=False, min_itemsize={'values': 64})
+
+    def truncate(self, partition, name, rows):
+        import pandas as pd
+
+        key = f"{self.key(partition)}/{name}"
+        with pd.HDFStore(self.path) as store:
+            if key in store:
+                store.remove(key, where=f"index >= {rows}")
+
+
+class TableOutput(OutputBackend):
+    """
+    Write the tables of a single simulation to a `.npz`, CSV or Arrow file,
+    with :py:func:`~topsim.core.table.write_tables`.
+    """
+
+    def __init__(self, path):
+        if _format(path) == '.arrow':
+            _require_pyarrow("Arrow table output")
+        super().__init__(path)
+
+    def write(self, partition, tables):
+        write_tables(self.path, tables)
+
+
+class DatasetOutput(OutputBackend):
+    """
+    Write results as a Parquet or Arrow IPC dataset (requires pyarrow).
+
+    Each table is a directory of files, partitioned by
+    :py:data:`PARTITION_FIELDS` (Hive-style, as `<field>=<value>`), so that
+    the results of thousands of simulations can be filtered by partition
+    without opening the files of the others. Streamed rows are written to a
+    new file, `part-<start>`, for each chunk.
+
+    Parameters
+    ----------
+    path : str or Path
+        The dataset directory
+    format : str
+        'parquet' or 'arrow'
+    """
+
+    def __init__(self, path, format='parquet'):
+        if format not in DATASET_FORMATS:
+            raise ValueError(
+                f"format must be one of {tuple(DATASET_FORMATS)}, "
+                f"not '{format}'")
+        # Checked now, rather than when the results are first written
+        _require_pyarrow(f"The '{format}' output backend")
+        super().__init__(path)
+        self.format = format
+
+    def directory(self, partition, name):
+        """
+        The directory holding table `name` of the simulation in `partition`
+        """
+        parts = [
+            f"{field}={quote(str(partition[field]), safe='') or NULL_PARTITION}"
+            for field in PARTITION_FIELDS
+        ]
+        return Path(self.path, name, *parts)
+
+    def write(self, partition, tables):
+        for name, data in tables.items():
+            self._write_part(partition, name, data, 0)
+
+    def append(self, partition, name, data, start):
+        self._write_part(partition, name, data, start)
+
+    def truncate(self, partition, name, rows):
+        directory = self.directory(partition, name)
+        for part in directory.glob(f"part-*{DATASET_FORMATS[self.format]}"):
+            if int(part.stem.split('-')[1]) >= rows:
+                part.unlink()
+
+    def _write_part(self, partition, name, data, start):
+        import pyarrow as pa
+
+        if isinstance(data, Table):
+            table = data.to_arrow()
+        else:
+            table = pa.Table.from_pandas(data)
+        directory = self.directory(partition, name)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"part-{start:012d}{DATASET_FORMATS[self.format]}"
+        if self.format == 'parquet':
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, path)
+        else:
+            with pa.ipc.new_file(str(path), table.schema) as writer:
+                writer.write_table(table)
+
+
+def _require_pyarrow(feature):
+    """
+    Raise an ImportError naming `feature` if pyarrow is not installed.
+    """
+    if find_spec('pyarrow') is None:
+        raise ImportError(
+            f"{feature} requires pyarrow; install it with "
+            f"`pip install topsim[arrow]`")
+
+
+def create_output(backend, path):
+    """
+    Create the output backend `backend` (one of :py:data:`OUTPUT_BACKENDS`)
+    writing to `path`.
+    """
+    if backend == 'hdf5':
+        return HDF5Output(path)
+    if backend == 'tables':
+        return TableOutput(path)
+    if backend in DATASET_FORMATS:
+        return DatasetOutput(path, backend)
+    raise ValueError(
+        f"output backend must be one of {OUTPUT_BACKENDS}, not '{backend}'")
+
+
+def open_dataset(path, name='sim', format='parquet'):
+    """
+    Open table `name` of a dataset written by :py:class:`DatasetOutput`,
+    without reading it.
+
+    Arrow IPC files are memory-mapped, so that reading them does not copy
+    their data.
+
+    Returns
+    -------
+    dataset : pyarrow.dataset.Dataset
+    """
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    if format not in DATASET_FORMATS:
+        raise ValueError(
+            f"format must be one of {tuple(DATASET_FORMATS)}, not '{format}'")
+    return ds.dataset(
+        str(Path(path, name)), format='parquet' if format == 'parquet'
+        else 'ipc', partitioning='hive',
+        filesystem=fs.LocalFileSystem(use_mmap=True))
+
+
+def read_dataset(path, name='sim', columns=None, filters=None,
+                 format='parquet'):
+    """
+    Read table `name` of a dataset written by :py:class:`DatasetOutput`.
+
+    Only the `columns` asked for are read, and `filters` are applied to the
+    partitions (skipping the files of any that do not match) and to the
+    statistics of each file before rows are read.
+
+    Parameters
+    ----------
+    path : str or Path
+        The dataset directory
+    name : str
+        The table to read
+    columns : list of str, optional
+        Columns to read; all of them by default
+    filters : dict or pyarrow.dataset.Expression, optional
+        Maps column or partition names to the value (or list of values)
+        that rows must have
+    format : str
+        'parquet' or 'arrow'
+
+    Returns
+    -------
+    table : pyarrow.Table
+        Convert it with `to_pandas()` if a DataFrame is needed
+    """
+    dataset = open_dataset(path, name, format)
+    return dataset.to_table(columns=columns, filter=_expression(filters))
+
+
+def _expression(filters):
+    """
+    Convert a dict of column values to a :py:obj:`pyarrow.dataset.Expression`
+    """
+    if filters is None or not isinstance(filters, dict):
+        return filters
+    import pyarrow.dataset as ds
+
+    expression = None
+    for column, value in filters.items():
+        if isinstance(value, (list, tuple, set)):
+            condition = ds.field(column).isin(list(value))
+        else:
+            condition = ds.field(column) == value
+        expression = condition if expression is None else (
+            expression & condition)
+    return expression
@@ -2,9 +2,12 @@ import sys
 import logging
 import copy
 
-import networkx as nx
 
 from enum import Enum
+from typing import Any, NamedTuple
+
+from topsim.core.adjacency import Adjacency
+from topsim.core.machine import Machine
 
 LOGGER = logging.getLogger(__name__)
 
@@ -29,6 +32,15 @@ class Planner:
     the only library that the Planner is aligned with; this may change in the
     future.
 
+    Plans can also be made ahead of time: with `lookahead` set, each time a
+    plan is made the Planner starts planning the next `lookahead` upcoming
+    observations (:py:attr:`observations`) in a pool of worker processes,
+    for the machines that were just provisioned. When the plan for one of
+    them is asked for, and the machines provisioned for it have the same
+    specification, the plan from the pool is used, with its tasks renamed
+    for the current time and moved to the equivalent provisioned machines.
+    Otherwise, the plan is made as usual.
+
     Parameters
     ----------
     env : simpy.Environment
@@ -44,9 +56,18 @@ class Planner:
     delay_model: topsim.core.delay.DelayModel
         The delaymodel object, to assign to each Workflow Plan task.
 
+    lookahead : int
+        Number of upcoming observations to plan ahead of time; 0 (the
+        default) plans each observation only when it is needed
+
+    workers : int, optional
+        Number of worker processes that plan ahead of time; by default, one
+        per CPU
+
     """
 
-    def __init__(self, env, cluster, model, use_task_data, use_edge_data, delay_model=None):
+    def __init__(self, env, cluster, model, use_task_data, use_edge_data,
+                 delay_model=None, lookahead=0, workers=None):
         self.env = env  #: :py:object:~`simpy.Environment` object for the
         # simulation
         self.cluster = cluster
@@ -55,6 +76,24 @@ class Planner:
         self.delay_model = delay_model
         self.use_task_data = use_task_data
         self.use_edge_data = use_edge_data
+        self.lookahead = lookahead
+        self.workers = workers
+        #: Observations that may be planned ahead of time, in any order
+        self.observations = []
+        #: Number of plans made ahead of time that were used, and that were
+        #: not, because the machines provisioned were different
+        self.prefetch_hits = 0
+        self.prefetch_misses = 0
+        self._pool = None
+        self._pending = {}
+
+    def __getstate__(self):
+        # Plans being made by the pool are not saved, and are made again
+        # when they are needed
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        state['_pending'] = {}
+        return state
 
     def run(self, observation, buffer, max_ingest):
         """
@@ -70,11 +109,155 @@ class Planner:
         -------
         core.topsim.planner.WorkflowPlan
         """
-        return self.model.generate_plan(self.env.now, self.cluster, buffer,
-                                        observation, max_ingest, self.use_task_data, self.use_edge_data)
+        plan = self._prefetched_plan(observation)
+        if plan is None:
+            plan = self.model.generate_plan(
+                self.env.now, self.cluster, buffer, observation, max_ingest,
+                self.use_task_data, self.use_edge_data)
+        if self.lookahead:
+            self._plan_ahead(observation, max_ingest)
+        return plan
 
         # yield self.env.timeout(0,plan)
 
+    def close(self):
+        """
+        Stop planning ahead of time, and shut down the worker processes.
+        """
+        for prefetch in self._pending.values():
+            prefetch.future.cancel()
+        self._pending = {}
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def _plan_ahead(self, observation, max_ingest):
+        """
+        Start planning the next upcoming observations, on machines like
+        those provisioned for `observation`.
+        """
+        machines = self.cluster.get_idle_resources(observation.name)
+        if not machines:
+            return
+        upcoming = [
+            o for o in sorted(self.observations, key=lambda o: o.est)
+            if o.plan is None and o is not observation
+            and o.name not in self._pending
+        ][:max(0, self.lookahead - len(self._pending))]
+        if not upcoming:
+            return
+        if self._pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        snapshot = [Machine(m.id, m.cpu, m.memory, m.disk, m.bandwidth,
+                            m.ethernet) for m in machines]
+        for o in upcoming:
+            ahead = copy.copy(o)
+            if ahead.ast is None:
+                ahead.ast = self.env.now
+            future = self._pool.submit(
+                _generate_plan, self.model, self.env.now, snapshot,
+                self.cluster.system_bandwidth, ahead, max_ingest,
+                self.use_task_data, self.use_edge_data)
+            self._pending[o.name] = _Prefetch(
+                future, _provision_key(snapshot), snapshot, self.env.now)
+            LOGGER.debug("Planning %s ahead of time @ %s", o.name,
+                         self.env.now)
+
+    def _prefetched_plan(self, observation):
+        """
+        The plan made ahead of time for `observation`, if it was made for
+        the machines provisioned for it; otherwise, None.
+        """
+        prefetch = self._pending.pop(observation.name, None)
+        if prefetch is None or observation.ast is None:
+            return None
+        machines = self.cluster.get_idle_resources(observation.name)
+        if prefetch.key != _provision_key(machines):
+            prefetch.future.cancel()
+            self.prefetch_misses += 1
+            LOGGER.debug("%s was planned ahead for different machines",
+                         observation.name)
+            return None
+        try:
+            plan = prefetch.future.result()
+        except Exception:
+            self.prefetch_misses += 1
+            LOGGER.warning("Planning %s ahead of time failed",
+                           observation.name, exc_info=True)
+            return None
+        self.prefetch_hits += 1
+        return self._rebase(
+            plan, observation, prefetch.clock,
+            {m.id: a.id for m, a in zip(prefetch.machines, machines)})
+
+    def _rebase(self, plan, observation, clock, machines):
+        """
+        Rename the tasks of `plan`, made at `clock`, as if it were made
+        now, and move them from each machine to the machine it maps to in
+        `machines`.
+        """
+        tasks = plan.adjacency.tasks
+        ids = {
+            task.id: self.model._create_observation_task_id(
+                task.graph_id, observation, self.env.now)
+            for task in tasks
+        }
+        for task in tasks:
+            task.id = ids[task.id]
+            task.pred = [ids[p] for p in task.pred]
+            if task.edge_data:
+                task.edge_data = {
+                    ids.get(k, k): v for k, v in task.edge_data.items()}
+            task.allocated_machine_id = machines.get(
+                task.allocated_machine_id, task.allocated_machine_id)
+            task.delay = copy.copy(self.model.delay_model)
+        plan.exec_order = [ids.get(x, x) for x in plan.exec_order]
+        plan.est += self.env.now - clock
+        # Tasks are hashed by their id
+        plan.adjacency = Adjacency(tasks, plan.adjacency.structure)
+        return plan
+
+
+class _Prefetch(NamedTuple):
+    """
+    A plan being made ahead of time, for machines like `machines`
+    """
+    future: Any
+    key: tuple
+    machines: list
+    clock: int
+
+
+class _Provision:
+    """
+    Stands in for the cluster when planning ahead of time, with `machines`
+    provisioned for the observation `name`.
+    """
+
+    def __init__(self, name, machines, system_bandwidth):
+        self.name = name
+        self.machines = machines
+        self.system_bandwidth = system_bandwidth
+
+    def get_idle_resources(self, observation, c='default'):
+        return list(self.machines) if observation == self.name else []
+
+
+def _provision_key(machines):
+    """
+    The specification of each machine, in the order provisioned
+    """
+    return tuple((m.cpu, m.memory, m.disk, m.bandwidth) for m in machines)
+
+
+def _generate_plan(model, clock, machines, system_bandwidth, observation,
+                   max_ingest, task_data, edge_data):
+    # Run in a worker process
+    cluster = _Provision(observation.name, machines, system_bandwidth)
+    return model.generate_plan(clock, cluster, None, observation, max_ingest,
+                               task_data, edge_data)
+
 
 class WorkflowPlan:
     """
@@ -84,13 +267,19 @@ class WorkflowPlan:
     representing the DAG nature of the workflow. This is why the tasks are
     stored in queues.
 
+    The dependencies between tasks are held in `adjacency`, a compact
+    :py:class:`~topsim.core.adjacency.Adjacency`; `graph`, a networkx
+    DiGraph of the tasks, is only built if it is asked for.
+
     Parameters
     ----------
-
+    graph : networkx.DiGraph, optional
+        The tasks and their dependencies, if no `adjacency` is given
+    adjacency : topsim.core.adjacency.Adjacency, optional
     """
 
     def __init__(self, id, est, eft, tasks, exec_order, status, max_ingest,
-                 graph=None):
+                 graph=None, adjacency=None):
         self.id = id
         self.est = est
         self.eft = eft
@@ -98,11 +287,32 @@ class WorkflowPlan:
         self.finished_tasks = []
         self.exec_order = exec_order
         self.status = status
-        self.graph = graph
+        if adjacency is None and graph is not None:
+            adjacency = Adjacency.from_networkx(
+                graph, {task: task for task in graph.nodes})
+        self.adjacency = adjacency
+        self._graph = graph
         self.min_resources = None
         self.max_resources = None
         self.priority = None
 
+    @property
+    def graph(self):
+        """
+        The tasks and their dependencies as a networkx DiGraph, built from
+        :py:attr:`adjacency` the first time it is used.
+        """
+        if self._graph is None and self.adjacency is not None:
+            self._graph = self.adjacency.to_networkx()
+        return self._graph
+
+    def __getstate__(self):
+        # The graph can be rebuilt from the adjacency, so is not saved
+        state = self.__dict__.copy()
+        if state['adjacency'] is not None:
+            state['_graph'] = None
+        return state
+
     def __lt__(self, other):
         return self.priority < other.priority
 
@@ -134,11 +344,11 @@ class WorkflowPlan:
         """
         return self.status == WorkflowStatus.FINISHED
 
-    def get_task_successors(self, task_id):
-        return self.graph.successors(task_id)
+    def get_task_successors(self, task):
+        return self.adjacency.successors(task)
 
-    def get_task_predecessors(self, task_id):
-        return self.graph.successors(task_id)
+    def get_task_predecessors(self, task):
+        return self.adjacency.predecessors(task)
 
     def get_data_cost(self, task_u, task_v):
         pass
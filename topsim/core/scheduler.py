@@ -14,15 +14,15 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import time
 import logging
-import pandas as pd
 
 from enum import Enum
-from tqdm import tqdm
 
 from topsim.common.globals import TIMESTEP
 from topsim.core.instrument import RunStatus
 from topsim.core.planner import WorkflowStatus
 from topsim.core.task import TaskStatus
+from topsim.core.trace import TRACE, TracePoint
+from topsim.core.eventbus import Event, EventBus
 
 LOGGER = logging.getLogger(__name__)
 
@@ -60,9 +60,13 @@ class Scheduler:
         self.provision_ingest = 0
         self.observation_queue = []
         self.schedule_status = ScheduleStatus.ONTIME
-        self.events = []
+        #: :py:obj:`~topsim.core.eventbus.EventBus` to which events are
+        #: published; replaced by that of the Simulation.
+        self.bus = EventBus()
         self.algtime = {}
         self.delay_offset = 0
+        #: Display a progress bar for each observation's tasks
+        self.show_progress = True
 
     def start(self):
         """
@@ -99,9 +103,8 @@ class Scheduler:
         LOGGER.debug("Scheduler starting up...")
 
         while self.status is SchedulerStatus.RUNNING:
-            self.events = []
             if self.env.now % 1000 == 0:
-                LOGGER.debug('Time on Scheduler: {0}'.format(self.env.now))
+                LOGGER.debug('Time on Scheduler: %s', self.env.now)
                 LOGGER.debug("Scheduler Status: %s", self.status)
             if self.buffer.has_observations_ready_for_processing():
                 obs = self.buffer.next_observation_for_processing()
@@ -186,7 +189,7 @@ class Scheduler:
         return buffer_capacity and cluster_capacity
 
     def allocate_ingest(self, observation, pipelines, planner, max_ingest=None,
-                        c='default'):
+                        c='default', time_left=None):
         """
         Ingest is 'streaming' data to the buffer during the observation
         How we calculate how long it takes remains to be seen
@@ -202,6 +205,10 @@ class Scheduler:
 
             pipelines[observation type][demand]
 
+        time_left : int, optional
+            Timesteps left of an ingest that is already running; used when
+            restoring a simulation from a checkpoint.
+
         Returns
         -------
             True/False
@@ -209,16 +216,17 @@ class Scheduler:
         Raises
         ------
         """
-        observation.ast = self.env.now
         # self.env.process(
         # observation.plan = planner.run(observation, self.buffer)
         # )
 
         pipeline_demand = pipelines[observation.name]['ingest_demand']
         ingest_observation = observation
-        # We do an off-by-one check here, because the first time we run the
-        # loop we will be one timestep ahead.
-        time_left = observation.duration - 1
+        if time_left is None:
+            observation.ast = self.env.now
+            # We do an off-by-one check here, because the first time we run
+            # the loop we will be one timestep ahead.
+            time_left = observation.duration - 1
         while ingest_observation.status is not RunStatus.FINISHED:
             if ingest_observation.status is RunStatus.WAITING:
                 cluster_ingest = self.env.process(
@@ -243,7 +251,8 @@ class Scheduler:
         # Change this to 'workflows scheduled/workflows unscheduled'
         pass
 
-    def allocate_tasks(self, observation):
+    def allocate_tasks(self, observation, current_plan=None, schedule=None,
+                       allocation_pairs=None, task_pool=None):
         """
         For the current observation, we need to allocate tasks to machines
         based on:
@@ -251,12 +260,16 @@ class Scheduler:
             * The plan that has been generated
             * The result of the scheduler's decision based on the current
             cluster state, and the original plan.
+
+        The remaining parameters are the allocation state of an observation
+        whose tasks are already being allocated; they are used when restoring
+        a simulation from a checkpoint.
+
         Returns
         -------
 
         """
         minst = -1
-        current_plan = None
         if observation is None:
             return False
 
@@ -267,12 +280,12 @@ class Scheduler:
         # if current_plan.est >= self.env.now + TIMESTEP: # Give us leeway on if we are one timestep out
         #     self.schedule_status.DELAYED
 
-        schedule = {}
-        allocation_pairs = {}
-        task_pool = set()
+        schedule = {} if schedule is None else schedule
+        allocation_pairs = {} if allocation_pairs is None else allocation_pairs
+        task_pool = set() if task_pool is None else task_pool
         _total_tasks = 0 # len(current_plan.tasks)
         _curr_tasks = 0 # len(current_plan.tasks)
-        _tqdm = True
+        _tqdm = self.show_progress
         pbar_setup = False
         pbar = None
         while True:
@@ -295,6 +308,7 @@ class Scheduler:
             if _tqdm and not pbar_setup:
                 _total_tasks = len(current_plan.tasks)
                 _curr_tasks = len(current_plan.tasks)
+                from tqdm import tqdm
                 pbar = tqdm(total=_total_tasks,
                             desc=f'Scheduler: {observation.name}', unit="Tasks",
                             leave=True, ncols=0)
@@ -370,11 +384,12 @@ class Scheduler:
             self._add_event(observation, "allocation", "stopped")
             if self.buffer.mark_observation_finished(observation):
                 self.cluster.release_batch_resources(observation.name)
-                LOGGER.debug(f'{observation.name} resources released')
+                LOGGER.debug('%s resources released', observation.name)
                 self.observation_queue.remove(observation)
                 self._add_event(observation, "queue", "removed")
                 finished = True
-                LOGGER.info(f"{observation.name} finished @ {self.env.now}")
+                LOGGER.info("%s finished @ %s", observation.name,
+                            self.env.now)
 
         return current_plan, schedule, task_pool, finished
 
@@ -404,8 +419,9 @@ class Scheduler:
                 task.update_allocation(machine)
             # Schedule
             if machine in curr_allocs or self.cluster.is_occupied(machine):
-                LOGGER.debug(
-                    "Allocation not made to cluster due to double-allocation")
+                if TRACE.scheduler:
+                    TRACE.record(TracePoint.DOUBLE_ALLOCATION, self.env.now,
+                                 task.id, machine.id)
             else:
                 allocation_pairs[task.id] = (task, machine)
                 pred_allocations = self._find_pred_allocations(task, machine,
@@ -417,7 +433,9 @@ class Scheduler:
                     self.cluster.allocate_task_to_cluster(task, machine,
                         pred_allocations, workflow_id))
 
-                LOGGER.debug(f"Allocation {task}-{machine} made to cluster")
+                if TRACE.scheduler:
+                    TRACE.record(TracePoint.ALLOCATION, self.env.now,
+                                 task.id, machine.id)
                 task.task_status = TaskStatus.SCHEDULED
                 curr_allocs.append(machine)
                 schedule.pop(task, None)
@@ -497,31 +515,23 @@ class Scheduler:
             Dataframe object with all the relevant data.
 
         """
-        df = pd.DataFrame()
-        df['scheduler_observation_queue'] = [int(len(self.observation_queue))]
-        df['schedule_status'] = [str(self.schedule_status.value)]
-        df['delay_offset'] = [self.delay_offset]
-        return df
+        import pandas as pd
+        return pd.DataFrame({k: [v] for k, v in self.to_record().items()})
 
-    def to_summary(self):
+    def to_record(self):
         """
-        Generate summary information when a key event occurs during the
-        current timestep
-
-        The scheduler has the following key events that can happen each timestep
-
-        Returns
-        -------
-        summary : dict
-            list of key-value pairs with the 'event': 'event_name'
+        The scheduling timestep data, as a dict of column names and values
+        (see :py:meth:`to_df`).
         """
-
-        return self.events
+        return {
+            'scheduler_observation_queue': int(len(self.observation_queue)),
+            'schedule_status': str(self.schedule_status.value),
+            'delay_offset': self.delay_offset,
+        }
 
     def _add_event(self, observation, resource, event):
-        self.events.append({"time": int(self.env.now), "actor": "scheduler",
-                            "observation": observation.name, "event": event,
-                            "resource": resource})
+        self.bus.publish(Event(int(self.env.now), "scheduler",
+                               observation.name, event, resource))
 
 
 class SchedulerStatus(Enum):
@@ -1,22 +1,36 @@
 import os
+import copy
 import logging
 import time
 import datetime
 import json
 
-import pandas as pd
 
 from pathlib import Path
 from topsim.core.config import Config
-from topsim.core.monitor import Monitor
+from topsim.core.monitor import Monitor, TIMESERIES_MODES
 from topsim.core.scheduler import Scheduler
 from topsim.core.cluster import Cluster
 from topsim.core.buffer import Buffer
 from topsim.core.planner import Planner
 from topsim.core.delay import DelayModel
+from topsim.core.table import Table
+from topsim.core.output import create_output, HDF5Output, OUTPUT_BACKENDS
+from topsim.core.eventlog import EventLogWriter
+from topsim.core.eventbus import EventBus, EventCounter
+from topsim.common.globals import TRACEFILE
 
 LOGGER = logging.getLogger(__name__)
 
+#: Supported ways of reporting simulation progress
+PROGRESS_MODES = ('bar', 'log', 'none')
+#: Wall-clock seconds between progress reports in 'log' mode
+PROGRESS_INTERVAL = 10
+#: Settings that may be changed in each branch of Simulation.fork()
+BRANCH_SETTINGS = ('scheduling', 'planning', 'delay')
+#: Ways in which the Monitor records simulation data
+ENGINES = ('pandas', 'array')
+
 
 class Simulation:
     """
@@ -59,6 +73,71 @@ class Simulation:
         `False` will return pandas DataFrame objects at the completion of the
         :py:meth:`~topsim.core.simulation.Simulation.run` function.
 
+    progress : str, optional
+        How progress is reported during the simulation: 'bar' displays a
+        progress bar for the tasks of each observation; 'log' periodically
+        logs the simulation time and the number of finished observations;
+        'none' reports nothing.
+
+    chunk_size : int, optional
+        If set (and `to_file` is `True`), the per-timestep simulation data is
+        streamed to the HDF5 store every `chunk_size` timesteps, rather than
+        held in memory until the end of the simulation.
+
+    checkpoint : Path, optional
+        File to which the state of the simulation is periodically saved (see
+        :py:meth:`~topsim.core.simulation.Simulation.checkpoint`).
+
+    checkpoint_interval : int, optional
+        Simulation time between checkpoints; required if `checkpoint` is set.
+
+    engine : str, optional
+        'pandas' (the default) collects results in DataFrames and writes
+        them to HDF5. 'array' runs the simulation without importing pandas:
+        results are recorded in :py:class:`~topsim.core.table.Table`
+        objects, which are returned by :py:meth:`start`, or written to
+        `hdf5_path` as a `.npz`, CSV or Arrow file (see
+        :py:func:`~topsim.core.table.write_tables`). Streaming
+        (`chunk_size`) is only supported by the 'pandas' engine.
+
+    event_log : Path or bool, optional
+        If set, events are appended to a binary event log at this path (or
+        at :py:data:`~topsim.common.globals.TRACEFILE` if True), rather than
+        collected in memory; see :py:mod:`topsim.core.eventlog`. The events
+        are then not included in the simulation output.
+
+    timeseries : str, optional
+        'dense' (the default) records the per-timestep data ('sim') as a
+        row for every timestep. 'changes' records a row, with its 'time',
+        only when a value has changed, and stores the values that are
+        constant for the run (algorithm names, configuration and delay)
+        with the parameters ('params') instead, along with the number of
+        'timesteps'. Use :py:func:`~topsim.core.monitor.expand_timeseries`
+        to expand it back to a row per timestep.
+
+    output_backend : str, optional
+        How results are written to `hdf5_path` (see
+        :py:mod:`topsim.core.output`): 'hdf5' (the default for the 'pandas'
+        engine), 'tables' (the default for the 'array' engine), or 'parquet'
+        or 'arrow' to write a dataset directory that is partitioned by the
+        timestamp, delimiters and configuration of each simulation.
+
+    task_memory_budget : int, optional
+        Approximate number of bytes of finished task records kept in memory;
+        beyond this, they are spilled to disk until the final task table is
+        built (see :py:class:`~topsim.core.taskstore.TaskStore`).
+
+    lookahead_plans : int, optional
+        Number of upcoming observations the planner plans ahead of time, in
+        worker processes, while the simulation runs (see
+        :py:class:`~topsim.core.planner.Planner`). Plans are the same as
+        without, provided the planning model only depends on the
+        specification and order of the machines provisioned.
+
+    planning_workers : int, optional
+        Number of worker processes used by `lookahead_plans`; by default,
+        one per CPU.
+
     Notes
     -----
     If to_file left as `False`, simulation results and output will be returned
@@ -132,19 +211,39 @@ class Simulation:
             hdf5_path=None,
             use_task_data=False,
             use_edge_data=True,
+            progress='bar',
+            chunk_size=None,
+            checkpoint=None,
+            checkpoint_interval=None,
+            engine='pandas',
+            event_log=None,
+            timeseries='dense',
+            output_backend=None,
+            task_memory_budget=None,
+            lookahead_plans=0,
+            planning_workers=None,
             **kwargs
     ):
 
         #: :py:obj:`simpy.Environment` object
         self.env = env
 
+        if engine not in ENGINES:
+            raise ValueError(
+                f"engine must be one of {ENGINES}, not '{engine}'")
+        self.engine = engine
+        if timeseries not in TIMESERIES_MODES:
+            raise ValueError(
+                f"timeseries must be one of {TIMESERIES_MODES}, "
+                f"not '{timeseries}'")
+
         #: :py:obj:`~topsim.core.monitor.Monitor` instance
         if timestamp is not None:
-            self.monitor = Monitor(self, timestamp)
+            self.monitor = Monitor(self, timestamp, engine, timeseries)
             self._timestamp = datetime.datetime.fromtimestamp(timestamp)
         else:
             self._timestamp = datetime.datetime.now()
-            self.monitor = Monitor(self, self._timestamp)
+            self.monitor = Monitor(self, self._timestamp, engine, timeseries)
 
         # Process necessary config files
 
@@ -152,7 +251,7 @@ class Simulation:
         # Initialise Actor and Resource objects
         self._cfg = Config(config)
         #: :py:obj:`~topsim.core.cluster.Cluster` instance
-        self.cluster = Cluster(env, self._cfg)
+        self.cluster = Cluster(env, self._cfg, task_memory_budget)
         #: :py:obj:`~topsim.core.buffer.Buffer` instance
         planning_model = planning_model
         # planning_model.ingest_requirements = self._cfg.get_max_ingest(instrument.name)
@@ -162,7 +261,8 @@ class Simulation:
             #  model outside the simulation.
             delay = DelayModel(0.0, "normal", DelayModel.DelayDegree.NONE)
         self.planner = Planner(
-            env, self.cluster, planning_model, use_task_data, use_edge_data, delay
+            env, self.cluster, planning_model, use_task_data, use_edge_data,
+            delay, lookahead=lookahead_plans, workers=planning_workers
         )
         self.buffer = Buffer(env, self.cluster, self.planner, self._cfg)
         scheduling_algorithm = scheduling
@@ -178,19 +278,46 @@ class Simulation:
             planner=self.planner,
             scheduler=self.scheduler
         )
+        self.planner.observations = self.instrument.observations
+
+        #: :py:obj:`~topsim.core.eventbus.EventBus` to which each actor
+        #: publishes its events
+        self.bus = EventBus()
+        for actor in (self.cluster, self.buffer, self.scheduler,
+                      self.instrument):
+            actor.bus = self.bus
+        self.bus.subscribe(self.monitor.record_event)
+        #: :py:obj:`~topsim.core.eventbus.EventCounter` of the events so far
+        self.event_counts = self.bus.subscribe(EventCounter())
 
         #: :py:obj:`bool` Flag for producing simulation output in a `.pkl`
         # file.
         self.to_file = to_file
-        if self.to_file and hdf5_path:
+        #: :py:obj:`~topsim.core.output.OutputBackend` to which results are
+        #: written
+        self._output = None
+        if output_backend is None:
+            output_backend = 'tables' if engine == 'array' else 'hdf5'
+        if output_backend not in OUTPUT_BACKENDS:
+            raise ValueError(
+                f"output_backend must be one of {OUTPUT_BACKENDS}, "
+                f"not '{output_backend}'")
+        if (engine, output_backend) in (('array', 'hdf5'),
+                                        ('pandas', 'tables')):
+            raise ValueError(
+                f"The '{engine}' engine cannot write '{output_backend}' "
+                f"output")
+        if self.to_file and hdf5_path and engine == 'array':
+            if chunk_size:
+                raise ValueError(
+                    "Streaming output (chunk_size) requires the 'pandas' "
+                    "engine")
+            self._output = create_output(output_backend, hdf5_path)
+        elif self.to_file and hdf5_path and output_backend != 'hdf5':
+            self._output = create_output(output_backend, hdf5_path)
+        elif self.to_file and hdf5_path:
             try:
-                if os.path.exists(hdf5_path):
-                    LOGGER.warning(
-                        'Output HDF5 path already exists, '
-                        'simulation appended to existing file'
-                    )
-                self._hdf5_store = pd.HDFStore(hdf5_path)
-                self._hdf5_store.close()
+                self._output = create_output(output_backend, hdf5_path)
             except Exception as e:
                 LOGGER.error('%s', e)
         elif self.to_file and hdf5_path is None:
@@ -209,9 +336,28 @@ class Simulation:
 
         self.params = {"use_task_data": [use_task_data], "use_edge_data":[use_edge_data]}
 
+        if progress not in PROGRESS_MODES:
+            raise ValueError(
+                f"progress must be one of {PROGRESS_MODES}, not '{progress}'")
+        self.progress = progress
+        self.scheduler.show_progress = (progress == 'bar')
+        if chunk_size and self.to_file:
+            self.monitor.chunk_size = chunk_size
+        if event_log:
+            self.monitor.event_log = EventLogWriter(
+                TRACEFILE if event_log is True else event_log)
+
+        if checkpoint and not checkpoint_interval:
+            raise ValueError("checkpoint requires a checkpoint_interval")
+        #: Path to which periodic checkpoints are written
+        self.checkpoint_path = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+
         self.running = False
+        #: Set if the simulation stopped because it exceeded its budget
+        self.timed_out = False
 
-    def start(self, runtime=-1):
+    def start(self, runtime=-1, budget=None):
         """
         Run the simulation, either for the specified runtime, OR until the
         exit conditions are reached.
@@ -230,6 +376,11 @@ class Simulation:
             known, pass that as the argument. If not, passing in a negative
             value (typically, just -1) will run the simulation until the
             exit condition is reached.
+        budget : float, optional
+            Wall-clock budget, in seconds. If the simulation has not finished
+            within the budget, it is stopped and whatever results have been
+            produced so far are returned (or written to file);
+            :py:attr:`timed_out` is set to indicate the results are partial.
 
         Returns
         -------
@@ -238,7 +389,10 @@ class Simulation:
                 Path names for the global simulation runtime and the
                 individual task data output.
         If `to_file` is False:
-            Two pandas.DataFrame objects for global sim runtime and task data.
+            Two pandas.DataFrame objects for global sim runtime and task data
+            (two :py:class:`~topsim.core.table.Table` objects if `engine` is
+            'array'; the task table has a 'task_id' column in place of the
+            index).
 
         """
         if self.running:
@@ -256,54 +410,286 @@ class Simulation:
         self.scheduler.start()
         self.env.process(self.scheduler.run())
         self.env.process(self.buffer.run())
+        return self._run(runtime, budget)
 
-        if runtime > 0:
-            self.env.run(until=runtime)
-        else:
-            while not self.is_finished():
-                self.env.run(self.env.now + 1)
-            # self.env.run(self.env.now + 1)
+    def _run(self, runtime=-1, budget=None):
+        """
+        Run the simulation (see :py:meth:`start`) and produce its output.
+        """
+        try:
+            if (runtime > 0 and budget is None and self.progress != 'log'
+                    and not self.checkpoint_path):
+                self.env.run(until=runtime)
+            else:
+                self._run_until_finished(runtime, budget)
+        finally:
+            # Shut down the planning workers even if the run fails
+            self.planner.close()
 
         LOGGER.info("Simulation Finished @ %s", self.env.now)
-        self.monitor.collate_events()
-        if self.to_file and self._hdf5_store is not None:
+        if self.planner.lookahead:
+            LOGGER.info("%s plans made ahead of time were used, %s were not",
+                        self.planner.prefetch_hits,
+                        self.planner.prefetch_misses)
+        if getattr(self.scheduler.algorithm, 'window', None):
+            stats = self.scheduler.algorithm.window_stats()
+            LOGGER.info("The scheduling window left tasks out in %s of %s "
+                        "timesteps", stats['window_truncated'],
+                        stats['window_decisions'])
+            self.params.update({k: [v] for k, v in stats.items()})
+        if self.monitor.event_log is not None:
+            self.monitor.event_log.flush()
+        if self.monitor.timeseries == 'changes':
+            self.params.update(
+                {k: [v] for k, v in self.monitor.metadata().items()})
+            self.params['timesteps'] = [self.monitor.timesteps]
+        if self.engine == 'array':
+            tasks = self._generate_final_task_table()
+            if self._output is not None:
+                self._output.write(self._output_partition(), {
+                    'sim': self.monitor.df, 'tasks': tasks,
+                    'events': self.monitor.events,
+                    'params': Table(self.params),
+                    'occupancy': self.cluster.occupancy.to_table()
+                })
+                return None
+            return self.monitor.df, tasks
+        if self.to_file and self._output is not None:
             global_df = self.monitor.df
             summary_df = self.monitor.events
-            self._hdf5_store.open()
-            self._compose_hdf5_output(global_df, summary_df)
-            self._hdf5_store.close()
+            self._compose_output(global_df, summary_df)
 
         else:
             return self.monitor.df, self._generate_final_task_data()
 
+    def _run_until_finished(self, runtime=-1, budget=None):
+        """
+        Step through the simulation one timestep at a time until the
+        simulation is finished (or `runtime` is reached), checking the
+        wall-clock budget and reporting progress along the way.
+        """
+        start = time.time()
+        last_report = start
+        while not self.is_finished():
+            if 0 < runtime <= self.env.now:
+                break
+            now = time.time()
+            if budget is not None and now - start > budget:
+                LOGGER.warning(
+                    "Simulation exceeded its %ss budget @ %s; stopping early",
+                    budget, self.env.now)
+                self.timed_out = True
+                break
+            if self.progress == 'log' and now - last_report > PROGRESS_INTERVAL:
+                LOGGER.info(
+                    "Simulation time %s: %s/%s observations finished",
+                    self.env.now, self.instrument.observations_finished(),
+                    len(self.instrument.observations))
+                last_report = now
+            self.env.run(self.env.now + 1)
+            if (self.checkpoint_path
+                    and self.env.now % self.checkpoint_interval == 0):
+                self.checkpoint(self.checkpoint_path)
+
+    def checkpoint(self, path):
+        """
+        Save the state of the simulation to `path`, so that it can be
+        continued later with :py:meth:`restore`.
 
+        Checkpoints are taken between timesteps, so this may be called once
+        :py:meth:`start` (with a `runtime`) or :py:meth:`resume` return, or
+        periodically during a run by passing `checkpoint` and
+        `checkpoint_interval` to the Simulation.
 
+        Parameters
+        ----------
+        path : str or Path
+            The checkpoint file
 
-    def resume(self, until):
+        Returns
+        -------
+        path : Path
         """
-        Resume a simulation for a period of time.
+        from topsim.core.checkpoint import save_checkpoint
+        if not self.running:
+            raise RuntimeError(
+                "Simulation has not been started; there is nothing to "
+                "checkpoint.")
+        return save_checkpoint(self, path)
+
+    @staticmethod
+    def restore(path):
+        """
+        Restore a simulation from a checkpoint written by
+        :py:meth:`checkpoint`.
+
+        If the simulation streams its results to file (`chunk_size`), or
+        writes an event log, any results written after the checkpoint was
+        taken are removed, as they will be produced again.
+
+        Examples
+        --------
+
+        >>> simulation = Simulation.restore('path/to/checkpoint.pkl')
+        >>> simulation.resume()
+
+        Parameters
+        ----------
+        path : str or Path
+            The checkpoint file
+
+        Returns
+        -------
+        simulation : Simulation
+            The simulation, ready to be continued with :py:meth:`resume`.
+        """
+        from topsim.core.checkpoint import load_checkpoint
+        simulation = load_checkpoint(path)
+        if simulation.monitor.chunk_size:
+            simulation._output.truncate(simulation._output_partition(), 'sim',
+                                        simulation.monitor.offset)
+        if simulation.monitor.event_log is not None:
+            simulation.monitor.event_log.truncate()
+        return simulation
+
+    def resume(self, until=None, budget=None):
+        """
+        Resume a simulation for a period of time, or until it is finished.
 
         Useful for testing purposes, as we do not re-initialise the process
         calls as we used to in
-        :py:obj:`~core.topsim.simulation.Simulation.start`
+        :py:obj:`~core.topsim.simulation.Simulation.start`, and for continuing
+        a simulation restored from a checkpoint (see :py:meth:`restore`).
 
         Parameters
         ----------
-        until : int
+        until : int, optional
             The (non-inclusive) :py:obj:`Simpy.env.now` timestep that we want to
-            continue to in the simulation
+            continue to in the simulation. If not provided, the simulation
+            is run until it is finished, and produces its output in the same
+            way as :py:meth:`start`.
+        budget : float, optional
+            Wall-clock budget, in seconds (see :py:meth:`start`).
 
         Returns
         -------
-        self.env.now : float
-            The current time in the simulation
+        If `until` is provided, None; otherwise, the output of
+        :py:meth:`start`.
         """
         if not self.running:
             raise RuntimeError(
                 "Simulation has not been started! Call start() to initialise "
                 "the process stack."
             )
-        self.env.run(until=until)
+        if until is not None and budget is None:
+            self.env.run(until=until)
+            return None
+        return self._run(until if until is not None else -1, budget)
+
+    def fork(self, branches, jobs=None, budget=None):
+        """
+        Continue copies of the simulation from the current time, each with
+        different scheduling, planning or delay settings.
+
+        The simulation is checkpointed in memory (see :py:meth:`checkpoint`)
+        and each branch is restored from it in a worker process, so the
+        shared prefix of the branches is only simulated once. This
+        simulation is not changed, and may itself be continued as a
+        baseline with :py:meth:`resume`.
+
+        Settings apply from the current time: workflows that have already
+        been planned keep their plans, and a new delay model is given to the
+        tasks that have not yet started.
+
+        Examples
+        --------
+
+        >>> simulation.start(runtime=3600)
+        >>> results = simulation.fork({
+        ...     'batch': {'scheduling': BatchProcessing()},
+        ...     'delayed': {'delay': DelayModel(0.2, 'normal')},
+        ... })
+
+        Parameters
+        ----------
+        branches : dict
+            Maps the name of each branch to its settings, a dict with any of
+            the keys in :py:data:`BRANCH_SETTINGS`.
+        jobs : int, optional
+            Number of worker processes; defaults to one per branch, up to
+            the number of CPUs. If 1, branches are run in this process.
+        budget : float, optional
+            Wall-clock budget of each branch, in seconds (see :py:meth:`start`)
+
+        Returns
+        -------
+        results : dict
+            The output of each branch, as for :py:meth:`start`. If `to_file`
+            is set, each branch writes its results to a copy of the output
+            (named `<output>-<branch><suffix>`) and the path is returned.
+            An event log is continued in the same way, in
+            `<log>-<branch><suffix>`.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        from topsim.core.checkpoint import dumps
+
+        if not self.running:
+            raise RuntimeError(
+                "Simulation has not been started; there is nothing to fork.")
+        for name, settings in branches.items():
+            unknown = set(settings) - set(BRANCH_SETTINGS)
+            if unknown:
+                raise ValueError(
+                    f"Branch '{name}' has unknown settings {sorted(unknown)};"
+                    f" expected any of {BRANCH_SETTINGS}")
+        state = dumps(self)
+        outputs = {name: self._branch_output(name) for name in branches}
+        LOGGER.info("Forking %s branches @ %s", len(branches), self.env.now)
+        if jobs is None:
+            jobs = min(len(branches), os.cpu_count() or 1)
+        if jobs == 1:
+            return {
+                name: _run_branch(state, name, settings, outputs[name], budget)
+                for name, settings in branches.items()
+            }
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                name: pool.submit(_run_branch, state, name, settings,
+                                  outputs[name], budget)
+                for name, settings in branches.items()
+            }
+            return {name: future.result() for name, future in futures.items()}
+
+    def _branch_output(self, name):
+        """
+        Create the output of branch `name` of this simulation, starting
+        from a copy of the output produced so far.
+        """
+        if self._output is None:
+            return None
+        return self._output.branch(name)
+
+    def _apply_branch_settings(self, scheduling=None, planning=None,
+                               delay=None):
+        """
+        Replace the scheduling, planning or delay model of a forked
+        simulation (see :py:meth:`fork`).
+        """
+        if scheduling is not None:
+            scheduling.ingest_requirements = (
+                self.scheduler.algorithm.ingest_requirements)
+            self.scheduler.algorithm = scheduling
+        if planning is not None:
+            self.planner.model = planning
+        if delay is not None:
+            self.planner.delay_model = delay
+            self.planner.model.delay_model = delay
+            for observation in self.instrument.observations:
+                if observation.plan is None:
+                    continue
+                for task in observation.plan.tasks:
+                    if task.ast < 0:
+                        task.delay = copy.copy(delay)
 
     def is_finished(self):
         """
@@ -333,16 +719,25 @@ class Simulation:
 
     def summary(self):
         """
-        Produce a formatted summary of events that occured during simulation
+        Summarise the simulation so far with the scalar metrics of
+        :py:func:`topsim.utils.analytics.summary`.
+
+        With a `chunk_size`, only the buffer usage of the rows still held
+        by the Monitor is included.
 
         Returns
         -------
-        df
+        summary : dict
         """
+        from topsim.utils import analytics
 
-        events = self.monitor.events
-        finish = max(events['timestep'],0)
-
+        # The Buffer reports the remaining capacity of its first buffers
+        capacity = {'hot_buffer': self.buffer.hot[0].total_capacity,
+                    'cold_buffer': self.buffer.cold[0].total_capacity}
+        return analytics.summary(
+            self.cluster.task_store.to_table(), self.monitor.events,
+            self.monitor.df, self.cluster.occupancy.to_table(),
+            machines=len(self.cluster.machine_ids), capacity=capacity)
 
     @staticmethod
     def _split_monolithic_config(self, json):
@@ -357,19 +752,29 @@ class Simulation:
         """
 
         df = self.cluster.finished_task_time_data()
-        df = df.T
-        size = len(df)
-        df['scheduling'] = [str(self.planner.model.algorithm) for x in range(size)]
-        df['planning'] = [
-            str(self.scheduler.algorithm) for x in range(size)
-        ]
-        df['config'] = [str(self._cfg_path) for x in range(size)]
-        return df.infer_objects()
-
-    def _compose_hdf5_output(self, global_df, summary_df):
-        """
-        Given a :py:obj:`pandas.HDFStore()` object, put global simulation,
-        task specific, and configuration data into HDF5 storage files.
+        df['scheduling'] = str(self.planner.model.algorithm)
+        df['planning'] = str(self.scheduler.algorithm)
+        df['config'] = str(self._cfg_path)
+        return df
+
+    def _generate_final_task_table(self):
+        """
+        Generate the task data of :py:meth:`_generate_final_task_data` as a
+        :py:class:`~topsim.core.table.Table`, without pandas.
+        """
+        columns = self.cluster.task_store.to_dict()
+        size = len(columns['task_id'])
+        # Labelled in the same way as _generate_final_task_data
+        columns['scheduling'] = [str(self.planner.model.algorithm)] * size
+        columns['planning'] = [str(self.scheduler.algorithm)] * size
+        columns['config'] = [str(self._cfg_path)] * size
+        return Table(columns)
+
+    def _compose_output(self, global_df, summary_df):
+        """
+        Write the global simulation, event summary, configuration, machine
+        occupancy and task data to the output backend.
+
         Parameters
         ----------
         global_df : :py:obj:pandas.DataFrame
@@ -380,22 +785,51 @@ class Simulation:
         -------
 
         """
-        if self._timestamp:
-            ts = f'{self._timestamp}'
-        else:
-            ts = f'{datetime.datetime.today().strftime("%y_%m_%d_%H_%M_%S")}'
+        import pandas as pd
 
+        tables = {}
+        if self.monitor.chunk_size:
+            self.monitor.flush()
+        else:
+            tables['sim'] = global_df.fillna(0)
+        tables['summary'] = summary_df
+        tables['params'] = pd.DataFrame(self.params)
+        tables['occupancy'] = self.cluster.occupancy.to_df()
+        tables['tasks'] = self._generate_final_task_data()
+        self._output.write(self._output_partition(), tables)
+
+    def _output_partition(self):
+        """
+        The fields (:py:data:`~topsim.core.output.PARTITION_FIELDS`) under
+        which this simulation is stored in the output
+        """
         ts = self._timestamp.strftime("%a%y%m%d%H%M%S")
-
         sanitised_path = self._cfg_path.name.replace(".json", '').split('/')[-1]
-        final_key = f'{ts}/{self._delimiters}/{sanitised_path}'
-        global_df = global_df.fillna(0)
-        self._hdf5_store.put(key=f"{final_key}/sim", value=global_df)
-        self._hdf5_store.put(key=f'{final_key}/summary',
-                             value=summary_df)
-        self._hdf5_store.put(key=f'{final_key}/params', value=pd.DataFrame(self.params))
+        return {'timestamp': ts, 'delimiters': self._delimiters,
+                'configuration': sanitised_path}
+
+    def _hdf5_key(self):
+        """
+        The key under which this simulation is stored in the HDF5 output
+        """
+        return HDF5Output.key(self._output_partition())
+
+    def _append_output(self, global_df, start):
+        """
+        Append a chunk of the global, per-timestep simulation data to the
+        output, after the `start` rows that have already been written.
 
-        return self._hdf5_store
+        Parameters
+        ----------
+        global_df : :py:obj:pandas.DataFrame
+            The rows of the simulation data not yet written to file
+        start : int
+            The number of rows already written
+        """
+        if global_df.empty:
+            return
+        self._output.append(self._output_partition(), 'sim',
+                            global_df.fillna(0), start)
 
     def _stringify_json_data(self, path, relative=True):
         """
@@ -427,3 +861,28 @@ class Simulation:
         jstr = json.dumps(jdict)  # , indent=2)
         return jstr
 
+
+def _run_branch(state, name, settings, output, budget):
+    """
+    Restore a simulation checkpointed by
+    :py:meth:`Simulation.fork`, change its settings, and run it to the end.
+    """
+    from topsim.core.checkpoint import loads
+    simulation = loads(state)
+    simulation._apply_branch_settings(**settings)
+    # Branches must not overwrite the checkpoints of the original simulation
+    simulation.checkpoint_path = None
+    if simulation.monitor.event_log is not None:
+        simulation.monitor.event_log = simulation.monitor.event_log.branch(
+            name)
+    if simulation.progress == 'bar':
+        simulation.progress = 'none'
+        simulation.scheduler.show_progress = False
+    if output is not None:
+        simulation._output = output
+    result = simulation.resume(budget=budget)
+    if simulation.timed_out:
+        LOGGER.warning("Branch %s stopped @ %s: budget spent",
+                       name, simulation.env.now)
+    LOGGER.info("Branch %s finished @ %s", name, simulation.env.now)
+    return output.path if output is not None else result
@@ -0,0 +1,251 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Column tables for simulation results that do not depend on pandas.
+
+A simulation run with the 'array' engine records its results as rows of
+plain values, which are appended to a :py:class:`Table`. Tables are saved as
+`.npz`, CSV or Arrow IPC files, and only converted to a
+:py:obj:`pandas.DataFrame` when asked for:
+
+>>> sim, tasks = simulation.start()
+>>> sim['available_resources'].max()
+>>> tasks.to_df(index='task_id')
+>>> write_tables('results.npz', {'sim': sim, 'tasks': tasks})
+"""
+
+import csv
+
+import numpy as np
+
+from pathlib import Path
+
+#: File formats that tables can be written in
+TABLE_FORMATS = ('.npz', '.csv', '.arrow')
+
+
+class Table:
+    """
+    Columns of values, recorded a row at a time.
+
+    Parameters
+    ----------
+    columns : dict, optional
+        Maps the name of each column to its values; all columns must be the
+        same length.
+    """
+
+    def __init__(self, columns=None):
+        self._columns = {k: list(v) for k, v in (columns or {}).items()}
+        lengths = {len(v) for v in self._columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("Columns are not all the same length")
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Create a table from a sequence of rows (dicts).
+        """
+        table = cls()
+        table.extend(records)
+        return table
+
+    def append(self, record):
+        """
+        Add a row to the table.
+
+        Columns that are missing from `record` are given None in that row;
+        a column first seen in `record` is None in all earlier rows.
+
+        Parameters
+        ----------
+        record : dict
+            Maps column names to the values of this row
+        """
+        for name in record:
+            if name not in self._columns:
+                self._columns[name] = [None] * self._length
+        for name, values in self._columns.items():
+            values.append(record.get(name))
+        self._length += 1
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __getitem__(self, name):
+        return np.asarray(self._columns[name])
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def to_dict(self):
+        """
+        Returns
+        -------
+        columns : dict
+            Maps the name of each column to a :py:obj:`numpy.ndarray`
+        """
+        return {name: self[name] for name in self._columns}
+
+    def to_numpy(self):
+        """
+        Returns
+        -------
+        array : numpy.recarray
+            A structured array with a field for each column
+        """
+        if not self._columns:
+            return np.rec.array(np.empty(0, dtype=[]))
+        return np.rec.fromarrays(list(self.to_dict().values()),
+                                 names=self.columns)
+
+    def to_df(self, index=None):
+        """
+        Convert the table to a :py:obj:`pandas.DataFrame`.
+
+        Parameters
+        ----------
+        index : str, optional
+            Column to use as the index of the DataFrame
+        """
+        import pandas as pd
+
+        df = pd.DataFrame(self.to_dict(), columns=self.columns)
+        if index is not None:
+            df = df.set_index(index)
+            df.index.name = None
+        return df.infer_objects()
+
+    def to_npz(self, path):
+        np.savez(path, **self.to_dict())
+
+    def to_csv(self, path):
+        with open(path, 'w', newline='') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(self.columns)
+            writer.writerows(zip(*self._columns.values()))
+
+    def to_arrow(self):
+        """
+        Convert the table to a :py:obj:`pyarrow.Table` (requires pyarrow).
+        """
+        import pyarrow as pa
+
+        return pa.table({k: list(v) for k, v in self._columns.items()})
+
+    def write(self, path):
+        """
+        Write the table to `path`, in the format given by its suffix (one
+        of :py:data:`TABLE_FORMATS`).
+        """
+        suffix = _format(path)
+        if suffix == '.npz':
+            self.to_npz(path)
+        elif suffix == '.csv':
+            self.to_csv(path)
+        else:
+            import pyarrow as pa
+
+            table = self.to_arrow()
+            with pa.ipc.new_file(str(path), table.schema) as writer:
+                writer.write_table(table)
+
+    @classmethod
+    def read(cls, path):
+        """
+        Read a table written to a `.npz` or Arrow file by :py:meth:`write`.
+        """
+        suffix = _format(path)
+        if suffix == '.npz':
+            with np.load(path, allow_pickle=True) as data:
+                return cls({name: data[name] for name in data.files})
+        if suffix == '.arrow':
+            import pyarrow as pa
+
+            with pa.memory_map(str(path)) as source:
+                table = pa.ipc.open_file(source).read_all()
+            return cls(table.to_pydict())
+        raise ValueError(f"Tables cannot be read back from {suffix} files")
+
+
+def _format(path):
+    suffix = Path(path).suffix
+    if suffix not in TABLE_FORMATS:
+        raise ValueError(
+            f"{path} is not one of the supported formats {TABLE_FORMATS}")
+    return suffix
+
+
+def write_tables(path, tables):
+    """
+    Write several tables (for example, the results of a simulation) to file.
+
+    A `.npz` archive holds all of the tables, with each column stored as
+    `<table>/<column>`; for other formats, each table is written to its own
+    file, `<stem>-<table><suffix>`.
+
+    Parameters
+    ----------
+    path : str or Path
+        Output file, with a suffix in :py:data:`TABLE_FORMATS`
+    tables : dict
+        Maps the name of each table to the :py:class:`Table`
+
+    Returns
+    -------
+    paths : list of Path
+        The files that were written
+    """
+    path = Path(path)
+    if _format(path) == '.npz':
+        np.savez(path, **{
+            f"{name}/{column}": values
+            for name, table in tables.items()
+            for column, values in table.to_dict().items()
+        })
+        return [path]
+    paths = []
+    for name, table in tables.items():
+        output = path.with_name(f"{path.stem}-{name}{path.suffix}")
+        table.write(output)
+        paths.append(output)
+    return paths
+
+
+def read_tables(path):
+    """
+    Read the tables in a `.npz` archive written by :py:func:`write_tables`.
+
+    Returns
+    -------
+    tables : dict
+        Maps the name of each table to the :py:class:`Table`
+    """
+    columns = {}
+    with np.load(path, allow_pickle=True) as data:
+        for key in data.files:
+            name, column = key.split('/', 1)
+            columns.setdefault(name, {})[column] = data[key]
+    return {name: Table(c) for name, c in columns.items()}
@@ -79,7 +79,24 @@ class Task(object):
     def __hash__(self):
         return hash(self.id)
 
-    def do_work(self, env, machine, predecessor_allocations=None):
+    def workflow_key(self):
+        """
+        Identity of the task within its workflow: the name of its
+        observation and its node in the workflow graph.
+
+        Unlike the task id, this does not depend on when the workflow was
+        planned, so the same task has the same key under any planning or
+        scheduling algorithm.
+        """
+        if self.graph_id is None:
+            return self.id
+        # Task ids are '<observation>_<plan time>_<graph id>'
+        prefix = self.id.removesuffix(f"_{self.graph_id}")
+        observation = prefix.rsplit('_', 1)[0]
+        return f"{observation}/{self.graph_id}"
+
+    def do_work(self, env, machine, predecessor_allocations=None,
+                total_duration=None):
         """
         This runs the task on the 'cluster'. We make the task in control of
         it's execution in order to "give it control" of delays.
@@ -93,26 +110,32 @@ class Task(object):
         env
         alt = True if the machine is different to the predecessors machine.
         This affects data transfer between tasks.
+        total_duration : int, optional
+            Used when restoring a simulation from a checkpoint
+            (:py:mod:`topsim.core.checkpoint`) to finish a task that was
+            already running; the task is not started again.
 
         Returns
         -------
 
         """
-        if predecessor_allocations:
-            yield env.timeout(
-                self._wait_for_transfer(env, machine, predecessor_allocations))
-        self.task_status = TaskStatus.RUNNING
-        self.ast = env.now
-
-        # self.eft = self.duration+self.ast
-        # Process potential updates to duration:
-        if (self.flops > 0) or (self.task_data > 0):
-            self.duration = self.calculate_runtime(machine)
-        total_duration = self._calc_task_delay()
-        if total_duration < 1:
-            yield env.timeout(0)
-        else:
-            yield env.timeout(total_duration - 1)
+        if total_duration is None:
+            if predecessor_allocations:
+                yield env.timeout(
+                    self._wait_for_transfer(env, machine,
+                                            predecessor_allocations))
+            self.task_status = TaskStatus.RUNNING
+            self.ast = env.now
+
+            # self.eft = self.duration+self.ast
+            # Process potential updates to duration:
+            if (self.flops > 0) or (self.task_data > 0):
+                self.duration = self.calculate_runtime(machine)
+            total_duration = self._calc_task_delay()
+            if total_duration < 1:
+                yield env.timeout(0)
+            else:
+                yield env.timeout(total_duration - 1)
 
         if self.duration < total_duration:
             self.delay_flag = True
@@ -208,7 +231,8 @@ class Task(object):
         updated duration
         """
         if self.delay is not None:
-            return self.delay.generate_delay(self.duration)
+            return self.delay.generate_delay(self.duration,
+                                             key=self.workflow_key())
         else:
             return self.duration
 
@@ -0,0 +1,178 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Columnar store of the tasks that have finished on the cluster.
+
+The Cluster appends a record to the store as each task finishes, rather
+than keeping the Task until the end of the simulation. Records are kept in
+memory, column by column; if a memory budget is given, the columns are
+spilled to a `.npz` file in a temporary directory each time they exceed it,
+and read back when the final task table is built:
+
+>>> store = TaskStore(memory_budget=64 * 2**20)
+>>> store.append(task, machine.id)
+>>> store.to_df()
+"""
+
+import shutil
+import logging
+import tempfile
+import weakref
+
+import numpy as np
+
+from pathlib import Path
+
+from topsim.core.table import Table
+
+LOGGER = logging.getLogger(__name__)
+
+#: Columns of the task store
+TASK_COLUMNS = ('task_id', 'est', 'eft', 'ast', 'aft', 'workflow_offset',
+                'observation_id', 'machine', 'delay_flag')
+
+#: Approximate size of a record, without its strings, in bytes
+_RECORD_BYTES = 8 * (len(TASK_COLUMNS) - 3)
+
+
+class TaskStore:
+    """
+    Append-only columns of finished task records, spilled to disk once they
+    exceed `memory_budget`.
+
+    Parameters
+    ----------
+    memory_budget : int, optional
+        Approximate number of bytes of records kept in memory; by default,
+        records are never spilled.
+    spill_dir : str or Path, optional
+        Directory to spill records to; by default, a temporary directory
+        that is removed with the store.
+    """
+
+    def __init__(self, memory_budget=None, spill_dir=None):
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        #: Approximate size of the records in memory, in bytes
+        self.nbytes = 0
+        self._columns = {name: [] for name in TASK_COLUMNS}
+        # Spilled records: the path of each .npz file, or (once restored
+        # from a checkpoint) the columns themselves
+        self._parts = []
+        self._length = 0
+        self._temporary = None
+
+    def append(self, task, machine):
+        """
+        Record a finished task.
+
+        Parameters
+        ----------
+        task : :py:obj:`~topsim.core.task.Task`
+        machine : str
+            The id of the machine the task ran on
+        """
+        observation = task.id.split('_')[0]
+        record = (task.id, task.est + task.workflow_offset,
+                  task.eft + task.workflow_offset, task.ast, task.aft,
+                  task.workflow_offset, observation, machine,
+                  task.delay_flag)
+        for values, value in zip(self._columns.values(), record):
+            values.append(value)
+        self._length += 1
+        self.nbytes += (_RECORD_BYTES + len(task.id) + len(observation)
+                        + len(machine))
+        if self.memory_budget is not None and self.nbytes > self.memory_budget:
+            self.spill()
+
+    def __len__(self):
+        return self._length
+
+    def spill(self):
+        """
+        Write the records in memory to a new `.npz` file, and release them.
+        """
+        if not self._columns['task_id']:
+            return
+        directory = self._spill_directory()
+        path = directory / f"tasks-{len(self._parts):06d}.npz"
+        np.savez(path, **{name: np.asarray(values)
+                          for name, values in self._columns.items()})
+        LOGGER.debug("Spilled %s task records to %s",
+                     len(self._columns['task_id']), path)
+        self._parts.append(str(path))
+        self._columns = {name: [] for name in TASK_COLUMNS}
+        self.nbytes = 0
+
+    def _spill_directory(self):
+        if self.spill_dir is not None:
+            directory = Path(self.spill_dir)
+            directory.mkdir(parents=True, exist_ok=True)
+            return directory
+        if self._temporary is None:
+            path = tempfile.mkdtemp(prefix='topsim-tasks-')
+            self._temporary = (path, weakref.finalize(
+                self, shutil.rmtree, path, ignore_errors=True))
+        return Path(self._temporary[0])
+
+    def _load_parts(self):
+        parts = []
+        for part in self._parts:
+            if isinstance(part, str):
+                with np.load(part) as data:
+                    part = {name: data[name] for name in TASK_COLUMNS}
+            parts.append(part)
+        return parts
+
+    def to_dict(self):
+        """
+        Returns
+        -------
+        columns : dict
+            Maps each of :py:data:`TASK_COLUMNS` to a
+            :py:obj:`numpy.ndarray` of every record, spilled or not
+        """
+        parts = self._load_parts()
+        if self._columns['task_id'] or not parts:
+            parts.append({name: np.asarray(values)
+                          for name, values in self._columns.items()})
+        return {
+            name: np.concatenate([part[name] for part in parts])
+            for name in TASK_COLUMNS
+        }
+
+    def to_table(self):
+        return Table(self.to_dict())
+
+    def to_df(self, index='task_id'):
+        """
+        The records as a :py:obj:`pandas.DataFrame`, indexed by `index`.
+        """
+        import pandas as pd
+
+        df = pd.DataFrame(self.to_dict(), columns=TASK_COLUMNS)
+        if index is not None:
+            df = df.set_index(index)
+            df.index.name = None
+        return df.infer_objects()
+
+    def __getstate__(self):
+        # Spilled records are included, so that a checkpoint does not
+        # depend on files that may be removed with this store
+        state = self.__dict__.copy()
+        state['_parts'] = self._load_parts()
+        state['_temporary'] = None
+        return state
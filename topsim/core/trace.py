@@ -0,0 +1,273 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Low-overhead structured tracing of the simulation's hot paths.
+
+Trace points are grouped into categories (one for each actor), each with a
+flag on the module-level :py:data:`TRACE` object. A trace point checks its
+flag before doing anything else, so a disabled trace point costs a single
+attribute lookup:
+
+>>> if TRACE.scheduler:
+...     TRACE.record(TracePoint.ALLOCATION, self.env.now, task.id, machine.id)
+
+Enabled trace points write fixed-width binary records to a ring buffer;
+strings (task ids, observation names) are interned, and nothing is
+formatted as text until the trace is read. Once the buffer is full, the
+oldest records are overwritten.
+
+>>> TRACE.enable('scheduler', 'cluster')
+>>> simulation.start()
+>>> for line in TRACE.format():
+...     print(line)
+
+Tracing can also be enabled before anything is imported (for example, in
+the worker processes of a sweep) with the environment variable
+`TOPSIM_TRACE`, set to 'all' or a comma-separated list of categories;
+`TOPSIM_TRACE_CAPACITY` sets the number of records kept.
+"""
+
+import os
+import struct
+import logging
+
+import numpy as np
+
+from enum import IntEnum
+
+LOGGER = logging.getLogger(__name__)
+
+#: Trace categories, each of which is enabled with a flag on a Tracer
+CATEGORIES = ('scheduler', 'cluster', 'buffer', 'instrument')
+
+#: Default number of records kept in the ring buffer
+DEFAULT_CAPACITY = 2 ** 16
+
+#: Maximum number of arguments of a trace point
+MAX_ARGS = 3
+
+#: Layout of a single trace record
+RECORD_DTYPE = np.dtype([
+    ('time', '<i8'), ('point', '<u2'), ('args', '<i8', (MAX_ARGS,))
+])
+_RECORD = struct.Struct(f'<qH{MAX_ARGS}q')
+
+
+class TracePoint(IntEnum):
+    """
+    Points in the simulation that can be traced.
+    """
+    ALLOCATION = 1
+    DOUBLE_ALLOCATION = 2
+    PROVISION = 3
+    TELESCOPE_USE = 4
+    HOT_BUFFER_STORED = 5
+
+
+#: The category of each trace point, its arguments (name, and 's' for
+#: strings or 'i' for integers), and the message it is formatted as
+SCHEMA = {
+    TracePoint.ALLOCATION: (
+        'scheduler', (('task', 's'), ('machine', 's')),
+        "Allocation {task}-{machine} made to cluster"),
+    TracePoint.DOUBLE_ALLOCATION: (
+        'scheduler', (('task', 's'), ('machine', 's')),
+        "Allocation {task}-{machine} not made to cluster due to "
+        "double-allocation"),
+    TracePoint.PROVISION: (
+        'cluster', (('observation', 's'), ('machines', 'i')),
+        "{machines} machines provisioned for {observation}"),
+    TracePoint.TELESCOPE_USE: (
+        'instrument', (('observation', 's'), ('arrays', 'i')),
+        "Telescope is now using {arrays} arrays ({observation})"),
+    TracePoint.HOT_BUFFER_STORED: (
+        'buffer', (('observation', 's'),),
+        "{observation} added to hot buffer"),
+}
+
+#: Whether each argument of a trace point is interned, padded to MAX_ARGS
+_INTERNED = {
+    point: tuple(kind == 's' for _, kind in fields)
+    + (False,) * (MAX_ARGS - len(fields))
+    for point, (_, fields, _) in SCHEMA.items()
+}
+
+
+class Tracer:
+    """
+    Ring buffer of binary trace records.
+
+    Each of :py:data:`CATEGORIES` is an attribute that is True when that
+    category is traced. Trace points must check it before calling
+    :py:meth:`record`.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of records kept; once full, the oldest are overwritten.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        for category in CATEGORIES:
+            setattr(self, category, False)
+        self.capacity = capacity
+        self._buffer = None
+        self.clear()
+
+    def enable(self, *categories, capacity=None):
+        """
+        Enable tracing of `categories` (all of them if none are given).
+        """
+        unknown = set(categories) - set(CATEGORIES)
+        if unknown:
+            raise ValueError(
+                f"Unknown trace categories {sorted(unknown)}; expected any "
+                f"of {CATEGORIES}")
+        if capacity is not None and capacity != self.capacity:
+            self.capacity = capacity
+            self.clear()
+        if self._buffer is None:
+            self._buffer = bytearray(self.capacity * _RECORD.size)
+        for category in categories or CATEGORIES:
+            setattr(self, category, True)
+
+    def disable(self, *categories):
+        """
+        Disable tracing of `categories` (all of them if none are given).
+        Records already made are kept.
+        """
+        for category in categories or CATEGORIES:
+            setattr(self, category, False)
+
+    def clear(self):
+        """
+        Drop all records and interned strings.
+        """
+        if self._buffer is not None:
+            self._buffer = bytearray(self.capacity * _RECORD.size)
+        self._count = 0
+        self._strings = []
+        self._string_ids = {}
+
+    def record(self, point, time, *args):
+        """
+        Add a record of trace `point` at simulation `time`.
+
+        Parameters
+        ----------
+        point : TracePoint
+        time : int
+        args
+            The arguments of `point`, as listed in :py:data:`SCHEMA`
+        """
+        values = [0] * MAX_ARGS
+        for i, (interned, value) in enumerate(zip(_INTERNED[point], args)):
+            values[i] = self._intern(value) if interned else value
+        _RECORD.pack_into(self._buffer,
+                          (self._count % self.capacity) * _RECORD.size,
+                          time, point, *values)
+        self._count += 1
+
+    def _intern(self, value):
+        value = str(value)
+        index = self._string_ids.get(value)
+        if index is None:
+            index = self._string_ids[value] = len(self._strings)
+            self._strings.append(value)
+        return index
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    @property
+    def dropped(self):
+        """
+        Number of records that have been overwritten.
+        """
+        return max(0, self._count - self.capacity)
+
+    def records(self):
+        """
+        The records in the ring buffer, oldest first.
+
+        Returns
+        -------
+        records : numpy.ndarray
+            Structured array of :py:data:`RECORD_DTYPE`; string arguments
+            are indices into :py:attr:`strings`.
+        """
+        if self._buffer is None:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        records = np.frombuffer(self._buffer, dtype=RECORD_DTYPE)
+        if self._count <= self.capacity:
+            return records[:self._count].copy()
+        start = self._count % self.capacity
+        return np.concatenate([records[start:], records[:start]])
+
+    @property
+    def strings(self):
+        return list(self._strings)
+
+    def decode(self):
+        """
+        The records in the ring buffer, oldest first, as dicts with the
+        time, the name of the trace point, and its named arguments.
+        """
+        decoded = []
+        for record in self.records():
+            point = TracePoint(record['point'])
+            _, fields, _ = SCHEMA[point]
+            entry = {'time': int(record['time']), 'point': point.name}
+            for (name, kind), value in zip(fields, record['args']):
+                entry[name] = (self._strings[value] if kind == 's'
+                               else int(value))
+            decoded.append(entry)
+        return decoded
+
+    def format(self):
+        """
+        The records in the ring buffer, oldest first, as log messages.
+        """
+        lines = []
+        for entry in self.decode():
+            _, _, message = SCHEMA[TracePoint[entry['point']]]
+            lines.append(f"{entry['time']}: {message.format(**entry)}")
+        return lines
+
+    def save(self, path):
+        """
+        Save the records and string table to a `.npz` file.
+        """
+        np.savez(path, records=self.records(),
+                 strings=np.asarray(self._strings, dtype=str))
+
+
+def _from_environment():
+    """
+    Create the tracer, enabling the categories listed in `TOPSIM_TRACE`.
+    """
+    tracer = Tracer(int(os.environ.get('TOPSIM_TRACE_CAPACITY',
+                                       DEFAULT_CAPACITY)))
+    categories = os.environ.get('TOPSIM_TRACE', '')
+    if categories == 'all':
+        tracer.enable()
+    elif categories:
+        tracer.enable(*[c.strip() for c in categories.split(',')])
+    return tracer
+
+
+#: The tracer used by the trace points of the simulation
+TRACE = _from_environment()
@@ -0,0 +1,285 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Compiled workflows.
+
+Workflows are written as networkx node-link JSON, which is slow to parse
+and builds a dict for every node and edge. :py:func:`compile_workflow`
+converts a workflow to a `.npz` archive of NumPy arrays: the node ids, in
+topological order, a column for each numeric node attribute, and the CSR
+edges of a :py:class:`~topsim.core.adjacency.Structure`. Either format can
+be read with :py:func:`load_workflow`:
+
+>>> compile_workflow('workflow.json')
+PosixPath('workflow.npz')
+>>> workflow = load_workflow('workflow.npz')
+>>> workflow.attributes['comp']
+array([71400, 55200, ...])
+
+A configuration may give the compiled workflow in place of the JSON file.
+Only the 'transfer_data' of edges is kept.
+"""
+
+import json
+import hashlib
+import functools
+import logging
+import tempfile
+
+import numpy as np
+
+from pathlib import Path
+
+from topsim.core.adjacency import Structure
+
+LOGGER = logging.getLogger(__name__)
+
+#: Suffix of compiled workflow files
+COMPILED_SUFFIX = '.npz'
+
+#: Format version of compiled workflows
+COMPILED_VERSION = 1
+
+_STRUCTURE_ARRAYS = ('succ_indptr', 'succ_indices', 'succ_data',
+                     'pred_indptr', 'pred_indices', 'pred_data')
+
+
+class CompiledWorkflow:
+    """
+    The nodes, node attributes and edges of a workflow.
+
+    Parameters
+    ----------
+    ids : list
+        The id of each node, in topological order
+    attributes : dict
+        Maps the name of each numeric node attribute to a
+        :py:obj:`numpy.ndarray` of its value at each node (NaN where a node
+        does not have it)
+    structure : :py:class:`~topsim.core.adjacency.Structure`
+        The edges between nodes, by their position in `ids`
+    header : dict, optional
+        The 'header' of the workflow file
+    graph : dict, optional
+        Graph-level fields of the node-link data ('directed', 'graph', ...)
+    """
+
+    def __init__(self, ids, attributes, structure, header=None, graph=None):
+        self.ids = list(ids)
+        self.attributes = attributes
+        self.structure = structure
+        self.header = header or {}
+        self.graph = graph or {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def attribute(self, name, default=0):
+        """
+        The values of node attribute `name`, as a list, with `default` for
+        nodes that do not have it.
+        """
+        if name not in self.attributes:
+            return [default] * len(self)
+        values = self.attributes[name]
+        if values.dtype.kind == 'f':
+            values = np.where(np.isnan(values), default, values)
+        return values.tolist()
+
+    def max_out_degree(self):
+        """
+        The most successors of any node
+        """
+        degree = self.structure.out_degree()
+        return int(degree.max()) if len(degree) else 0
+
+    def to_networkx(self):
+        """
+        The workflow as a :py:obj:`networkx.DiGraph` of its node ids, as read
+        from its node-link JSON.
+        """
+        import networkx as nx
+
+        graph = nx.DiGraph(**self.graph.get('graph', {}))
+        graph.add_nodes_from(zip(self.ids, self._node_attributes()))
+        ids, structure = self.ids, self.structure
+        sources = np.repeat(np.arange(len(ids)), structure.out_degree())
+        graph.add_edges_from(
+            (ids[u], ids[v], {'transfer_data': d}) for u, v, d in zip(
+                sources.tolist(), structure.succ_indices.tolist(),
+                structure.succ_data.tolist()))
+        return graph
+
+    def to_node_link(self):
+        """
+        The workflow as node-link JSON data, with its 'header'.
+        """
+        import networkx as nx
+
+        graph = nx.readwrite.node_link_data(self.to_networkx(), edges='links')
+        graph.update({k: v for k, v in self.graph.items() if k not in graph})
+        return {'header': self.header, 'graph': graph}
+
+    def _node_attributes(self):
+        columns = {name: values.tolist()
+                   for name, values in self.attributes.items()}
+        for i in range(len(self)):
+            yield {name: values[i] for name, values in columns.items()
+                   if values[i] == values[i]}
+
+    def save(self, path):
+        """
+        Write the workflow to the `.npz` file at `path`.
+        """
+        ids = np.asarray(self.ids)
+        if ids.dtype.kind not in 'iu':
+            ids = np.asarray([str(i) for i in self.ids])
+        arrays = {f"attr/{name}": values
+                  for name, values in self.attributes.items()}
+        arrays.update({name: getattr(self.structure, name)
+                       for name in _STRUCTURE_ARRAYS})
+        meta = {'version': COMPILED_VERSION, 'header': self.header,
+                'graph': self.graph}
+        # Uncompressed, so that loading is a copy of each array
+        np.savez(path, ids=ids, meta=np.asarray(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def from_node_link(cls, data):
+        """
+        Compile the node-link JSON `data` of a workflow.
+        """
+        import networkx as nx
+
+        graph = nx.readwrite.node_link_graph(data['graph'], edges='links')
+        ids = list(nx.algorithms.topological_sort(graph))
+        names = {}
+        for node in ids:
+            for name, value in graph.nodes[node].items():
+                if isinstance(value, (int, float)):
+                    names.setdefault(name, None)
+        attributes = {}
+        for name in names:
+            values = [graph.nodes[n].get(name) for n in ids]
+            if any(v is None for v in values):
+                values = [np.nan if v is None else v for v in values]
+            attributes[name] = np.asarray(values)
+        fields = {k: v for k, v in data['graph'].items()
+                  if k not in ('nodes', 'links')}
+        return cls(ids, attributes, Structure.from_networkx(graph, ids),
+                   data.get('header'), fields)
+
+    @classmethod
+    def from_npz(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta['version'] != COMPILED_VERSION:
+                raise ValueError(
+                    f"{path} is a version {meta['version']} compiled "
+                    f"workflow; expected version {COMPILED_VERSION}")
+            structure = Structure(*(data[n] for n in _STRUCTURE_ARRAYS))
+            attributes = {key.split('/', 1)[1]: data[key]
+                          for key in data.files if key.startswith('attr/')}
+            ids = data['ids'].tolist()
+        return cls(ids, attributes, structure, meta['header'], meta['graph'])
+
+
+def is_compiled(path):
+    return Path(path).suffix == COMPILED_SUFFIX
+
+
+def load_workflow(path):
+    """
+    Read a workflow file, compiled or node-link JSON. The most recently
+    read workflows are cached, so should not be modified.
+
+    Returns
+    -------
+    workflow : :py:class:`CompiledWorkflow`
+    """
+    stat = Path(path).stat()
+    return _load_workflow(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=32)
+def _load_workflow(path, mtime, size):
+    # Keyed by modification time and size, so that a changed file is re-read
+    if is_compiled(path):
+        return CompiledWorkflow.from_npz(path)
+    with open(path, 'r') as infile:
+        return CompiledWorkflow.from_node_link(json.load(infile))
+
+
+def compile_workflow(source, output=None):
+    """
+    Compile the node-link JSON workflow at `source`.
+
+    Parameters
+    ----------
+    source : str or Path
+    output : str or Path, optional
+        By default, `source` with the suffix :py:data:`COMPILED_SUFFIX`
+
+    Returns
+    -------
+    output : Path
+    """
+    source = Path(source)
+    output = Path(output) if output else source.with_suffix(COMPILED_SUFFIX)
+    if output.suffix != COMPILED_SUFFIX:
+        raise ValueError(
+            f"Compiled workflows must have the suffix {COMPILED_SUFFIX}")
+    load_workflow(source).save(output)
+    LOGGER.info("Compiled %s to %s", source, output)
+    return output
+
+
+def read_graph(path):
+    """
+    A :py:obj:`networkx.DiGraph` of the workflow file at `path`, compiled or
+    node-link JSON.
+    """
+    import networkx as nx
+
+    if is_compiled(path):
+        return load_workflow(path).to_networkx()
+    with open(path, 'r') as infile:
+        config = json.load(infile)
+    return nx.readwrite.node_link_graph(config['graph'], edges="links")
+
+
+def node_link_file(path, directory=None):
+    """
+    A node-link JSON file of the workflow at `path`, for libraries that only
+    read JSON: `path` itself, or the decompiled workflow, written to
+    `directory` (by default, the temporary directory) unless it already
+    has been since `path` last changed.
+    """
+    if not is_compiled(path):
+        return path
+    path = Path(path).resolve()
+    digest = hashlib.sha256(str(path).encode()).hexdigest()[:12]
+    target = (Path(directory or tempfile.gettempdir())
+              / f"{path.stem}-{digest}.json")
+    if not target.exists() or target.stat().st_mtime < path.stat().st_mtime:
+        with open(target, 'w') as fp:
+            json.dump(load_workflow(path).to_node_link(), fp, default=_json)
+    return str(target)
+
+
+def _json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value)} is not JSON serialisable")
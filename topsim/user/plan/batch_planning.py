@@ -13,11 +13,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-import json
 import copy
-import networkx as nx
 
 from topsim.core.task import Task
+from topsim.core.adjacency import Adjacency
+from topsim.core.workflow import load_workflow, read_graph
 from topsim.algorithms.planning import Planning
 from topsim.core.planner import WorkflowStatus, WorkflowPlan
 
@@ -28,15 +28,13 @@ def _workflow_to_nx(workflow):
     Parameters
     ----------
     workflow
+        Node-link JSON or compiled workflow file
 
     Returns
     -------
     graph : networkx.DiGraph object
     """
-    with open(workflow, 'r') as infile:
-        config = json.load(infile)
-    graph = nx.readwrite.node_link_graph(config['graph'], edges="links")
-    return graph
+    return read_graph(workflow)
 
 
 class BatchPlanning(Planning):
@@ -71,52 +69,39 @@ class BatchPlanning(Planning):
         """
 
         plan = None
-        if self.algorithm is 'batch':
-            graph = _workflow_to_nx(observation.workflow)
+        if self.algorithm == 'batch':
+            # Read once for each workflow file, and shared between plans
+            workflow = load_workflow(observation.workflow)
+            nodes, structure = workflow.ids, workflow.structure
+            comp = workflow.attribute('comp')
+            data = workflow.attribute('task_data')
             est = clock # self._calc_workflow_est(observation, buffer)
-            # new_graph = nx.DiGraph()
-            mapping = {}
+            ids = [
+                self._create_observation_task_id(node, observation, clock)
+                for node in nodes
+            ]
             tasks = []
-            exec_order = list(nx.algorithms.topological_sort(graph))
-            for task in exec_order:
-                tid = self._create_observation_task_id(
-                    task, observation, clock
-                )
+            for i, node in enumerate(nodes):
                 dm = copy.copy(self.delay_model)
-                pred = list(graph.predecessors(task))
+                start, stop = structure.pred_indptr[i:i + 2]
                 predecessors = [
-                    self._create_observation_task_id(
-                        x, observation, clock
-                    ) for x in pred
+                    ids[j] for j in structure.pred_indices[start:stop]
                 ]
-
                 # Get the data transfer costs
-                edge_costs = {}
-                data = dict(graph.pred[task])
-                for element in data:
-                    pred_tid = self._create_observation_task_id(
-                        element, observation, clock
-                    )
-                    edge_costs[pred_tid] = data[element]["transfer_data"]
+                edge_costs = dict(zip(
+                    predecessors, structure.pred_data[start:stop].tolist()))
 
                 est, eft = 0, 0
                 machine_id = None
-                task_compute =  graph.nodes[task]['comp']
-                task_data = 0
-                if 'task_data' in  graph.nodes[task]:
-                    task_data = graph.nodes[task]['task_data']
-
                 taskobj = Task(
-                    tid, est, eft, machine_id, predecessors, task_compute,
-                    task_data, edge_costs, dm, gid=task
+                    ids[i], est, eft, machine_id, predecessors, comp[i],
+                    data[i], edge_costs, dm, gid=node
                 )
-                mapping[task] = taskobj
                 tasks.append(taskobj)
-            new_graph = nx.relabel_nodes(graph, mapping)
-            # exec_order = list(nx.algorithms.topological_sort(graph))
             return WorkflowPlan(
-                observation.name, est, -1, tasks, exec_order,
-                WorkflowStatus.SCHEDULED, max_ingest, new_graph
+                observation.name, est, -1, tasks, list(nodes),
+                WorkflowStatus.SCHEDULED, max_ingest,
+                adjacency=Adjacency(tasks, structure)
             )
 
         else:
@@ -0,0 +1,341 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Native HEFT planning.
+
+:py:class:`HEFTPlanning` is a built-in implementation of the Heterogeneous
+Earliest Finish Time heuristic (Topcuoglu et al., 2002), which produces the
+same plans as :py:class:`~topsim.user.plan.static_planning.SHADOWPlanning`
+with the 'heft' algorithm, without the SHADOW library:
+
+1. The runtime of each task on each class of machine (machines with the same
+   flops), and the cost of each edge, are computed as NumPy arrays over the
+   compiled workflow (:py:func:`~topsim.core.workflow.load_workflow`);
+2. Tasks are ranked by their upward rank, the length of the longest path
+   from the task to the exit of the workflow, using the mean runtime of
+   each task over the machines;
+3. In order of decreasing rank, each task is allocated to the machine on
+   which it finishes earliest, inserted into the first idle period of that
+   machine that is long enough, after its predecessors' data arrives.
+
+As in SHADOW, runtimes and edge costs are rounded to whole timesteps, and
+edge costs use the system bandwidth of the cluster, and are not incurred
+between tasks on the same machine.
+"""
+
+import copy
+import logging
+
+import numpy as np
+
+from topsim.algorithms.planning import Planning
+from topsim.core.adjacency import Adjacency
+from topsim.core.planner import WorkflowPlan, WorkflowStatus
+from topsim.core.task import Task
+from topsim.core.workflow import load_workflow
+
+LOGGER = logging.getLogger(__name__)
+
+
+class MachineClasses:
+    """
+    The machines available to a plan, grouped by their flops.
+
+    Parameters
+    ----------
+    machines : list of :py:obj:`~topsim.core.machine.Machine`
+
+    Attributes
+    ----------
+    ids : list
+        The id of each machine, in the order given
+    flops : numpy.ndarray
+        The flops of each class of machine
+    members : numpy.ndarray
+        The class of each machine
+    counts : numpy.ndarray
+        The number of machines in each class
+    """
+
+    def __init__(self, machines):
+        self.ids = [m.id for m in machines]
+        self.flops, self.members, self.counts = np.unique(
+            np.asarray([m.cpu for m in machines], dtype=float),
+            return_inverse=True, return_counts=True)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def runtimes(self, comp):
+        """
+        The runtime, in timesteps, of each task (row) on each class of
+        machine (column).
+        """
+        comp = np.asarray(comp, dtype=float)
+        return np.rint(comp[:, None] / self.flops[None, :])
+
+    def mean_runtime(self, runtimes):
+        """
+        The runtime of each task averaged over every machine
+        """
+        return runtimes @ self.counts / self.counts.sum()
+
+
+def upward_rank(structure, runtime, cost):
+    """
+    The upward rank of each node of a workflow.
+
+    Parameters
+    ----------
+    structure : :py:class:`~topsim.core.adjacency.Structure`
+        The edges of the workflow, with nodes in topological order
+    runtime : numpy.ndarray
+        The (mean) runtime of each node
+    cost : numpy.ndarray
+        The cost of each edge, in the order of `structure.succ_indices`
+
+    Returns
+    -------
+    rank : numpy.ndarray
+    """
+    indptr, indices = structure.succ_indptr, structure.succ_indices
+    rank = np.array(runtime, dtype=float)
+    # Successors always come later in topological order, so are ranked first
+    for i in range(len(rank) - 1, -1, -1):
+        start, stop = indptr[i], indptr[i + 1]
+        if stop > start:
+            rank[i] += (cost[start:stop] + rank[indices[start:stop]]).max()
+    return rank
+
+
+class _Timelines:
+    """
+    The periods for which each machine is allocated to tasks, in order of
+    their start, padded with infinity.
+    """
+
+    def __init__(self, machines, capacity=16):
+        self.starts = np.full((machines, capacity), np.inf)
+        self.finishes = np.full((machines, capacity), np.inf)
+        self.counts = np.zeros(machines, dtype=np.int64)
+
+    def earliest_start(self, machines, ready, duration):
+        """
+        The earliest time at or after `ready` that each of `machines` is
+        idle for `duration`.
+        """
+        # The idle periods of each machine end with the start of each task,
+        # and the last is unbounded
+        width = int(self.counts[machines].max()) + 1
+        ends = self.starts[machines, :width]
+        begins = np.zeros_like(ends)
+        begins[:, 1:] = self.finishes[machines, :width - 1]
+        start = np.maximum(begins, ready[:, None])
+        first = np.argmax(start + duration[:, None] <= ends, axis=1)
+        return start[np.arange(len(machines)), first]
+
+    def insert(self, machine, start, finish):
+        n = self.counts[machine]
+        if n + 1 == self.starts.shape[1]:
+            padding = np.full_like(self.starts, np.inf)
+            self.starts = np.hstack((self.starts, padding))
+            self.finishes = np.hstack((self.finishes, padding))
+        i = np.searchsorted(self.starts[machine, :n], start, side='right')
+        for periods, value in ((self.starts, start), (self.finishes, finish)):
+            periods[machine, i + 1:n + 1] = periods[machine, i:n].copy()
+            periods[machine, i] = value
+        self.counts[machine] += 1
+
+
+def heft(structure, runtimes, cost, members, rank=None):
+    """
+    Allocate each node of a workflow to a machine with HEFT.
+
+    Parameters
+    ----------
+    structure : :py:class:`~topsim.core.adjacency.Structure`
+        The edges of the workflow, with nodes in topological order
+    runtimes : numpy.ndarray
+        The runtime of each node (row) on each class of machine (column)
+    cost : numpy.ndarray
+        The cost of each edge, in the order of `structure.succ_indices`
+    members : numpy.ndarray
+        The class of each machine
+    rank : numpy.ndarray, optional
+        The upward rank of each node; by default, using the mean runtime over
+        `members`
+
+    Returns
+    -------
+    order, start, finish, machine : numpy.ndarray
+        The order in which nodes were allocated, and the start and finish
+        time and machine of each node
+    """
+    size = len(structure)
+    if rank is None:
+        counts = np.bincount(members, minlength=runtimes.shape[1])
+        rank = upward_rank(structure, runtimes @ counts / counts.sum(), cost)
+    # Stable, so that ties keep topological order
+    order = np.argsort(-rank, kind='stable')
+
+    # The cost of each edge, grouped by target instead of source
+    sources = np.repeat(np.arange(size), structure.out_degree())
+    by_target = np.argsort(structure.succ_indices, kind='stable')
+    pred_sources, pred_cost = sources[by_target], cost[by_target]
+    pred_indptr = structure.pred_indptr
+
+    runtimes = runtimes[:, members]
+    machines = np.arange(len(members))
+    start, finish = np.zeros(size), np.zeros(size)
+    machine = np.full(size, -1, dtype=np.int64)
+    timelines = _Timelines(len(members))
+    # When each machine is next free, and when its last task starts
+    available = np.zeros(len(members))
+    last_start = np.full(len(members), -np.inf)
+    for i in order.tolist():
+        begin, end = pred_indptr[i], pred_indptr[i + 1]
+        preds = pred_sources[begin:end]
+        if len(preds):
+            # Data from predecessors on another machine arrives after its
+            # cost
+            arrival = finish[preds][:, None] + (
+                pred_cost[begin:end][:, None]
+                * (machine[preds][:, None] != machines[None, :]))
+            ready = arrival.max(axis=0)
+        else:
+            ready = np.zeros(len(members))
+        duration = runtimes[i]
+        # Starting after the last task on each machine...
+        starts = np.maximum(ready, available)
+        eft = starts + duration
+        # ...or earlier, in an idle period before the last task, on
+        # machines that could then finish first
+        earliest = ready + duration
+        idle = np.flatnonzero((earliest <= last_start)
+                              & (earliest <= eft.min()))
+        if len(idle):
+            starts[idle] = timelines.earliest_start(
+                idle, ready[idle], duration[idle])
+            eft[idle] = starts[idle] + duration[idle]
+        best = int(np.argmin(eft))
+        start[i], finish[i] = starts[best], eft[best]
+        machine[i] = best
+        timelines.insert(best, start[i], finish[i])
+        available[best] = max(available[best], finish[i])
+        last_start[best] = max(last_start[best], start[i])
+    return order, start, finish, machine
+
+
+class HEFTPlanning(Planning):
+    """
+    Plan workflows with the native HEFT implementation in this module, as an
+    alternative to :py:class:`~topsim.user.plan.static_planning.SHADOWPlanning`
+    that does not need SHADOW.
+
+    Parameters
+    ----------
+    algorithm : str
+        'heft' is the only algorithm supported
+    delay_model
+    """
+
+    def __init__(self, algorithm='heft', delay_model=None):
+        super().__init__(algorithm, delay_model)
+
+    def __str__(self):
+        return 'HEFTPlanning'
+
+    def to_string(self):
+        return self.__str__()
+
+    def generate_plan(self, clock, cluster, buffer, observation, max_ingest,
+                      task_data=False, edge_data=True):
+        """
+        Build a HEFT plan of the observation workflow on the machines
+        provisioned for it.
+
+        Parameters
+        ----------
+        clock : int
+            Current simulation time (usually provided through `env.now`)
+        cluster
+        buffer
+        observation
+        max_ingest
+        task_data
+        edge_data
+
+        Returns
+        -------
+        plan : :py:class:`~topsim.core.planner.WorkflowPlan`
+        """
+        if self.algorithm != 'heft':
+            raise RuntimeError(
+                f"{self.algorithm} is not implemented by {str(self)}"
+            )
+        if observation.ast is None:
+            raise RuntimeError(
+                f'Observation AST must be updated before plan'
+            )
+        machines = MachineClasses(
+            cluster.get_idle_resources(observation.name))
+        if not len(machines):
+            raise RuntimeError(
+                f"No resources are provisioned for {observation.name}")
+
+        workflow = load_workflow(observation.workflow)
+        structure = workflow.structure
+        comp = workflow.attribute('comp')
+        runtimes = machines.runtimes(comp)
+        cost = np.rint(structure.succ_data / cluster.system_bandwidth)
+        rank = upward_rank(structure, machines.mean_runtime(runtimes), cost)
+        order, start, finish, machine = heft(
+            structure, runtimes, cost, machines.members, rank)
+
+        ids = [self._create_observation_task_id(node, observation, clock)
+               for node in workflow.ids]
+        data = workflow.attribute('task_data')
+        start, finish = start.astype(int).tolist(), finish.astype(int).tolist()
+        tasks = [None] * len(ids)
+        for i in order.tolist():
+            begin, end = structure.pred_indptr[i:i + 2]
+            predecessors = [ids[j] for j in structure.pred_indices[begin:end]]
+            edge_costs = dict(zip(
+                predecessors, structure.pred_data[begin:end].tolist()))
+            tasks[i] = Task(
+                ids[i], start[i], finish[i], machines.ids[machine[i]],
+                predecessors, comp[i], data[i], edge_costs,
+                copy.copy(self.delay_model), gid=workflow.ids[i],
+                use_task_data=task_data, use_edge_data=edge_data
+            )
+        adjacency = Adjacency(tasks, structure)
+        exec_order = [ids[i] for i in order.tolist()]
+        tasks = [tasks[i] for i in order.tolist()]
+        tasks.sort(key=lambda x: x.est)
+        eft = max(finish) if finish else 0
+        LOGGER.debug("Solution makespan for %s is %s", self.algorithm, eft)
+
+        return WorkflowPlan(
+            observation.name, clock, eft, tasks, exec_order,
+            WorkflowStatus.SCHEDULED, max_ingest, adjacency=adjacency,
+        )
+
+    def to_df(self):
+        """
+        Produce output to be amalgamated into the global simulation data
+        frame produced by the Monitor
+        """
+        pass
@@ -15,14 +15,13 @@
 
 import logging
 import copy
-import networkx as nx
 
 from topsim.algorithms.planning import Planning
+from topsim.core.adjacency import Adjacency
+from topsim.core.workflow import node_link_file
 from topsim.core.planner import WorkflowPlan, WorkflowStatus
 from topsim.core.task import Task
 
-from shadow.algorithms.heuristic import heft, fcfs, pheft
-from shadow.models.workflow import Workflow, Environment
 
 LOGGER = logging.getLogger(__name__)
 
@@ -111,11 +110,12 @@ class SHADOWPlanning(Planning):
                 allocation.machine.id,
                 predecessors,
                 task.flops_demand, task.io_demand, edge_costs,
-                dm, use_task_data=task_data, use_edge_data=edge_data
+                dm, gid=task.tid, use_task_data=task_data,
+                use_edge_data=edge_data
             )
             mapping[task] = taskobj
             tasks.append(taskobj)
-        new_graph = nx.relabel_nodes(workflow.graph, mapping)
+        adjacency = Adjacency.from_networkx(workflow.graph, mapping)
         tasks.sort(key=lambda x: x.est)
         exec_order = [
             self._create_observation_task_id(x, observation, clock)
@@ -125,7 +125,7 @@ class SHADOWPlanning(Planning):
 
         return WorkflowPlan(
             observation.name, est, eft, tasks, exec_order,
-            WorkflowStatus.SCHEDULED, max_ingest, new_graph,
+            WorkflowStatus.SCHEDULED, max_ingest, adjacency=adjacency,
         )
 
     def to_df(self):
@@ -149,7 +149,10 @@ class SHADOWPlanning(Planning):
             A wrapper for NetworkX DiGraph object with additional information
 
         """
-        workflow = Workflow(observation.workflow)
+        from shadow.models.workflow import Workflow, Environment
+
+        # SHADOW reads node-link JSON, so compiled workflows are decompiled
+        workflow = Workflow(node_link_file(observation.workflow))
         available_resources = self._cluster_to_shadow_format(cluster, observation)
         workflow_env = Environment(available_resources, dictionary=True)
         workflow.add_environment(workflow_env)
@@ -181,6 +184,7 @@ class SHADOWPlanning(Planning):
             A solution object which describes a static schedule with
             additional information.
         """
+        from shadow.algorithms.heuristic import heft, fcfs, pheft
 
         if self.algorithm == 'heft':
             solution = heft(workflow)
@@ -15,10 +15,9 @@
 
 import copy
 import logging
-import json
-import networkx as nx
 
 from topsim.core.task import TaskStatus
+from topsim.core.workflow import load_workflow
 from topsim.core.planner import WorkflowStatus
 from topsim.algorithms.scheduling import Scheduling
 
@@ -43,6 +42,10 @@ class BatchProcessing(Scheduling):
 
     resource_split: dict
 
+    window : int, optional
+        Number of tasks considered for each free machine every timestep (see
+        :py:meth:`~topsim.algorithms.scheduling.Scheduling._considered`)
+
     """
 
     def __init__(
@@ -51,9 +54,10 @@ class BatchProcessing(Scheduling):
         min_resources_per_workflow=2,
         resource_split=None,
         ignore_ingest=False,
-        use_workflow_dop=False
+        use_workflow_dop=False,
+        window=None
     ):
-        super().__init__()
+        super().__init__(window)
         self.max_resources_split = max_resource_partitions
         self.min_resource_per_workflow = min_resources_per_workflow
         self.resource_split = resource_split
@@ -90,7 +94,7 @@ class BatchProcessing(Scheduling):
         if not task_pool and provision:
             for task in workflow_plan.tasks:
                 # id = int(task.id.split('_')[-1])
-                if not list(workflow_plan.graph.predecessors(task)):
+                if not workflow_plan.adjacency.has_predecessors(task):
                     task_pool.add(task)
         removed = set()
         added = set()
@@ -100,53 +104,29 @@ class BatchProcessing(Scheduling):
             # number of (greedy) allocations we can make
             # print(f"{clock}, {len(temporary_resources)=}")
             max_allocations_iteration = len(temporary_resources)
-            for task in task_pool:
+            # Iterate in a fixed order, so that allocations do not depend on
+            # the (per-process) hashing of the task pool.
+            for task in self._considered(
+                    cluster, workflow_plan, task_pool,
+                    len(temporary_resources)):
                 # If we have exhausted all possible allocations for this
                 # timest ep, there no need to iterat
                 if len(allocations) >= max_allocations_iteration:
                     break
                 if len(temporary_resources) > 0 and task not in allocations:
-                    if task.task_status is TaskStatus.UNSCHEDULED:
-                        # id = int(task.id.split('_')[-1])
-                        # Pick the next available machine
-                        m = temporary_resources[0]
-                        # If there are no predecessors, we can schedule
-                        # without issue
-                        if not list(workflow_plan.graph.predecessors(task)):
-                            # if not task.pred:
-                            tduration = int(task.flops / m.cpu)
-                            allocations[task] = m
-                            temporary_resources.remove(m)
-                            removed.add(task)
-                            added.update(workflow_plan.graph.successors(task))
-                        else:
-                            pred = list(workflow_plan.graph.predecessors(task))
-                            count = 0
-                            for p in pred:
-                                if cluster.is_task_finished(p):
-                                    count += 1
-                            if count < len(list(pred)):
-                                continue
-                            #
-                            # pred = set(task.pred)
-                            # finished = set(
-                            #     t.id for t in cluster.get_finished_tasks()
-                            # )
-                            # # Check if there isn't an overlap between sets
-                            # if not pred.issubset(finished):
-                            #     # one of the predecessors is still running
-                            #     continue
-                            else:
-                                allocations[task] = m
-                                temporary_resources.remove(m)
-                                removed.add(task)
-                                added.update(
-                                    workflow_plan.graph.successors(task))
+                    # Pick the next available machine
+                    m = temporary_resources[0]
+                    allocations[task] = m
+                    temporary_resources.remove(m)
+                    removed.add(task)
+                    added.update(workflow_plan.adjacency.successors(task))
+            self._record_window(workflow_plan, removed,
+                                len(temporary_resources))
         task_pool -= removed
         task_pool.update(added)
         if len(workflow_plan.tasks) == 0:
             workflow_plan.status = WorkflowStatus.FINISHED
-            logger.debug(f'{workflow_plan.id} is finished.')
+            logger.debug('%s is finished.', workflow_plan.id)
             cluster.release_batch_resources(workflow_plan.id)
         return allocations, workflow_plan, task_pool
 
@@ -211,12 +191,8 @@ class BatchProcessing(Scheduling):
                 self.ingest_requirements = self.LOW_REALTIME_RESOURCES
                 
             if self.use_workflow_dop:
-                with open(observation.workflow, 'r') as infile:
-                    wfconfig = json.load(infile)
-                graph = nx.readwrite.json_graph.node_link_graph(wfconfig['graph'], edges="links")
-
-                graph_dop = (max(graph.out_degree(list(graph.nodes)),
-                             key=lambda x: x[1]))[1] / 2
+                workflow = load_workflow(observation.workflow)
+                graph_dop = workflow.max_out_degree() / 2
 
                 min_resources = int(graph_dop)
                 if min_resources == len(cluster):
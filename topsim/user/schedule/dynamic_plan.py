@@ -14,13 +14,11 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import copy
 import logging
-import json
-import pandas as pd
-import networkx as nx
 
 from topsim.algorithms.scheduling import Scheduling
 from topsim.core.planner import WorkflowStatus
 from topsim.core.task import TaskStatus
+from topsim.core.workflow import load_workflow
 
 logger = logging.getLogger(__name__)
 
@@ -35,9 +33,10 @@ class DynamicSchedulingFromPlan(Scheduling):
                  min_resources_per_workflow=2,
                  resource_split=None,
                  ignore_ingest=False,
-                 use_workflow_dop=False
+                 use_workflow_dop=False,
+                 window=None
                  ):
-        super().__init__()
+        super().__init__(window)
         self.accurate = 0
         self.alternate = 0
         self._report = True
@@ -91,7 +90,7 @@ class DynamicSchedulingFromPlan(Scheduling):
         replace = False
         if not task_pool:
             for task in workflow_plan.tasks:
-                if not list(workflow_plan.graph.predecessors(task)):
+                if not workflow_plan.adjacency.has_predecessors(task):
                     task_pool.add(task)
         removed = set()
         added = set()
@@ -103,51 +102,31 @@ class DynamicSchedulingFromPlan(Scheduling):
                 logger.info("%s available resources", len(temporary_resources))
                 self._report = False
             max_allocations_iteration = len(temporary_resources)
-            for task in sorted(task_pool, key=lambda x: x.est):
+            for task in self._considered(
+                    cluster, workflow_plan, task_pool,
+                    len(temporary_resources)):
                 # If we have exhausted all possible allocations for this
                 # timestep, there no need to iterat
                 if len(allocations) >= max_allocations_iteration:
                     break
-                if (
-                        task.task_status is TaskStatus.UNSCHEDULED
-                        and task not in allocations
-                        and len(temporary_resources) > 0
-                ):
+                if task not in allocations and len(temporary_resources) > 0:
                     # Are we workflow - delayed?
                     # if workflow_plan.ast > workflow_plan.est:
                     #     workflow_plan.status = WorkflowStatus.DELAYED
-                    # Task has no predecssors
                     machine = cluster.get_machine_from_id(task.allocated_machine_id)
                     if machine not in temporary_resources:
                         continue
-                    if not list(workflow_plan.graph.predecessors(task)):
+                    # Task has no predecssors
+                    if not workflow_plan.adjacency.has_predecessors(task):
                         workflow_plan.status = WorkflowStatus.SCHEDULED
-                        # We do not update the allocations
-                        allocations[task] = machine
-                        self.accurate += 1
-                        temporary_resources.remove(machine)
-                        removed.add(task)
-                        added.update(workflow_plan.graph.successors(task))
-                    # The task has predecessors
-                    else:
-                        # If the set of finished tasks does not contain all
-                        # of the previous tasks, we cannot start yet.
-                        pred = list(
-                            workflow_plan.graph.predecessors(task)
-                        )  # set(task.pred)
-                        count = 0
-                        for p in pred:
-                            if cluster.is_task_finished(p):
-                                count += 1
-                        if count < len(pred):
-                            # One of the predecessors of 't' is still running
-                            continue
-                        else:
-                            allocations[task] = machine
-                            temporary_resources.remove(machine)
-                            removed.add(task)
-                            added.update((workflow_plan.graph.successors(task)))
-                            self.accurate += 1
+                    # We do not update the allocations
+                    allocations[task] = machine
+                    temporary_resources.remove(machine)
+                    removed.add(task)
+                    added.update(workflow_plan.adjacency.successors(task))
+                    self.accurate += 1
+            self._record_window(workflow_plan, removed,
+                                len(temporary_resources))
 
         task_pool -= removed
         task_pool.update(added)
@@ -158,6 +137,7 @@ class DynamicSchedulingFromPlan(Scheduling):
         return allocations, workflow_plan, task_pool
 
     def to_df(self):
+        import pandas as pd
         df = pd.DataFrame()
         df["alternate"] = [self.alternate]
         df["accurate"] = [self.accurate]
@@ -229,12 +209,8 @@ class DynamicSchedulingFromPlan(Scheduling):
                 self.ingest_requirements = self.LOW_REALTIME_RESOURCES
             
             if self.use_workflow_dop:
-                with open(observation.workflow, 'r') as infile:
-                    wfconfig = json.load(infile)
-                graph = nx.readwrite.json_graph.node_link_graph(wfconfig['graph'], edges="links")
-
-                graph_dop = (max(graph.out_degree(list(graph.nodes)),
-                             key=lambda x: x[1]))[1] / 2
+                workflow = load_workflow(observation.workflow)
+                graph_dop = workflow.max_out_degree() / 2
 
                 min_resources = int(graph_dop)
                 if min_resources == len(cluster):
@@ -281,7 +257,7 @@ class DynamicSchedulingFromPlan(Scheduling):
                 if provision < self.min_resource_per_workflow:
                     return False
                 else:
-                    logger.info(f"{provision} machines provisioned for {observation.name}")
+                    # Traced by the cluster (TracePoint.PROVISION)
                     return cluster.provision_batch_resources(provision,
                                                              observation.name)
             else:
@@ -297,5 +273,6 @@ class GlobalDagDelayHeuristic(Scheduling):
         return None, None, workflow_plan.status
 
     def to_df(self):
+        import pandas as pd
         df = pd.DataFrame()
         return df
@@ -15,7 +15,6 @@
 
 import copy
 import logging
-import pandas as pd
 
 from topsim.algorithms.scheduling import Scheduling
 from topsim.core.planner import WorkflowStatus
@@ -94,7 +93,7 @@ class GreedySchedulingFromPlan(Scheduling):
                     # previous tasks, we cannot start yet.
                     pred = set(task.pred)
                     # finished = set(t.id for t in cluster.tasks['finished'])
-                    finished = set(t.id for t in cluster.finished_tasks)
+                    finished = set(cluster.finished_tasks)
                     # machine = cluster.dmachine[task.machine]
                     machine = cluster.get_machine_from_id(task.allocated_machine_id)
                     # Check if there is an overlap between the two sets
@@ -126,6 +125,8 @@ class GreedySchedulingFromPlan(Scheduling):
         df : pd.DataFrame
             Pandas DataFrame object
         """
+        import pandas as pd
+
         df = pd.DataFrame()
         df['alternate'] = [self.alternate]
         df['accurate'] = [self.accurate]
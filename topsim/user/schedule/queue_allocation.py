@@ -15,7 +15,6 @@
 
 import copy
 import logging
-import networkx as nx
 
 from topsim.core.task import TaskStatus
 from topsim.core.planner import WorkflowStatus
@@ -68,7 +67,7 @@ class QueueProcessing(Scheduling):
 
         if not task_pool:
             for task in workflow_plan.tasks:
-                if not list(workflow_plan.graph.predecessors(task)):
+                if not workflow_plan.adjacency.has_predecessors(task):
                     task_pool.add(task)
         removed = set()
         added = set()
@@ -87,15 +86,15 @@ class QueueProcessing(Scheduling):
                     m = temporary_resources[0]
                     # If there are no predecessors, we can schedule
                     # without issue
-                    if not list(workflow_plan.graph.predecessors(task)):
+                    if not workflow_plan.adjacency.has_predecessors(task):
                         # if not task.pred:
                         tduration = int(task.flops / m.cpu)
                         allocations[task] = m
                         temporary_resources.remove(m)
                         removed.add(task)
-                        added.update(workflow_plan.graph.successors(task))
+                        added.update(workflow_plan.adjacency.successors(task))
                     else:
-                        pred = list(workflow_plan.graph.predecessors(task))
+                        pred = workflow_plan.adjacency.predecessors(task)
                         count = 0
                         for p in pred:
                             if cluster.is_task_finished(p):
@@ -106,12 +105,12 @@ class QueueProcessing(Scheduling):
                             allocations[task] = m
                             temporary_resources.remove(m)
                             removed.add(task)
-                            added.update(workflow_plan.graph.successors(task))
+                            added.update(workflow_plan.adjacency.successors(task))
         task_pool -= removed
         task_pool.update(added)
         if len(workflow_plan.tasks) == 0:
             workflow_plan.status = WorkflowStatus.FINISHED
-            logger.debug(f"{workflow_plan.id} is finished.")
+            logger.debug('%s is finished.', workflow_plan.id)
             cluster.release_batch_resources(workflow_plan.id)
         return allocations, workflow_plan.status, task_pool
 
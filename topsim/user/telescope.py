@@ -1,11 +1,12 @@
 # import simpy
 # from core.planner import Planner
 # import config_data
-import pandas as pd
 import logging
 
 from topsim.core.instrument import Instrument, RunStatus
 from topsim.core.scheduler import ScheduleStatus
+from topsim.core.trace import TRACE, TracePoint
+from topsim.core.eventbus import Event, EventBus
 
 LOGGER = logging.getLogger(__name__)
 
@@ -78,7 +79,7 @@ class Telescope(Instrument):
         #: :py:obj:`~topsim.core.olanner.Planner` object of Simulation
         self.planner = planner
         self.observation_types = None
-        self.events = []
+        self.bus = EventBus()
         self.telescope_status = False
         self.telescope_use = 0
         self.delayed = False
@@ -123,7 +124,6 @@ class Telescope(Instrument):
         """
         while self.has_observations_to_process():
             # Check if scheduler is delayed
-            self.events = []
             if (
                     self.scheduler.schedule_status is ScheduleStatus.DELAYED
                     and not self.delayed):
@@ -144,8 +144,10 @@ class Telescope(Instrument):
                         ret = self.begin_observation(observation)
                         observation.ast = self.env.now
 
-                        LOGGER.info('telescope is now using %s arrays',
-                                    self.telescope_use)
+                        if TRACE.instrument:
+                            TRACE.record(TracePoint.TELESCOPE_USE,
+                                         self.env.now, observation.name,
+                                         self.telescope_use)
                         process = self.env.process(
                             self.scheduler.allocate_ingest(observation,
                                                            self.pipelines,
@@ -156,15 +158,14 @@ class Telescope(Instrument):
                                              self.telescope_status):
                     observation.status = self.finish_observation(observation)
                     self._add_event(observation, "telescope", "finished")
-                    LOGGER.info('Telescope is now using %s arrays',
-                                self.telescope_use)
+                    if TRACE.instrument:
+                        TRACE.record(TracePoint.TELESCOPE_USE, self.env.now,
+                                     observation.name, self.telescope_use)
                 else:
                     continue
 
             yield self.env.timeout(1)
 
-        self.events = []
-
     def begin_observation(self, observation):
         """
         Update the telescope use status based on observation demand for antennas
@@ -304,11 +305,15 @@ class Telescope(Instrument):
         return False
 
     def to_df(self):
-        df = pd.DataFrame()
-        df['observations_waiting'] = [self.observations_waiting()]
-        df['observations_finished'] = [self.observations_finished()]
-        df['observations_delayed'] = [self._calc_observation_delay()]
-        return df
+        import pandas as pd
+        return pd.DataFrame({k: [v] for k, v in self.to_record().items()})
+
+    def to_record(self):
+        return {
+            'observations_waiting': self.observations_waiting(),
+            'observations_finished': self.observations_finished(),
+            'observations_delayed': self._calc_observation_delay(),
+        }
 
     def _calc_observation_delay(self):
         cum_delay = 0
@@ -319,10 +324,5 @@ class Telescope(Instrument):
         return cum_delay
 
     def _add_event(self, observation, resource, event):
-        self.events.append(
-            {
-                "time": int(self.env.now), "actor": "instrument",
-                "observation": observation.name, "event": event,
-                "resource": resource
-            }
-        )
+        self.bus.publish(Event(int(self.env.now), "instrument",
+                               observation.name, event, resource))
@@ -0,0 +1,395 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Post-run analytics of simulation results.
+
+Each metric is computed with whole-column NumPy/pandas operations on the
+tables a simulation produces: the task table, the event summary, the
+per-timestep (or change-only) 'sim' table and the machine occupancy log.
+Tables may be :py:obj:`pandas.DataFrame` or
+:py:class:`~topsim.core.table.Table`.
+
+>>> sim, tasks = simulation.start()
+>>> analytics.queue_wait(simulation.monitor.events)
+>>> simulation.summary()
+{'makespan': 215.0, 'tasks': 30, ...}
+
+Every simulation in a results file (HDF5, a `.npz`/CSV/Arrow table file, or
+a Parquet/Arrow dataset directory) can be summarised at once:
+
+>>> analytics.summarise_runs('results.h5')
+"""
+
+import logging
+
+import numpy as np
+
+from pathlib import Path
+
+from topsim.core.output import (
+    HDF5Output, PARTITION_FIELDS, DATASET_FORMATS)
+from topsim.core.table import Table
+
+LOGGER = logging.getLogger(__name__)
+
+#: Buffer columns of the 'sim' table, which record remaining capacity
+BUFFER_COLUMNS = ('hot_buffer', 'cold_buffer')
+
+#: Names of the event table in the outputs of each engine
+EVENT_TABLES = ('summary', 'events')
+
+#: Substring of the ids of the tasks that ingest an observation
+_INGEST = '_ingest_'
+
+
+def _frame(data):
+    if isinstance(data, Table):
+        return data.to_df()
+    return data
+
+
+def _task_frame(tasks, ingest=False):
+    """
+    The task table as a DataFrame, without ingest tasks unless `ingest`.
+    """
+    df = _frame(tasks)
+    if ingest or len(df) == 0:
+        return df
+    ids = df['task_id'] if 'task_id' in df.columns else df.index.to_series()
+    return df[~ids.astype(str).str.contains(_INGEST, regex=False).values]
+
+
+def makespan(tasks):
+    """
+    The time at which the last task finished.
+    """
+    df = _frame(tasks)
+    if len(df) == 0:
+        return 0.0
+    return float(np.nanmax(df['aft'].to_numpy(dtype=float)))
+
+
+def queue_wait(events):
+    """
+    How long each observation waited in the buffer before the scheduler
+    started to allocate its tasks.
+
+    Parameters
+    ----------
+    events : DataFrame or Table
+        The event summary of a simulation (:py:attr:`Monitor.events`)
+
+    Returns
+    -------
+    wait : :py:obj:`pandas.DataFrame`
+        Indexed by observation, with the time it was 'added' to the buffer,
+        the time allocation 'started', and the 'wait' between them; 'started'
+        and 'wait' are NaN for observations that were never scheduled
+    """
+    import pandas as pd
+
+    df = _frame(events)
+    actor, resource, event = (df[c].to_numpy() for c in
+                              ('actor', 'resource', 'event'))
+    added = df[(actor == 'buffer') & (resource == 'buffer')
+               & (event == 'added')]
+    started = df[(actor == 'scheduler') & (resource == 'allocation')
+                 & (event == 'started')]
+    wait = pd.DataFrame({
+        'added': added.groupby('observation')['time'].min(),
+        'started': started.groupby('observation')['time'].min(),
+    }).astype(float)
+    wait = wait[wait['added'].notna()]
+    wait['wait'] = wait['started'] - wait['added']
+    wait.index.name = 'observation'
+    return wait
+
+
+def workflow_runtime(tasks):
+    """
+    The runtime of each observation's workflow, against its plan.
+
+    Returns
+    -------
+    runtime : :py:obj:`pandas.DataFrame`
+        Indexed by observation, with the 'actual' time from the first task
+        starting to the last finishing, the 'planned' time of the same, and
+        their 'ratio'
+    """
+    df = _task_frame(tasks)
+    grouped = df.groupby('observation_id').agg(
+        ast=('ast', 'min'), aft=('aft', 'max'),
+        est=('est', 'min'), eft=('eft', 'max')).astype(float)
+    runtime = grouped.assign(
+        actual=grouped['aft'] - grouped['ast'],
+        planned=grouped['eft'] - grouped['est'])[['actual', 'planned']]
+    runtime['ratio'] = (runtime['actual']
+                        / runtime['planned'].where(runtime['planned'] > 0))
+    runtime.index.name = 'observation'
+    return runtime
+
+
+def task_slowdown(tasks):
+    """
+    The actual runtime of each task divided by its planned runtime; NaN for
+    tasks planned to take no time.
+
+    Returns
+    -------
+    slowdown : :py:obj:`pandas.Series`
+    """
+    df = _task_frame(tasks)
+    actual = df['aft'].to_numpy(dtype=float) - df['ast'].to_numpy(dtype=float)
+    planned = df['eft'].to_numpy(dtype=float) - df['est'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slowdown = np.where(planned > 0, actual / planned, np.nan)
+    return _series(slowdown, df)
+
+
+def _series(values, df):
+    import pandas as pd
+
+    if 'task_id' in df.columns:
+        return pd.Series(values, index=df['task_id'].to_numpy())
+    return pd.Series(values, index=df.index)
+
+
+def utilisation(occupancy, machines, start=0, end=None, kind=None):
+    """
+    The fraction of the capacity of the cluster (machine-seconds) that was
+    occupied during `[start, end)`; see also
+    :py:meth:`~topsim.core.occupancy.OccupancyLog.utilisation`.
+
+    Parameters
+    ----------
+    occupancy : DataFrame or Table
+        The machine occupancy log (the 'occupancy' output table)
+    machines : int
+        The number of machines in the cluster
+    start, end : int, optional
+        By default, from 0 to the end of the last interval
+    kind : str, optional
+        Only count work of this kind ('ingest' or 'task')
+
+    Returns
+    -------
+    utilisation : float
+    """
+    df = _frame(occupancy)
+    if kind is not None:
+        df = df[df['kind'].to_numpy() == kind]
+    starts = df['start'].to_numpy(dtype=float)
+    ends = df['end'].to_numpy(dtype=float)
+    if end is None:
+        end = np.nanmax(np.concatenate([ends, starts, [start]]))
+    # Intervals that are still open end at `end`
+    ends = np.where(np.isnan(ends), end, ends)
+    if end <= start or machines <= 0:
+        return 0.0
+    occupied = np.clip(np.minimum(ends, end) - np.maximum(starts, start),
+                       0, None).sum()
+    return float(occupied / (machines * (end - start)))
+
+
+def buffer_high_water(sim, capacity=None):
+    """
+    The most data held in each buffer at once, and when it was first held.
+
+    Parameters
+    ----------
+    sim : DataFrame or Table
+        The 'sim' table, dense or of changes only; its buffer columns record
+        the remaining capacity of each buffer
+    capacity : dict, optional
+        The total capacity of each of :py:data:`BUFFER_COLUMNS`; by default,
+        the most capacity recorded, which is the capacity of a buffer that
+        starts empty
+
+    Returns
+    -------
+    high_water : :py:obj:`pandas.DataFrame`
+        Indexed by buffer, with the 'used' capacity and its 'time'
+    """
+    import pandas as pd
+
+    df = _frame(sim)
+    capacity = capacity or {}
+    if 'time' in df.columns:
+        times = df['time'].to_numpy()
+    else:
+        times = df.index.to_numpy()
+    rows = {}
+    for name in BUFFER_COLUMNS:
+        if name not in df.columns or len(df) == 0:
+            continue
+        remaining = pd.to_numeric(df[name], errors='coerce').to_numpy(
+            dtype=float)
+        total = capacity.get(name, np.nanmax(remaining))
+        peak = int(np.nanargmin(remaining))
+        rows[name] = {'used': float(total - remaining[peak]),
+                      'time': times[peak]}
+    return pd.DataFrame.from_dict(
+        rows, orient='index', columns=['used', 'time'])
+
+
+def summary(tasks, events, sim=None, occupancy=None, machines=None,
+            capacity=None):
+    """
+    Summarise a simulation with scalar metrics.
+
+    Parameters
+    ----------
+    tasks, events : DataFrame or Table
+        The task table and event summary
+    sim : DataFrame or Table, optional
+        The 'sim' table, for buffer high-water marks (and the number of
+        machines, if `machines` is not given)
+    occupancy : DataFrame or Table, optional
+        The machine occupancy log, for utilisation
+    machines : int, optional
+        The number of machines in the cluster
+    capacity : dict, optional
+        See :py:func:`buffer_high_water`
+
+    Returns
+    -------
+    summary : dict
+    """
+    end = makespan(tasks)
+    wait = queue_wait(events)['wait']
+    runtime = workflow_runtime(tasks)
+    slowdown = task_slowdown(tasks).to_numpy()
+    slowdown = slowdown[~np.isnan(slowdown)]
+    metrics = {
+        'makespan': end,
+        'tasks': len(_task_frame(tasks)),
+        'observations': len(runtime),
+        'mean_queue_wait': _mean(wait),
+        'max_queue_wait': float(wait.max()) if wait.notna().any() else np.nan,
+        'mean_workflow_runtime': _mean(runtime['actual']),
+        'mean_runtime_ratio': _mean(runtime['ratio']),
+        'mean_task_slowdown': (float(slowdown.mean()) if len(slowdown)
+                               else np.nan),
+        'p95_task_slowdown': (float(np.percentile(slowdown, 95))
+                              if len(slowdown) else np.nan),
+    }
+    if sim is not None:
+        sim = _frame(sim)
+        if machines is None and 'available_resources' in sim.columns:
+            machines = int(sim['available_resources'].max())
+        high_water = buffer_high_water(sim, capacity)
+        for name in high_water.index:
+            metrics[f'{name}_high_water'] = high_water.loc[name, 'used']
+    if occupancy is not None and machines:
+        metrics['utilisation'] = utilisation(occupancy, machines, 0, end)
+    return metrics
+
+
+def _mean(series):
+    return float(series.mean()) if series.notna().any() else np.nan
+
+
+def read_runs(path, format='parquet'):
+    """
+    Read the tables of every simulation in a results file.
+
+    Parameters
+    ----------
+    path : str or Path
+        An HDF5 file, a `.npz`, CSV or Arrow table file (of one simulation),
+        or a Parquet/Arrow dataset directory
+    format : str
+        The format of a dataset directory
+
+    Yields
+    ------
+    partition : dict
+        The :py:data:`~topsim.core.output.PARTITION_FIELDS` of the
+        simulation (empty for a table file)
+    tables : dict
+        Maps each table name to a :py:obj:`pandas.DataFrame`
+    """
+    path = Path(path)
+    if path.is_dir():
+        yield from _read_dataset_runs(path, format)
+    elif path.suffix in ('.npz', '.csv', '.arrow'):
+        from topsim.core.table import read_tables
+
+        yield {}, {name: table.to_df()
+                   for name, table in read_tables(path).items()}
+    else:
+        yield from _read_hdf5_runs(path)
+
+
+def _read_hdf5_runs(path):
+    import pandas as pd
+
+    with pd.HDFStore(path, mode='r') as store:
+        runs = {}
+        for key in store.keys():
+            partition, name = HDF5Output.parse_key(key)
+            runs.setdefault(HDF5Output.key(partition),
+                            (partition, []))[1].append(name)
+        for run, (partition, names) in runs.items():
+            yield partition, {name: store.get(f"/{run}/{name}")
+                              for name in names}
+
+
+def _read_dataset_runs(path, format):
+    from topsim.core.output import read_dataset
+
+    runs = {}
+    for directory in sorted(path.iterdir()):
+        if not directory.is_dir():
+            continue
+        df = read_dataset(path, directory.name, format=format).to_pandas()
+        for key, rows in df.groupby(list(PARTITION_FIELDS), observed=True):
+            runs.setdefault(key, {})[directory.name] = rows.drop(
+                columns=list(PARTITION_FIELDS)).reset_index(drop=True)
+    for key, tables in runs.items():
+        yield dict(zip(PARTITION_FIELDS, map(str, key))), tables
+
+
+def summarise_runs(path, format='parquet'):
+    """
+    :py:func:`summary` of every simulation in a results file (see
+    :py:func:`read_runs`) that has a task table.
+
+    Returns
+    -------
+    summaries : :py:obj:`pandas.DataFrame`
+        A row for each simulation, indexed by its partition fields
+    """
+    import pandas as pd
+
+    if format not in DATASET_FORMATS:
+        raise ValueError(
+            f"format must be one of {tuple(DATASET_FORMATS)}, not '{format}'")
+    rows = []
+    for partition, tables in read_runs(path, format):
+        events = next((tables[n] for n in EVENT_TABLES if n in tables), None)
+        if 'tasks' not in tables or events is None:
+            LOGGER.warning("Skipping %s, which has no task or event table",
+                           partition or path)
+            continue
+        rows.append({**partition, **summary(
+            tables['tasks'], events, tables.get('sim'),
+            tables.get('occupancy'))})
+    df = pd.DataFrame(rows)
+    fields = [f for f in PARTITION_FIELDS if f in df.columns]
+    if fields:
+        df = df.set_index(fields)
+    return df
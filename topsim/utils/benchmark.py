@@ -0,0 +1,569 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Performance benchmarks for the simulation.
+
+Each benchmark scenario starts from the canonical test configuration
+(`test/data/config/standard_simulation.json`) and scales one dimension of it:
+the number of machines in the cluster, the number of tasks in each workflow,
+the number of observations, or the (simulated) duration of each observation.
+Scenarios are run in a fresh process so that peak memory use is measured
+for that scenario alone. The test configuration is only part of a source
+checkout; any other configuration may be scaled instead (`base`, or
+`topsim bench --base-config`).
+
+The results of a benchmark are saved as JSON so that they can be compared
+across versions:
+
+>>> results = run_benchmarks(scales=['small', 'medium'])
+>>> write_results(results, 'bench.json')
+>>> compare_results(load_results('baseline.json'), results)
+
+The size and load time of the 'tasks' workflow of each scale are compared
+between node-link JSON and the compiled format (see
+:py:mod:`topsim.core.workflow`).
+
+The makespan and wall time of a wide workflow are compared between
+scheduling windows (see :py:func:`measure_scheduling_window`), along with
+how often each window left ready tasks out of a scheduling decision.
+
+The time taken to import the simulation in a fresh interpreter is measured
+as well, as it is paid by every worker process of a sweep; heavy
+dependencies must only be imported on first use:
+
+>>> measure_import('topsim.core.simulation')
+{'module': 'topsim.core.simulation', 'import_time': 0.21, 'heavy_modules': []}
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import resource
+import tempfile
+import subprocess
+
+import simpy
+
+from pathlib import Path
+from datetime import datetime
+from importlib.metadata import version, PackageNotFoundError
+
+LOGGER = logging.getLogger(__name__)
+
+#: The configuration (and workflow) every scenario is derived from
+BASE_CONFIG = (Path(__file__).parents[2]
+               / "test/data/config/standard_simulation.json")
+
+#: The dimension of the base configuration each scenario scales
+SCENARIOS = ("machines", "tasks", "observations", "duration")
+
+#: Multiplier applied to the scaled dimension at each scale
+SCALES = {"small": 1, "medium": 4, "large": 16}
+
+#: Seconds in each of the timesteps supported by Config
+TIMESTEP_SECONDS = {"seconds": 1, "minutes": 60, "hours": 3600}
+
+#: Format version of the JSON results
+RESULTS_VERSION = 1
+
+#: Modules whose import time is measured
+IMPORT_MODULES = ("topsim.cli", "topsim.core.simulation",
+                  "topsim.utils.replicate")
+
+#: Dependencies that must not be imported until they are used
+HEAVY_MODULES = ("pandas", "tables", "h5py", "networkx", "shadow", "tqdm")
+
+#: Upper limit, in seconds, on the time taken by each of IMPORT_MODULES
+IMPORT_BUDGET = 1.0
+
+_IMPORT_SCRIPT = """
+import sys, json, time, importlib
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({
+    "import_time": time.perf_counter() - start,
+    "heavy_modules": [m for m in sys.argv[2:] if m in sys.modules],
+}))
+"""
+
+
+class _CountingEnvironment(simpy.Environment):
+    """
+    Environment that keeps a count of the events it has processed.
+    """
+
+    def __init__(self, initial_time=0):
+        super().__init__(initial_time)
+        self.processed = 0
+
+    def step(self):
+        self.processed += 1
+        super().step()
+
+
+def scenario_name(scenario, scale):
+    return f"{scenario}_{scale}"
+
+
+def build_scenario(scenario, scale, directory, base=BASE_CONFIG):
+    """
+    Write the configuration (and workflow) for a benchmark scenario.
+
+    Parameters
+    ----------
+    scenario : str
+        One of :py:data:`SCENARIOS`
+    scale : str
+        One of :py:data:`SCALES`
+    directory : str or Path
+        Directory in which the scenario files are written
+    base : str or Path
+        Configuration file that is scaled
+
+    Returns
+    -------
+    config : Path
+        Path to the scenario configuration file
+    """
+    if scenario not in SCENARIOS:
+        raise ValueError(f"{scenario} is not one of {SCENARIOS}")
+    if scale not in SCALES:
+        raise ValueError(f"{scale} is not one of {tuple(SCALES)}")
+    factor = SCALES[scale]
+    base = Path(base)
+    directory = Path(directory)
+    with open(base) as fp:
+        config = json.load(fp)
+
+    telescope = config["instrument"]["telescope"]
+    for name, pipeline in telescope["pipelines"].items():
+        workflow = base.parent / pipeline["workflow"]
+        if scenario == "tasks":
+            workflow = _replicate_workflow(
+                workflow, factor, directory / f"{name}_workflow.json")
+        pipeline["workflow"] = str(workflow.absolute())
+
+    if scenario == "machines":
+        for spec in config["cluster"]["system"]["resources"].values():
+            spec["count"] *= factor
+    elif scenario == "observations":
+        observations = telescope["observations"]
+        end = max(o["start"] + o["duration"] for o in observations)
+        telescope["observations"] = [
+            dict(o, name=o["name"], start=o["start"] + i * end)
+            for i in range(factor) for o in observations
+        ]
+        _scale_buffer(config, factor)
+    elif scenario == "duration":
+        for o in telescope["observations"]:
+            o["start"] *= factor
+            o["duration"] *= factor
+        _scale_buffer(config, factor)
+
+    path = directory / f"{scenario_name(scenario, scale)}.json"
+    with open(path, "w") as fp:
+        json.dump(config, fp, indent=2)
+    return path
+
+
+def _scale_buffer(config, factor):
+    """
+    Give the buffer room for the additional data produced by more, or
+    longer, observations.
+    """
+    config["buffer"]["hot"]["capacity"] *= factor
+    config["buffer"]["cold"]["capacity"] *= factor
+
+
+def _replicate_workflow(workflow, copies, path):
+    """
+    Write a workflow made up of `copies` independent copies of `workflow`.
+    """
+    with open(workflow) as fp:
+        wf = json.load(fp)
+    graph = wf["graph"]
+    nodes, links = [], []
+    for i in range(copies):
+        for node in graph["nodes"]:
+            nodes.append(dict(node, id=f"{i}_{node['id']}"))
+        for link in graph["links"]:
+            links.append(dict(link, source=f"{i}_{link['source']}",
+                              target=f"{i}_{link['target']}"))
+    wf["graph"] = dict(graph, nodes=nodes, links=links)
+    with open(path, "w") as fp:
+        json.dump(wf, fp)
+    return path
+
+
+def _peak_rss():
+    """
+    Peak resident set size of this process, in bytes.
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _run_scenario(scenario, scale, output, base=BASE_CONFIG):
+    """
+    Run a single benchmark scenario and measure it.
+
+    This is run in a fresh worker process (see :py:func:`run_benchmarks`),
+    so that the peak RSS is that of this scenario alone.
+    """
+    from topsim.core.simulation import Simulation
+    from topsim.user.telescope import Telescope
+    from topsim.user.plan.batch_planning import BatchPlanning
+    from topsim.user.schedule.batch_allocation import BatchProcessing
+
+    logging.getLogger("topsim").setLevel(logging.WARNING)
+    directory = Path(output)
+    config = build_scenario(scenario, scale, directory, base)
+    hdf5_path = directory / f"{scenario_name(scenario, scale)}.h5"
+    env = _CountingEnvironment()
+    simulation = Simulation(
+        env, config, Telescope, BatchPlanning("batch"), BatchProcessing(),
+        to_file=True, hdf5_path=str(hdf5_path), progress="none",
+        delimiters="bench"
+    )
+    timestep = simulation._cfg.timestep_unit
+    if not isinstance(timestep, int):
+        timestep = TIMESTEP_SECONDS.get(timestep, 1)
+    start = time.perf_counter()
+    simulation.start()
+    wall = time.perf_counter() - start
+    simulated = env.now * timestep
+    return {
+        "name": scenario_name(scenario, scale),
+        "scenario": scenario,
+        "scale": scale,
+        "factor": SCALES[scale],
+        "machines": len(simulation.cluster.machines),
+        "tasks": len(simulation.cluster.finished_tasks),
+        "observations": len(simulation.instrument.observations),
+        "wall_time": wall,
+        "simulated_time": simulated,
+        "simulated_per_wall": simulated / wall if wall else None,
+        "events": env.processed,
+        "events_per_second": env.processed / wall if wall else None,
+        "peak_rss": _peak_rss(),
+        "output_size": hdf5_path.stat().st_size,
+    }
+
+
+def measure_workflow_formats(scale, directory, base=BASE_CONFIG, repeat=3):
+    """
+    Compare the size and load time of the workflow of the 'tasks' scenario
+    at `scale`, as node-link JSON and compiled
+    (:py:func:`~topsim.core.workflow.compile_workflow`).
+
+    JSON is loaded as it was before workflows could be compiled, with
+    `json.load` and `node_link_graph`.
+
+    Returns
+    -------
+    result : dict
+        The number of tasks, and the size (bytes) and fastest load time
+        (seconds) of each format
+    """
+    import networkx as nx
+
+    from topsim.core.workflow import CompiledWorkflow, compile_workflow
+
+    with open(base) as fp:
+        pipeline = next(iter(
+            json.load(fp)["instrument"]["telescope"]["pipelines"].values()))
+    directory = Path(directory)
+    source = _replicate_workflow(
+        Path(base).parent / pipeline["workflow"], SCALES[scale],
+        directory / f"workflow_{scale}.json")
+    compiled = compile_workflow(source)
+
+    def load_json():
+        with open(source) as fp:
+            return nx.readwrite.node_link_graph(
+                json.load(fp)["graph"], edges="links")
+
+    def best(load):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            load()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    return {
+        "name": f"workflow_{scale}",
+        "tasks": len(CompiledWorkflow.from_npz(compiled)),
+        "json_size": source.stat().st_size,
+        "compiled_size": compiled.stat().st_size,
+        "json_load_time": best(load_json),
+        "compiled_load_time": best(
+            lambda: CompiledWorkflow.from_npz(compiled)),
+    }
+
+
+def measure_import(module, repeat=3):
+    """
+    Time the import of `module` in a fresh interpreter.
+
+    Parameters
+    ----------
+    module : str
+        Name of the module to import
+    repeat : int
+        Number of times the import is timed; the fastest is reported.
+
+    Returns
+    -------
+    result : dict
+        The fastest import time, in seconds, and which of
+        :py:data:`HEAVY_MODULES` were imported along with `module`.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (str(Path(__file__).parents[2]), env.get("PYTHONPATH"))
+        if p)
+    best = None
+    for _ in range(repeat):
+        process = subprocess.run(
+            [sys.executable, "-c", _IMPORT_SCRIPT, module, *HEAVY_MODULES],
+            capture_output=True, text=True, check=True, env=env)
+        result = json.loads(process.stdout)
+        if best is None or result["import_time"] < best["import_time"]:
+            best = result
+    return {"module": module, **best}
+
+
+def measure_scheduling_window(directory, windows=(None, 1, 2, 4),
+                              base=BASE_CONFIG, size=400, width=100):
+    """
+    Compare the makespan and wall time of a wide workflow scheduled with
+    each look-ahead window (see
+    :py:attr:`~topsim.algorithms.scheduling.Scheduling.window`).
+
+    A single observation of a layered workflow of `size` tasks, `width`
+    wide, is planned and scheduled with batch planning and processing, and
+    with native HEFT planning and dynamic scheduling from the plan.
+
+    Returns
+    -------
+    results : list of dict
+        For each combination of planning and window, the wall time
+        (seconds), makespan (timesteps), and the counts of timesteps
+        returned by
+        :py:meth:`~topsim.algorithms.scheduling.Scheduling.window_stats`
+    """
+    from topsim.core.simulation import Simulation
+    from topsim.user.telescope import Telescope
+    from topsim.user.plan.batch_planning import BatchPlanning
+    from topsim.user.plan.heft_planning import HEFTPlanning
+    from topsim.user.schedule.batch_allocation import BatchProcessing
+    from topsim.user.schedule.dynamic_plan import DynamicSchedulingFromPlan
+    from topsim.utils.generate import generate_workflow
+
+    directory = Path(directory)
+    workflow = directory / f"window_{size}.json"
+    # Tasks take a little over one timestep on a machine of the base
+    # configuration, so that many are ready at once
+    generate_workflow(workflow, shape="layered", size=size, width=width,
+                      comp=84 * 60, seed=1)
+    with open(base) as fp:
+        config = json.load(fp)
+    telescope = config["instrument"]["telescope"]
+    name, pipeline = next(iter(telescope["pipelines"].items()))
+    telescope["pipelines"] = {
+        name: dict(pipeline, workflow=str(workflow.absolute()))}
+    observation = next(o for o in telescope["observations"]
+                       if o["name"] == name)
+    telescope["observations"] = [dict(observation, duration=60)]
+    path = directory / f"window_{size}_config.json"
+    with open(path, "w") as fp:
+        json.dump(config, fp, indent=2)
+
+    models = {
+        "batch": (lambda: BatchPlanning("batch"), BatchProcessing),
+        "heft": (lambda: HEFTPlanning("heft"), DynamicSchedulingFromPlan),
+    }
+    results = []
+    for planning, (planner, scheduler) in models.items():
+        for window in windows:
+            algorithm = scheduler(window=window)
+            simulation = Simulation(
+                simpy.Environment(), path, Telescope, planner(), algorithm,
+                progress="none", timestamp=0)
+            start = time.perf_counter()
+            simulation.start()
+            results.append({
+                "name": f"{planning}_window_{window or 'all'}",
+                "tasks": size,
+                "wall_time": time.perf_counter() - start,
+                "makespan": simulation.env.now,
+                **algorithm.window_stats(),
+            })
+    return results
+
+
+def run_benchmarks(scenarios=SCENARIOS, scales=("small",), repeat=1,
+                   base=BASE_CONFIG):
+    """
+    Run each scenario at each scale.
+
+    Parameters
+    ----------
+    scenarios : iterable of str
+        Scenarios to run; see :py:data:`SCENARIOS`
+    scales : iterable of str
+        Scales at which each scenario is run; see :py:data:`SCALES`
+    repeat : int
+        Number of times each scenario is run; the fastest run is reported.
+    base : str or Path
+        Configuration (and workflow) from which each scenario is derived
+
+    Returns
+    -------
+    results : dict
+        Benchmark results, with the environment they were produced in.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+
+    # 'spawn' so the peak RSS of each worker starts from nothing
+    context = get_context("spawn")
+    runs = []
+    for scenario in scenarios:
+        for scale in scales:
+            best = None
+            for _ in range(repeat):
+                with tempfile.TemporaryDirectory() as tmp, \
+                        ProcessPoolExecutor(1, mp_context=context) as pool:
+                    result = pool.submit(
+                        _run_scenario, scenario, scale, tmp, base).result()
+                if best is None or result["wall_time"] < best["wall_time"]:
+                    best = result
+            LOGGER.info("%s: %.2fs", best["name"], best["wall_time"])
+            runs.append(best)
+    with tempfile.TemporaryDirectory() as tmp:
+        workflows = [
+            measure_workflow_formats(scale, tmp, base, max(repeat, 3))
+            for scale in scales
+        ]
+        windows = measure_scheduling_window(tmp, base=base)
+    return {
+        "version": RESULTS_VERSION,
+        "topsim": _topsim_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "runs": runs,
+        "imports": [measure_import(m, max(repeat, 3)) for m in IMPORT_MODULES],
+        "workflows": workflows,
+        "windows": windows,
+    }
+
+
+def _topsim_version():
+    try:
+        return version("topsim")
+    except PackageNotFoundError:
+        return None
+
+
+def write_results(results, path):
+    with open(path, "w") as fp:
+        json.dump(results, fp, indent=2)
+
+
+def load_results(path):
+    with open(path) as fp:
+        return json.load(fp)
+
+
+def compare_results(baseline, current):
+    """
+    Compare the wall time and peak RSS of each scenario with a baseline.
+
+    Parameters
+    ----------
+    baseline : dict
+        Results returned by :py:func:`run_benchmarks` or
+        :py:func:`load_results`
+    current : dict
+        Results returned by :py:func:`run_benchmarks`
+
+    Returns
+    -------
+    comparison : list of dict
+        One entry for each scenario present in both results, with the ratio
+        of current to baseline wall time and peak RSS (< 1 is an improvement)
+    """
+    previous = {r["name"]: r for r in baseline["runs"]}
+    comparison = []
+    for run in current["runs"]:
+        if run["name"] not in previous:
+            continue
+        old = previous[run["name"]]
+        comparison.append({
+            "name": run["name"],
+            "wall_time": run["wall_time"] / old["wall_time"],
+            "peak_rss": run["peak_rss"] / old["peak_rss"],
+        })
+    return comparison
+
+
+def format_results(results, comparison=None):
+    """
+    Format benchmark results as a plain-text table.
+    """
+    ratios = {c["name"]: c for c in comparison or []}
+    header = (f"{'scenario':<20}{'wall (s)':>10}{'sim s/s':>12}"
+              f"{'events/s':>12}{'RSS (MB)':>10}{'out (MB)':>10}")
+    if comparison is not None:
+        header += f"{'vs base':>10}"
+    lines = [header]
+    for run in results["runs"]:
+        line = (f"{run['name']:<20}{run['wall_time']:>10.2f}"
+                f"{run['simulated_per_wall']:>12.0f}"
+                f"{run['events_per_second']:>12.0f}"
+                f"{run['peak_rss'] / 2**20:>10.1f}"
+                f"{run['output_size'] / 2**20:>10.2f}")
+        if comparison is not None:
+            ratio = ratios.get(run["name"])
+            line += f"{ratio['wall_time']:>9.2f}x" if ratio else f"{'-':>10}"
+        lines.append(line)
+    for result in results.get("workflows", []):
+        lines.append(
+            f"{result['name']} ({result['tasks']} tasks): JSON "
+            f"{result['json_size'] / 2**20:.2f} MB in "
+            f"{result['json_load_time']:.4f}s, compiled "
+            f"{result['compiled_size'] / 2**20:.2f} MB in "
+            f"{result['compiled_load_time']:.4f}s")
+    for result in results.get("windows", []):
+        lines.append(
+            f"{result['name']}: makespan {result['makespan']} in "
+            f"{result['wall_time']:.2f}s, window truncated "
+            f"{result['window_truncated']} of "
+            f"{result['window_decisions']} timesteps")
+    for result in results.get("imports", []):
+        line = f"import {result['module']}: {result['import_time']:.3f}s"
+        if result["heavy_modules"]:
+            line += f" (imports {', '.join(result['heavy_modules'])})"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,335 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Catalogue of the simulations stored in many HDF5 results files.
+
+Indexing a results file records the key, tables, metadata, parameters and
+summary metrics (:py:func:`topsim.utils.analytics.summary`) of each
+simulation in it in a small SQLite database. Runs can then be found without
+opening any results file, and their tables loaded only when they are
+needed:
+
+>>> catalogue = Catalogue('catalogue.sqlite')
+>>> catalogue.index('sweep_output/')
+>>> runs = catalogue.find(planning='heft', scheduling='DynamicSchedulingFromPlan',
+...                       configuration='mos_sw10')
+>>> for run, sim in catalogue.load(runs, 'sim', jobs=4):
+...     ...
+
+Files are re-indexed only when they have changed since they were last
+indexed.
+"""
+
+import json
+import sqlite3
+import logging
+
+from pathlib import Path
+
+from topsim.core.output import HDF5Output, PARTITION_FIELDS
+from topsim.core.monitor import METADATA_COLUMNS
+
+LOGGER = logging.getLogger(__name__)
+
+#: Columns of each run in the catalogue, that may be queried directly
+RUN_COLUMNS = ('file', 'key') + PARTITION_FIELDS + METADATA_COLUMNS
+
+#: Suffixes of the results files found in a directory
+RESULTS_SUFFIXES = ('.h5', '.hdf5')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, mtime REAL, size INTEGER);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, file TEXT, key TEXT,
+    timestamp TEXT, delimiters TEXT, configuration TEXT, planning TEXT,
+    scheduling TEXT, config TEXT, delay TEXT, tables TEXT,
+    UNIQUE (file, key));
+CREATE TABLE IF NOT EXISTS attributes (
+    run INTEGER, kind TEXT, name TEXT, value,
+    PRIMARY KEY (run, kind, name));
+CREATE INDEX IF NOT EXISTS attributes_name ON attributes (name, value);
+"""
+
+
+class Catalogue:
+    """
+    SQLite index of the runs in HDF5 results files.
+
+    Parameters
+    ----------
+    path : str or Path
+        The catalogue database; created if it does not exist
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        return _Connection(self.path)
+
+    def __len__(self):
+        with self._connect() as db:
+            return db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def index(self, *paths, metrics=True, force=False):
+        """
+        Index the runs in each results file of `paths`.
+
+        Parameters
+        ----------
+        paths : str or Path
+            HDF5 results files, or directories that are searched
+            (recursively) for them
+        metrics : bool
+            Compute the summary metrics of runs that have a task table
+        force : bool
+            Re-index files that have not changed
+
+        Returns
+        -------
+        runs : int
+            The number of runs indexed
+        """
+        count = 0
+        for path in _results_files(paths):
+            stat = path.stat()
+            with self._connect() as db:
+                row = db.execute(
+                    "SELECT mtime, size FROM files WHERE path = ?",
+                    (str(path),)).fetchone()
+                if not force and row == (stat.st_mtime, stat.st_size):
+                    continue
+                self._remove(db, path)
+                for run, attributes in _read_runs(path, metrics):
+                    self._insert(db, run, attributes)
+                    count += 1
+                db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)",
+                           (str(path), stat.st_mtime, stat.st_size))
+            LOGGER.info("Indexed %s", path)
+        return count
+
+    @staticmethod
+    def _remove(db, path):
+        db.execute("DELETE FROM attributes WHERE run IN "
+                   "(SELECT id FROM runs WHERE file = ?)", (str(path),))
+        db.execute("DELETE FROM runs WHERE file = ?", (str(path),))
+
+    @staticmethod
+    def _insert(db, run, attributes):
+        columns = RUN_COLUMNS + ('tables',)
+        cursor = db.execute(
+            f"INSERT INTO runs ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            [run.get(c) for c in columns])
+        db.executemany(
+            "INSERT INTO attributes VALUES (?, ?, ?, ?)",
+            [(cursor.lastrowid, kind, name, value)
+             for kind, name, value in attributes])
+
+    def find(self, **criteria):
+        """
+        The runs that match every one of `criteria`.
+
+        Each criterion is the name of one of :py:data:`RUN_COLUMNS`, a
+        parameter or a metric, and the value (or list of values) it must
+        have. Strings containing `*` are matched as glob patterns, so that,
+        for example, `delimiters='heft/dynamic_plan/*'` finds the runs of a
+        sweep combination.
+
+        Returns
+        -------
+        runs : :py:obj:`pandas.DataFrame`
+            Indexed by run id, with the :py:data:`RUN_COLUMNS`, the tables
+            in the run and a column for each parameter and metric
+        """
+        import pandas as pd
+
+        where, values = [], []
+        for name, value in criteria.items():
+            if name in RUN_COLUMNS:
+                condition, args = _condition(name, value)
+            else:
+                condition, args = _condition('value', value)
+                condition = (f"EXISTS (SELECT 1 FROM attributes a WHERE "
+                             f"a.run = runs.id AND a.name = ? AND {condition})")
+                args = [name] + args
+            where.append(condition)
+            values.extend(args)
+        query = "SELECT * FROM runs"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        with self._connect() as db:
+            runs = pd.read_sql_query(query, db, params=values, index_col='id')
+            attributes = pd.read_sql_query(
+                "SELECT run, name, value FROM attributes WHERE run IN "
+                f"(SELECT id FROM ({query}))", db, params=values)
+        if len(attributes):
+            wide = attributes.pivot(index='run', columns='name',
+                                    values='value').infer_objects()
+            runs = runs.join(wide.drop(columns=runs.columns, errors='ignore'))
+        runs.index.name = 'run'
+        return runs
+
+    def load(self, runs, name='sim', jobs=1):
+        """
+        Read table `name` of each of `runs`, as it is needed.
+
+        Parameters
+        ----------
+        runs : :py:obj:`pandas.DataFrame`
+            Runs returned by :py:meth:`find`
+        name : str
+            The table to read
+        jobs : int
+            Read this many tables at once, in worker processes
+
+        Yields
+        ------
+        run : int
+            The id of the run
+        df : :py:obj:`pandas.DataFrame`
+        """
+        locations = [(file, f"{key}/{name}")
+                     for file, key in zip(runs['file'], runs['key'])]
+        if jobs <= 1:
+            for run, location in zip(runs.index, locations):
+                yield run, _read_table(*location)
+            return
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            # Only `jobs` tables are read ahead of the caller
+            pending = []
+            for run, location in zip(runs.index, locations):
+                pending.append((run, pool.submit(_read_table, *location)))
+                if len(pending) >= jobs:
+                    run, future = pending.pop(0)
+                    yield run, future.result()
+            for run, future in pending:
+                yield run, future.result()
+
+
+class _Connection:
+    """
+    SQLite connection that commits (or rolls back) and closes on exit
+    """
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+
+    def __enter__(self):
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.db.commit()
+        else:
+            self.db.rollback()
+        self.db.close()
+
+
+def _condition(column, value):
+    if isinstance(value, (list, tuple, set)):
+        value = list(value)
+        return f"{column} IN ({', '.join('?' * len(value))})", value
+    if isinstance(value, str) and '*' in value:
+        return f"{column} GLOB ?", [value]
+    return f"{column} = ?", [value]
+
+
+def _results_files(paths):
+    for path in paths:
+        path = Path(path).resolve()
+        if path.is_dir():
+            yield from sorted(p for p in path.rglob('*')
+                              if p.suffix in RESULTS_SUFFIXES)
+        else:
+            yield path
+
+
+def _read_table(file, key):
+    import pandas as pd
+
+    return pd.read_hdf(file, key=key)
+
+
+def _read_runs(path, metrics=True):
+    """
+    The catalogue entry of each run in the HDF5 file at `path`.
+
+    Yields
+    ------
+    run : dict
+        The values of :py:data:`RUN_COLUMNS`, and the 'tables' of the run
+    attributes : list of tuple
+        The (kind, name, value) of each parameter and metric
+    """
+    import pandas as pd
+
+    from topsim.utils import analytics
+
+    with pd.HDFStore(path, mode='r') as store:
+        runs = {}
+        for key in store.keys():
+            partition, name = HDF5Output.parse_key(key)
+            runs.setdefault(HDF5Output.key(partition),
+                            (partition, []))[1].append(name)
+        for key, (partition, names) in runs.items():
+            run = dict(partition)
+            run.update(file=str(path), key=key, tables=','.join(names))
+            attributes = []
+            if 'params' in names:
+                params = store.get(f"/{key}/params")
+                for name in params.columns:
+                    value = _scalar(params[name].iloc[0])
+                    if name in METADATA_COLUMNS:
+                        run[name] = value
+                    else:
+                        attributes.append(('param', name, value))
+            if 'sim' in names and not all(c in run for c in METADATA_COLUMNS):
+                # Dense time series repeat the metadata on every row
+                first = store.select(f"/{key}/sim", start=0, stop=1)
+                for name in METADATA_COLUMNS:
+                    if name in first.columns:
+                        run.setdefault(name, _scalar(first[name].iloc[0]))
+            if metrics and 'tasks' in names:
+                events = next((n for n in analytics.EVENT_TABLES
+                               if n in names), None)
+                if events is not None:
+                    summary = analytics.summary(
+                        store.get(f"/{key}/tasks"),
+                        store.get(f"/{key}/{events}"),
+                        store.get(f"/{key}/sim") if 'sim' in names else None,
+                        store.get(f"/{key}/occupancy")
+                        if 'occupancy' in names else None)
+                    attributes.extend(
+                        ('metric', name, _scalar(value))
+                        for name, value in summary.items())
+            yield run, attributes
+
+
+def _scalar(value):
+    """
+    Convert a NumPy scalar to a value that SQLite can store
+    """
+    if hasattr(value, 'item'):
+        value = value.item()
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return value
+    return json.dumps(value, default=str)
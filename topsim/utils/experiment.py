@@ -21,12 +21,15 @@ This provides an example implementation and sits alongside the
 user.* modules implemented in this codebase.
 """
 
+import os
 import time
+import json
+import hashlib
 import itertools
 import logging
 
 import simpy
-from datetime import date
+from datetime import date, datetime
 from pathlib import Path
 
 logging.basicConfig(level="INFO")
@@ -34,14 +37,17 @@ LOGGER = logging.getLogger(__name__)
 
 # Framework defined models
 from topsim.core.simulation import Simulation
+from topsim.core.delay import DelayModel
 
 # User defined models
 from topsim.user.telescope import Telescope  # Instrument
 from topsim.user.schedule.batch_allocation import BatchProcessing
 from topsim.user.plan.batch_planning import BatchPlanning  # Planning
-from topsim.user.plan.static_planning import SHADOWPlanning
 from topsim.user.schedule.dynamic_plan import DynamicSchedulingFromPlan
 
+#: Name of the results manifest stored in the Experiment output directory
+MANIFEST = "manifest.json"
+
 
 class Experiment:
     """
@@ -52,6 +58,30 @@ class Experiment:
     - Serial
     - Batch
 
+    Each simulation in the experiment is identified by a stable digest of
+    its inputs (see :py:func:`simulation_digest`). Completed simulations are
+    recorded in a results manifest (``manifest.json``) in the output
+    directory; when the experiment is run again, any combination whose
+    digest is in the manifest, and whose output file still exists, is
+    skipped. This makes re-running an interrupted (or extended) sweep
+    incremental.
+
+    Batch mode is intended for array-jobs on HPC partitions. The complete
+    set of combinations is enumerated deterministically, and may be written
+    to a sweep manifest with :py:meth:`write_sweep_manifest`. Each process
+    in the array then runs a single shard of the sweep:
+
+    >>> experiment = Experiment.from_sweep_manifest('output/sweep.json')
+    >>> experiment.run(shard=(task_id, task_count))
+
+    Shard `i` of `N` runs every combination whose index ``% N == i``, and
+    writes to its own results file and results manifest. Once all shards
+    have finished, :py:func:`merge_shards` combines them. If `batch` is set
+    and no shard is passed to :py:meth:`run`, the shard is taken from the
+    ``SLURM_ARRAY_TASK_ID``, ``SLURM_ARRAY_TASK_MIN`` and
+    ``SLURM_ARRAY_TASK_COUNT`` environment variables, so that an array of
+    ``--array=1-N`` runs shards 0 to N - 1.
+
     """
 
     def __init__(
@@ -61,79 +91,242 @@ class Experiment:
             data_combinations: list[tuple] = None,
             output=None,
             delay: bool = False,
+            force: bool = False,
             **kwargs):
 
         self._configurations = configuration
+        self._alloc_combinations = alloc_combinations
+        self._data_combinations = data_combinations
         self._combinations = list(itertools.product(alloc_combinations,
                                                     data_combinations))
         self._delay = delay
         self._output = Path(output)
         self._sims = []
         self.sched_args = kwargs['sched_args']
-        self._batch = kwargs['slurm'] if 'batch' in kwargs else False
+        self._batch = kwargs.get('batch', kwargs.get('slurm', False))
+        #: Re-run simulations even if they exist in the results manifest
+        self._force = force
+        self._manifest_path = self._output / MANIFEST
+        self.manifest = load_manifest(self._manifest_path)
+        self._results_file = None
+
+    @classmethod
+    def from_sweep_manifest(cls, path, output=None, force=False):
+        """
+        Re-create an Experiment from a sweep manifest produced by
+        :py:meth:`write_sweep_manifest`.
+
+        A hand-written sweep specification may be used in place of the
+        manifest; it has the same keys, but without the enumerated
+        `combinations`::
+
+            {
+              "configuration": ["path/to/config.json"],
+              "alloc_combinations": [["batch", "batch"],
+                                     ["heft", "dynamic_plan"]],
+              "data_combinations": [[false, true]],
+              "sched_args": {},
+              "delay": null,
+              "output": "path/to/output"
+            }
+
+        Parameters
+        ----------
+        path : str or Path
+            Path to the sweep manifest
+        output : str or Path, optional
+            Output directory; defaults to the directory stored in the
+            manifest.
+        force : bool
+            Re-run simulations even if they exist in the results manifest
+
+        Returns
+        -------
+        experiment : Experiment
+        """
+        with open(path) as fp:
+            sweep = json.load(fp)
+        if not (output or sweep.get('output')):
+            raise ValueError(f"No output directory provided for {path}")
+        experiment = cls(
+            configuration=sweep['configuration'],
+            alloc_combinations=[tuple(c) for c in sweep['alloc_combinations']],
+            data_combinations=[tuple(c) for c in sweep['data_combinations']],
+            output=output or sweep.get('output'),
+            delay=_build_delay(sweep.get('delay')),
+            force=force,
+            sched_args=sweep.get('sched_args', {}),
+            batch='SLURM_ARRAY_TASK_ID' in os.environ
+        )
+        if 'combinations' not in sweep:
+            return experiment
+        recorded = [c['digest'] for c in sweep['combinations']]
+        current = [c['digest'] for c in experiment.combinations()]
+        if recorded != current:
+            LOGGER.warning(
+                "Inputs to %s have changed since the manifest was written; "
+                "using the current configuration and workflow files", path)
+        return experiment
+
+    def combinations(self):
+        """
+        Enumerate every simulation in the experiment.
 
-    def _build_simulations(self):
+        The enumeration is deterministic: configurations are iterated in the
+        order they are provided, followed by the allocation and then data
+        combinations. Each entry is JSON-serialisable, so the list may be
+        written to disk and shared between processes.
+
+        Returns
+        -------
+        combinations : list of dict
+            Each dictionary has the index of the combination, the config
+            path, the planning and scheduling names, the data flags, and the
+            digest of the simulation.
+        """
+        combinations = []
+        index = 0
+        for c in self._configurations:
+            for (plan, sched), (use_task_data, use_edge_data) in self._combinations:
+                combinations.append({
+                    'index': index,
+                    'config': str(c),
+                    'planning': plan,
+                    'scheduling': sched,
+                    'use_task_data': use_task_data,
+                    'use_edge_data': use_edge_data,
+                    'digest': simulation_digest(
+                        c, plan, sched, self.sched_args, self._delay,
+                        use_task_data, use_edge_data)
+                })
+                index += 1
+        return combinations
+
+    def write_sweep_manifest(self, path=None):
+        """
+        Write the enumerated combinations of the experiment to disk.
+
+        Parameters
+        ----------
+        path : str or Path, optional
+            Where to store the manifest; defaults to ``sweep.json`` in the
+            output directory.
+
+        Returns
+        -------
+        path : Path
+            Location of the sweep manifest
+        """
+        path = Path(path) if path else self._output / SWEEP_MANIFEST
+        path.parent.mkdir(parents=True, exist_ok=True)
+        sweep = {
+            'version': 1,
+            'output': str(self._output),
+            'configuration': [str(c) for c in self._configurations],
+            'alloc_combinations': self._alloc_combinations,
+            'data_combinations': self._data_combinations,
+            'sched_args': self.sched_args,
+            'delay': _describe_delay(self._delay),
+            'combinations': self.combinations(),
+        }
+        write_manifest(sweep, path)
+        return path
+
+    def _build_simulations(self, shard=None):
+        for combination in self._pending_combinations(shard):
+            yield (combination['digest'],
+                   *self._build_simulation(combination))
+
+    def _pending_combinations(self, shard=None):
+        """
+        The combinations (in the shard, if provided) that do not already
+        have results in the results manifest.
+        """
         if not self._output.exists():
             try:
                 self._output.mkdir(parents=True)
             except OSError as e:
                 LOGGER.critical("Failed to make output directory: %s", e)
-        for c in self._configurations:
-           for combination in self._combinations:
-                ac, dc = combination
-                plan, sched = ac
-                use_task_data, use_edge_data = dc
-                if plan == "batch":
-                    plan = BatchPlanning("batch")
-                elif plan == "static":
-                    plan = SHADOWPlanning("heft")
-                else:
-                    raise RuntimeError("Planning '%s' is not supported", plan)
-
-                if sched == "dynamic_plan":
-                    sched = DynamicSchedulingFromPlan(**self.sched_args)
-                else:
-                    sched = BatchProcessing(**self.sched_args)
-                env = simpy.Environment()
-                instrument = Telescope
-                result_path_hash = _generate_truncated_hash(c, hash_length=6)
-                yield Simulation(env=env, config=c, instrument=instrument,
-                                 planning_model=plan, scheduling=sched, delay=self._delay, timestamp=None,
-                                 to_file=True,
-                                 hdf5_path=f"{self._output}/results_f{date.today().isoformat()}_{result_path_hash}.h5",
-                                 use_task_data=use_task_data, use_edge_data=use_edge_data)
-
-    def _run_batch(self):
-        """
-        Batch experiments are single-run experiments, which means we don't run combinations
-        """ 
-        c= self._configurations[0]
-        plan, sched = self._combinations[0]
-        if plan == "batch":
-            plan = BatchPlanning("batch")
-        elif plan == "static":
-            plan = SHADOWPlanning("heft")
-        else:
-            raise RuntimeError("Planning '%s' is not supported", plan)
-
-        if sched == "dynamic_plan":
-            sched = DynamicSchedulingFromPlan(**self.sched_args)
-        else:
-            sched = BatchProcessing(**self.sched_args)
-        env = simpy.Environment()
-        instrument = Telescope
-        result_path_hash = _generate_truncated_hash(c, hash_length=6)
-        yield Simulation(env=env, config=c, instrument=instrument,
-                            planning_model=plan, scheduling=sched, delay=self._delay, timestamp=None,
-                            to_file=True,
-                            hdf5_path=f"{self._output}/results_f{date.today().isoformat()}_{result_path_hash}.h5")
+        for combination in self.combinations():
+            if shard and combination['index'] % shard[1] != shard[0]:
+                continue
+            digest = combination['digest']
+            if not self._force and self.is_complete(digest):
+                LOGGER.info("Skipping %s/%s on %s: results exist in %s",
+                            combination['planning'],
+                            combination['scheduling'],
+                            combination['config'],
+                            self.manifest["runs"][digest]["output"])
+                continue
+            yield combination
 
+    def _build_simulation(self, combination, **kwargs):
+        """
+        Construct the Simulation for a single entry of
+        :py:meth:`combinations`.
 
+        Returns
+        -------
+        output, simulation
+            The name of the results file (relative to the output directory)
+            and the Simulation object.
+        """
+        return _build_simulation(
+            combination, self._output, self._results_file, self.sched_args,
+            self._delay, **kwargs)
 
     def _review_experiment_combinations(self):
         pass
 
-    def run(self, review=False, threading=False):
+    def is_complete(self, digest):
+        """
+        Determine if the simulation with the given digest has already been
+        run, based on the results manifest.
+
+        Parameters
+        ----------
+        digest : str
+            Digest produced by :py:func:`simulation_digest`
+
+        Returns
+        -------
+        True if the digest is recorded in the manifest and the recorded
+        output file still exists.
+        """
+        run = self.manifest["runs"].get(digest)
+        if run is None:
+            return False
+        return (self._output / run["output"]).exists()
+
+    def _record_result(self, digest, record):
+        """
+        Add a completed simulation to the results manifest and write the
+        manifest to disk.
+        """
+        self.manifest["runs"][digest] = record
+        write_manifest(self.manifest, self._manifest_path)
+
+    def _select_shard(self, shard):
+        """
+        Point the results file and manifest at those of the given shard.
+        """
+        if shard is None and self._batch:
+            # Array task ids start at SLURM_ARRAY_TASK_MIN, usually 1
+            shard = (int(os.environ.get('SLURM_ARRAY_TASK_ID', 0))
+                     - int(os.environ.get('SLURM_ARRAY_TASK_MIN', 0)),
+                     int(os.environ.get('SLURM_ARRAY_TASK_COUNT', 1)))
+        if shard is None:
+            return None
+        i, n = shard
+        if not 0 <= i < n:
+            raise ValueError(f"Shard {i}/{n} is not in the range 0-{n - 1}")
+        self._results_file = SHARD_RESULTS.format(i=i, n=n)
+        self._manifest_path = self._output / SHARD_MANIFEST.format(i=i, n=n)
+        self.manifest = load_manifest(self._manifest_path)
+        return i, n
+
+    def run(self, review=False, threading=False, shard=None, jobs=1,
+            budget=None, progress='bar', chunk_size=None):
         """
         Run a combinations of simulations based on parameters provided to the class
         constructor.
@@ -142,63 +335,455 @@ class Experiment:
         ----------
         review
         threading
+        shard : tuple(int, int), optional
+            Run only shard `i` of `N` (see :py:func:`parse_shard`).
+        jobs : int
+            Number of simulations to run in parallel worker processes. When
+            running in parallel, each simulation writes to its own results
+            file.
+        budget : float, optional
+            Wall-clock budget, in seconds, for the whole experiment. Once
+            the budget is spent, no new simulations are started, and running
+            simulations are stopped early (and are not recorded in the
+            results manifest, so are re-run next time).
+        progress : str
+            'bar' shows a progress bar ('bar' per simulation when running
+            serially, or across the experiment when running in parallel);
+            'log' logs progress; 'none' reports nothing.
+        chunk_size : int, optional
+            Stream per-timestep results to file every `chunk_size`
+            timesteps (see :py:class:`~topsim.core.simulation.Simulation`).
 
         Returns
         -------
-
+        completed : int
+            The number of simulations that completed
         """
         if not self._output:
             LOGGER.warning("No output file set, experiments will not be run.")
             return exit(1)
-        if self._batch:
-            s = self._run_batch()
-            st = time.time()
-            LOGGER.info("Simulation is using %s to plan and %s to schedule",
-                            s.planner.model.algorithm, s.scheduler.algorithm)
-            try:
-                    s.start()
-            except ValueError as exp:
-                LOGGER.warning("Simulation  did not run due to non-useable simulation "
-                        "parameters")
-                ft = time.time()
-            LOGGER.info("Runtime: %s.", ft - st)
+        shard = self._select_shard(shard)
+        total = len(self._combinations) * len(self._configurations)
+        if shard:
+            LOGGER.info("Running shard %s/%s of %s simulations",
+                        shard[0], shard[1], total)
+        deadline = time.time() + budget if budget is not None else None
+        pending = list(self._pending_combinations(shard))
+        if jobs > 1:
+            completed = self._run_parallel(pending, jobs, deadline,
+                                           progress, chunk_size)
         else:
-            i = 0
-            for s in self._build_simulations():
-                LOGGER.info("Simulation %s/%s running...",
-                            i+1, len(self._combinations) * len(self._configurations))
-                LOGGER.info("Simulation is using %s to plan and %s to schedule",
-                            s.planner.model.algorithm, s.scheduler.algorithm)
-                print(s.planner.model.algorithm, s.scheduler.algorithm)
-                st = time.time()
-                try:
-                    s.start()
-                except ValueError as exp:
-                    print(exp)
-                    print(f"Simulation {i+1} did not run due to non-useable simulation "
-                        f"parameters")
-                # self._sims.remove(s)
-                ft = time.time()
-                i += 1
-                LOGGER.info("Runtime: %s.", ft - st)
+            completed = self._run_serial(pending, total, deadline,
+                                         progress, chunk_size)
         LOGGER.info("Experiment complete.")
+        return completed
+
+    def _run_serial(self, pending, total, deadline, progress, chunk_size):
+        completed = 0
+        for i, combination in enumerate(pending):
+            LOGGER.info("Simulation %s/%s running...", i+1, total)
+            result = _run_combination(
+                combination, self._output, self._results_file,
+                self.sched_args, self._delay, deadline, progress, chunk_size)
+            if result is None:
+                LOGGER.warning("Experiment budget spent; %s simulations "
+                               "were not run", len(pending) - i)
+                break
+            completed += self._process_result(combination, result)
+        return completed
+
+    def _run_parallel(self, pending, jobs, deadline, progress, chunk_size):
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        pbar = None
+        if progress == 'bar':
+            from tqdm import tqdm
+            pbar = tqdm(total=len(pending), desc='Experiment',
+                        unit="Simulations", ncols=0)
+        # Results files cannot be shared between processes.
+        results_file, self._results_file = self._results_file, None
+        completed = 0
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                pool.submit(
+                    _run_combination, combination, self._output, None,
+                    self.sched_args, self._delay, deadline,
+                    'log' if progress == 'log' else 'none', chunk_size
+                ): combination for combination in pending
+            }
+            for future in as_completed(futures):
+                combination = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    LOGGER.error("Simulation %s failed: %s",
+                                 combination['index'], e)
+                    continue
+                if result is not None:
+                    completed += self._process_result(combination, result)
+                if pbar:
+                    pbar.update(1)
+        self._results_file = results_file
+        if pbar:
+            pbar.close()
+        return completed
+
+    def _process_result(self, combination, result):
+        """
+        Record the result of a simulation returned by
+        :py:func:`_run_combination` in the results manifest.
+
+        Returns
+        -------
+        1 if the simulation completed, 0 otherwise.
+        """
+        record, timed_out = result
+        if timed_out:
+            LOGGER.warning("Simulation %s stopped at the experiment budget; "
+                           "results are partial", combination['index'])
+            return 0
+        if record is None:
+            return 0
+        self._record_result(combination['digest'], record)
+        return 1
+
+
+def _build_simulation(combination, output_dir, results_file, sched_args,
+                      delay, **kwargs):
+    """
+    Construct the Simulation for a single entry of
+    :py:meth:`Experiment.combinations`. Additional keyword arguments are
+    passed to :py:class:`~topsim.core.simulation.Simulation`.
+
+    Returns
+    -------
+    output, simulation
+        The name of the results file (relative to the output directory)
+        and the Simulation object.
+    """
+    digest = combination['digest']
+    plan = _build_planning(combination['planning'])
+    sched = _build_scheduling(combination['scheduling'], sched_args)
+    env = simpy.Environment()
+    instrument = Telescope
+    if results_file:
+        output = results_file
+    else:
+        output = (f"results_f{date.today().isoformat()}_"
+                  f"{digest[:DIGEST_LENGTH]}.h5")
+    simulation = Simulation(
+        env=env, config=combination['config'], instrument=instrument,
+        planning_model=plan, scheduling=sched, delay=delay,
+        timestamp=None, to_file=True,
+        hdf5_path=f"{output_dir}/{output}",
+        use_task_data=combination['use_task_data'],
+        use_edge_data=combination['use_edge_data'],
+        delimiters=(f"{combination['planning']}/"
+                    f"{combination['scheduling']}/"
+                    f"run_{digest[:DIGEST_LENGTH]}"),
+        **kwargs)
+    return output, simulation
+
+
+def _run_combination(combination, output_dir, results_file, sched_args, delay,
+                     deadline=None, progress='bar', chunk_size=None):
+    """
+    Build and run the simulation for a single combination. This is a
+    module-level function so that it may be run in a worker process.
+
+    Returns
+    -------
+    None if the experiment deadline has already passed; otherwise a tuple
+    of the results manifest record (None if the simulation could not run)
+    and whether the simulation was stopped by the deadline.
+    """
+    budget = None
+    if deadline is not None:
+        budget = deadline - time.time()
+        if budget <= 0:
+            return None
+    output, s = _build_simulation(
+        combination, output_dir, results_file, sched_args, delay,
+        progress=progress, chunk_size=chunk_size)
+    LOGGER.info("Simulation is using %s to plan and %s to schedule",
+                s.planner.model.algorithm, s.scheduler.algorithm)
+    st = time.time()
+    try:
+        s.start(budget=budget)
+    except ValueError as exp:
+        print(exp)
+        print(f"Simulation {combination['index']} did not run due to "
+              f"non-useable simulation parameters")
+        return None, False
+    runtime = time.time() - st
+    LOGGER.info("Runtime: %s.", runtime)
+    record = {
+        "output": output,
+        "config": str(s._cfg_path),
+        "planning": str(s.planner.model.algorithm),
+        "scheduling": str(s.scheduler.algorithm),
+        "use_task_data": s.params["use_task_data"][0],
+        "use_edge_data": s.params["use_edge_data"][0],
+        "finished": datetime.now().isoformat(timespec="seconds"),
+        "runtime": runtime,
+    }
+    return record, s.timed_out
+
+
+#: Name of the sweep manifest written by Experiment.write_sweep_manifest
+SWEEP_MANIFEST = "sweep.json"
+#: Results file and results manifest for each shard of a sweep
+SHARD_RESULTS = "results_shard{i}of{n}.h5"
+SHARD_MANIFEST = "manifest_shard{i}of{n}.json"
+
+#: Number of digest characters used in result file names
+DIGEST_LENGTH = 12
+#: Name of the results file produced by merge_shards
+MERGED_RESULTS = "results.h5"
+
+
+#: Planning short-hand names and the algorithm they use
+PLANNING = {"batch": "batch", "static": "heft", "heft": "heft",
+            "pheft": "pheft", "fcfs": "fcfs", "native_heft": "heft"}
+#: Scheduling short-hand names
+SCHEDULING = ("dynamic_plan", "batch")
+
+
+def _build_planning(plan):
+    """
+    Create the planning model from the Experiment short-hand name.
+
+    'static' is the original name for SHADOW's HEFT implementation; 'heft',
+    'pheft' and 'fcfs' select the SHADOW algorithm directly. 'native_heft'
+    is the built-in HEFT implementation, which does not need SHADOW.
+    """
+    if plan == "batch":
+        return BatchPlanning("batch")
+    elif plan == "native_heft":
+        from topsim.user.plan.heft_planning import HEFTPlanning
+        return HEFTPlanning(PLANNING[plan])
+    elif plan in PLANNING:
+        from topsim.user.plan.static_planning import SHADOWPlanning
+        return SHADOWPlanning(PLANNING[plan])
+    else:
+        raise RuntimeError("Planning '%s' is not supported", plan)
+
+
+def _build_scheduling(sched, sched_args):
+    """
+    Create the scheduling model from the Experiment short-hand name.
+    """
+    if sched == "dynamic_plan":
+        return DynamicSchedulingFromPlan(**sched_args)
+    else:
+        return BatchProcessing(**sched_args)
+
+
+def _build_delay(description):
+    """
+    Re-create the delay model from the output of :py:func:`_describe_delay`.
+    """
+    if not description:
+        return False
+    return DelayModel(description['prob'], description['dist'],
+                      DelayModel.DelayDegree(description['degree']),
+                      seed=description['seed'],
+                      common_random_numbers=description.get(
+                          'common_random_numbers', False))
+
 
-def _generate_truncated_hash(path: Path, hash_length: int ) -> str:
+def parse_shard(shard: str):
     """
-    Generate a truncated string hash of the pathname. This is to balance 
-    result file pathname uniqueness and readability. 
-    
-    This is _not_ a secure hash and will definitely increase the chance of 
-    conflicts. However, we are not expecting to produce large numbers of result
-    files over the course a given experiment so it is unlikely to produce 
-    collisions (e.g. ~150 different output files). 
+    Parse an ``i/N`` shard specification.
 
-    Parameters: 
-        path: name of the path we are hashing
-        hash_length: The length of the truncated hash
+    Shards are zero-indexed, so the shards of a sweep split into four
+    processes are ``0/4``, ``1/4``, ``2/4`` and ``3/4``.
 
-    Returns:
-        Truncated result of the absolute value of hash(path). 
+    Returns
+    -------
+    shard : tuple(int, int)
     """
+    try:
+        i, n = (int(x) for x in shard.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard '{shard}' is not of the form i/N") from None
+    if not 0 <= i < n:
+        raise ValueError(f"Shard {i}/{n} is not in the range 0-{n - 1}")
+    return i, n
 
-    return str(abs(hash(path)))[:hash_length]
\ No newline at end of file
+
+def merge_shards(output, results=MERGED_RESULTS):
+    """
+    Combine the results files and manifests written by each shard of a
+    sweep in the output directory.
+
+    Every key of each shard's HDF5 store is copied into a single results
+    file, and the shard manifests are merged into the results manifest of
+    the output directory, so that subsequent runs of the Experiment skip
+    the merged simulations.
+
+    Parameters
+    ----------
+    output : str or Path
+        Experiment output directory
+    results : str
+        Name of the merged results file
+
+    Returns
+    -------
+    path : Path
+        Location of the merged results file
+    """
+    import pandas as pd
+
+    output = Path(output)
+    manifest = load_manifest(output / MANIFEST)
+    shard_manifests = sorted(output.glob(SHARD_MANIFEST.format(i='*', n='*')))
+    if not shard_manifests:
+        raise FileNotFoundError(f"No shard manifests found in {output}")
+    merged = output / results
+    with pd.HDFStore(merged) as target:
+        for path in shard_manifests:
+            shard = load_manifest(path)
+            copied = set()
+            for digest, run in shard["runs"].items():
+                if run["output"] not in copied:
+                    with pd.HDFStore(output / run["output"], mode='r') as source:
+                        for key in source.keys():
+                            target.put(key, source.get(key))
+                    copied.add(run["output"])
+                manifest["runs"][digest] = dict(run, output=results)
+    write_manifest(manifest, output / MANIFEST)
+    LOGGER.info("Merged %s shards into %s", len(shard_manifests), merged)
+    return merged
+
+
+def _file_digest(path) -> str:
+    """
+    SHA-256 digest of the contents of the file at path.
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _workflow_digests(config) -> dict:
+    """
+    Produce a digest for each workflow file referenced by the instrument
+    pipelines in the configuration at path `config`.
+
+    Workflow paths are relative to the configuration file, in the same way
+    they are resolved in :py:meth:`topsim.core.config.Config.parse_instrument_config`.
+    """
+    config = Path(config)
+    with open(config) as fp:
+        cfg = json.load(fp)
+    digests = {}
+    for name, instrument in cfg.get('instrument', {}).items():
+        for pipeline, spec in instrument.get('pipelines', {}).items():
+            workflow = config.parent / spec['workflow']
+            digests[f"{name}/{pipeline}"] = _file_digest(workflow)
+    return digests
+
+
+def _describe_model(model, name):
+    """
+    Stable description of a planning or scheduling model. Accepts either the
+    Experiment short-hand name or an instance of the model.
+    """
+    if isinstance(model, str):
+        return {'name': model}
+    cls = type(model)
+    return {'class': f"{cls.__module__}.{cls.__qualname__}",
+            'algorithm': str(getattr(model, 'algorithm', name))}
+
+
+def _describe_delay(delay):
+    """
+    Stable description of the delay model used for a simulation.
+    """
+    if not delay:
+        return None
+    if isinstance(delay, DelayModel):
+        description = {'prob': delay.prob, 'dist': delay.dist,
+                       'degree': delay.degree.value, 'seed': delay.seed}
+        # Only recorded when set, so existing digests are unchanged
+        if getattr(delay, 'common_random_numbers', False):
+            description['common_random_numbers'] = True
+        return description
+    return str(delay)
+
+
+def simulation_digest(config, planning, scheduling, sched_args=None,
+                      delay=None, use_task_data=False, use_edge_data=True):
+    """
+    Produce a stable digest that identifies a single simulation.
+
+    Unlike :py:func:`hash`, this digest is the same across interpreter runs.
+    It covers everything that determines the results of the simulation:
+
+    * The contents of the configuration file, and each workflow file
+      referenced by the instrument pipelines;
+    * The planning and scheduling models, and the scheduling parameters;
+    * The delay model; and
+    * The task and edge data flags.
+
+    Parameters
+    ----------
+    config : str or Path
+        Path to the simulation configuration
+    planning : str or :py:obj:`~topsim.algorithms.planning.Planning`
+        Planning short-hand name (e.g. 'batch') or instance
+    scheduling : str or :py:obj:`~topsim.algorithms.scheduling.Scheduling`
+        Scheduling short-hand name (e.g. 'dynamic_plan') or instance
+    sched_args : dict
+        Keyword arguments passed to the scheduling model
+    delay : :py:obj:`~topsim.core.delay.DelayModel`, optional
+    use_task_data : bool
+    use_edge_data : bool
+
+    Returns
+    -------
+    digest : str
+        Hexadecimal SHA-256 digest
+    """
+    description = {
+        'config': _file_digest(config),
+        'workflows': _workflow_digests(config),
+        'planning': _describe_model(planning, 'planning'),
+        'scheduling': _describe_model(scheduling, 'scheduling'),
+        'sched_args': sched_args or {},
+        'delay': _describe_delay(delay),
+        'use_task_data': bool(use_task_data),
+        'use_edge_data': bool(use_edge_data),
+    }
+    encoded = json.dumps(description, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def load_manifest(path) -> dict:
+    """
+    Load the results manifest at path, or produce an empty manifest if it
+    does not exist yet.
+    """
+    path = Path(path)
+    if not path.exists():
+        return {"version": 1, "runs": {}}
+    with open(path) as fp:
+        return json.load(fp)
+
+
+def write_manifest(manifest, path):
+    """
+    Write the results manifest to path.
+
+    The manifest is written to a temporary file that replaces the existing
+    manifest, so an interrupted experiment never leaves a partial manifest.
+    """
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, 'w') as fp:
+        json.dump(manifest, fp, indent=2, sort_keys=True)
+    os.replace(tmp, path)
@@ -0,0 +1,386 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Generate synthetic simulation configurations and workflows.
+
+These are used to benchmark, and capacity-plan with, systems much larger
+than those in the test data: thousands of machines, workflows with hundreds
+of thousands of tasks, and observing plans that span a year.
+
+Both configurations and workflows are written as they are generated, so the
+size of the output is not limited by memory. Workflows are produced in the
+node-link JSON format read by the planning models::
+
+    {"header": {...}, "graph": {"nodes": [{"id": 0, "comp": ...,
+     "task_data": ...}, ...], "links": [{"source": 0, "target": 1,
+     "transfer_data": ...}, ...]}}
+
+Examples
+--------
+
+>>> generate_workflow('wf.json', shape='layered', size=100000, seed=20)
+>>> generate_config('config.json', {'emu': 'wf.json'}, machines=10000,
+...                 observations=1000, seed=20)
+"""
+
+import json
+import math
+import logging
+
+import numpy as np
+
+from pathlib import Path
+
+LOGGER = logging.getLogger(__name__)
+
+#: DAG shapes supported by :py:func:`generate_workflow`
+SHAPES = ("fork-join", "layered", "random")
+
+#: Nodes generated (and written) at a time
+CHUNK_SIZE = 10000
+
+def _vary(rng, mean, heterogeneity, size=None):
+    """
+    Draw values uniformly within +/- `heterogeneity` of `mean`.
+    """
+    return mean * (1 + heterogeneity * rng.uniform(-1, 1, size))
+
+
+def _sample(rng, low, count, k):
+    """
+    Sample `k[r]` distinct values from `range(low[r], low[r] + count[r])`
+    for each row `r`, using Floyd's algorithm across all rows at once.
+
+    Returns
+    -------
+    samples : numpy.ndarray
+        One row for each sample, padded with -1 to the largest `k`.
+    """
+    rows = len(low)
+    steps = int(k.max(initial=0))
+    samples = np.full((rows, steps), -1, dtype=np.int64)
+    for step in range(steps):
+        active = step >= steps - k
+        j = np.where(active, count - steps + step, 0)
+        t = rng.integers(0, j + 1)
+        taken = (samples[:, :step] == t[:, None]).any(axis=1)
+        samples[:, step] = np.where(
+            active, np.where(taken, j, t), -1)
+    return np.where(samples >= 0, samples + low[:, None], -1)
+
+
+def _predecessors(shape, start, stop, size, width, degree, rng):
+    """
+    Predecessors of tasks `start` to `stop` in a workflow of the given
+    shape.
+
+    Each shape is defined so that the predecessors of a task depend only on
+    its position (and the random stream), which means links can be streamed
+    without keeping the graph in memory.
+
+    Returns
+    -------
+    predecessors : list of numpy.ndarray
+    """
+    index = np.arange(start, stop)
+    if shape == "fork-join":
+        # A fork task, followed by `width` parallel tasks, which are joined
+        # by the fork task of the next stage.
+        period = width + 1
+        preds = []
+        for i in index:
+            offset = i % period
+            stage = i - offset
+            if i == 0:
+                preds.append(np.empty(0, dtype=np.int64))
+            elif offset == 0:
+                preds.append(np.arange(stage - width, stage))
+            elif i == size - 1 and offset > 1:
+                # The workflow ends in the middle of a stage; join the tasks
+                # of that stage so there is a single exit task.
+                preds.append(np.arange(stage + 1, i))
+            else:
+                preds.append(np.array([stage]))
+        return preds
+    if shape == "layered":
+        layer = index // width
+        low = np.maximum(layer - 1, 0) * width
+        count = np.where(layer > 0, width, 0)
+        k = np.minimum(degree, count)
+    elif shape == "random":
+        low = np.maximum(0, index - width)
+        count = index - low
+        k = np.where(count > 0, rng.integers(
+            1, np.minimum(degree, np.maximum(count, 1)) + 1), 0)
+    else:
+        raise ValueError(f"{shape} is not one of {SHAPES}")
+    samples = np.sort(_sample(rng, low, count, k), axis=1)
+    return [row[row >= 0] for row in samples]
+
+
+def _write_items(fp, items):
+    """
+    Write an iterable of JSON-serialisable items as the elements of a JSON
+    array, without holding the array in memory.
+    """
+    fp.write("[")
+    for n, item in enumerate(items):
+        if n:
+            fp.write(",")
+        fp.write("\n")
+        fp.write(json.dumps(item))
+    fp.write("\n]")
+
+
+def generate_workflow(path, shape="layered", size=1000, width=None,
+                      degree=2, comp=60000, heterogeneity=0.5, ccr=0.01,
+                      task_data=0, seed=None):
+    """
+    Write a synthetic workflow to `path`.
+
+    Parameters
+    ----------
+    path : str or Path
+        Output file
+    shape : str
+        One of :py:data:`SHAPES`:
+
+        * 'fork-join': stages of `width` parallel tasks between a fork and
+          a join task
+        * 'layered': layers of `width` tasks, each depending on `degree`
+          tasks from the previous layer
+        * 'random': each task depends on between 1 and `degree` of the
+          `width` tasks generated before it
+    size : int
+        Number of tasks in the workflow
+    width : int, optional
+        Parallelism of the workflow; defaults to the square root of `size`
+    degree : int
+        Maximum number of predecessors of each task ('layered' and 'random')
+    comp : float
+        Mean computation cost of each task
+    heterogeneity : float
+        Spread of the task and data costs, as a fraction (0-1) of the mean
+    ccr : float
+        Communication-to-computation ratio: the mean data transferred along
+        each edge is `ccr * comp`
+    task_data : float
+        Mean data read by each task (0 for none)
+    seed : int, optional
+        Random seed; a random one is chosen (and recorded in the header's
+        `gen_specs`) if it is not given.
+
+    Returns
+    -------
+    path : Path
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"{shape} is not one of {SHAPES}")
+    if size < 1:
+        raise ValueError(f"Workflow size must be positive, not {size}")
+    if not 0 <= heterogeneity < 1:
+        raise ValueError("Heterogeneity must be in the range [0, 1)")
+    width = width or max(1, math.isqrt(size))
+    path = Path(path)
+    # Independent random streams, so that nodes and links can be generated
+    # in separate passes over the workflow.
+    sequence = np.random.SeedSequence(seed)
+    node_seed, link_seed = sequence.spawn(2)
+    header = {
+        "time": False,
+        "gen_specs": {
+            "shape": shape, "size": size, "width": width, "degree": degree,
+            "comp": comp, "heterogeneity": heterogeneity, "ccr": ccr,
+            "task_data": task_data, "seed": sequence.entropy
+        }
+    }
+    with open(path, "w") as fp:
+        fp.write(f'{{"header": {json.dumps(header)}, "graph": '
+                 f'{{"directed": true, "multigraph": false, "graph": {{}}, '
+                 f'"nodes": ')
+        _write_items(fp, _generate_nodes(size, comp, heterogeneity,
+                                         task_data, node_seed))
+        fp.write(', "links": ')
+        _write_items(fp, _generate_links(shape, size, width, degree, comp,
+                                         heterogeneity, ccr, link_seed))
+        fp.write("}}\n")
+    LOGGER.info("Generated %s workflow with %s tasks: %s", shape, size, path)
+    return path
+
+
+def _generate_nodes(size, comp, heterogeneity, task_data, seed):
+    rng = np.random.default_rng(seed)
+    for start in range(0, size, CHUNK_SIZE):
+        n = min(CHUNK_SIZE, size - start)
+        costs = np.rint(_vary(rng, comp, heterogeneity, n)).astype(int)
+        data = np.rint(_vary(rng, task_data, heterogeneity, n)).astype(int)
+        for i in range(n):
+            node = {"id": start + i, "comp": int(costs[i])}
+            if task_data:
+                node["task_data"] = int(data[i])
+            yield node
+
+
+def _generate_links(shape, size, width, degree, comp, heterogeneity, ccr,
+                    seed):
+    rng = np.random.default_rng(seed)
+    for start in range(0, size, CHUNK_SIZE):
+        stop = min(start + CHUNK_SIZE, size)
+        preds = _predecessors(shape, start, stop, size, width, degree, rng)
+        edges = sum(len(p) for p in preds)
+        data = np.rint(
+            _vary(rng, comp * ccr, heterogeneity, edges)).astype(int)
+        e = 0
+        for i, sources in zip(range(start, stop), preds):
+            for p in sources:
+                yield {"source": int(p), "target": i,
+                       "transfer_data": int(data[e])}
+                e += 1
+
+
+def generate_config(path, pipelines, machines=100, machine_classes=None,
+                    flops=84, compute_bandwidth=10, system_bandwidth=1.0,
+                    heterogeneity=0.0, observations=10, duration=3600,
+                    gap=0, total_arrays=36, data_rate=5e8,
+                    max_ingest_resources=5, buffer_observations=4,
+                    timestep="seconds", seed=None):
+    """
+    Write a synthetic simulation configuration to `path`.
+
+    Parameters
+    ----------
+    path : str or Path
+        Output file
+    pipelines : dict
+        Workflow file for each observation (pipeline) name. Paths are
+        stored relative to the configuration if possible.
+    machines : int
+        Number of machines in the cluster
+    machine_classes : int, optional
+        Number of distinct machine types; defaults to 1 for a homogeneous
+        cluster and 4 otherwise.
+    flops, compute_bandwidth : float
+        Mean compute and bandwidth of each machine
+    system_bandwidth : float
+        Bandwidth of the cluster interconnect
+    heterogeneity : float
+        Spread of the machine and observation parameters, as a fraction
+        (0-1) of the mean
+    observations : int
+        Number of observations in the observing plan
+    duration : int
+        Mean duration of each observation, in seconds
+    gap : int
+        Time between observations, in seconds
+    total_arrays : int
+        Number of arrays in the telescope; each observation uses between
+        half and all of them.
+    data_rate : float
+        Mean data produced by each observation, per second
+    max_ingest_resources : int
+        Number of machines reserved for ingest
+    buffer_observations : int
+        Number of (mean) observations the hot and cold buffers can hold
+    timestep : str or int
+        Simulation timestep (see :py:class:`~topsim.core.config.Config`)
+    seed : int, optional
+        Random seed; a random one is chosen (and recorded in the cluster
+        `gen_specs`) if it is not given.
+
+    Returns
+    -------
+    path : Path
+    """
+    if not pipelines:
+        raise ValueError("At least one pipeline is required")
+    if not 0 <= heterogeneity < 1:
+        raise ValueError("Heterogeneity must be in the range [0, 1)")
+    sequence = np.random.SeedSequence(seed)
+    rng = np.random.default_rng(sequence)
+    path = Path(path)
+    if machine_classes is None:
+        machine_classes = 1 if heterogeneity == 0 else 4
+    machine_classes = max(1, min(machine_classes, machines))
+
+    resources = {}
+    counts = [machines // machine_classes] * machine_classes
+    counts[0] += machines % machine_classes
+    for c, count in enumerate(counts):
+        resources[f"cat{c}"] = {
+            "compute_bandwidth": int(round(
+                _vary(rng, compute_bandwidth, heterogeneity))),
+            "flops": int(round(_vary(rng, flops, heterogeneity))),
+            "count": count
+        }
+    cluster = {
+        "header": {"time": "false", "gen_specs": {
+            "machines": machines, "heterogeneity": heterogeneity,
+            "seed": sequence.entropy}},
+        "system": {"resources": resources,
+                   "system_bandwidth": system_bandwidth}
+    }
+    peak_rate = data_rate * (1 + heterogeneity)
+    capacity = data_rate * duration * buffer_observations
+    buffer = {
+        "hot": {"capacity": capacity, "max_ingest_rate": peak_rate},
+        "cold": {"capacity": capacity, "max_data_rate": peak_rate * 0.4}
+    }
+    telescope = {
+        "total_arrays": total_arrays,
+        "max_ingest_resources": max_ingest_resources,
+        "pipelines": {
+            name: {"workflow": _relative(workflow, path.parent),
+                   "ingest_demand": max_ingest_resources}
+            for name, workflow in pipelines.items()
+        },
+    }
+    with open(path, "w") as fp:
+        instrument = json.dumps(telescope)[:-1]
+        fp.write(f'{{"instrument": {{"telescope": {instrument}, '
+                 f'"observations": ')
+        _write_items(fp, _generate_observations(
+            rng, list(pipelines), observations, duration, gap, total_arrays,
+            data_rate, heterogeneity))
+        fp.write(f'}}}}, "cluster": {json.dumps(cluster)}, '
+                 f'"buffer": {json.dumps(buffer)}, '
+                 f'"timestep": {json.dumps(timestep)}}}\n')
+    LOGGER.info("Generated configuration with %s machines and %s "
+                "observations: %s", machines, observations, path)
+    return path
+
+
+def _generate_observations(rng, names, observations, duration, gap,
+                           total_arrays, data_rate, heterogeneity):
+    start = 0
+    for i in range(observations):
+        length = max(1, int(round(_vary(rng, duration, heterogeneity))))
+        yield {
+            "name": names[i % len(names)],
+            "start": start,
+            "duration": length,
+            "instrument_demand": int(
+                rng.integers(max(1, total_arrays // 2), total_arrays + 1)),
+            "data_product_rate": float(_vary(rng, data_rate, heterogeneity))
+        }
+        start += length + gap
+
+
+def _relative(workflow, directory):
+    try:
+        return Path(workflow).absolute().relative_to(
+            directory.absolute()).as_posix()
+    except ValueError:
+        return Path(workflow).absolute().as_posix()
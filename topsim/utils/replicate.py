@@ -0,0 +1,325 @@
+# Copyright (C) 2025 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Monte Carlo replications of a simulation.
+
+Each replication runs the same simulation with the delay model seeded
+differently. Replications are run in a process pool, and the key metrics of
+each are added to running statistics as they finish; once the confidence
+interval of the chosen metric is narrow enough, no more replications are
+started.
+
+>>> delay = DelayModel(0.2, 'normal', DelayModel.DelayDegree.MID)
+>>> replications, summary = run_replications(
+...     'config.json', BatchPlanning('batch'), BatchProcessing(), delay,
+...     metric='makespan', target_width=10, jobs=4)
+>>> summary.to_csv('summary.csv')
+
+To compare two scheduling algorithms pairwise, run both with the same
+`seed` and a delay model with `common_random_numbers` set: replication i of
+each then sees the same delay for each task.
+"""
+
+import copy
+import math
+import logging
+
+import numpy as np
+
+from statistics import NormalDist
+
+LOGGER = logging.getLogger(__name__)
+
+#: Metrics recorded for each replication
+METRICS = ("makespan", "observation_delay", "task_delay_offset")
+
+
+class RunningStatistics:
+    """
+    Mean and variance of a stream of values (Welford's algorithm), with the
+    confidence interval of the mean.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return math.nan
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def half_width(self, confidence=0.95):
+        """
+        Half the width of the `confidence` interval of the mean.
+        """
+        if self.count < 2:
+            return math.inf
+        t = _t_quantile((1 + confidence) / 2, self.count - 1)
+        return t * self.std / math.sqrt(self.count)
+
+
+def _t_quantile(p, df):
+    """
+    Quantile of Student's t-distribution with `df` degrees of freedom.
+
+    The quantile is exact for df <= 2; otherwise, the Cornish-Fisher
+    expansion about the normal quantile (Abramowitz & Stegun 26.7.5) is
+    used, which is accurate to three decimal places for df >= 3. (scipy is
+    not a dependency.)
+    """
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z = NormalDist().inv_cdf(p)
+    g1 = (z ** 3 + z) / 4
+    g2 = (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96
+    g3 = (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384
+    g4 = (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3
+          - 945 * z) / 92160
+    return z + g1 / df + g2 / df ** 2 + g3 / df ** 3 + g4 / df ** 4
+
+
+def replication_seeds(seed, count):
+    """
+    Independent seeds for `count` replications, derived from `seed`.
+
+    The seed of each replication only depends on `seed` and its index, so
+    replications can be added to an earlier set without re-running it.
+    """
+    sequence = np.random.SeedSequence(seed)
+    return [int(s.generate_state(1)[0]) for s in sequence.spawn(count)]
+
+
+def _run_replication(index, seed, config, planning, scheduling, delay,
+                     instrument, kwargs):
+    """
+    Run a single replication and return its metrics.
+    """
+    import simpy
+    from topsim.core.simulation import Simulation
+
+    planning = copy.deepcopy(planning)
+    scheduling = copy.deepcopy(scheduling)
+    if delay is not None:
+        delay = copy.copy(delay)
+        delay.seed = seed
+        # Tasks are given the delay model of the planning model
+        planning.delay_model = delay
+    # Only summary metrics are needed, so the results are not kept in pandas
+    kwargs = dict({'engine': 'array'}, **kwargs)
+    simulation = Simulation(
+        simpy.Environment(), config, instrument, planning, scheduling,
+        delay=delay, progress='none', **kwargs)
+    simulation.start()
+    observations = simulation.instrument.observations
+    return {
+        "replication": index,
+        "seed": seed,
+        "makespan": simulation.env.now,
+        "observation_delay": sum(
+            max(0, o.ast - o.est) for o in observations if o.ast is not None),
+        "task_delay_offset": simulation.scheduler.delay_offset,
+    }
+
+
+def _init_worker():
+    """
+    Quieten the simulation log of each worker process, which would
+    otherwise interleave the progress of every replication.
+    """
+    logging.getLogger("topsim").setLevel(logging.WARNING)
+
+
+def run_replications(config, planning, scheduling, delay=None,
+                     metric="makespan", target_width=None, relative=False,
+                     confidence=0.95, min_replications=5,
+                     max_replications=100, jobs=1, seed=None,
+                     instrument=None, **kwargs):
+    """
+    Run replications of a simulation until the confidence interval of
+    `metric` is narrow enough.
+
+    Parameters
+    ----------
+    config : str or Path
+        Simulation configuration
+    planning : :py:obj:`~topsim.algorithms.planning.Planning`
+        Planning model; each replication runs with a copy.
+    scheduling : :py:obj:`~topsim.algorithms.scheduling.Algorithm`
+        Scheduling model; each replication runs with a copy.
+    delay : :py:obj:`~topsim.core.delay.DelayModel`, optional
+        Delay model; each replication runs with a copy that has its own seed.
+    metric : str
+        The metric (one of :py:data:`METRICS`) that decides when to stop.
+    target_width : float, optional
+        Stop once the full width of the confidence interval of `metric` is
+        at most this. If not provided, `max_replications` are run.
+    relative : bool
+        If True, `target_width` is relative to the mean of `metric`.
+    confidence : float
+        Confidence level of the intervals
+    min_replications : int
+        Replications run before the stopping rule is checked
+    max_replications : int
+        Replications run at most
+    jobs : int
+        Number of worker processes; if 1, replications are run in this
+        process.
+    seed : int, optional
+        Seed from which the seed of each replication is derived (see
+        :py:func:`replication_seeds`).
+    instrument : :py:obj:`~topsim.core.instrument.Instrument`, optional
+        Defaults to :py:class:`~topsim.user.telescope.Telescope`
+    kwargs
+        Passed on to each :py:obj:`~topsim.core.simulation.Simulation`
+
+    Returns
+    -------
+    replications : pandas.DataFrame
+        The seed and metrics of each replication
+    summary : pandas.DataFrame
+        Summary statistics of each metric (see :py:func:`summarise`)
+    """
+    import pandas as pd
+
+    if metric not in METRICS:
+        raise ValueError(f"{metric} is not one of {METRICS}")
+    if min_replications < 2:
+        raise ValueError("At least 2 replications are needed for a "
+                         "confidence interval")
+    if max_replications < min_replications:
+        raise ValueError("max_replications is less than min_replications")
+    if instrument is None:
+        from topsim.user.telescope import Telescope
+        instrument = Telescope
+
+    seeds = replication_seeds(seed, max_replications)
+    args = (config, planning, scheduling, delay, instrument, kwargs)
+    statistics = RunningStatistics()
+    results = []
+
+    def done(result):
+        results.append(result)
+        statistics.update(result[metric])
+        LOGGER.info("Replication %s: %s = %s (mean %.2f +/- %.2f)",
+                    result["replication"], metric, result[metric],
+                    statistics.mean, statistics.half_width(confidence))
+        return _converged(statistics, target_width, relative, confidence,
+                          min_replications)
+
+    if jobs == 1:
+        for i, s in enumerate(seeds):
+            if done(_run_replication(i, s, *args)):
+                break
+    else:
+        _run_parallel(seeds, args, jobs, done)
+
+    replications = pd.DataFrame(results)
+    if len(results) == max_replications and target_width is not None \
+            and not _converged(statistics, target_width, relative,
+                               confidence, min_replications):
+        LOGGER.warning("%s replications run, but the confidence interval of "
+                       "%s is still wider than %s", max_replications, metric,
+                       target_width)
+    return replications, summarise(replications, confidence)
+
+
+def _run_parallel(seeds, args, jobs, done):
+    """
+    Keep `jobs` replications running until `done` reports convergence.
+
+    Results are passed to `done` in replication order, so the replications
+    that are used do not depend on the order in which workers finish.
+    """
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+    with ProcessPoolExecutor(max_workers=jobs,
+                             initializer=_init_worker) as pool:
+        pending = {}
+        finished = {}
+        submitted = 0
+        consumed = 0
+        while consumed < len(seeds):
+            while submitted < len(seeds) and len(pending) < jobs:
+                pending[submitted] = pool.submit(
+                    _run_replication, submitted, seeds[submitted], *args)
+                submitted += 1
+            complete, _ = wait(pending.values(), return_when=FIRST_COMPLETED)
+            for index in [i for i, f in pending.items() if f in complete]:
+                finished[index] = pending.pop(index).result()
+            while consumed in finished:
+                if done(finished.pop(consumed)):
+                    for future in pending.values():
+                        future.cancel()
+                    return
+                consumed += 1
+
+
+def _converged(statistics, target_width, relative, confidence,
+               min_replications):
+    if target_width is None or statistics.count < min_replications:
+        return False
+    width = 2 * statistics.half_width(confidence)
+    if relative:
+        width = width / abs(statistics.mean) if statistics.mean else math.inf
+    return width <= target_width
+
+
+def summarise(replications, confidence=0.95):
+    """
+    Summary statistics of each metric over a set of replications.
+
+    Returns
+    -------
+    summary : pandas.DataFrame
+        One row for each of :py:data:`METRICS`, with the number of
+        replications, mean, standard deviation, and the `confidence`
+        interval of the mean.
+    """
+    import pandas as pd
+
+    rows = {}
+    for metric in METRICS:
+        statistics = RunningStatistics()
+        for value in replications[metric] if len(replications) else []:
+            statistics.update(value)
+        half_width = statistics.half_width(confidence)
+        rows[metric] = {
+            "replications": statistics.count,
+            "mean": statistics.mean,
+            "std": statistics.std,
+            "ci_low": statistics.mean - half_width,
+            "ci_high": statistics.mean + half_width,
+            "ci_width": 2 * half_width,
+        }
+    summary = pd.DataFrame.from_dict(rows, orient="index")
+    summary.index.name = "metric"
+    summary.attrs["confidence"] = confidence
+    return summary